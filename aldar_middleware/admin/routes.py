@@ -1,16 +1,15 @@
 """Admin routes for user and system management."""
 
-import csv
-import io
+import json
 import logging
 import asyncio
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Sequence
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_, or_, asc, desc, nullslast, exists, cast, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -38,13 +37,21 @@ from aldar_middleware.admin.schemas import (
 )
 from aldar_middleware.schemas.feedback import PaginatedResponse
 from aldar_middleware.auth.dependencies import get_current_admin_user
-from aldar_middleware.database.base import get_db, async_session
+from aldar_middleware.database.base import get_db, get_read_db, async_session
 from aldar_middleware.models import User, UserGroupMembership, UserAgent, UserPermission, UserGroup
+from aldar_middleware.models.logs import AdminLog
 from aldar_middleware.services.logs_service import LogsService
 from aldar_middleware.services.postgres_logs_service import postgres_logs_service
 from aldar_middleware.services.azure_ad_sync import AzureADSyncService
 from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id
+from aldar_middleware.utils.csv_export import CSVExport, csv_export_response
+from aldar_middleware.utils.pagination import (
+    InvalidCursorError,
+    KeysetColumn,
+    paginate_keyset,
+    split_keyset_rows,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +77,8 @@ async def list_users(
     sort_order: Optional[str] = Query("ASC", description="Sort order: ASC or DESC"),
     include_groups: bool = Query(False, description="Include user groups (slower, use /users/{user_id}/groups for specific user)"),
     include_agents: bool = Query(True, description="Include user agents (default: True)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor (takes precedence over skip)"),
+    include_total: bool = Query(True, description="Count all matching users; disable for faster deep paging"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db),
 ) -> PaginatedResponse[UserResponse]:
@@ -246,74 +255,64 @@ async def list_users(
         query = query.where(User.last_login <= date_to)
     
     # Get total count before pagination
-    count_query = select(func.count()).select_from(query.subquery())
-    count_result = await db.execute(count_query)
-    total = count_result.scalar_one()
-    
-    # Apply sorting
-    order_by_clause = None
-    if sort_by:
-        sort_by_lower = sort_by.lower()
-        sort_order_upper = (sort_order or "ASC").upper()
-        
-        # Validate sort_order
-        if sort_order_upper not in ["ASC", "DESC"]:
-            sort_order_upper = "ASC"
-        
-        # Map sort_by to User model fields
-        if sort_by_lower == "role":
-            # Sort by is_admin first (admin users come first in DESC, last in ASC)
-            # Then by group role if available
-            if sort_order_upper == "ASC":
-                # ASC: non-admins first, then admins
-                order_by_clause = asc(User.is_admin)
-            else:
-                # DESC: admins first, then non-admins
-                order_by_clause = desc(User.is_admin)
-        elif sort_by_lower == "last_active":
-            # Sort by last_login (NULLs last)
-            field = User.last_login
-            if sort_order_upper == "ASC":
-                order_by_clause = nullslast(asc(field))
-            else:
-                order_by_clause = nullslast(desc(field))
-        elif sort_by_lower in ["username", "department", "full_name", "email", "date"]:
-            field_mapping = {
-                "username": User.username,
-                "department": User.azure_department,
-                "full_name": User.full_name,
-                "email": User.email,
-                "date": User.created_at,
-            }
-            field = field_mapping[sort_by_lower]
-            if sort_order_upper == "ASC":
-                # For ASC, put NULLs last
-                order_by_clause = nullslast(asc(field))
-            else:
-                # For DESC, put NULLs last as well for consistency
-                order_by_clause = nullslast(desc(field))
-        else:
-            # Invalid sort_by, default to name
-            order_by_clause = nullslast(asc(User.full_name))
+    total = None
+    if include_total:
+        count_query = select(func.count()).select_from(query.subquery())
+        count_result = await db.execute(count_query)
+        total = count_result.scalar_one()
+    
+    # Apply sorting (keyset: sort key, then id)
+    sort_by_lower = (sort_by or "name").lower()
+    sort_order_upper = (sort_order or "ASC").upper()
+    if sort_order_upper not in ["ASC", "DESC"]:
+        sort_order_upper = "ASC"
+    descending = sort_order_upper == "DESC"
+    
+    # Map sort_by to User model fields
+    field_mapping = {
+        # role: admins first in DESC, last in ASC
+        "role": User.is_admin,
+        "last_active": User.last_login,
+        "username": User.username,
+        "department": User.azure_department,
+        "full_name": User.full_name,
+        "email": User.email,
+        "date": User.created_at,
+    }
+    if sort_by_lower in field_mapping:
+        sort_keys = [
+            KeysetColumn(field_mapping[sort_by_lower], descending=descending, nullable=sort_by_lower != "email"),
+        ]
     else:
-        # Default sorting by name (full_name, then username as fallback)
-        # Use COALESCE to fallback to username if full_name is NULL
-        from sqlalchemy import func
+        # Default sorting by name (full_name, then username, then email as fallback)
+        sort_by_lower, sort_order_upper = "name", "ASC"
         name_expr = func.coalesce(User.full_name, User.username, User.email)
-        order_by_clause = nullslast(asc(name_expr))
+        sort_keys = [KeysetColumn(name_expr)]
+    sort_keys.append(KeysetColumn(User.id, descending=sort_keys[0].descending))
+    cursor_signature = f"admin_users:{sort_by_lower}:{sort_order_upper}"
     
     # Apply pagination and sorting
-    result = await db.execute(
-        query
-        .order_by(order_by_clause)
-        .offset(skip)
-        .limit(limit)
+    try:
+        page_query = paginate_keyset(
+            query,
+            sort_keys,
+            limit=limit,
+            signature=cursor_signature,
+            cursor=cursor,
+            offset=skip,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    result = await db.execute(page_query)
+    users, next_cursor = split_keyset_rows(
+        result.all(), sort_keys, limit=limit, signature=cursor_signature
     )
-    users = result.scalars().all()
     
     # Convert skip to page (1-based)
     page = (skip // limit) + 1 if limit > 0 else 1
-    total_pages = (total + limit - 1) // limit if total > 0 else 0
+    total_pages = None
+    if total is not None:
+        total_pages = (total + limit - 1) // limit if total > 0 else 0
     
     # Fast path: return users without groups if not needed (agents are included by default)
     if not include_groups and not include_agents:
@@ -360,6 +359,7 @@ async def list_users(
             page=page,
             limit=limit,
             total_pages=total_pages,
+            next_cursor=next_cursor,
         )
     
     # Build user responses with agents information (only if include_groups or include_agents is True)
@@ -738,11 +738,70 @@ async def list_users(
         page=page,
         limit=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
+USER_CSV_FIELDS = [
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "full_name",
+    "is_active",
+    "is_verified",
+    "is_admin",
+    "azure_ad_id",
+    "azure_display_name",
+    "azure_upn",
+    "department",
+    "job_title",
+    "external_id",
+    "company",
+    "is_onboarded",
+    "is_custom_query_enabled",
+    "created_at",
+    "updated_at",
+    "last_login",
+    "first_logged_in_at",
+]
+
+
+async def _user_csv_rows(db: AsyncSession, users: Sequence[User]) -> List[Dict[str, Any]]:
+    """Render a batch of users as CSV rows."""
+    return [
+        {
+            "id": str(user.id),
+            "email": user.email or "",
+            "username": user.username or "",
+            "first_name": user.first_name or "",
+            "last_name": user.last_name or "",
+            "full_name": user.full_name or "",
+            "is_active": user.is_active,
+            "is_verified": user.is_verified,
+            "is_admin": user.is_admin,
+            "azure_ad_id": user.azure_ad_id or "",
+            "azure_display_name": user.azure_display_name or "",
+            "azure_upn": user.azure_upn or "",
+            "department": user.azure_department or "",
+            "job_title": user.azure_job_title or "",
+            "external_id": user.external_id or "",
+            "company": user.company or "",
+            "is_onboarded": user.is_onboarded,
+            "is_custom_query_enabled": user.is_custom_query_enabled,
+            "created_at": user.created_at.isoformat() if user.created_at else "",
+            "updated_at": user.updated_at.isoformat() if user.updated_at else "",
+            "last_login": user.last_login.isoformat() if user.last_login else "",
+            "first_logged_in_at": user.first_logged_in_at.isoformat() if user.first_logged_in_at else "",
+        }
+        for user in users
+    ]
+
+
 @router.get("/users/export/csv")
 async def export_users_csv(
+    request: Request,
     is_admin: Optional[bool] = Query(None, description="Filter by admin status"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     is_verified: Optional[bool] = Query(None, description="Filter by verified status"),
@@ -757,7 +816,7 @@ async def export_users_csv(
     sort_order: Optional[str] = Query("ASC", description="Sort order: ASC or DESC"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db),
-) -> Response:
+) -> StreamingResponse:
     """Export users as CSV (admin only)."""
     try:
         from sqlalchemy import func
@@ -888,81 +947,91 @@ async def export_users_csv(
             name_expr = func.coalesce(User.full_name, User.username, User.email)
             order_by_clause = nullslast(asc(name_expr))
         
-        # Get all users (no pagination for export)
-        result = await db.execute(query.order_by(order_by_clause))
-        users = result.scalars().all()
-        
-        # Create CSV
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=[
-                "id",
-                "email",
-                "username",
-                "first_name",
-                "last_name",
-                "full_name",
-                "is_active",
-                "is_verified",
-                "is_admin",
-                "azure_ad_id",
-                "azure_display_name",
-                "azure_upn",
-                "department",
-                "job_title",
-                "external_id",
-                "company",
-                "is_onboarded",
-                "is_custom_query_enabled",
-                "created_at",
-                "updated_at",
-                "last_login",
-                "first_logged_in_at",
-            ],
-        )
-        
-        csv_writer.writeheader()
-        for user in users:
-            csv_writer.writerow({
-                "id": str(user.id),
-                "email": user.email or "",
-                "username": user.username or "",
-                "first_name": user.first_name or "",
-                "last_name": user.last_name or "",
-                "full_name": user.full_name or "",
-                "is_active": user.is_active,
-                "is_verified": user.is_verified,
-                "is_admin": user.is_admin,
-                "azure_ad_id": user.azure_ad_id or "",
-                "azure_display_name": user.azure_display_name or "",
-                "azure_upn": user.azure_upn or "",
-                "department": user.azure_department or "",
-                "job_title": user.azure_job_title or "",
-                "external_id": user.external_id or "",
-                "company": user.company or "",
-                "is_onboarded": user.is_onboarded,
-                "is_custom_query_enabled": user.is_custom_query_enabled,
-                "created_at": user.created_at.isoformat() if user.created_at else "",
-                "updated_at": user.updated_at.isoformat() if user.updated_at else "",
-                "last_login": user.last_login.isoformat() if user.last_login else "",
-                "first_logged_in_at": user.first_logged_in_at.isoformat() if user.first_logged_in_at else "",
-            })
-        
-        csv_data = csv_buffer.getvalue()
-        
-        logger.info(
-            "Users exported as CSV",
-            extra={
-                "user_count": len(users),
-                "exported_by": str(current_user.id),
-            },
-        )
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=users.csv"},
+        request_correlation_id = get_correlation_id() or str(uuid.uuid4())
+        filters = {
+            "is_admin": is_admin,
+            "is_active": is_active,
+            "is_verified": is_verified,
+            "user_id": str(user_id) if user_id else None,
+            "username": username,
+            "email": email,
+            "azure_ad_id": azure_ad_id,
+            "search": search,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+        }
+
+        async def write_export_log(
+            export_db: AsyncSession, log_action_type: str, log_level: str, message: str, **details: Any
+        ) -> None:
+            try:
+                admin_log_data = {
+                    "id": str(uuid.uuid4()),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "level": log_level,
+                    "action_type": log_action_type,
+                    "user_id": str(current_user.id),
+                    "email": current_user.email,
+                    "username": current_user.username or current_user.email,
+                    "correlation_id": request_correlation_id,
+                    "module": "admin",
+                    "function": "export_users_csv",
+                    "message": message,
+                    "log_data": {
+                        "action_type": log_action_type,
+                        "filters": filters,
+                        **details,
+                    }
+                }
+
+                await postgres_logs_service.write_admin_log(export_db, admin_log_data)
+            except Exception as e:
+                logger.error(f"Failed to write admin log for users export: {e}", exc_info=True)
+
+        # Log admin action: ADMIN_USERS_EXPORTED, before any row is sent
+        async def log_export(export_db: AsyncSession) -> None:
+            await write_export_log(export_db, "ADMIN_USERS_EXPORTED", "INFO", "Users export started", status="started")
+
+        async def log_export_completed(export_db: AsyncSession, row_count: int) -> None:
+            logger.info(
+                "Users exported as CSV",
+                extra={
+                    "user_count": row_count,
+                    "exported_by": str(current_user.id),
+                },
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_USERS_EXPORT_COMPLETED",
+                "INFO",
+                f"Users exported as CSV: {row_count} rows",
+                status="completed",
+                row_count=row_count,
+            )
+
+        async def log_export_failed(export_db: AsyncSession, row_count: int, error: BaseException) -> None:
+            await write_export_log(
+                export_db,
+                "ADMIN_USERS_EXPORT_FAILED",
+                "ERROR",
+                f"Users export failed after {row_count} rows",
+                status="failed",
+                row_count=row_count,
+                error=repr(error),
+            )
+
+        # Every matching user is streamed (no pagination for export)
+        return csv_export_response(
+            CSVExport(
+                query=query.order_by(order_by_clause, User.id),
+                fieldnames=USER_CSV_FIELDS,
+                render_batch=_user_csv_rows,
+                filename="users.csv",
+                on_start=log_export,
+                on_complete=log_export_completed,
+                on_failure=log_export_failed,
+            ),
+            request,
         )
     
     except Exception as e:
@@ -1458,8 +1527,10 @@ async def query_logs(
     offset: int = Query(0, ge=0, description="Number of logs to skip"),
     sort_by: Optional[str] = Query(None, description="Sort by field: timestamp, level, action_type, eventType, email, username, name, module"),
     sort_order: Optional[str] = Query("DESC", description="Sort order: ASC or DESC"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor (takes precedence over page/offset)"),
+    include_total: bool = Query(True, description="Count all matching items; disable for faster deep paging"),
     current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> PaginatedResponse[LogEntryResponse]:
     """Query application logs (admin only) from PostgreSQL admin_logs table."""
     try:
@@ -1482,10 +1553,12 @@ async def query_logs(
             search=search,
             sort_by=sort_by,
             sort_order=sort_order,
+            cursor=cursor,
+            include_total=include_total,
         )
         
         items = result.get("items", [])
-        total = result.get("total", 0)
+        total = result.get("total")
         
         # Transform to AdminLogEventResponse format (matching user logs structure)
         admin_logs_list = []
@@ -1715,7 +1788,9 @@ async def query_logs(
         page = (offset // limit) + 1 if limit > 0 else 1
         
         # Calculate total_pages
-        total_pages = (total + limit - 1) // limit if total > 0 and limit > 0 else 1
+        total_pages = None
+        if total is not None:
+            total_pages = (total + limit - 1) // limit if total > 0 and limit > 0 else 1
         
         # Return paginated response
         return PaginatedResponse(
@@ -1724,6 +1799,8 @@ async def query_logs(
             page=page,
             limit=limit,
             total_pages=total_pages,
+            total_is_estimate=result.get("total_is_estimate", False),
+            next_cursor=result.get("next_cursor"),
         )
     except ValueError as e:
         raise HTTPException(
@@ -1738,8 +1815,113 @@ async def query_logs(
         ) from e
 
 
+ADMIN_LOG_CSV_FIELDS = [
+    "ID",
+    "Timestamp",
+    "Level",
+    "ActionType",
+    "Module",
+    "Function",
+    "User ID",
+    "Name",
+    "Email",
+    "Role",
+    "User department",
+    "message",
+    "correlation_id",
+    "log_data",
+]
+
+
+async def _admin_log_csv_rows(db: AsyncSession, logs: Sequence[AdminLog]) -> List[Dict[str, Any]]:
+    """Render a batch of admin logs as CSV rows, looking up their users in one query."""
+    items = [postgres_logs_service.admin_log_to_dict(log) for log in logs]
+
+    # Fetch user information for enrichment
+    user_uuid_ids = set()
+    for item in items:
+        user_id = item.get("user_id")
+        if user_id:
+            try:
+                user_uuid_ids.add(UUID(user_id))
+            except (ValueError, TypeError):
+                pass
+
+    users_map = {}
+    if user_uuid_ids:
+        try:
+            user_result = await db.execute(select(User).where(User.id.in_(user_uuid_ids)))
+            for user in user_result.scalars().all():
+                full_name = user.full_name
+                if not full_name:
+                    if user.azure_display_name:
+                        full_name = user.azure_display_name
+                    elif user.first_name or user.last_name:
+                        full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+
+                users_map[str(user.id)] = {
+                    "full_name": full_name,
+                    "department": user.azure_department,
+                    "role": "ADMIN" if user.is_admin else "NORMAL",
+                    "azure_ad_id": user.azure_ad_id,
+                }
+        except Exception as e:
+            logger.warning(f"Error fetching user information for logs: {str(e)}")
+
+    rows = []
+    for item in items:
+        log_data = item.get("log_data", {})
+        item_id = item.get("id") or log_data.get("id") or ""
+        # Timestamp
+        created_at = item.get("timestamp") or item.get("createdAt") or log_data.get("timestamp") or ""
+        # Level and action
+        level = item.get("level") or log_data.get("level") or ""
+        action_type_val = item.get("action_type") or log_data.get("action_type") or ""
+        module_val = item.get("module") or log_data.get("module") or ""
+        function_val = item.get("function") or log_data.get("function") or ""
+
+        user_id = item.get("user_id") or log_data.get("user_id") or ""
+
+        # Get user info if available
+        user_info = users_map.get(user_id, {}) if user_id else {}
+
+        # Format log_data as JSON string
+        try:
+            log_data_str = json.dumps(log_data) if log_data else ""
+        except Exception:
+            log_data_str = str(log_data)
+
+        # Get user fields
+        name = user_info.get("full_name", "") or item.get("name", "")
+        email = item.get("email", "") or user_info.get("email", "")
+        role = user_info.get("role", "") or item.get("role", "")
+        department = user_info.get("department", "") or item.get("department", "")
+
+        # Clean up message - remove newlines and extra spaces
+        message = (item.get("message") or "").replace("\n", " ").replace("\r", "").strip()
+
+        rows.append({
+            "ID": item_id or "",
+            "Timestamp": created_at if isinstance(created_at, str) else (created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)),
+            "Level": level or "",
+            "ActionType": action_type_val or "",
+            "Module": module_val or "",
+            "Function": function_val or "",
+            "User ID": user_id or "",
+            "Name": name or "",
+            "Email": email or "",
+            "Role": role or "",
+            "User department": department or "",
+            "message": message or "",
+            "correlation_id": item.get("correlation_id", "") or "",
+            "log_data": log_data_str,
+        })
+    return rows
+
+
 @router.get("/logs/export/csv")
 async def export_admin_logs_csv(
+    request: Request,
     email: Optional[str] = Query(None, description="Filter by user email"),
     level: Optional[str] = Query(None, description="Filter by log level"),
     action_type: Optional[str] = Query(None, description="Filter by action type"),
@@ -1750,14 +1932,14 @@ async def export_admin_logs_csv(
     search: Optional[str] = Query(None, description="Search across name, email, username, user_id, message, and log data fields"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db),
-) -> Response:
-    """Export admin logs as CSV (admin only)."""
+) -> StreamingResponse:
+    """Export admin logs as CSV (admin only).
+
+    Every matching log is streamed, newest first.
+    """
     try:
-        # Query all matching logs (no pagination for export)
-        result = await postgres_logs_service.query_admin_logs(
-            db=db,
-            limit=100000,  # Large limit for export
-            offset=0,
+        query = await postgres_logs_service.admin_logs_export_query(
+            db,
             date_from=date_from,
             date_to=date_to,
             level=level,
@@ -1766,180 +1948,94 @@ async def export_admin_logs_csv(
             function=function,
             email=email,
             search=search,
-            sort_by="timestamp",
-            sort_order="DESC",
         )
-        
-        items = result.get("items", [])
-        
-        # Fetch user information for enrichment
-        from uuid import UUID as UUIDType
-        user_ids_to_fetch = set()
-        for item in items:
-            user_id = item.get("user_id")
-            if user_id:
-                try:
-                    UUIDType(user_id)
-                    user_ids_to_fetch.add(user_id)
-                except (ValueError, TypeError):
-                    pass
-        
-        users_map = {}
-        if user_ids_to_fetch:
-            try:
-                user_uuid_ids = []
-                for user_id_str in user_ids_to_fetch:
-                    try:
-                        user_uuid_ids.append(UUIDType(user_id_str))
-                    except (ValueError, TypeError):
-                        pass
-                
-                if user_uuid_ids:
-                    user_query = select(User).where(User.id.in_(user_uuid_ids))
-                    user_result = await db.execute(user_query)
-                    users = user_result.scalars().all()
-                    
-                    for user in users:
-                        full_name = user.full_name
-                        if not full_name:
-                            if user.azure_display_name:
-                                full_name = user.azure_display_name
-                            elif user.first_name or user.last_name:
-                                full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
-                        
-                        users_map[str(user.id)] = {
-                            "full_name": full_name,
-                            "department": user.azure_department,
-                            "role": "ADMIN" if user.is_admin else "NORMAL",
-                            "azure_ad_id": user.azure_ad_id,
-                        }
-            except Exception as e:
-                logger.warning(f"Error fetching user information for logs: {str(e)}")
-        
-        # Create CSV with specific columns as requested
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=[
-                "ID",
-                "Timestamp",
-                "Level",
-                "ActionType",
-                "Module",
-                "Function",
-                "User ID",
-                "Name",
-                "Email",
-                "Role",
-                "User department",
-                "message",
-                "correlation_id",
-                "log_data",
-            ],
-        )
-        
-        csv_writer.writeheader()
-        for item in items:
-            log_data = item.get("log_data", {})
-            item_id = item.get("id") or log_data.get("id") or ""
-            # Timestamp
-            created_at = item.get("timestamp") or item.get("createdAt") or log_data.get("timestamp") or ""
-            # Level and action
-            level = item.get("level") or log_data.get("level") or ""
-            action_type_val = item.get("action_type") or log_data.get("action_type") or ""
-            module_val = item.get("module") or log_data.get("module") or ""
-            function_val = item.get("function") or log_data.get("function") or ""
-
-            user_id = item.get("user_id") or log_data.get("user_id") or ""
-
-            # Get user info if available
-            user_info = users_map.get(user_id, {}) if user_id else {}
-
-            # Format log_data as JSON string
-            import json
-            try:
-                log_data_str = json.dumps(log_data) if log_data else ""
-            except Exception:
-                log_data_str = str(log_data)
-
-            # Get user fields
-            name = user_info.get("full_name", "") or item.get("name", "")
-            email = item.get("email", "") or user_info.get("email", "")
-            role = user_info.get("role", "") or item.get("role", "")
-            department = user_info.get("department", "") or item.get("department", "")
-
-            # Clean up message - remove newlines and extra spaces
-            message = (item.get("message") or "").replace("\n", " ").replace("\r", "").strip()
-
-            csv_writer.writerow({
-                "ID": item_id or "",
-                "Timestamp": created_at if isinstance(created_at, str) else (created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)),
-                "Level": level or "",
-                "ActionType": action_type_val or "",
-                "Module": module_val or "",
-                "Function": function_val or "",
-                "User ID": user_id or "",
-                "Name": name or "",
-                "Email": email or "",
-                "Role": role or "",
-                "User department": department or "",
-                "message": message or "",
-                "correlation_id": item.get("correlation_id", "") or "",
-                "log_data": log_data_str,
-            })
+        request_correlation_id = get_correlation_id() or str(uuid.uuid4())
 
-        csv_data = csv_buffer.getvalue()
-        
-        logger.info(
-            "Admin logs exported as CSV",
-            extra={
-                "user_id": str(current_user.id),
-                "row_count": len(items),
-            },
-        )
-        
-        # Log admin action: ADMIN_ADMIN_LOGS_EXPORTED
-        try:
-            request_correlation_id = get_correlation_id() or str(uuid.uuid4())
-            admin_log_data = {
-                "id": str(uuid.uuid4()),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "level": "INFO",
-                "action_type": "ADMIN_ADMIN_LOGS_EXPORTED",
-                "user_id": str(current_user.id),
-                "email": current_user.email,
-                "username": current_user.username or current_user.email,
-                "correlation_id": request_correlation_id,
-                "module": "admin",
-                "function": "export_admin_logs_csv",
-                "message": f"Admin logs exported as CSV: {len(items)} rows",
-                "log_data": {
-                    "action_type": "ADMIN_ADMIN_LOGS_EXPORTED",
-                    "row_count": len(items),
-                    "filters": {
-                        "date_from": date_from.isoformat() if date_from else None,
-                        "date_to": date_to.isoformat() if date_to else None,
-                        "email": email,
-                        "level": level,
-                        "action_type": action_type,
-                        "module": module,
-                        "function": function,
-                        "search": search,
+        filters = {
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+            "email": email,
+            "level": level,
+            "action_type": action_type,
+            "module": module,
+            "function": function,
+            "search": search,
+        }
+
+        async def write_export_log(
+            export_db: AsyncSession, log_action_type: str, log_level: str, message: str, **details: Any
+        ) -> None:
+            try:
+                admin_log_data = {
+                    "id": str(uuid.uuid4()),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "level": log_level,
+                    "action_type": log_action_type,
+                    "user_id": str(current_user.id),
+                    "email": current_user.email,
+                    "username": current_user.username or current_user.email,
+                    "correlation_id": request_correlation_id,
+                    "module": "admin",
+                    "function": "export_admin_logs_csv",
+                    "message": message,
+                    "log_data": {
+                        "action_type": log_action_type,
+                        "filters": filters,
+                        **details,
                     }
                 }
-            }
-            
-            # Write to PostgreSQL synchronously using the same db session
-            await postgres_logs_service.write_admin_log(db, admin_log_data)
-        except Exception as e:
-            logger.error(f"Failed to write admin log for admin logs export: {e}", exc_info=True)
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=admin_logs_export.csv"},
+
+                await postgres_logs_service.write_admin_log(export_db, admin_log_data)
+            except Exception as e:
+                logger.error(f"Failed to write admin log for admin logs export: {e}", exc_info=True)
+
+        # Log admin action: ADMIN_ADMIN_LOGS_EXPORTED, before any row is sent
+        async def log_export(export_db: AsyncSession) -> None:
+            await write_export_log(
+                export_db, "ADMIN_ADMIN_LOGS_EXPORTED", "INFO", "Admin logs export started", status="started"
+            )
+
+        async def log_export_completed(export_db: AsyncSession, row_count: int) -> None:
+            logger.info(
+                "Admin logs exported as CSV",
+                extra={
+                    "user_id": str(current_user.id),
+                    "row_count": row_count,
+                },
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_ADMIN_LOGS_EXPORT_COMPLETED",
+                "INFO",
+                f"Admin logs exported as CSV: {row_count} rows",
+                status="completed",
+                row_count=row_count,
+            )
+
+        async def log_export_failed(export_db: AsyncSession, row_count: int, error: BaseException) -> None:
+            await write_export_log(
+                export_db,
+                "ADMIN_ADMIN_LOGS_EXPORT_FAILED",
+                "ERROR",
+                f"Admin logs export failed after {row_count} rows",
+                status="failed",
+                row_count=row_count,
+                error=repr(error),
+            )
+
+        return csv_export_response(
+            CSVExport(
+                query=query,
+                fieldnames=ADMIN_LOG_CSV_FIELDS,
+                render_batch=_admin_log_csv_rows,
+                filename="admin_logs_export.csv",
+                on_start=log_export,
+                on_complete=log_export_completed,
+                on_failure=log_export_failed,
+            ),
+            request,
         )
-    
+
     except Exception as e:
         logger.error(
             f"Failed to export admin logs: {str(e)}",
@@ -43,6 +43,7 @@ from aldar_middleware.middleware.external_api_cache import (
     AGNOAPIMonitoringMiddleware
 )
 from aldar_middleware.settings.context import get_correlation_id
+from aldar_middleware.utils.openapi_cache import install_openapi_cache
 
 
 class ORJSONResponse(Response):
@@ -202,8 +203,6 @@ def get_app() -> FastAPI:
 
     # Add HTTPBearer security scheme to OpenAPI
     def custom_openapi():
-        if app.openapi_schema:
-            return app.openapi_schema
         openapi_schema = get_openapi(
             title=app.title,
             version=app.version,
@@ -300,9 +299,10 @@ def get_app() -> FastAPI:
             
             openapi_schema["tags"] = ordered_tags
         
-        app.openapi_schema = openapi_schema
-        return app.openapi_schema
-    app.openapi = custom_openapi
+        return openapi_schema
+
+    # Generated once per route table and served from memory with an ETag
+    install_openapi_cache(app, custom_openapi, settings.openapi_cache_path)
 
     # Include routers
     app.include_router(router=api_router, prefix=settings.api_prefix)
@@ -280,6 +280,33 @@ class AzureADAuth:
             # Return None on error - don't fail the login process
             return None
 
+    async def get_user_profile_photo_etag(self, access_token: str, user_id: str) -> Optional[str]:
+        """Get the ETag of a user's profile photo from Microsoft Graph.
+
+        Reads the photo metadata only, so callers can skip downloading a photo
+        that has not changed since it was last stored.
+
+        Args:
+            access_token: Azure AD access token
+            user_id: Azure AD user ID (oid from token)
+
+        Returns:
+            Photo ETag if the user has a photo, None otherwise
+
+        Raises:
+            httpx.HTTPError: If the metadata request fails
+        """
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(
+                f"https://graph.microsoft.com/v1.0/users/{user_id}/photo",
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+        if response.status_code == 404:
+            logger.debug(f"Profile photo not found for user {user_id} (404)")
+            return None
+        response.raise_for_status()
+        return response.json().get("@odata.mediaEtag")
+
     async def get_user_profile_photo_bytes(self, access_token: str, user_id: str) -> Optional[bytes]:
         """Get user profile photo bytes from Microsoft Graph.
         
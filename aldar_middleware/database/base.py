@@ -1,11 +1,14 @@
 """Database base configuration."""
 
 from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from aldar_middleware.database.pool_budget import compute_pool_budget, create_pooled_engine
+from aldar_middleware.database.read_routing import ReadRouter
 from aldar_middleware.settings import settings
+from aldar_middleware.settings.context import get_user_id
 
 # Naming convention for constraints
 convention = {
@@ -19,17 +22,20 @@ convention = {
 metadata = MetaData(naming_convention=convention)
 Base = declarative_base(metadata=metadata)
 
-# Create async engine with proper connection pooling for Celery workers
-engine = create_async_engine(
+# Each worker's share of the cluster-wide connection budget (see pool_budget.py)
+pool_budget = compute_pool_budget(
+    settings.db_connection_budget,
+    workers=settings.db_pool_workers or settings.workers_count,
+    replicas=settings.db_pool_replicas,
+    overflow_fraction=settings.db_pool_overflow_fraction,
+)
+
+engine = create_pooled_engine(
     str(settings.db_url_property),
+    pool_budget,
+    pool_timeout=settings.db_pool_timeout,
+    pgbouncer_transaction_mode=settings.db_pgbouncer_transaction_mode,
     echo=settings.db_echo,
-    future=True,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    pool_size=20,  # Number of connections to maintain (increased for high load)
-    max_overflow=30,  # Maximum overflow connections (increased for performance tests)
-    pool_timeout=30,  # Timeout for getting connection from pool
-    connect_args={"command_timeout": 60}  # Query timeout in seconds
 )
 
 # Create async session factory
@@ -39,6 +45,37 @@ async_session = sessionmaker(
     expire_on_commit=False,
 )
 
+# Optional read replica, used through get_read_db
+replica_engine = None
+replica_session = None
+if settings.db_replica_url:
+    replica_engine = create_pooled_engine(
+        settings.db_replica_url,
+        compute_pool_budget(
+            settings.db_replica_connection_budget,
+            workers=settings.db_pool_workers or settings.workers_count,
+            replicas=settings.db_pool_replicas,
+            overflow_fraction=settings.db_pool_overflow_fraction,
+        ),
+        name="replica",
+        pool_timeout=settings.db_pool_timeout,
+        pgbouncer_transaction_mode=settings.db_pgbouncer_transaction_mode,
+        echo=settings.db_echo,
+    )
+    replica_session = sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+read_router = ReadRouter(
+    async_session,
+    replica_session,
+    max_lag_seconds=settings.db_replica_max_lag_seconds,
+    lag_check_interval=settings.db_replica_lag_check_interval_seconds,
+    sticky_seconds=settings.db_read_your_writes_seconds,
+)
+
 
 async def get_db() -> AsyncSession:
     """Get database session."""
@@ -47,6 +84,21 @@ async def get_db() -> AsyncSession:
             yield session
         finally:
             await session.close()
+            # Keep the user's reads on the primary until the replica has their write
+            await read_router.note_session_writes(session, get_user_id())
+
+
+async def get_read_db() -> AsyncSession:
+    """Get a session for read-only endpoints.
+
+    Reads from the replica unless it lags or the requesting user just wrote;
+    see database/read_routing.py.
+    """
+    async with await read_router.read_session(get_user_id()) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
 
 
 async def get_async_session() -> AsyncSession:
@@ -56,3 +108,4 @@ async def get_async_session() -> AsyncSession:
             yield session
         finally:
             await session.close()
+            await read_router.note_session_writes(session, get_user_id())
@@ -0,0 +1,172 @@
+"""Cluster-wide database connection budgeting.
+
+Every gunicorn worker owns its own connection pool, so the connections a
+deployment can open are ``replicas x workers x (pool_size + max_overflow)``.
+With fixed per-worker pools that number grows with the CPU count of the node
+and quickly exceeds what Postgres (or pgbouncer) accepts.
+
+:func:`compute_pool_budget` splits a configured cluster-wide budget across
+every worker at boot instead. Requests beyond a worker's share queue in its
+pool for up to ``db_pool_timeout`` seconds rather than failing to connect.
+:class:`MeteredAsyncPool` reports how long checkouts wait and how saturated
+each pool is.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from loguru import logger
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Per-worker pool used when no connection budget is configured
+DEFAULT_POOL_SIZE = 20
+DEFAULT_MAX_OVERFLOW = 30
+
+
+@dataclass(frozen=True)
+class PoolBudget:
+    """Pool dimensions of one worker."""
+
+    pool_size: int
+    max_overflow: int
+
+    @property
+    def capacity(self) -> int:
+        """Most connections the worker may hold at once."""
+        return self.pool_size + self.max_overflow
+
+
+def compute_pool_budget(
+    budget: Optional[int],
+    workers: int,
+    replicas: int = 1,
+    overflow_fraction: float = 0.25,
+) -> PoolBudget:
+    """Split a cluster-wide connection budget into one worker's pool.
+
+    Args:
+        budget: Connections all workers of all replicas may hold together;
+            None keeps the fixed default pool
+        workers: Worker processes per replica
+        replicas: Replicas (pods) of the deployment
+        overflow_fraction: Share of a worker's connections that are only
+            opened under load and closed again when returned
+
+    Returns:
+        The worker's pool size and overflow; their sum never exceeds its share
+        of the budget, except that every worker gets at least one connection
+    """
+    if budget is None:
+        return PoolBudget(DEFAULT_POOL_SIZE, DEFAULT_MAX_OVERFLOW)
+    if budget < 1 or workers < 1 or replicas < 1:
+        raise ValueError(f"Invalid connection budget {budget} for {replicas} replicas x {workers} workers")
+    if not 0 <= overflow_fraction < 1:
+        raise ValueError(f"Pool overflow fraction must be in [0, 1), got {overflow_fraction}")
+
+    processes = workers * replicas
+    share = budget // processes
+    if share < 1:
+        logger.warning(
+            f"Connection budget {budget} is smaller than the {processes} workers sharing it; "
+            f"giving each worker one connection ({processes} in total)"
+        )
+        share = 1
+
+    max_overflow = int(share * overflow_fraction)
+    pool = PoolBudget(pool_size=share - max_overflow, max_overflow=max_overflow)
+    logger.info(
+        f"Connection budget {budget} split across {replicas} replicas x {workers} workers: "
+        f"pool_size={pool.pool_size}, max_overflow={pool.max_overflow} per worker"
+    )
+    return pool
+
+
+class MeteredAsyncPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout wait time and saturation.
+
+    Metrics are labelled with the pool's ``logging_name`` (the engine's
+    ``pool_logging_name``), which survives ``engine.dispose()``.
+    """
+
+    @property
+    def metrics_name(self) -> str:
+        return self._orig_logging_name or "default"
+
+    def connect(self) -> Any:
+        # Imported here: the monitoring package imports database.base
+        from aldar_middleware.monitoring.prometheus import record_db_pool_checkout
+
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            record_db_pool_checkout(self.metrics_name, time.perf_counter() - start, timed_out)
+            self._record_usage()
+
+    def _do_return_conn(self, record: Any) -> None:
+        super()._do_return_conn(record)
+        self._record_usage()
+
+    def _record_usage(self) -> None:
+        from aldar_middleware.monitoring.prometheus import record_db_pool_usage
+
+        record_db_pool_usage(self.metrics_name, self.checkedout(), self.size() + self._max_overflow)
+
+
+def pgbouncer_connect_args() -> Dict[str, Any]:
+    """asyncpg arguments for pgbouncer in transaction mode.
+
+    Consecutive transactions may run on different server connections, so
+    prepared statements must not be cached across them, and their names must
+    not collide between clients sharing a server connection.
+    """
+    return {
+        "statement_cache_size": 0,  # asyncpg's own cache
+        "prepared_statement_cache_size": 0,  # SQLAlchemy's asyncpg dialect cache
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+def create_pooled_engine(
+    url: str,
+    pool: PoolBudget,
+    name: str = "primary",
+    pool_timeout: float = 30.0,
+    pgbouncer_transaction_mode: bool = False,
+    **kwargs: Any,
+) -> AsyncEngine:
+    """Create an async engine with a metered pool of the given dimensions.
+
+    Args:
+        url: Database URL
+        pool: Pool dimensions, usually from :func:`compute_pool_budget`
+        name: Pool name used in logs and metrics
+        pool_timeout: Seconds a checkout queues before raising TimeoutError
+        pgbouncer_transaction_mode: Disable prepared statement caching
+        **kwargs: Passed to ``create_async_engine``
+    """
+    connect_args = {"command_timeout": 60}  # Query timeout in seconds
+    if pgbouncer_transaction_mode:
+        connect_args.update(pgbouncer_connect_args())
+    connect_args.update(kwargs.pop("connect_args", {}))
+    return create_async_engine(
+        url,
+        future=True,
+        poolclass=MeteredAsyncPool,
+        pool_logging_name=name,
+        pool_pre_ping=True,  # Verify connections before using them
+        pool_recycle=3600,  # Recycle connections after 1 hour
+        pool_size=pool.pool_size,
+        max_overflow=pool.max_overflow,
+        pool_timeout=pool_timeout,
+        connect_args=connect_args,
+        **kwargs,
+    )
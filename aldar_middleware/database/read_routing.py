@@ -0,0 +1,218 @@
+"""Read-replica routing for read-heavy endpoints.
+
+Endpoints that only read opt in with the ``get_read_db`` dependency
+(``database/base.py``) instead of ``get_db``. :class:`ReadRouter` gives them a
+replica session when that is safe and a primary session otherwise:
+
+* no replica is configured (``db_replica_url`` unset);
+* the replica is unreachable, or more than ``db_replica_max_lag_seconds``
+  behind the primary (measured at most every
+  ``db_replica_lag_check_interval_seconds``);
+* the requesting user committed a write in the last
+  ``db_read_your_writes_seconds`` (read-your-writes). Writes are noted by the
+  ``get_db`` dependency per worker and in Redis, so the stickiness holds for
+  the user's next requests on any worker.
+
+Writes are detected from ORM flushes and INSERT/UPDATE/DELETE (or textual)
+statements executed on a session and then committed.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.elements import TextClause
+
+from aldar_middleware.database.redis_client import get_redis_sync
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+# Session.info keys set by the write tracking listeners below
+_PENDING_WRITES = "read_routing_pending_writes"
+_COMMITTED_WRITES = "read_routing_committed_writes"
+
+# Replay lag of a standby; 0 on a primary and on a standby that has replayed all it received
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Local read-your-writes entries kept before expired ones are swept
+_MAX_LOCAL_WRITERS = 10000
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Where a read session goes and why."""
+
+    target: str  # PRIMARY or REPLICA
+    reason: str  # "replica", "no_replica", "recent_write", "replica_lag", "replica_unavailable"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context: Any) -> None:
+    session.info[_PENDING_WRITES] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete or isinstance(state.statement, TextClause):
+        state.session.info[_PENDING_WRITES] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _track_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_WRITES, False):
+        session.info[_COMMITTED_WRITES] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _track_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_WRITES, None)
+
+
+def _anonymous(user_id: Optional[str]) -> bool:
+    return not user_id or user_id == "N/A"
+
+
+class ReadRouter:
+    """Chooses between the primary and a replica for read-only sessions."""
+
+    REDIS_KEY_PREFIX = "db_read:recent_write:"
+
+    def __init__(
+        self,
+        primary_sessions: Callable[[], AsyncSession],
+        replica_sessions: Optional[Callable[[], AsyncSession]] = None,
+        max_lag_seconds: float = 5.0,
+        lag_check_interval: float = 2.0,
+        sticky_seconds: float = 10.0,
+        lag_check_timeout: float = 1.0,
+        redis_getter: Callable[[], Any] = get_redis_sync,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            primary_sessions: Session factory of the primary
+            replica_sessions: Session factory of the replica; None routes every read to the primary
+            max_lag_seconds: Replica lag beyond which reads go to the primary
+            lag_check_interval: Seconds between replica lag measurements
+            sticky_seconds: How long a user's reads go to the primary after they write
+            lag_check_timeout: Seconds before a lag measurement counts as unavailable
+            redis_getter: Returns the shared Redis client, or None
+            clock: Monotonic clock
+        """
+        self._primary_sessions = primary_sessions
+        self._replica_sessions = replica_sessions
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.sticky_seconds = sticky_seconds
+        self.lag_check_timeout = lag_check_timeout
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self._lag: Optional[float] = None
+        self._lag_checked_at = float("-inf")
+        self._recent_writers: Dict[str, float] = {}
+
+    async def note_write(self, user_id: Optional[str]) -> None:
+        """Send the user's reads to the primary for ``sticky_seconds``."""
+        if _anonymous(user_id):
+            return
+        if len(self._recent_writers) >= _MAX_LOCAL_WRITERS:
+            now = self._clock()
+            self._recent_writers = {user: until for user, until in self._recent_writers.items() if until > now}
+        self._recent_writers[user_id] = self._clock() + self.sticky_seconds
+
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        try:
+            await redis.set(f"{self.REDIS_KEY_PREFIX}{user_id}", 1, px=int(self.sticky_seconds * 1000))
+        except Exception as e:
+            logger.warning(f"Could not share recent write of user {user_id}: {e}")
+
+    async def note_session_writes(self, session: AsyncSession, user_id: Optional[str]) -> None:
+        """Note a write for the user if the session committed one."""
+        if session.info.pop(_COMMITTED_WRITES, False):
+            await self.note_write(user_id)
+
+    async def recently_wrote(self, user_id: Optional[str]) -> bool:
+        """Whether the user wrote within ``sticky_seconds``, on this worker or another."""
+        if _anonymous(user_id):
+            return False
+        until = self._recent_writers.get(user_id)
+        if until is not None:
+            if until > self._clock():
+                return True
+            del self._recent_writers[user_id]
+
+        redis = self._redis_getter()
+        if redis is None:
+            return False
+        try:
+            return bool(await redis.exists(f"{self.REDIS_KEY_PREFIX}{user_id}"))
+        except Exception as e:
+            # Without the shared marker a stale read is possible; the primary is always fresh
+            logger.warning(f"Could not check recent writes of user {user_id}: {e}")
+            return True
+
+    async def replica_lag(self) -> Optional[float]:
+        """Replica lag in seconds, or None if it is unknown or the replica is unreachable."""
+        now = self._clock()
+        if now - self._lag_checked_at >= self.lag_check_interval:
+            # Claim the check so concurrent requests keep using the previous value
+            self._lag_checked_at = now
+            self._lag = await self._measure_lag()
+            from aldar_middleware.monitoring.prometheus import record_replica_lag
+
+            record_replica_lag(self._lag)
+        return self._lag
+
+    async def _measure_lag(self) -> Optional[float]:
+        try:
+            async with self._replica_sessions() as session:
+                lag = await asyncio.wait_for(session.scalar(_REPLICA_LAG_SQL), self.lag_check_timeout)
+            return float(lag)
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from the primary: {e!r}")
+            return None
+
+    async def decide(self, user_id: Optional[str] = None) -> RouteDecision:
+        """Choose the database for a read by ``user_id``."""
+        if self._replica_sessions is None:
+            decision = RouteDecision(PRIMARY, "no_replica")
+        elif await self.recently_wrote(user_id):
+            decision = RouteDecision(PRIMARY, "recent_write")
+        else:
+            lag = await self.replica_lag()
+            if lag is None:
+                decision = RouteDecision(PRIMARY, "replica_unavailable")
+            elif lag > self.max_lag_seconds:
+                decision = RouteDecision(PRIMARY, "replica_lag")
+            else:
+                decision = RouteDecision(REPLICA, "replica")
+
+        # Imported here: the monitoring package imports database.base
+        from aldar_middleware.monitoring.prometheus import record_db_read_route
+
+        record_db_read_route(decision.target, decision.reason)
+        return decision
+
+    async def read_session(self, user_id: Optional[str] = None) -> AsyncSession:
+        """A new session for reads by ``user_id`` on the database chosen by :meth:`decide`."""
+        decision = await self.decide(user_id)
+        factory = self._replica_sessions if decision.target == REPLICA else self._primary_sessions
+        session = factory()
+        session.info["read_route"] = decision
+        return session
@@ -2,7 +2,7 @@
 
 import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List
 
 from loguru import logger
 from sqlalchemy import text
@@ -18,11 +18,15 @@ from aldar_middleware.monitoring.metrics_forwarder import (
     initialize_prometheus_forwarder,
     shutdown_prometheus_forwarder,
 )
+from aldar_middleware.monitoring.database_tracing import install_database_tracing
+from aldar_middleware.monitoring.trace_exporter import get_trace_exporter
 from aldar_middleware.monitoring.cosmos_logger import (
     initialize_cosmos_logging,
     shutdown_cosmos_logging,
 )
+from aldar_middleware.services.login_enrichment import get_login_enrichment_worker
 from aldar_middleware.services.user_logs_service import user_logs_service
+from aldar_middleware.utils.startup import StartupGraph, StartupTask, get_startup_graph, set_startup_graph
 from aldar_middleware.orchestration.azure_key_vault import (
     get_key_vault_service,
     load_secrets_from_key_vault,
@@ -71,242 +75,260 @@ async def _initialize_caches(redis_client, redis_available: bool) -> None:
         logger.warning(f"Failed to initialize user memory cache: {cache_error}")
 
 
-@asynccontextmanager
-async def lifespan_setup(app) -> AsyncGenerator[None, None]:
-    """
-    Application lifespan manager.
+async def _load_key_vault_secrets() -> None:
+    """Load secrets from Azure Key Vault into the environment."""
+    key_vault_loaded = await asyncio.to_thread(load_secrets_from_key_vault)
+    if key_vault_loaded:
+        logger.info("Secrets loaded from Azure Key Vault")
+    else:
+        logger.debug("Azure Key Vault not configured or no secrets to load")
 
-    Handles startup and shutdown events.
-    """
-    # Startup
-    logger.info("Starting AIQ Backend application...")
 
-    # Initialize Azure Key Vault and load secrets
-    try:
-        key_vault_loaded = load_secrets_from_key_vault()
-        if key_vault_loaded:
-            logger.info("Secrets loaded from Azure Key Vault")
-        else:
-            logger.debug("Azure Key Vault not configured or no secrets to load")
-    except Exception as e:
-        logger.warning(f"Failed to load secrets from Azure Key Vault: {e}")
-        # Don't raise - Key Vault is optional
+async def _init_key_vault_service() -> None:
+    """Initialize the Key Vault service (for programmatic access)."""
+    key_vault_service = await asyncio.to_thread(get_key_vault_service)
+    if key_vault_service:
+        logger.info("Azure Key Vault service initialized")
 
-    # Initialize Key Vault service (for programmatic access)
-    try:
-        key_vault_service = get_key_vault_service()
-        if key_vault_service:
-            logger.info("Azure Key Vault service initialized")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Azure Key Vault service: {e}")
-        # Don't raise - Key Vault is optional
 
-    # Initialize Cosmos DB logging (admin logs)
-    try:
-        cosmos_initialized = await initialize_cosmos_logging()
-        if cosmos_initialized:
-            logger.info("Cosmos DB logging initialized")
-        else:
-            logger.debug("Cosmos DB logging not enabled")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Cosmos DB logging: {e}")
-        # Don't raise - Cosmos DB logging is optional
-    
-    # Initialize User Logs Service (user logs collection)
-    try:
-        user_logs_initialized = await user_logs_service.initialize()
-        if user_logs_initialized:
-            logger.info("User logs service initialized successfully")
-        else:
-            logger.debug("User logs service not enabled")
-    except Exception as e:
-        logger.warning(f"Failed to initialize user logs service: {e}")
-        # Don't raise - User logs service is optional
+async def _init_cosmos_logging() -> None:
+    """Initialize Cosmos DB logging (admin logs)."""
+    if await initialize_cosmos_logging():
+        logger.info("Cosmos DB logging initialized")
+    else:
+        logger.debug("Cosmos DB logging not enabled")
 
-    # Initialize Azure monitoring
-    try:
-        initialize_azure_monitoring()
-        logger.info("Azure monitoring initialized")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Azure monitoring: {e}")
-        # Don't raise - Azure monitoring is optional
 
-    # Initialize Azure Metrics Ingestion
-    try:
-        initialize_metrics_ingestion()
-        logger.info("Azure Metrics Ingestion initialized")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Azure Metrics Ingestion: {e}")
-        # Don't raise - metrics ingestion is optional
+async def _init_user_logs() -> None:
+    """Initialize the user logs service (user logs collection)."""
+    if await user_logs_service.initialize():
+        logger.info("User logs service initialized successfully")
+    else:
+        logger.debug("User logs service not enabled")
 
-    # Initialize Prometheus to Azure Metrics Forwarder
-    try:
-        initialize_prometheus_forwarder(collection_interval=settings.azure_metrics_push_interval)
-        logger.info("Prometheus to Azure metrics forwarder initialized")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Prometheus forwarder: {e}")
-        # Don't raise - forwarder is optional
 
-    # Initialize database
-    try:
-        # Test database connection
-        async with engine.begin() as conn:
-            await conn.run_sync(lambda sync_conn: sync_conn.execute(text("SELECT 1")))
-        logger.info("Database connection established")
-    except Exception as e:
-        logger.warning(f"Failed to connect to database: {e}")
-        logger.warning("Continuing without database - some features may be unavailable")
-        # Don't raise - database connection is optional for basic functionality
+async def _check_database() -> None:
+    """Test the database connection."""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: sync_conn.execute(text("SELECT 1")))
+    logger.info("Database connection established")
+
+
+async def _connect_redis():
+    """Connect to Redis and ping it.
 
-    # Initialize Redis connection
-    redis_client = None
+    Returns:
+        Redis client, or None when Redis connection attempts are disabled
+
+    Raises:
+        Exception: If Redis cannot be reached
+    """
     # If Redis connection attempts are disabled via settings, skip trying
     if not settings.redis_enabled:
         logger.info("Redis connection attempts disabled via settings (ALDAR_REDIS_ENABLED=false). Using in-memory cache.")
+        return None
+
+    import redis.asyncio as redis
+    import ssl
+
+    # Get Redis URL - prefer explicit redis_url over building from components
+    if settings.redis_url:
+        redis_url = settings.redis_url
+        logger.info(f"Using explicit Redis URL from settings")
+    else:
+        redis_url = str(settings.redis_url_property)
+        logger.info(f"Built Redis URL from components")
+
+    # Mask password in logs for security
+    redis_url_log = redis_url
+    if '@' in redis_url:
+        # Mask password: rediss://:****@host:port/db
+        parts = redis_url.split('@')
+        if ':' in parts[0]:
+            scheme_auth = parts[0].split('://')
+            if len(scheme_auth) > 1 and ':' in scheme_auth[1]:
+                auth_part = scheme_auth[1].split(':')
+                if len(auth_part) > 1:
+                    redis_url_log = f"{scheme_auth[0]}://:{'*' * min(len(auth_part[1]), 8)}@{parts[1]}"
+
+    logger.info(f"Attempting to connect to Redis: {redis_url_log}")
+
+    # Check if it's Azure Redis Cache
+    is_azure_redis = "redis.cache.windows.net" in redis_url or "rediss://" in redis_url.lower()
+
+    if is_azure_redis:
+        # Azure Redis Cache requires SSL parameters
+        logger.info("Detected Azure Redis Cache - configuring SSL/TLS parameters")
+        # Parse URL to extract components
+        from urllib.parse import urlparse
+        parsed = urlparse(redis_url)
+
+        # Build SSL context for Azure Redis Cache
+        # SECURITY: Enable SSL verification for production
+        # Azure Redis Cache uses valid certificates, so we should verify them
+        from aldar_middleware.settings.settings import Environment
+        ssl_context = ssl.create_default_context()
+        # Only disable verification in development if explicitly configured
+        if settings.environment == Environment.DEVELOPMENT and settings.debug:
+            logger.warning("SSL verification disabled for Redis (development mode only)")
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        else:
+            # Production: Enable full SSL verification
+            ssl_context.check_hostname = True
+            ssl_context.verify_mode = ssl.CERT_REQUIRED
+
+        # Build connection parameters
+        connection_params = {
+            "host": parsed.hostname or settings.redis_host,
+            "port": parsed.port or settings.redis_port,
+            "db": int(parsed.path.lstrip('/')) if parsed.path else settings.redis_db,
+            "password": parsed.password or settings.redis_password,
+            "ssl": ssl_context,  # Use SSL context instead of boolean
+            "decode_responses": False,
+            "socket_connect_timeout": 15,  # 15 seconds connection timeout
+            "socket_timeout": 15,  # 15 seconds socket timeout
+            "retry_on_timeout": True,
+            "health_check_interval": 30
+        }
+
+        logger.info(f"Connecting to Azure Redis: {connection_params['host']}:{connection_params['port']}")
+        redis_client = redis.Redis(**connection_params)
+    else:
+        # Standard Redis connection
+        logger.info("Using standard Redis connection")
+        redis_client = redis.from_url(
+            redis_url,
+            socket_connect_timeout=15,
+            socket_timeout=15,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+
+    # Test connection with timeout
+    logger.info("Testing Redis connection with ping...")
+    try:
+        ping_result = await asyncio.wait_for(redis_client.ping(), timeout=15.0)
+        if not ping_result:
+            raise Exception("Redis ping returned False")
+        logger.info("✓ Redis connection established successfully")
+    except redis.ConnectionError as e:
+        logger.error(f"❌ Redis connection error: {e}")
+        logger.info("💡 Check: Redis host, port, password, and network connectivity")
+        raise
+    except (redis.TimeoutError, asyncio.TimeoutError) as e:
+        logger.error(f"❌ Redis connection timeout: {e}")
+        logger.info("💡 Check: Network connectivity, firewall rules, and Redis server status")
+        raise
+    return redis_client
+
+
+async def _init_redis_caches() -> None:
+    """Initialize Redis-backed caches, falling back to in-memory storage."""
+    from aldar_middleware.database.redis_client import init_redis_client
+
+    # None when the redis phase failed, timed out or is disabled
+    redis_client = get_startup_graph().results.get("redis")
+    if not settings.redis_enabled:
         try:
             from aldar_middleware.auth.obo_utils import init_obo_token_cache
             init_obo_token_cache(redis_client=None)
             logger.info("✓ OBO token cache initialized with in-memory storage (Redis disabled)")
         except Exception as cache_error:
             logger.warning(f"Failed to initialize OBO token cache: {cache_error}")
-        
-        # Initialize Redis client as None for dependency injection
-        from aldar_middleware.database.redis_client import init_redis_client
-        init_redis_client(None)
     else:
-        try:
-            import redis.asyncio as redis
-            import ssl
-
-            # Get Redis URL - prefer explicit redis_url over building from components
-            if settings.redis_url:
-                redis_url = settings.redis_url
-                logger.info(f"Using explicit Redis URL from settings")
-            else:
-                redis_url = str(settings.redis_url_property)
-                logger.info(f"Built Redis URL from components")
-        
-            # Mask password in logs for security
-            redis_url_log = redis_url
-            if '@' in redis_url:
-                # Mask password: rediss://:****@host:port/db
-                parts = redis_url.split('@')
-                if ':' in parts[0]:
-                    scheme_auth = parts[0].split('://')
-                    if len(scheme_auth) > 1 and ':' in scheme_auth[1]:
-                        auth_part = scheme_auth[1].split(':')
-                        if len(auth_part) > 1:
-                            redis_url_log = f"{scheme_auth[0]}://:{'*' * min(len(auth_part[1]), 8)}@{parts[1]}"
-
-            logger.info(f"Attempting to connect to Redis: {redis_url_log}")
-
-            # Check if it's Azure Redis Cache
-            is_azure_redis = "redis.cache.windows.net" in redis_url or "rediss://" in redis_url.lower()
-
-            if is_azure_redis:
-                # Azure Redis Cache requires SSL parameters
-                logger.info("Detected Azure Redis Cache - configuring SSL/TLS parameters")
-                # Parse URL to extract components
-                from urllib.parse import urlparse
-                parsed = urlparse(redis_url)
-
-                # Build SSL context for Azure Redis Cache
-                # SECURITY: Enable SSL verification for production
-                # Azure Redis Cache uses valid certificates, so we should verify them
-                from aldar_middleware.settings.settings import Environment
-                ssl_context = ssl.create_default_context()
-                # Only disable verification in development if explicitly configured
-                if settings.environment == Environment.DEVELOPMENT and settings.debug:
-                    logger.warning("SSL verification disabled for Redis (development mode only)")
-                    ssl_context.check_hostname = False
-                    ssl_context.verify_mode = ssl.CERT_NONE
-                else:
-                    # Production: Enable full SSL verification
-                    ssl_context.check_hostname = True
-                    ssl_context.verify_mode = ssl.CERT_REQUIRED
-
-                # Build connection parameters
-                connection_params = {
-                    "host": parsed.hostname or settings.redis_host,
-                    "port": parsed.port or settings.redis_port,
-                    "db": int(parsed.path.lstrip('/')) if parsed.path else settings.redis_db,
-                    "password": parsed.password or settings.redis_password,
-                    "ssl": ssl_context,  # Use SSL context instead of boolean
-                    "decode_responses": False,
-                    "socket_connect_timeout": 15,  # 15 seconds connection timeout
-                    "socket_timeout": 15,  # 15 seconds socket timeout
-                    "retry_on_timeout": True,
-                    "health_check_interval": 30
-                }
-
-                logger.info(f"Connecting to Azure Redis: {connection_params['host']}:{connection_params['port']}")
-                redis_client = redis.Redis(**connection_params)
-            else:
-                # Standard Redis connection
-                logger.info("Using standard Redis connection")
-                redis_client = redis.from_url(
-                    redis_url,
-                    socket_connect_timeout=15,
-                    socket_timeout=15,
-                    retry_on_timeout=True,
-                    health_check_interval=30
-                )
-
-            # Test connection with timeout
-            logger.info("Testing Redis connection with ping...")
-            try:
-                ping_result = await asyncio.wait_for(redis_client.ping(), timeout=15.0)
-                if ping_result:
-                    logger.info("✓ Redis connection established successfully")
-                else:
-                    raise Exception("Redis ping returned False")
-            except asyncio.TimeoutError:
-                raise Exception("Redis ping timed out after 15 seconds")
-
-            # Initialize caches with Redis
-            await _initialize_caches(redis_client=redis_client, redis_available=True)
-            
-            # Initialize Redis client for dependency injection
-            from aldar_middleware.database.redis_client import init_redis_client
-            init_redis_client(redis_client)
-        except redis.ConnectionError as e:
-            logger.error(f"❌ Redis connection error: {e}")
-            logger.warning("Continuing without Redis - some features may be unavailable")
-            logger.info("💡 Check: Redis host, port, password, and network connectivity")
-            await _initialize_caches(redis_client=None, redis_available=False)
-            
-            # Initialize Redis client as None for dependency injection
-            from aldar_middleware.database.redis_client import init_redis_client
-            init_redis_client(None)
-        except redis.TimeoutError as e:
-            logger.error(f"❌ Redis connection timeout: {e}")
+        if redis_client is None:
             logger.warning("Continuing without Redis - some features may be unavailable")
-            logger.info("💡 Check: Network connectivity, firewall rules, and Redis server status")
-            await _initialize_caches(redis_client=None, redis_available=False)
-            
-            # Initialize Redis client as None for dependency injection
-            from aldar_middleware.database.redis_client import init_redis_client
-            init_redis_client(None)
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Redis: {type(e).__name__}: {e}")
-            import traceback
-            logger.debug(f"Redis connection error traceback: {traceback.format_exc()}")
-            logger.warning("Continuing without Redis - some features may be unavailable")
-            await _initialize_caches(redis_client=None, redis_available=False)
-            
-            # Initialize Redis client as None for dependency injection
-            from aldar_middleware.database.redis_client import init_redis_client
-            init_redis_client(None)
+        await _initialize_caches(redis_client=redis_client, redis_available=redis_client is not None)
+
+    # Initialize Redis client for dependency injection
+    init_redis_client(redis_client)
+
+
+async def _init_metrics_forwarding() -> None:
+    """Initialize Azure Metrics Ingestion and the Prometheus forwarder."""
+    await asyncio.to_thread(initialize_metrics_ingestion)
+    logger.info("Azure Metrics Ingestion initialized")
+    initialize_prometheus_forwarder(collection_interval=settings.azure_metrics_push_interval)
+    logger.info("Prometheus to Azure metrics forwarder initialized")
 
-    # Initialize OpenAI client
+
+async def _init_openai() -> None:
+    """Initialize the OpenAI client."""
+    from aldar_middleware.services.ai_service import AIService
+    await asyncio.to_thread(AIService)
+    logger.info("OpenAI service initialized")
+
+
+def _startup_tasks(app=None) -> List[StartupTask]:
+    """Startup work as a dependency graph.
+
+    Key Vault secrets load first because the other subsystems read their
+    credentials from the environment. The database and Redis are needed to
+    serve requests; everything else comes up in the background and is
+    reported on ``/api/v1/health/ready``.
+    """
+    after_secrets = ("key_vault_secrets",)
+    tasks = [
+        StartupTask("key_vault_secrets", _load_key_vault_secrets, timeout=30.0),
+        StartupTask("database", _check_database, after_secrets, timeout=10.0),
+        StartupTask("redis", _connect_redis, after_secrets, timeout=20.0),
+        StartupTask("redis_caches", _init_redis_caches, ("redis",), timeout=10.0),
+        StartupTask("key_vault_service", _init_key_vault_service, after_secrets, timeout=30.0, background=True),
+        StartupTask("cosmos_logging", _init_cosmos_logging, after_secrets, timeout=30.0, background=True),
+        StartupTask("user_logs", _init_user_logs, after_secrets, timeout=30.0, background=True),
+        StartupTask("azure_monitoring", lambda: asyncio.to_thread(initialize_azure_monitoring), after_secrets, timeout=30.0, background=True),
+        StartupTask("metrics_forwarding", _init_metrics_forwarding, after_secrets, timeout=30.0, background=True),
+        StartupTask("openai", _init_openai, after_secrets, timeout=30.0, background=True),
+    ]
+    openapi_cache = getattr(getattr(app, "state", None), "openapi_cache", None)
+    if openapi_cache is not None:
+        # Generate the schema now rather than on the first /docs request.
+        # Requests do not need it (/openapi.json builds it on demand), so it
+        # does not hold /health/ready.
+        tasks.append(
+            StartupTask(
+                "openapi_schema",
+                lambda: asyncio.to_thread(openapi_cache.get),
+                timeout=120.0,
+                background=True,
+                gates_readiness=False,
+            )
+        )
+    return tasks
+
+
+@asynccontextmanager
+async def lifespan_setup(app) -> AsyncGenerator[None, None]:
+    """
+    Application lifespan manager.
+
+    Handles startup and shutdown events. Startup runs as a graph of
+    concurrent tasks (see ``_startup_tasks``); failures are logged and the
+    application continues without the affected subsystem.
+    """
+    # Startup
+    logger.info("Starting AIQ Backend application...")
+
+    # Install SQL statement tracing (fingerprint aggregates, slow query log)
     try:
-        from aldar_middleware.services.ai_service import AIService
-        ai_service = AIService()
-        logger.info("OpenAI service initialized")
+        install_database_tracing(engine.sync_engine)
     except Exception as e:
-        logger.warning(f"Failed to initialize OpenAI service: {e}")
-        logger.warning("Continuing without OpenAI - AI features may be unavailable")
-        # Don't raise - OpenAI service is optional for basic functionality
+        logger.warning(f"Failed to install database tracing: {e}")
+
+    # Start the background trace exporter (requests only buffer their traces)
+    if settings.distributed_tracing_enabled:
+        try:
+            await get_trace_exporter().start()
+        except Exception as e:
+            logger.warning(f"Failed to start trace exporter: {e}")
+
+    graph = StartupGraph(_startup_tasks(app))
+    set_startup_graph(graph)
+    await graph.start()
+
+    if graph.phases["database"].status != "ok":
+        logger.warning("Continuing without database - some features may be unavailable")
 
     logger.info("AIQ Backend application started successfully")
 
@@ -314,6 +336,10 @@ async def lifespan_setup(app) -> AsyncGenerator[None, None]:
 
     # Shutdown
     logger.info("Shutting down AIQ Backend application...")
+
+    # Stop background startup tasks that are still running
+    await graph.stop()
+    redis_client = graph.results.get("redis")
     
     # Close Redis connection
     if redis_client:
@@ -344,6 +370,18 @@ async def lifespan_setup(app) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning(f"Error shutting down Cosmos DB logging: {e}")
 
+    # Export buffered traces before the database pool is closed
+    try:
+        await get_trace_exporter().stop()
+    except Exception as e:
+        logger.warning(f"Error stopping trace exporter: {e}")
+
+    # Stop in-process login enrichment workers
+    try:
+        await get_login_enrichment_worker().stop()
+    except Exception as e:
+        logger.warning(f"Error stopping login enrichment worker: {e}")
+
     # Close database connections
     try:
         await engine.dispose()
@@ -10,6 +10,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import StreamingResponse
 from loguru import logger
 
+from aldar_middleware.models import TraceStatusType
 from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import set_correlation_id, get_correlation_id, get_agent_context
 from aldar_middleware.monitoring.distributed_tracing import get_distributed_tracing_service, DistributedTracingService
@@ -103,7 +104,7 @@ class DistributedTracingMiddleware(BaseHTTPMiddleware):
             # Handle exception - record trace
             if tracing_service:
                 await tracing_service.end_trace(
-                    status="error",
+                    status=TraceStatusType.ERROR,
                     error_type=type(e).__name__,
                     error_message=str(e),
                 )
@@ -128,7 +129,7 @@ class DistributedTracingMiddleware(BaseHTTPMiddleware):
             
             # End trace
             await tracing_service.end_trace(
-                status="success",
+                status=TraceStatusType.ERROR if response.status_code >= 500 else TraceStatusType.SUCCESS,
                 http_status_code=response.status_code,
             )
         
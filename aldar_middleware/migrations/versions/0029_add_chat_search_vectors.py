@@ -0,0 +1,58 @@
+"""Add full-text search vectors for chat session search
+
+Revision ID: 0029
+Revises: 0028
+Create Date: 2026-03-02
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0029'
+down_revision = '0028'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add generated tsvector columns and GIN indexes on session titles and message content."""
+
+    # Generated columns are maintained by Postgres on every insert/update.
+    # The 'simple' configuration does no stemming or stop-word removal, so it
+    # behaves the same for English and Arabic content.
+    op.execute("""
+        ALTER TABLE sessions
+        ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(session_name, ''))) STORED
+    """)
+
+    # Message content is capped so very large messages stay under the
+    # tsvector size limit.
+    op.execute("""
+        ALTER TABLE messages
+        ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', left(coalesce(content, ''), 200000))) STORED
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_search_vector
+        ON sessions USING GIN (search_vector)
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_search_vector
+        ON messages USING GIN (search_vector)
+    """)
+
+    print("✅ Created full-text search vectors for chat session search")
+
+
+def downgrade() -> None:
+    """Remove full-text search vectors."""
+
+    op.execute("DROP INDEX IF EXISTS idx_messages_search_vector")
+    op.execute("DROP INDEX IF EXISTS idx_sessions_search_vector")
+    op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE sessions DROP COLUMN IF EXISTS search_vector")
+
+    print("✅ Removed full-text search vectors for chat session search")
@@ -0,0 +1,90 @@
+"""Add denormalized activity columns for the chat session sidebar
+
+Revision ID: 0030
+Revises: 0029
+Create Date: 2026-03-09
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0030'
+down_revision = '0029'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add message_count/last_activity_at, backfill them and is_favorite, and index the sidebar groups."""
+
+    op.execute("""
+        ALTER TABLE sessions
+        ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0
+    """)
+    op.execute("""
+        ALTER TABLE sessions
+        ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP WITHOUT TIME ZONE
+    """)
+
+    # Same activity rule the sidebar used to compute per request:
+    # last non-system message > last_message_interaction_at > updated_at > created_at
+    op.execute("""
+        UPDATE sessions
+        SET last_activity_at = coalesce(last_message_interaction_at, updated_at, created_at)
+    """)
+    op.execute("""
+        UPDATE sessions AS s
+        SET message_count = ms.message_count,
+            last_activity_at = ms.last_message_at
+        FROM (
+            SELECT session_id, count(id) AS message_count, max(created_at) AS last_message_at
+            FROM messages
+            WHERE content_type <> 'system'
+            GROUP BY session_id
+        ) AS ms
+        WHERE ms.session_id = s.id
+    """)
+
+    op.execute("""
+        ALTER TABLE sessions
+        ALTER COLUMN last_activity_at SET DEFAULT (now() AT TIME ZONE 'utc'),
+        ALTER COLUMN last_activity_at SET NOT NULL
+    """)
+
+    # The favourite toggle has only written session_metadata so far; copy it
+    # into the column the sidebar filters on.
+    op.execute("""
+        UPDATE sessions
+        SET is_favorite = true
+        WHERE is_favorite = false
+          AND (lower(session_metadata->>'is_favorite') = 'true'
+               OR lower(session_metadata->>'isFavorite') = 'true'
+               OR lower(session_metadata->>'is_favourite') = 'true')
+    """)
+    op.execute("""
+        UPDATE sessions
+        SET is_favorite = false
+        WHERE is_favorite = true
+          AND coalesce(lower(session_metadata->>'is_favorite') = 'true', false) = false
+          AND coalesce(lower(session_metadata->>'isFavorite') = 'true', false) = false
+          AND coalesce(lower(session_metadata->>'is_favourite') = 'true', false) = false
+    """)
+
+    # Each sidebar group (favourites, today, previous 7 days, ...) is one
+    # range scan: user_id and is_favorite equality, then last_activity_at order.
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_user_favorite_activity
+        ON sessions (user_id, is_favorite, last_activity_at DESC)
+    """)
+
+    print("✅ Added message_count and last_activity_at to sessions and backfilled sidebar activity")
+
+
+def downgrade() -> None:
+    """Remove denormalized activity columns."""
+
+    op.execute("DROP INDEX IF EXISTS idx_sessions_user_favorite_activity")
+    op.execute("ALTER TABLE sessions DROP COLUMN IF EXISTS last_activity_at")
+    op.execute("ALTER TABLE sessions DROP COLUMN IF EXISTS message_count")
+
+    print("✅ Removed sidebar activity columns from sessions")
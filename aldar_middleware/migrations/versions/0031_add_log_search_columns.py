@@ -0,0 +1,98 @@
+"""Add trigram-indexed search columns to user and admin logs
+
+Revision ID: 0031
+Revises: 0030
+Create Date: 2026-03-16
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0031'
+down_revision = '0030'
+branch_labels = None
+depends_on = None
+
+USER_UUID_EXPRESSION = """
+    CASE WHEN user_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+    THEN user_id::uuid END
+"""
+
+USER_LOG_SEARCH_TEXT_EXPRESSION = """
+    lower(coalesce(email, '') || E'\\n'
+          || coalesce(action_type, '') || E'\\n'
+          || coalesce(log_data->>'name', '') || E'\\n'
+          || coalesce(log_data->>'email', '') || E'\\n'
+          || coalesce(log_data->>'eventType', '') || E'\\n'
+          || coalesce(log_data->'eventPayload'->'agent'->>'agentName', '') || E'\\n'
+          || coalesce(log_data->'eventPayload'->>'agentName', '') || E'\\n'
+          || coalesce(log_data->'body'->'agent'->>'agentName', '') || E'\\n'
+          || coalesce(log_data->'body'->>'agentName', ''))
+"""
+
+ADMIN_LOG_SEARCH_TEXT_EXPRESSION = """
+    lower(coalesce(email, '') || E'\\n'
+          || coalesce(username, '') || E'\\n'
+          || coalesce(action_type, '') || E'\\n'
+          || coalesce(message, '') || E'\\n'
+          || coalesce(log_data->>'name', '') || E'\\n'
+          || coalesce(log_data->'body'->>'name', '') || E'\\n'
+          || coalesce(log_data->'body'->>'description', ''))
+"""
+
+
+def upgrade() -> None:
+    """Add generated user_uuid/search_text columns with btree and pg_trgm GIN indexes."""
+
+    # pg_trgm has to be allow-listed on managed Postgres; without it the
+    # columns are still created and searched, just without the GIN index.
+    op.execute("""
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXCEPTION WHEN OTHERS THEN
+            RAISE WARNING 'pg_trgm is not available, skipping trigram indexes: %', SQLERRM;
+        END
+        $$
+    """)
+
+    # Adding stored generated columns rewrites both tables once.
+    for table, search_expression in (
+        ("user_logs", USER_LOG_SEARCH_TEXT_EXPRESSION),
+        ("admin_logs", ADMIN_LOG_SEARCH_TEXT_EXPRESSION),
+    ):
+        op.execute(f"""
+            ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS user_uuid uuid
+                GENERATED ALWAYS AS ({USER_UUID_EXPRESSION}) STORED,
+            ADD COLUMN IF NOT EXISTS search_text text
+                GENERATED ALWAYS AS ({search_expression}) STORED
+        """)
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_user_uuid
+            ON {table} (user_uuid)
+        """)
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                    CREATE INDEX IF NOT EXISTS idx_{table}_search_text_trgm
+                    ON {table} USING GIN (search_text gin_trgm_ops);
+                END IF;
+            END
+            $$
+        """)
+
+    print("✅ Added trigram search columns to user_logs and admin_logs")
+
+
+def downgrade() -> None:
+    """Remove log search columns."""
+
+    for table in ("user_logs", "admin_logs"):
+        op.execute(f"DROP INDEX IF EXISTS idx_{table}_search_text_trgm")
+        op.execute(f"DROP INDEX IF EXISTS idx_{table}_user_uuid")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_text")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS user_uuid")
+
+    print("✅ Removed trigram search columns from user_logs and admin_logs")
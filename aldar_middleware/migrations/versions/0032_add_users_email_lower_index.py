@@ -0,0 +1,35 @@
+"""Index lower(email) for case-insensitive user lookups
+
+Revision ID: 0032
+Revises: 0031
+Create Date: 2026-03-23
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0032'
+down_revision = '0031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add an expression index on lower(email)."""
+
+    # Run event ingestion resolves users with lower(email) IN (...), which
+    # the plain unique index on email cannot serve.
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_email_lower
+        ON users (lower(email))
+    """)
+
+    print("✅ Added lower(email) index to users")
+
+
+def downgrade() -> None:
+    """Remove lower(email) index."""
+
+    op.execute("DROP INDEX IF EXISTS idx_users_email_lower")
+
+    print("✅ Removed lower(email) index from users")
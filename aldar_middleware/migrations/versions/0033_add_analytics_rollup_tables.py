@@ -0,0 +1,76 @@
+"""Add daily agent usage and feedback rollup tables
+
+Revision ID: 0033
+Revises: 0032
+Create Date: 2026-03-30
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0033'
+down_revision = '0032'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create rollup tables, their watermark table and the feedback change index."""
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS agent_usage_daily (
+            day DATE NOT NULL,
+            agent_id BIGINT NOT NULL,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            input_tokens BIGINT NOT NULL DEFAULT 0,
+            output_tokens BIGINT NOT NULL DEFAULT 0,
+            total_tokens BIGINT NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP,
+            refreshed_at TIMESTAMP NOT NULL DEFAULT now(),
+            CONSTRAINT pk_agent_usage_daily PRIMARY KEY (day, agent_id)
+        )
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_agent_usage_daily_agent_id
+        ON agent_usage_daily (agent_id)
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_daily (
+            day DATE NOT NULL,
+            agent_id VARCHAR(255) NOT NULL DEFAULT '',
+            entity_type feedback_entity_type NOT NULL,
+            rating feedback_rating NOT NULL,
+            feedback_count INTEGER NOT NULL DEFAULT 0,
+            refreshed_at TIMESTAMP NOT NULL DEFAULT now(),
+            CONSTRAINT pk_feedback_daily PRIMARY KEY (day, agent_id, entity_type, rating)
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+            name VARCHAR(100) PRIMARY KEY,
+            watermark DATE NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL
+        )
+    """)
+
+    # The refresh job finds feedback deleted or edited since its last run
+    # (to recompute older days) by updated_at.
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_feedback_data_updated_at
+        ON feedback_data (updated_at)
+    """)
+
+    print("✅ Added analytics rollup tables")
+
+
+def downgrade() -> None:
+    """Drop rollup tables and the feedback change index."""
+
+    op.execute("DROP INDEX IF EXISTS ix_feedback_data_updated_at")
+    op.execute("DROP TABLE IF EXISTS analytics_rollup_state")
+    op.execute("DROP TABLE IF EXISTS feedback_daily")
+    op.execute("DROP TABLE IF EXISTS agent_usage_daily")
+
+    print("✅ Removed analytics rollup tables")
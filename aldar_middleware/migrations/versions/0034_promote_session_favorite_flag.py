@@ -0,0 +1,72 @@
+"""Make sessions.is_favorite the only favourite flag
+
+Revision ID: 0034
+Revises: 0033
+Create Date: 2026-04-01
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0034'
+down_revision = '0033'
+branch_labels = None
+depends_on = None
+
+# Keys the favourite toggle and older clients have stored in session_metadata
+FAVORITE_METADATA_KEYS = ("is_favorite", "isFavorite", "is_favourite")
+
+
+def _metadata_has_favorite_key() -> str:
+    keys = ", ".join(f"'{key}'" for key in FAVORITE_METADATA_KEYS)
+    return f"session_metadata::jsonb ?| array[{keys}]"
+
+
+def upgrade() -> None:
+    """Reconcile is_favorite from the legacy metadata keys, strip them and drop the redundant favourite index."""
+
+    # Sessions that still carry a favourite key in metadata take their flag
+    # from it: favourite if any key holds a true value (Postgres boolean
+    # literals, or a JSON true).
+    is_true = " OR ".join(
+        f"coalesce(lower(session_metadata->>'{key}') IN ('true', 't', 'yes', 'y', 'on', '1'), false)"
+        for key in FAVORITE_METADATA_KEYS
+    )
+    op.execute(f"""
+        UPDATE sessions
+        SET is_favorite = ({is_true})
+        WHERE session_metadata IS NOT NULL
+          AND json_typeof(session_metadata) = 'object'
+          AND {_metadata_has_favorite_key()}
+    """)
+
+    removed_keys = " - ".join(f"'{key}'" for key in FAVORITE_METADATA_KEYS)
+    op.execute(f"""
+        UPDATE sessions
+        SET session_metadata = (session_metadata::jsonb - {removed_keys})::json
+        WHERE session_metadata IS NOT NULL
+          AND json_typeof(session_metadata) = 'object'
+          AND {_metadata_has_favorite_key()}
+    """)
+
+    # Superseded by 0030's idx_sessions_user_favorite_activity
+    # (user_id, is_favorite, last_activity_at DESC): it matches every user's
+    # favourites
+    op.execute("DROP INDEX IF EXISTS ix_sessions_is_favorite")
+
+    print("✅ Promoted sessions.is_favorite to the only favourite flag")
+
+
+def downgrade() -> None:
+    """Restore the is_favorite index and copy the flag back into metadata."""
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_sessions_is_favorite ON sessions (is_favorite)")
+    op.execute("""
+        UPDATE sessions
+        SET session_metadata = (
+            coalesce(session_metadata::jsonb, '{}'::jsonb) || jsonb_build_object('is_favorite', true)
+        )::json
+        WHERE is_favorite
+    """)
+
+    print("✅ Restored the is_favorite index and is_favorite in session metadata")
@@ -100,6 +100,9 @@ from aldar_middleware.models.agno_memory import AgnoMemory
 # User settings model
 from aldar_middleware.models.user_settings import UserSettings
 
+# Analytics rollup models
+from aldar_middleware.models.analytics_rollup import AgentUsageDaily, FeedbackDaily, AnalyticsRollupState
+
 __all__ = [
     "User",
     "UserAgent",
@@ -180,4 +183,7 @@ __all__ = [
     "AdminConfig",
     "AgnoMemory",
     "UserSettings",
+    "AgentUsageDaily",
+    "FeedbackDaily",
+    "AnalyticsRollupState",
 ]
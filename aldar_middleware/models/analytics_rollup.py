@@ -0,0 +1,56 @@
+"""Daily rollup tables for admin agent and feedback analytics."""
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, Date, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
+
+from aldar_middleware.database.base import Base
+from aldar_middleware.models.feedback import FeedbackEntityType, FeedbackRating
+
+
+class AgentUsageDaily(Base):
+    """Per-agent, per-day aggregate of agent_usage_metrics rows."""
+
+    __tablename__ = "agent_usage_daily"
+
+    day = Column(Date, primary_key=True)
+    agent_id = Column(BigInteger, primary_key=True, index=True)
+    usage_count = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    last_used_at = Column(DateTime, nullable=True)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class FeedbackDaily(Base):
+    """Per-day count of live feedback by agent, entity type and rating.
+
+    Feedback without an agent is stored under an empty agent_id.
+    """
+
+    __tablename__ = "feedback_daily"
+
+    day = Column(Date, primary_key=True)
+    agent_id = Column(String(255), primary_key=True, default="")
+    entity_type = Column(
+        PG_ENUM(FeedbackEntityType, name="feedback_entity_type", values_callable=lambda x: [e.value for e in x], create_type=False),
+        primary_key=True,
+    )
+    rating = Column(
+        PG_ENUM(FeedbackRating, name="feedback_rating", values_callable=lambda x: [e.value for e in x], create_type=False),
+        primary_key=True,
+    )
+    feedback_count = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalyticsRollupState(Base):
+    """Refresh watermark of a rollup: every day before ``watermark`` is complete."""
+
+    __tablename__ = "analytics_rollup_state"
+
+    name = Column(String(100), primary_key=True)
+    watermark = Column(Date, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
@@ -89,6 +89,7 @@ class FeedbackData(Base):
         Index("ix_feedback_user_entity", "user_id", "entity_id"),
         Index("ix_feedback_type_date", "entity_type", "created_at"),
         Index("ix_feedback_user_date", "user_id", "created_at"),
+        Index("ix_feedback_data_updated_at", "updated_at"),
     )
 
     def __repr__(self) -> str:
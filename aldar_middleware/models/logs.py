@@ -1,12 +1,48 @@
 """Log models for storing user and admin logs in PostgreSQL with JSONB."""
 
 import uuid
-from sqlalchemy import Column, DateTime, Index, String, Text
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Computed, DateTime, Index, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 
 from aldar_middleware.database.base import Base
 
+# user_id is stored as text; logs written for real users carry a UUID that is
+# exposed as a generated uuid column so joins to users.id need no casts.
+USER_UUID_EXPRESSION = (
+    "CASE WHEN user_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' "
+    "THEN user_id::uuid END"
+)
+
+
+def _search_text_expression(*fields: str) -> str:
+    """Lower-cased, newline-separated concatenation of the searchable fields."""
+    return "lower(" + " || E'\\n' || ".join(f"coalesce({field}, '')" for field in fields) + ")"
+
+
+# Fields searched by the admin log screens (trigram GIN indexed)
+USER_LOG_SEARCH_TEXT_EXPRESSION = _search_text_expression(
+    "email",
+    "action_type",
+    "log_data->>'name'",
+    "log_data->>'email'",
+    "log_data->>'eventType'",
+    "log_data->'eventPayload'->'agent'->>'agentName'",
+    "log_data->'eventPayload'->>'agentName'",
+    "log_data->'body'->'agent'->>'agentName'",
+    "log_data->'body'->>'agentName'",
+)
+ADMIN_LOG_SEARCH_TEXT_EXPRESSION = _search_text_expression(
+    "email",
+    "username",
+    "action_type",
+    "message",
+    "log_data->>'name'",
+    "log_data->'body'->>'name'",
+    "log_data->'body'->>'description'",
+)
+
 
 class UserLog(Base):
     """
@@ -37,6 +73,10 @@ class UserLog(Base):
     
     # Full log data as JSONB (3.0 format)
     log_data = Column(JSONB, nullable=False)
+
+    # Maintained by Postgres from user_id / searchable fields
+    user_uuid = Column(UUID(as_uuid=True), Computed(USER_UUID_EXPRESSION, persisted=True))
+    search_text = deferred(Column(Text, Computed(USER_LOG_SEARCH_TEXT_EXPRESSION, persisted=True)))
     
     # Indexes for common queries
     __table_args__ = (
@@ -51,6 +91,9 @@ class UserLog(Base):
         Index('idx_user_logs_action_timestamp', 'action_type', 'timestamp'),
         # GIN index for JSONB queries
         Index('idx_user_logs_log_data_gin', 'log_data', postgresql_using='gin'),
+        Index('idx_user_logs_user_uuid', 'user_uuid'),
+        Index('idx_user_logs_search_text_trgm', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
     )
     
     def __repr__(self) -> str:
@@ -96,6 +139,10 @@ class AdminLog(Base):
     
     # Full log data as JSONB (all details)
     log_data = Column(JSONB, nullable=False)
+
+    # Maintained by Postgres from user_id / searchable fields
+    user_uuid = Column(UUID(as_uuid=True), Computed(USER_UUID_EXPRESSION, persisted=True))
+    search_text = deferred(Column(Text, Computed(ADMIN_LOG_SEARCH_TEXT_EXPRESSION, persisted=True)))
     
     # Indexes for common queries
     __table_args__ = (
@@ -115,6 +162,9 @@ class AdminLog(Base):
         # Full text search index on message
         Index('idx_admin_logs_message_gin', 'message', postgresql_using='gin',
               postgresql_ops={'message': 'gin_trgm_ops'}),
+        Index('idx_admin_logs_user_uuid', 'user_uuid'),
+        Index('idx_admin_logs_search_text_trgm', 'search_text', postgresql_using='gin',
+              postgresql_ops={'search_text': 'gin_trgm_ops'}),
     )
     
     def __repr__(self) -> str:
@@ -4,9 +4,9 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, DateTime, String, Text, ForeignKey, Integer, Boolean, JSON, BigInteger
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, DateTime, String, Text, ForeignKey, Integer, Boolean, JSON, BigInteger
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from aldar_middleware.database.base import Base
 
@@ -51,6 +51,10 @@ class Message(Base):
     # - customQueryTopicsOfInterest: Optional[List[str]]
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Full-text search vector over content, maintained by Postgres (GIN indexed)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed("to_tsvector('simple', left(coalesce(content, ''), 200000))", persisted=True))
+    )
 
     # Relationships
     session = relationship("Session", back_populates="messages")
@@ -6,9 +6,9 @@ from uuid import uuid4
 
 from sqlalchemy import (
     Column, String, Integer, Float, DateTime, Boolean, Text, JSON,
-    ForeignKey, Index, UniqueConstraint, func, BIGINT, Enum as SQLEnum
+    ForeignKey, Index, UniqueConstraint, func, BIGINT
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ENUM as PG_ENUM
 from sqlalchemy.orm import relationship
 
 import enum
@@ -60,7 +60,12 @@ class DistributedTrace(Base):
     duration_ms = Column(Integer, nullable=True)  # Total duration in milliseconds
     
     # Status & Error Information
-    status = Column(SQLEnum(TraceStatusType), nullable=False, default=TraceStatusType.PENDING, index=True)
+    status = Column(
+        PG_ENUM(TraceStatusType, name="trace_status_type", values_callable=lambda x: [e.value for e in x], create_type=False),
+        nullable=False,
+        default=TraceStatusType.PENDING,
+        index=True,
+    )
     http_status_code = Column(Integer, nullable=True)
     error_type = Column(String(255), nullable=True)
     error_message = Column(Text, nullable=True)
@@ -74,7 +79,11 @@ class DistributedTrace(Base):
     # Trace Metadata
     trace_metadata = Column(JSONB, nullable=True)  # Custom metadata
     sampled = Column(Boolean, default=True)  # Was this trace sampled?
-    sample_type = Column(SQLEnum(TraceSampleType), nullable=False, default=TraceSampleType.FULL)
+    sample_type = Column(
+        PG_ENUM(TraceSampleType, name="trace_sample_type", values_callable=lambda x: [e.value for e in x], create_type=False),
+        nullable=False,
+        default=TraceSampleType.FULL,
+    )
     
     # Relationships (lazy-loaded for performance)
     request_response_audit = relationship(
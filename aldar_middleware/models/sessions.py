@@ -2,10 +2,10 @@
 
 import uuid
 
-from sqlalchemy import Boolean, BigInteger, Column, DateTime, ForeignKey, JSON, String
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Boolean, BigInteger, Column, Computed, DateTime, ForeignKey, Index, Integer, JSON, String, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from aldar_middleware.database.base import Base
 from aldar_middleware.utils.timezone import utcnow_naive
@@ -15,6 +15,15 @@ class Session(Base):
     """Session model for user-agent interactions."""
 
     __tablename__ = "sessions"
+    __table_args__ = (
+        # One index range scan per sidebar group (favourites / time buckets)
+        Index(
+            "idx_sessions_user_favorite_activity",
+            "user_id",
+            "is_favorite",
+            text("last_activity_at DESC"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     public_id = Column(UUID(as_uuid=True), unique=True, default=uuid.uuid4, index=True)
@@ -31,7 +40,7 @@ class Session(Base):
     # 2.0 migration fields
     graph_id = Column(String(255), nullable=True, index=True)  # Graph ID from 2.0
     deleted_at = Column(DateTime, nullable=True, index=True)  # Soft delete timestamp
-    is_favorite = Column(Boolean, default=False, nullable=False)  # Favorite status (migrated from metadata)
+    is_favorite = Column(Boolean, default=False, nullable=False)  # Favorite status; the only favourite flag (no longer kept in metadata)
     last_message_interaction_at = Column(DateTime, nullable=True, index=True)  # Last message interaction time
     meeting_id = Column(String(255), nullable=True, index=True)  # Meeting ID
     document_knowledge_agent_id = Column(BigInteger, ForeignKey("agents.id"), nullable=True, index=True)  # Document knowledge agent
@@ -39,6 +48,13 @@ class Session(Base):
     started_at = Column(DateTime, default=utcnow_naive, nullable=True, index=True)
     created_at = Column(DateTime, default=utcnow_naive, nullable=False, index=True)
     updated_at = Column(DateTime, default=utcnow_naive, onupdate=utcnow_naive, nullable=False)
+    # Sidebar activity, maintained on every message write (see routes.chat._record_session_message)
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)  # Non-system messages
+    last_activity_at = Column(DateTime, default=utcnow_naive, nullable=False)
+    # Full-text search vector over the title, maintained by Postgres (GIN indexed)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(session_name, ''))", persisted=True))
+    )
 
     # Relationships
     user = relationship("User", back_populates="sessions")
@@ -6,6 +6,7 @@ from aldar_middleware.monitoring.prometheus import (
     
     # Metrics endpoint
     get_metrics,
+    get_metrics_registry,
     
     # HTTP Request metrics
     REQUEST_COUNT,
@@ -124,6 +125,7 @@ __all__ = [
     
     # Metrics endpoint
     "get_metrics",
+    "get_metrics_registry",
     
     # HTTP Request metrics
     "REQUEST_COUNT",
@@ -1,57 +1,191 @@
 """Database query tracing using SQLAlchemy event listeners.
 
-Tracks all database queries with timing, parameters, and performance metrics.
-Integrates with distributed tracing to capture queries within request context.
+Statements are normalized to fingerprints (literals, bind placeholders and
+IN/VALUES lists collapsed) and aggregated in memory: call counts, errors,
+rows and a latency histogram per fingerprint. Fingerprints are cached by
+statement text, so the per-query cost is a dict lookup and a few counter
+updates. Caller frames are captured only for sampled or slow queries.
+Query counts, time and slow queries are also added to the active request
+trace, which exports them with the trace.
 """
 
-import time
-import inspect
+import random
 import re
-from typing import Optional, Dict, Any
-from datetime import datetime, timezone
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
 
+try:
+    import greenlet
+except ImportError:  # pragma: no cover - installed with sqlalchemy[asyncio]
+    greenlet = None
 from sqlalchemy import event
-from sqlalchemy.engine import Engine, ExecutionContext
-from sqlalchemy.pool import Pool
+from sqlalchemy.engine import Engine
 from loguru import logger
 
 from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id
-from aldar_middleware.monitoring.pii_masking import get_pii_masking_service
+from aldar_middleware.monitoring.distributed_tracing import get_current_trace
+from aldar_middleware.monitoring.trace_exporter import QueryRecord
+
+# Upper bounds (ms) of the per-fingerprint latency histogram; the last bucket is open
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+OTHER_FINGERPRINT = "<other>"
+MAX_FINGERPRINT_LENGTH = 2000
+CALLERS_PER_FINGERPRINT = 5
+
+_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_PATTERN = re.compile(
+    r"\$\d+(?:::[\w\[\]]+(?:\(\d+(?:,\s*\d+)?\))?)?|%\(\w+\)s|%s|(?<!:):\w+|\?"
+)
+_NUMBER_PATTERN = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_PATTERN = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_THIS_FILE = __file__.rsplit(".", 1)[0]
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_statement(statement: str) -> Tuple[str, str]:
+    """Normalize a SQL statement into a fingerprint and its query type.
+
+    Literals and bind placeholders become ``?``, parenthesized parameter
+    lists (IN lists, VALUES rows) collapse to ``(?)`` and multi-row VALUES to
+    one row, so statements that differ only in parameters or list length
+    share a fingerprint. No literal values (and
+    therefore no PII) survive normalization.
+
+    Args:
+        statement: SQL statement as sent to the driver
+
+    Returns:
+        Tuple of (fingerprint, query_type)
+    """
+    normalized = _COMMENT_PATTERN.sub(" ", statement)
+    normalized = _STRING_PATTERN.sub("?", normalized)
+    normalized = _PLACEHOLDER_PATTERN.sub("?", normalized)
+    normalized = _NUMBER_PATTERN.sub("?", normalized)
+    normalized = _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+    normalized = _LIST_PATTERN.sub("(?)", normalized)
+    normalized = _VALUES_PATTERN.sub(r"\1", normalized)
+
+    first_word = normalized.split(" ", 1)[0]
+    query_type = first_word.upper() if first_word.isalpha() else "UNKNOWN"
+
+    if len(normalized) > MAX_FINGERPRINT_LENGTH:
+        normalized = normalized[:MAX_FINGERPRINT_LENGTH] + "..."
+    return normalized, query_type
+
+
+@dataclass
+class StatementStats:
+    """In-memory aggregates for one statement fingerprint."""
+
+    fingerprint: str
+    query_type: str
+    calls: int = 0
+    errors: int = 0
+    slow_calls: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    bucket_counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    callers: Counter = field(default_factory=Counter)
+
+    def record(self, duration_ms: float, rows: Optional[int], slow: bool) -> None:
+        self.calls += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        if slow:
+            self.slow_calls += 1
+        if rows and rows > 0:
+            self.rows += rows
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+
+    def add_caller(self, caller: str) -> None:
+        if caller in self.callers or len(self.callers) < CALLERS_PER_FINGERPRINT:
+            self.callers[caller] += 1
+
+    def percentile_ms(self, percentile: float) -> float:
+        """Upper bound of the histogram bucket holding the given percentile."""
+        if not self.calls:
+            return 0.0
+        target = self.calls * percentile
+        seen = 0
+        for index, count in enumerate(self.bucket_counts):
+            seen += count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(float(LATENCY_BUCKETS_MS[index]), self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "query_type": self.query_type,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow_calls": self.slow_calls,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p95_ms": round(self.percentile_ms(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "callers": [
+                {"caller": caller, "count": count} for caller, count in self.callers.most_common()
+            ],
+        }
 
 
 class DatabaseTracer:
     """Tracer for database queries using SQLAlchemy events."""
-    
-    # Query execution context (thread-local, will be per-request in async context)
-    _query_start_times: Dict[int, float] = {}
-    
+
+    SORT_KEYS = {
+        "total_time": lambda stats: stats.total_ms,
+        "calls": lambda stats: stats.calls,
+        "mean_time": lambda stats: stats.total_ms / stats.calls if stats.calls else 0.0,
+        "max_time": lambda stats: stats.max_ms,
+        "errors": lambda stats: stats.errors,
+    }
+
     def __init__(self):
         """Initialize the database tracer."""
         self.enabled = settings.trace_database_queries
         self.slow_threshold_ms = settings.trace_query_slow_threshold_ms
-        self.masking_service = get_pii_masking_service()
-    
+        self.caller_sample_rate = settings.trace_query_caller_sample_rate
+        self.max_fingerprints = settings.trace_query_max_fingerprints
+        self.started_at = time.time()
+        self._stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self._engines: set = set()
+
     def install_hooks(self, engine: Engine) -> None:
         """Install SQLAlchemy event hooks on the engine.
-        
+
         Args:
             engine: SQLAlchemy engine instance
         """
-        if not self.enabled:
+        if not self.enabled or id(engine) in self._engines:
             return
-        
-        # Before execute
+
         event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
-        
-        # After execute
         event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
-        
-        # Execute error
         event.listen(engine, "handle_error", self.handle_error)
-        
+        self._engines.add(id(engine))
+
         logger.info("Database query tracing hooks installed")
-    
+
     def before_cursor_execute(
         self,
         conn,
@@ -61,8 +195,8 @@ class DatabaseTracer:
         context,
         executemany: bool,
     ) -> None:
-        """Called before a cursor.execute() call.
-        
+        """Called before a cursor.execute() call; records the start time.
+
         Args:
             conn: Database connection
             cursor: Cursor object
@@ -71,29 +205,9 @@ class DatabaseTracer:
             context: Execution context
             executemany: Whether executing multiple statements
         """
-        try:
-            if not context:
-                return
-            
-            # Store start time using statement ID
-            context._query_start_time = time.time()
-            
-            # Extract and sanitize query
-            query_type = self._extract_query_type(statement)
-            
-            # Get caller info
-            caller_info = self._get_caller_info()
-            
-            # Log at debug level
-            correlation_id = get_correlation_id() or "unknown"
-            logger.debug(
-                f"Database query starting: type={query_type}, correlation_id={correlation_id}, "
-                f"caller={caller_info['file']}:{caller_info['function']}:{caller_info['line']}"
-            )
-        
-        except Exception as e:
-            logger.error(f"Error in before_cursor_execute: {e}")
-    
+        if context is not None:
+            context._query_start_time = time.perf_counter()
+
     def after_cursor_execute(
         self,
         conn,
@@ -103,8 +217,8 @@ class DatabaseTracer:
         context,
         executemany: bool,
     ) -> None:
-        """Called after a cursor.execute() call.
-        
+        """Called after a cursor.execute() call; aggregates the statement.
+
         Args:
             conn: Database connection
             cursor: Cursor object
@@ -114,135 +228,154 @@ class DatabaseTracer:
             executemany: Whether executing multiple statements
         """
         try:
-            if not context or not hasattr(context, "_query_start_time"):
+            start = getattr(context, "_query_start_time", None)
+            if start is None:
                 return
-            
-            # Calculate duration
-            duration_ms = int((time.time() - context._query_start_time) * 1000)
-            
-            # Extract query info
-            query_type = self._extract_query_type(statement)
+            duration_ms = (time.perf_counter() - start) * 1000
             slow_query = duration_ms > self.slow_threshold_ms
-            
-            # Sanitize query for logging
-            sanitized_query = self._sanitize_query(statement)
-            
-            # Log slow queries
+
+            rows = None
+            try:
+                rows = cursor.rowcount
+            except Exception:
+                pass
+
+            fingerprint, query_type = fingerprint_statement(statement)
+            caller = None
+            if slow_query or random.random() < self.caller_sample_rate:
+                caller = _get_caller()
+
+            with self._lock:
+                stats = self._get_stats(fingerprint, query_type)
+                stats.record(duration_ms, rows, slow_query)
+                if caller:
+                    stats.add_caller(caller)
+
+            trace = get_current_trace()
+            if trace is not None:
+                trace.database_query_count += 1
+                trace.total_query_time_ms += duration_ms
+                if slow_query:
+                    trace.add_query(QueryRecord(
+                        query_type=query_type,
+                        query_sql=fingerprint,
+                        start_time=datetime.now(timezone.utc) - timedelta(milliseconds=duration_ms),
+                        duration_ms=duration_ms,
+                        rows=rows,
+                        caller=caller,
+                        slow_threshold_ms=self.slow_threshold_ms,
+                    ))
+
             if slow_query:
                 logger.warning(
                     f"Slow database query detected: type={query_type}, "
-                    f"duration_ms={duration_ms}, threshold_ms={self.slow_threshold_ms}, "
-                    f"query={sanitized_query}"
+                    f"duration_ms={duration_ms:.1f}, threshold_ms={self.slow_threshold_ms}, "
+                    f"caller={caller}, correlation_id={get_correlation_id() or 'unknown'}, "
+                    f"query={fingerprint[:500]}"
                 )
-            else:
-                logger.debug(
-                    f"Database query completed: type={query_type}, duration_ms={duration_ms}"
-                )
-            
-            # Try to get row count
-            rows_affected = None
-            try:
-                if query_type in ["INSERT", "UPDATE", "DELETE"]:
-                    rows_affected = cursor.rowcount
-                elif query_type == "SELECT":
-                    rows_affected = cursor.rowcount if cursor.rowcount > 0 else None
-            except Exception:
-                pass
-        
+
         except Exception as e:
             logger.error(f"Error in after_cursor_execute: {e}")
-    
+
     def handle_error(self, exception_context) -> None:
         """Called when an error occurs during execution.
-        
+
         Args:
             exception_context: Exception context
         """
         try:
             if not exception_context or not exception_context.original_exception:
                 return
-            
+
             error = exception_context.original_exception
-            statement = exception_context.statement if hasattr(exception_context, "statement") else "unknown"
-            
+            statement = getattr(exception_context, "statement", None)
+            fingerprint, query_type = fingerprint_statement(statement) if statement else ("unknown", "UNKNOWN")
+            caller = _get_caller()
+
+            with self._lock:
+                stats = self._get_stats(fingerprint, query_type)
+                stats.errors += 1
+                stats.add_caller(caller)
+
             logger.error(
-                f"Database query error: statement={statement}, error={error}",
-                exc_info=error
+                f"Database query error: caller={caller}, statement={fingerprint[:500]}, error={error}"
             )
-        
+
         except Exception as e:
             logger.error(f"Error in handle_error: {e}")
-    
-    def _extract_query_type(self, statement: str) -> str:
-        """Extract SQL query type from statement.
-        
-        Args:
-            statement: SQL statement
-            
-        Returns:
-            Query type (SELECT, INSERT, UPDATE, DELETE, etc.)
-        """
-        # Remove leading whitespace and comments
-        statement = statement.strip()
-        statement = re.sub(r'^--.*?\n', '', statement, flags=re.MULTILINE)
-        statement = re.sub(r'^/\*.*?\*/', '', statement, flags=re.DOTALL)
-        statement = statement.strip()
-        
-        # Extract first word
-        match = re.match(r'(\w+)', statement)
-        if match:
-            return match.group(1).upper()
-        
-        return "UNKNOWN"
-    
-    def _sanitize_query(self, statement: str, max_length: int = 500) -> str:
-        """Sanitize SQL query for logging (remove sensitive data).
-        
+
+    def _get_stats(self, fingerprint: str, query_type: str) -> StatementStats:
+        """Aggregate for a fingerprint; new fingerprints beyond the cap share one bucket."""
+        stats = self._stats.get(fingerprint)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                fingerprint, query_type = OTHER_FINGERPRINT, "UNKNOWN"
+                stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = StatementStats(fingerprint, query_type)
+        return stats
+
+    def hot_statements(self, limit: int = 20, order_by: str = "total_time") -> List[Dict[str, Any]]:
+        """Top statement fingerprints since start or the last reset.
+
         Args:
-            statement: SQL statement
-            max_length: Maximum length of returned query
-            
-        Returns:
-            Sanitized query
-        """
-        # Mask string values (basic PII masking for SQL)
-        sanitized = re.sub(
-            r"'[^']*'",
-            "'***'",
-            statement
-        )
-        
-        # Truncate if too long
-        if len(sanitized) > max_length:
-            sanitized = sanitized[:max_length] + "..."
-        
-        return sanitized
-    
-    def _get_caller_info(self) -> Dict[str, Any]:
-        """Get information about the caller of the database query.
-        
+            limit: Number of fingerprints to return
+            order_by: One of total_time, calls, mean_time, max_time, errors
+
         Returns:
-            Dictionary with file, function, and line number
+            Statement aggregates, most expensive first
         """
-        try:
-            # Walk up the stack to find the first frame outside SQLAlchemy
-            frame = inspect.currentframe()
+        key = self.SORT_KEYS.get(order_by)
+        if key is None:
+            raise ValueError(f"order_by must be one of: {', '.join(self.SORT_KEYS)}")
+        with self._lock:
+            ranked = sorted(self._stats.values(), key=key, reverse=True)[:limit]
+            return [stats.to_dict() for stats in ranked]
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals across all fingerprints."""
+        with self._lock:
+            return {
+                "since": self.started_at,
+                "fingerprints": len(self._stats),
+                "calls": sum(stats.calls for stats in self._stats.values()),
+                "errors": sum(stats.errors for stats in self._stats.values()),
+                "total_ms": round(sum(stats.total_ms for stats in self._stats.values()), 3),
+            }
+
+    def reset(self) -> None:
+        """Drop all aggregates."""
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+
+def _get_caller() -> str:
+    """First application frame outside SQLAlchemy and this module, as file:function:line.
+
+    With the asyncio engine the statement runs in a greenlet whose stack
+    ends at SQLAlchemy's greenlet_spawn; the awaiting application coroutine
+    is on the parent greenlet's stack, so that is searched next.
+    """
+    try:
+        frames = [sys._getframe(1)]
+        if greenlet is not None:
+            parent = greenlet.getcurrent().parent
+            if parent is not None and parent.gr_frame is not None:
+                frames.append(parent.gr_frame)
+        for frame in frames:
             while frame:
                 file_name = frame.f_code.co_filename
-                
-                # Skip SQLAlchemy internal frames
-                if "sqlalchemy" not in file_name and "aldar_middleware" in file_name:
-                    return {
-                        "file": file_name.split("/")[-1],
-                        "function": frame.f_code.co_name,
-                        "line": frame.f_lineno,
-                    }
-                
+                if (
+                    "aldar_middleware" in file_name
+                    and "sqlalchemy" not in file_name
+                    and not file_name.startswith(_THIS_FILE)
+                ):
+                    return f"{file_name.split('/')[-1]}:{frame.f_code.co_name}:{frame.f_lineno}"
                 frame = frame.f_back
-        except Exception:
-            pass
-        
-        return {"file": "unknown", "function": "unknown", "line": 0}
+    except Exception:
+        pass
+    return "unknown"
 
 
 # Global instance
@@ -251,12 +384,12 @@ _database_tracer: Optional[DatabaseTracer] = None
 
 def get_database_tracer() -> DatabaseTracer:
     """Get or create the global database tracer.
-    
+
     Returns:
         DatabaseTracer instance
     """
     global _database_tracer
-    
+
     if _database_tracer is None:
         _database_tracer = DatabaseTracer()
         logger.info(
@@ -264,17 +397,18 @@ def get_database_tracer() -> DatabaseTracer:
             f"Enabled: {_database_tracer.enabled}. "
             f"Slow query threshold: {_database_tracer.slow_threshold_ms}ms"
         )
-    
+
     return _database_tracer
 
 
 def install_database_tracing(engine: Engine) -> None:
     """Install database query tracing on a SQLAlchemy engine.
-    
-    Should be called once during application initialization.
-    
+
+    Should be called once during application initialization. For an
+    ``AsyncEngine`` pass ``engine.sync_engine``.
+
     Args:
         engine: SQLAlchemy engine instance
     """
     tracer = get_database_tracer()
-    tracer.install_hooks(engine)
\ No newline at end of file
+    tracer.install_hooks(engine)
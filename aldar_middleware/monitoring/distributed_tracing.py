@@ -2,10 +2,18 @@
 
 Provides end-to-end request tracing across all services, agent calls, and database queries.
 Integrates with Azure Application Insights for centralized trace visualization.
+
+Traces live in memory for the duration of a request and are handed to the
+background trace exporter when they end, so requests never write trace rows
+themselves. Head sampling (``trace_sample_rate``) decides up front which
+traces are kept; tail retention additionally keeps every failed trace and
+every trace slower than ``trace_retention_slow_threshold_ms``.
 """
 
+import random
 import time
 import uuid
+from contextvars import ContextVar
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
@@ -15,8 +23,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id, get_agent_context
-from aldar_middleware.models import DistributedTrace, TraceStatusType, TraceSampleType
+from aldar_middleware.models import TraceStatusType, TraceSampleType
+from aldar_middleware.monitoring.trace_exporter import (
+    QueryRecord,
+    TraceRecord,
+    get_trace_exporter,
+)
+
+# Trace of the request being handled in this context
+_current_trace: ContextVar[Optional[TraceRecord]] = ContextVar("current_trace", default=None)
+
 
+def get_current_trace() -> Optional[TraceRecord]:
+    """Get the trace of the current request, if one is active."""
+    return _current_trace.get()
 
 class TraceSamplingConfig:
     """Sampling configuration for traces."""
@@ -68,12 +88,18 @@ class DistributedTracingService:
         """Initialize the distributed tracing service.
         
         Args:
-            db_session: Database session for storing traces (optional for initialization)
+            db_session: Accepted for compatibility; traces are written by the
+                trace exporter on its own session
         """
         self.db_session = db_session
         self.enabled = settings.distributed_tracing_enabled and settings.app_insights_enabled
         self.sampling_config = TraceSamplingConfig(settings.trace_sample_rate)
-        self.current_trace: Optional[DistributedTrace] = None
+        self.slow_threshold_ms = settings.trace_retention_slow_threshold_ms
+    
+    @property
+    def current_trace(self) -> Optional[TraceRecord]:
+        """Trace of the request being handled in the current context."""
+        return _current_trace.get()
     
     async def set_db_session(self, db_session: AsyncSession) -> None:
         """Set the database session (called after it's available).
@@ -84,7 +110,7 @@ class DistributedTracingService:
         self.db_session = db_session
     
     def should_trace(self) -> bool:
-        """Determine if this request should be traced based on sampling.
+        """Head sampling decision for a new trace.
         
         Returns:
             True if request should be traced, False otherwise
@@ -92,10 +118,28 @@ class DistributedTracingService:
         if not self.enabled:
             return False
         
-        # Always trace errors and specific paths, even with sampling
-        import random
         return random.random() < self.sampling_config.should_sample
     
+    def retention_reason(self, trace: TraceRecord) -> Optional[str]:
+        """Tail retention decision for a finished trace.
+        
+        Args:
+            trace: Finished trace
+            
+        Returns:
+            "error", "slow" or "sampled" if the trace is kept, None if it is discarded
+        """
+        if (
+            trace.status in (TraceStatusType.ERROR, TraceStatusType.TIMEOUT)
+            or (trace.http_status_code or 0) >= 500
+        ):
+            return "error"
+        if (trace.duration_ms or 0) >= self.slow_threshold_ms or trace.queries:
+            return "slow"
+        if trace.sampled:
+            return "sampled"
+        return None
+    
     async def start_trace(
         self,
         request_method: str,
@@ -103,7 +147,7 @@ class DistributedTracingService:
         request_endpoint: Optional[str] = None,
         user_id: Optional[str] = None,
         correlation_id: Optional[str] = None,
-    ) -> DistributedTrace:
+    ) -> TraceRecord:
         """Start a new distributed trace for an incoming request.
         
         Args:
@@ -114,7 +158,7 @@ class DistributedTracingService:
             correlation_id: Correlation ID (will be generated if not provided)
             
         Returns:
-            DistributedTrace instance
+            TraceRecord for the request
         """
         if not correlation_id:
             correlation_id = get_correlation_id() or str(uuid.uuid4())
@@ -126,7 +170,7 @@ class DistributedTracingService:
         # Determine if this trace should be sampled
         sampled = self.should_trace()
         
-        trace = DistributedTrace(
+        trace = TraceRecord(
             correlation_id=correlation_id,
             trace_id=trace_id,
             span_id=span_id,
@@ -135,12 +179,11 @@ class DistributedTracingService:
             request_path=request_path,
             request_endpoint=request_endpoint,
             start_time=datetime.now(timezone.utc),
-            status=TraceStatusType.PENDING,
             sampled=sampled,
             sample_type=self.sampling_config.sample_type,
         )
         
-        self.current_trace = trace
+        _current_trace.set(trace)
         
         logger.debug(
             f"Started distributed trace: correlation_id={correlation_id}, "
@@ -155,8 +198,8 @@ class DistributedTracingService:
         http_status_code: Optional[int] = None,
         error_type: Optional[str] = None,
         error_message: Optional[str] = None,
-    ) -> Optional[DistributedTrace]:
-        """End and persist the current distributed trace.
+    ) -> Optional[TraceRecord]:
+        """End the current distributed trace and hand it to the exporter if it is kept.
         
         Args:
             status: Trace status (SUCCESS, ERROR, TIMEOUT, PARTIAL)
@@ -165,44 +208,40 @@ class DistributedTracingService:
             error_message: Error message if applicable
             
         Returns:
-            Persisted DistributedTrace instance or None if no trace is active
+            Finished TraceRecord or None if no trace is active
         """
-        if not self.current_trace:
+        trace = _current_trace.get()
+        if not trace:
             return None
-        
-        trace = self.current_trace
+        _current_trace.set(None)
         
         # Calculate duration
-        now = datetime.now(timezone.utc)
-        trace.end_time = now
-        trace.duration_ms = int((now - trace.start_time).total_seconds() * 1000)
+        trace.end_time = datetime.now(timezone.utc)
+        trace.duration_ms = int((time.perf_counter() - trace.started_at) * 1000)
         
         # Update status
-        trace.status = status
+        trace.status = TraceStatusType(status)
         trace.http_status_code = http_status_code
         trace.error_type = error_type
         trace.error_message = error_message
         
-        # Update agent and query counts from context
+        # Update agent counts from context
         agent_context = get_agent_context()
         if agent_context:
             trace.agent_count = agent_context.get_agent_count()
             agent_stats = agent_context.get_agent_statistics()
             trace.total_agent_time_ms = int(agent_stats.get("total_agent_time", 0) * 1000)
         
-        # Persist to database if session is available and trace is sampled
-        if self.db_session and trace.sampled:
-            try:
-                self.db_session.add(trace)
-                await self.db_session.flush()
+        if self.enabled:
+            trace.retention = self.retention_reason(trace)
+            if trace.retention:
+                get_trace_exporter().submit(trace)
                 logger.debug(
-                    f"Persisted distributed trace: correlation_id={trace.correlation_id}, "
-                    f"duration_ms={trace.duration_ms}, status={trace.status.value}"
+                    f"Queued distributed trace for export: correlation_id={trace.correlation_id}, "
+                    f"duration_ms={trace.duration_ms}, status={trace.status.value}, "
+                    f"retention={trace.retention}"
                 )
-            except Exception as e:
-                logger.error(f"Failed to persist distributed trace: {e}")
         
-        self.current_trace = None
         return trace
     
     async def add_trace_metadata(self, key: str, value: Any) -> None:
@@ -212,13 +251,11 @@ class DistributedTracingService:
             key: Metadata key
             value: Metadata value
         """
-        if not self.current_trace:
+        trace = _current_trace.get()
+        if not trace:
             return
         
-        if self.current_trace.metadata is None:
-            self.current_trace.metadata = {}
-        
-        self.current_trace.metadata[key] = value
+        trace.metadata[key] = value
     
     async def record_agent_call_in_trace(
         self,
@@ -237,18 +274,13 @@ class DistributedTracingService:
             duration_ms: Duration in milliseconds
             status: Status of the call (success, error, timeout)
         """
-        if not self.current_trace:
+        trace = _current_trace.get()
+        if not trace:
             return
         
         # These are already tracked via agent context,
         # but we can add detailed agent call info to trace metadata
-        if self.current_trace.metadata is None:
-            self.current_trace.metadata = {}
-        
-        if "agent_calls" not in self.current_trace.metadata:
-            self.current_trace.metadata["agent_calls"] = []
-        
-        self.current_trace.metadata["agent_calls"].append({
+        trace.metadata.setdefault("agent_calls", []).append({
             "agent_type": agent_type,
             "agent_name": agent_name,
             "method": method,
@@ -262,35 +294,36 @@ class DistributedTracingService:
         duration_ms: int,
         rows_affected: Optional[int] = None,
         slow_query: bool = False,
+        query_sql: Optional[str] = None,
     ) -> None:
         """Record a database query in the trace metrics.
         
+        Statements executed through the instrumented engine are recorded
+        automatically by the database tracer; this is for queries made
+        through other clients.
+        
         Args:
             query_type: Type of query (SELECT, INSERT, UPDATE, DELETE)
             duration_ms: Duration in milliseconds
             rows_affected: Number of rows affected
-            slow_query: Whether the query was slow
+            slow_query: Whether the query was slow (slow queries are exported with the trace)
+            query_sql: Sanitized statement, if available
         """
-        if not self.current_trace:
+        trace = _current_trace.get()
+        if not trace:
             return
         
-        # Update query count and time
-        self.current_trace.database_query_count += 1
-        self.current_trace.total_query_time_ms += duration_ms
-        
-        # Add to metadata
-        if self.current_trace.metadata is None:
-            self.current_trace.metadata = {}
-        
-        if "database_queries" not in self.current_trace.metadata:
-            self.current_trace.metadata["database_queries"] = []
-        
-        self.current_trace.metadata["database_queries"].append({
-            "query_type": query_type,
-            "duration_ms": duration_ms,
-            "rows_affected": rows_affected,
-            "slow_query": slow_query,
-        })
+        trace.database_query_count += 1
+        trace.total_query_time_ms += duration_ms
+        
+        if slow_query:
+            trace.add_query(QueryRecord(
+                query_type=query_type,
+                query_sql=query_sql or query_type,
+                start_time=datetime.now(timezone.utc),
+                duration_ms=duration_ms,
+                rows=rows_affected,
+            ))
     
     @asynccontextmanager
     async def trace_operation(
@@ -335,12 +368,13 @@ class DistributedTracingService:
         Returns:
             Dictionary with trace context (trace_id, span_id, parent_span_id)
         """
-        if not self.current_trace:
+        trace = _current_trace.get()
+        if not trace:
             return {}
         
         return {
-            "traceparent": f"00-{self.current_trace.trace_id}-{self.current_trace.span_id}-01",
-            "correlation_id": self.current_trace.correlation_id,
+            "traceparent": f"00-{trace.trace_id}-{trace.span_id}-01",
+            "correlation_id": trace.correlation_id,
         }
 
 
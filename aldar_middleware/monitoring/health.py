@@ -3,12 +3,14 @@
 from typing import Dict, Any
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from aldar_middleware.database.base import get_db
 from aldar_middleware.settings import settings
 from aldar_middleware.monitoring.prometheus import get_metrics
+from aldar_middleware.utils.startup import get_startup_graph
 
 router = APIRouter()
 
@@ -93,12 +95,24 @@ async def metrics():
 
 
 @router.get("/health/ready")
-async def readiness_check() -> Dict[str, Any]:
-    """Readiness check for Kubernetes."""
-    return {
-        "status": "ready",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+async def readiness_check() -> JSONResponse:
+    """Readiness check for Kubernetes.
+
+    Returns 503 until every startup phase, including subsystems started in
+    the background, has finished; warm-ups such as the OpenAPI schema are
+    reported but not waited for. Phases that failed or timed out are
+    reported but do not keep the instance out of rotation.
+    """
+    graph = get_startup_graph()
+    ready = graph is not None and graph.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "timestamp": datetime.utcnow().isoformat(),
+            "phases": graph.snapshot() if graph else {},
+        },
+    )
 
 
 @router.get("/health/live")
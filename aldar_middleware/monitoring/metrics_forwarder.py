@@ -1,20 +1,71 @@
 """
 Collects Prometheus metrics and forwards them to Azure Monitor.
 Extracts key metrics from the local Prometheus setup and sends them to Azure.
+
+Under gunicorn every worker starts a forwarder, but only the worker holding
+the pod's leader lock collects and forwards; it reads the metrics aggregated
+across all workers, so each value is sent once per pod.
 """
 
+import fcntl
 import logging
-from typing import Optional
+import os
+from typing import IO, Optional
 from threading import Thread, Event
 from datetime import datetime, timezone
 
-from prometheus_client import REGISTRY
-
 from aldar_middleware.monitoring.azure_metrics_ingestion import get_metrics_forwarder
+from aldar_middleware.monitoring.prometheus import MULTIPROCESS_DIR, get_metrics_registry
 
 logger = logging.getLogger(__name__)
 
 
+class PodLeaderLock:
+    """Non-blocking exclusive file lock shared by the workers of a pod.
+
+    At most one process holds it. The OS releases it when the holder exits,
+    so when gunicorn recycles that worker another one takes over on its next
+    attempt.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the lock.
+
+        Args:
+            path: Lock file, in a directory shared by the pod's workers
+        """
+        self.path = path
+        self._handle: Optional[IO] = None
+
+    @property
+    def held(self) -> bool:
+        """Whether this process holds the lock."""
+        return self._handle is not None
+
+    def acquire(self) -> bool:
+        """Try to take the lock without waiting; True if this process holds it."""
+        if self._handle is not None:
+            return True
+
+        handle = open(self.path, "a")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+
+        self._handle = handle
+        logger.info(f"Process {os.getpid()} is the pod's metrics forwarding leader")
+        return True
+
+    def release(self):
+        """Release the lock if this process holds it."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
 class PrometheusToAzureForwarder:
     """
     Collects Prometheus metrics and forwards key metrics to Azure Monitor.
@@ -48,6 +99,12 @@ class PrometheusToAzureForwarder:
         self.running = False
         self.thread: Optional[Thread] = None
         self.stop_event = Event()
+        # Without multiprocess mode each process is its own pod-level view
+        self.leader_lock = (
+            PodLeaderLock(os.path.join(MULTIPROCESS_DIR, "azure-forwarder.lock"))
+            if MULTIPROCESS_DIR
+            else None
+        )
 
     def start(self):
         """Start the background metrics forwarding thread."""
@@ -75,6 +132,9 @@ class PrometheusToAzureForwarder:
         if self.thread:
             self.thread.join(timeout=10)
 
+        if self.leader_lock:
+            self.leader_lock.release()
+
         logger.info("Prometheus to Azure Forwarder stopped")
 
     def _collection_loop(self):
@@ -97,24 +157,30 @@ class PrometheusToAzureForwarder:
         if not forwarder:
             return
 
+        # Another worker forwards the pod's metrics
+        if self.leader_lock and not self.leader_lock.acquire():
+            return
+
         try:
             timestamp = datetime.now(timezone.utc)
             metrics_collected = 0
 
-            # Iterate through all metrics in Prometheus registry
-            for collector in REGISTRY._collector_to_names:
+            # Iterate through all metrics, aggregated across workers
+            for metric in get_metrics_registry().collect():
                 try:
-                    for metric in collector.collect():
-                        if metric.name not in self.FORWARDED_METRICS:
-                            continue
+                    # Counter families are named without their _total suffix
+                    dimension_labels = self.FORWARDED_METRICS.get(
+                        metric.name, self.FORWARDED_METRICS.get(f"{metric.name}_total")
+                    )
+                    if dimension_labels is None:
+                        continue
 
-                        dimension_labels = self.FORWARDED_METRICS[metric.name]
-                        metrics_collected += self._process_metric(
-                            metric, dimension_labels, forwarder, timestamp
-                        )
+                    metrics_collected += self._process_metric(
+                        metric, dimension_labels, forwarder, timestamp
+                    )
 
                 except Exception as e:
-                    logger.debug(f"Error processing metric collector: {str(e)}")
+                    logger.debug(f"Error processing metric {metric.name}: {str(e)}")
 
             if metrics_collected > 0:
                 logger.debug(
@@ -143,6 +209,10 @@ class PrometheusToAzureForwarder:
 
         # Process metric samples (time series)
         for sample in metric.samples:
+            # Creation timestamps are not metric values
+            if sample.name.endswith("_created"):
+                continue
+
             try:
                 # Build dimension dictionary from labels
                 dimensions = {}
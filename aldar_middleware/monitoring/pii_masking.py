@@ -1,11 +1,18 @@
 """PII (Personally Identifiable Information) masking service for logs and traces.
 
 Provides configurable masking of sensitive data patterns based on environment settings.
+
+All enabled patterns are combined into one alternation of named groups, so a
+string is scanned once instead of once per pattern. Cheap literal checks
+(``@``, digits, ``eyJ``, keywords) first decide which patterns can match at
+all; strings that none can match are returned without running a regex.
 """
 
-import re
 import json
-from typing import Any, Dict, Optional, Pattern
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Pattern, Tuple
+
 from loguru import logger
 
 from aldar_middleware.settings import settings
@@ -13,7 +20,7 @@ from aldar_middleware.settings import settings
 
 class PIIMaskingConfig:
     """Configuration for PII masking."""
-    
+
     def __init__(self):
         """Initialize PII masking configuration from settings."""
         self.enabled = settings.pii_masking_enabled
@@ -22,11 +29,98 @@ class PIIMaskingConfig:
         self.mask_credit_cards = settings.pii_mask_credit_cards
         self.mask_tokens = settings.pii_mask_tokens
         self.mask_api_keys = settings.pii_mask_api_keys
+        self.cache_size = settings.pii_mask_cache_size
+
+
+# Pattern sources as (regex, case_insensitive). Case-insensitive patterns are
+# wrapped in a scoped (?i:...) group so they can share one alternation.
+_PATTERN_SOURCES: Dict[str, Tuple[str, bool]] = {
+    "email": (
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', False
+    ),
+    "phone": (
+        r'(?:(?:\+?1\s*(?:[.-]\s*)?)?(?:\(\s*([0-9]{3})\s*\)|([0-9]{3}))\s*(?:[.-]\s*)?)?([0-9]{3})\s*(?:[.-]\s*)?([0-9]{4})(?:\s*(?:#|x\.?|ext\.?|extension)\s*(\d+))?', False
+    ),
+    "credit_card": (
+        r'\b(?:\d[ -]*?){13,19}\b', False
+    ),
+    "api_key": (
+        r'(?:api[_-]?key|apikey|auth[_-]?token|access[_-]?token|bearer|token)\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?', True
+    ),
+    "auth_token": (
+        r'(?:authorization|auth)\s*[:\s=]+\s*(?:bearer|token)\s+[^\s]+', True
+    ),
+    "jwt": (
+        r'eyJ[a-zA-Z0-9_-]*\.eyJ[a-zA-Z0-9_-]*\.[a-zA-Z0-9_-]*', False
+    ),
+    "aws_key": (
+        r'AKIA[0-9A-Z]{16}', True
+    ),
+    "password": (
+        r'(?:password|passwd|pwd)\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?', True
+    ),
+    "connection_string": (
+        r'(?:connection|conn|db)[_-]?string\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?', True
+    ),
+    "ssn": (
+        r'\b(?!000|666)[0-9]{3}-?(?!00)[0-9]{2}-?(?!0000)[0-9]{4}\b', False
+    ),
+}
+
+_DIGIT = re.compile(r'\d')
+
+
+def _has_digit(value: str, lowered: str) -> bool:
+    return _DIGIT.search(value) is not None
+
+
+def _contains(*needles: str) -> Callable[[str, str], bool]:
+    """Prefilter matching when any needle occurs in the lowercased value."""
+    return lambda value, lowered: any(needle in lowered for needle in needles)
+
+
+# Literal prefilters: a pattern can only match when its prefilter passes
+_PREFILTERS: Dict[str, Callable[[str, str], bool]] = {
+    "email": lambda value, lowered: "@" in value,
+    "phone": _has_digit,
+    "credit_card": _has_digit,
+    "api_key": _contains("key", "token", "bearer"),
+    "auth_token": _contains("auth"),
+    "jwt": lambda value, lowered: "eyJ" in value,
+    "aws_key": _contains("akia"),
+    "password": _contains("pass", "pwd"),
+    "connection_string": _contains("string"),
+    "ssn": _has_digit,
+}
+
+# Keys whose values are redacted entirely, and keys whose scalar values never
+# hold PII and are not scanned (identifiers and timings only; free-text keys
+# such as "status" or "type" do not belong here). Dicts and lists under a safe
+# key are still masked. Keys are compared lowercased with "-" as "_".
+SENSITIVE_KEYS = frozenset({
+    "authorization", "proxy_authorization", "x_api_key", "x_auth_token", "cookie", "set_cookie",
+    "x_auth", "auth", "token", "api_key", "x_token", "x_secret", "secret", "password",
+    "passwd", "pwd", "access_token", "refresh_token", "id_token", "client_secret",
+    "connection_string",
+})
+SAFE_KEYS = frozenset({
+    "timestamp", "level", "correlation_id", "trace_id", "span_id", "parent_span_id",
+    "request_id", "method", "status_code", "duration_ms", "response_time_ms",
+    "module", "function", "line", "logger",
+})
+
+# Strings up to this length (header values, ids, paths) are memoized
+_MEMO_MAX_LENGTH = 256
+
+
+@lru_cache(maxsize=1024)
+def _normalize_key(key: str) -> str:
+    return key.lower().replace("-", "_")
 
 
 class PIIMaskingService:
     """Service for masking personally identifiable information.
-    
+
     Supports masking of:
     - Email addresses
     - Phone numbers
@@ -34,47 +128,19 @@ class PIIMaskingService:
     - Authentication tokens and API keys
     - Custom patterns
     """
-    
+
     # Regex patterns for common PII
-    PATTERNS = {
-        "email": re.compile(
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        ),
-        "phone": re.compile(
-            r'(?:(?:\+?1\s*(?:[.-]\s*)?)?(?:\(\s*([0-9]{3})\s*\)|([0-9]{3}))\s*(?:[.-]\s*)?)?([0-9]{3})\s*(?:[.-]\s*)?([0-9]{4})(?:\s*(?:#|x\.?|ext\.?|extension)\s*(\d+))?'
-        ),
-        "credit_card": re.compile(
-            r'\b(?:\d[ -]*?){13,19}\b'
-        ),
-        "api_key": re.compile(
-            r'(?i)(?:api[_-]?key|apikey|auth[_-]?token|access[_-]?token|bearer|token)\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?'
-        ),
-        "auth_token": re.compile(
-            r'(?i)(?:authorization|auth)\s*[:\s=]+\s*(?:bearer|token)\s+[^\s]+'
-        ),
-        "jwt": re.compile(
-            r'eyJ[a-zA-Z0-9_-]*\.eyJ[a-zA-Z0-9_-]*\.[a-zA-Z0-9_-]*'
-        ),
-        "aws_key": re.compile(
-            r'(?i)AKIA[0-9A-Z]{16}'
-        ),
-        "password": re.compile(
-            r'(?i)(?:password|passwd|pwd)\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?'
-        ),
-        "connection_string": re.compile(
-            r'(?i)(?:connection|conn|db)[_-]?string\s*[:\s=]+\s*[\'"]?([^\s\'"\]}{]+)[\'"]?'
-        ),
-        "ssn": re.compile(
-            r'\b(?!000|666)[0-9]{3}-?(?!00)[0-9]{2}-?(?!0000)[0-9]{4}\b'
-        ),
+    PATTERNS: Dict[str, Pattern] = {
+        name: re.compile(source, re.IGNORECASE if ignore_case else 0)
+        for name, (source, ignore_case) in _PATTERN_SOURCES.items()
     }
-    
+
     def __init__(self):
         """Initialize the PII masking service."""
         self.config = PIIMaskingConfig()
         self.masking_applied: Dict[str, bool] = {}
         self._update_masking_applied()
-    
+
     def _update_masking_applied(self) -> None:
         """Update which patterns should be masked based on config."""
         self.masking_applied = {
@@ -89,121 +155,134 @@ class PIIMaskingService:
             "connection_string": self.config.mask_api_keys,
             "ssn": self.config.mask_tokens,
         }
-    
+        # Enabled patterns in application order, and their combined regexes
+        self._enabled = tuple(name for name in _PATTERN_SOURCES if self.masking_applied.get(name))
+        self._combined: Dict[Tuple[str, ...], Pattern] = {}
+        self._mask_short = lru_cache(maxsize=self.config.cache_size)(self._scan)
+
+    def _combined_pattern(self, names: Tuple[str, ...]) -> Pattern:
+        """Single alternation of the given patterns, one named group each."""
+        pattern = self._combined.get(names)
+        if pattern is None:
+            alternatives = []
+            for name in names:
+                source, ignore_case = _PATTERN_SOURCES[name]
+                if ignore_case:
+                    source = f"(?i:{source})"
+                alternatives.append(f"(?P<{name}>{source})")
+            pattern = self._combined[names] = re.compile("|".join(alternatives))
+        return pattern
+
+    def _scan(self, value: str, preserve_length: bool) -> str:
+        """Mask every pattern match in one pass over the string."""
+        lowered = value.lower()
+        candidates = tuple(name for name in self._enabled if _PREFILTERS[name](value, lowered))
+        if not candidates:
+            return value
+
+        if preserve_length:
+            replace = lambda match: "*" * (match.end() - match.start())
+        else:
+            replace = lambda match: f"***{match.lastgroup}***"
+        return self._combined_pattern(candidates).sub(replace, value)
+
     def mask_string(self, value: str, preserve_length: bool = True) -> str:
         """Mask sensitive information in a string.
-        
+
         Args:
             value: String to mask
             preserve_length: If True, replacement has same length as original
-            
+
         Returns:
             Masked string
         """
         if not value or not isinstance(value, str):
             return value
-        
+
         if not self.config.enabled:
             return value
-        
-        masked_value = value
-        
-        # Apply masking in order
-        for pattern_name, pattern in self.PATTERNS.items():
-            if not self.masking_applied.get(pattern_name, False):
-                continue
-            
-            def replace_func(match: re.Match) -> str:
-                matched_text = match.group(0)
-                if preserve_length:
-                    return "*" * len(matched_text)
-                else:
-                    return f"***{pattern_name}***"
-            
-            masked_value = pattern.sub(replace_func, masked_value)
-        
-        return masked_value
-    
+
+        if len(value) <= _MEMO_MAX_LENGTH:
+            return self._mask_short(value, preserve_length)
+        return self._scan(value, preserve_length)
+
+    def _redact(self, value: str, preserve_length: bool) -> str:
+        """Mask a value stored under a sensitive key."""
+        return "*" * len(value) if preserve_length else "***redacted***"
+
+    def _mask_value(self, key: Any, value: Any, preserve_length: bool) -> Any:
+        """Mask a dictionary value according to its key."""
+        if value is None:
+            return value
+        normalized_key = _normalize_key(key) if isinstance(key, str) else None
+        if isinstance(value, str):
+            if normalized_key in SAFE_KEYS:
+                return value
+            if normalized_key in SENSITIVE_KEYS:
+                return self._redact(value, preserve_length)
+            return self.mask_string(value, preserve_length)
+        if isinstance(value, dict):
+            return self.mask_dict(value, preserve_length)
+        if isinstance(value, list):
+            return self.mask_list(value, preserve_length)
+        return value
+
     def mask_dict(self, data: Dict[str, Any], preserve_length: bool = True) -> Dict[str, Any]:
         """Recursively mask sensitive information in a dictionary.
-        
+
+        String values of sensitive keys (passwords, tokens, cookies) are
+        masked entirely; string values of keys in ``SAFE_KEYS`` are left as
+        they are. Nested dicts and lists are always masked.
+
         Args:
             data: Dictionary to mask
             preserve_length: If True, replacement has same length as original
-            
+
         Returns:
             Dictionary with masked values
         """
         if not data or not isinstance(data, dict):
             return data
-        
+
         if not self.config.enabled:
             return data
-        
-        masked_dict = {}
-        
-        for key, value in data.items():
-            if value is None:
-                masked_dict[key] = value
-            elif isinstance(value, str):
-                masked_dict[key] = self.mask_string(value, preserve_length)
-            elif isinstance(value, dict):
-                masked_dict[key] = self.mask_dict(value, preserve_length)
-            elif isinstance(value, list):
-                masked_dict[key] = self.mask_list(value, preserve_length)
-            else:
-                masked_dict[key] = value
-        
-        return masked_dict
-    
+
+        return {key: self._mask_value(key, value, preserve_length) for key, value in data.items()}
+
     def mask_list(self, data: list, preserve_length: bool = True) -> list:
         """Recursively mask sensitive information in a list.
-        
+
         Args:
             data: List to mask
             preserve_length: If True, replacement has same length as original
-            
+
         Returns:
             List with masked values
         """
         if not data or not isinstance(data, list):
             return data
-        
+
         if not self.config.enabled:
             return data
-        
-        masked_list = []
-        
-        for item in data:
-            if item is None:
-                masked_list.append(item)
-            elif isinstance(item, str):
-                masked_list.append(self.mask_string(item, preserve_length))
-            elif isinstance(item, dict):
-                masked_list.append(self.mask_dict(item, preserve_length))
-            elif isinstance(item, list):
-                masked_list.append(self.mask_list(item, preserve_length))
-            else:
-                masked_list.append(item)
-        
-        return masked_list
-    
+
+        return [self._mask_value(None, item, preserve_length) for item in data]
+
     def mask_json_string(self, json_string: str, preserve_length: bool = True) -> str:
         """Mask sensitive information in a JSON string.
-        
+
         Args:
             json_string: JSON string to mask
             preserve_length: If True, replacement has same length as original
-            
+
         Returns:
             JSON string with masked values
         """
         if not json_string or not isinstance(json_string, str):
             return json_string
-        
+
         if not self.config.enabled:
             return json_string
-        
+
         try:
             data = json.loads(json_string)
             masked_data = self.mask_dict(data, preserve_length)
@@ -211,60 +290,50 @@ class PIIMaskingService:
         except (json.JSONDecodeError, TypeError):
             # If it's not valid JSON, mask it as a string
             return self.mask_string(json_string, preserve_length)
-    
+
     def mask_headers(self, headers: Dict[str, str]) -> Dict[str, str]:
         """Mask sensitive information in HTTP headers.
-        
+
         Args:
             headers: HTTP headers to mask
-            
+
         Returns:
             Dictionary with masked sensitive headers
         """
         if not headers or not isinstance(headers, dict):
             return headers
-        
+
         if not self.config.enabled:
             return headers
-        
-        # Headers to mask
-        sensitive_headers = {
-            "authorization", "x-api-key", "x-auth-token", "cookie",
-            "x-auth", "auth", "token", "api-key", "api_key",
-            "x-token", "x-secret", "secret", "password",
-        }
-        
+
         masked_headers = {}
-        
+
         for key, value in headers.items():
-            if key.lower() in sensitive_headers:
-                if value and isinstance(value, str):
-                    # Mask the value but preserve structure if possible
-                    if len(value) > 10:
-                        masked_headers[key] = value[:5] + "*" * (len(value) - 10) + value[-5:]
-                    else:
-                        masked_headers[key] = "*" * len(value)
+            if _normalize_key(key) in SENSITIVE_KEYS and value and isinstance(value, str):
+                # Mask the value but preserve structure if possible
+                if len(value) > 10:
+                    masked_headers[key] = value[:5] + "*" * (len(value) - 10) + value[-5:]
                 else:
-                    masked_headers[key] = value
+                    masked_headers[key] = "*" * len(value)
             else:
                 masked_headers[key] = value
-        
+
         return masked_headers
-    
+
     def should_mask(self, pattern_name: str) -> bool:
         """Check if a specific pattern should be masked.
-        
+
         Args:
             pattern_name: Name of the pattern to check
-            
+
         Returns:
             True if pattern should be masked, False otherwise
         """
         return self.config.enabled and self.masking_applied.get(pattern_name, False)
-    
+
     def get_masking_config(self) -> Dict[str, bool]:
         """Get the current masking configuration.
-        
+
         Returns:
             Dictionary of pattern names to masking flags
         """
@@ -277,12 +346,12 @@ _masking_service: Optional[PIIMaskingService] = None
 
 def get_pii_masking_service() -> PIIMaskingService:
     """Get or create the global PII masking service.
-    
+
     Returns:
         PIIMaskingService instance
     """
     global _masking_service
-    
+
     if _masking_service is None:
         _masking_service = PIIMaskingService()
         logger.info(
@@ -290,17 +359,17 @@ def get_pii_masking_service() -> PIIMaskingService:
             f"Masking enabled: {_masking_service.config.enabled}. "
             f"Patterns: {_masking_service.get_masking_config()}"
         )
-    
+
     return _masking_service
 
 
 def mask_string(value: str, preserve_length: bool = True) -> str:
     """Convenience function to mask a string.
-    
+
     Args:
         value: String to mask
         preserve_length: If True, replacement has same length as original
-        
+
     Returns:
         Masked string
     """
@@ -309,11 +378,11 @@ def mask_string(value: str, preserve_length: bool = True) -> str:
 
 def mask_dict(data: Dict[str, Any], preserve_length: bool = True) -> Dict[str, Any]:
     """Convenience function to mask a dictionary.
-    
+
     Args:
         data: Dictionary to mask
         preserve_length: If True, replacement has same length as original
-        
+
     Returns:
         Dictionary with masked values
     """
@@ -322,11 +391,11 @@ def mask_dict(data: Dict[str, Any], preserve_length: bool = True) -> Dict[str, A
 
 def mask_headers(headers: Dict[str, str]) -> Dict[str, str]:
     """Convenience function to mask HTTP headers.
-    
+
     Args:
         headers: HTTP headers to mask
-        
+
     Returns:
         Dictionary with masked sensitive headers
     """
-    return get_pii_masking_service().mask_headers(headers)
\ No newline at end of file
+    return get_pii_masking_service().mask_headers(headers)
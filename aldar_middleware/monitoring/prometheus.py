@@ -1,19 +1,29 @@
 """Prometheus monitoring configuration."""
 
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry
+from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, multiprocess
 from fastapi import Response
-from fastapi.routing import APIRoute
+from loguru import logger
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response as StarletteResponse
+from starlette.routing import BaseRoute, Mount, get_route_path
+import os
+import threading
 import time
-from typing import Callable, Optional, Dict, Any
+from collections import OrderedDict
+from typing import Callable, Optional, Dict, Any, Sequence, Set, Tuple
 
+from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id
 
 # Dynamic metrics registry for generic metric recording
 _DYNAMIC_METRICS: Dict[str, Gauge] = {}
 
+# Set by the gunicorn config before workers import the app. prometheus_client
+# then keeps metric values in per-process mmap files in this directory, and
+# exposition aggregates them across workers.
+MULTIPROCESS_DIR: Optional[str] = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
 # ========================================
 # HTTP Request Metrics
 # ========================================
@@ -30,6 +40,11 @@ REQUEST_DURATION = Histogram(
     buckets=(0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
 )
 
+ENDPOINT_LABEL_OVERFLOW = Counter(
+    "aiq_http_endpoint_label_overflow_total",
+    "Requests recorded under endpoint 'other' because the endpoint label limit was reached"
+)
+
 REQUESTS_WITH_CORRELATION_ID = Counter(
     "aiq_requests_with_correlation_id_total",
     "Total requests tracked with correlation ID",
@@ -145,7 +160,8 @@ MCP_REQUEST_DURATION = Histogram(
 
 MCP_CONNECTIONS_ACTIVE = Gauge(
     "aiq_mcp_connections_active",
-    "Number of active MCP connections"
+    "Number of active MCP connections",
+    multiprocess_mode="livesum"
 )
 
 MCP_CONNECTION_ERRORS = Counter(
@@ -191,6 +207,119 @@ DATABASE_QUERY_DURATION = Histogram(
     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
 )
 
+DB_POOL_WAIT = Histogram(
+    "aiq_db_pool_wait_seconds",
+    "Time taken to check a connection out of the worker's pool, including queueing",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    "aiq_db_pool_timeouts_total",
+    "Connection checkouts that gave up after waiting db_pool_timeout seconds",
+    ["pool"]
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "aiq_db_pool_checked_out_connections",
+    "Database connections currently checked out of the pools",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_CAPACITY = Gauge(
+    "aiq_db_pool_capacity_connections",
+    "Maximum connections the pools may open (pool_size + max_overflow)",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_SATURATION = Gauge(
+    "aiq_db_pool_saturation_ratio",
+    "Checked-out connections over pool capacity of the most saturated worker",
+    ["pool"],
+    multiprocess_mode="livemax"
+)
+
+DB_READ_ROUTES = Counter(
+    "aiq_db_read_routes_total",
+    "Read-only sessions by database and routing reason",
+    ["target", "reason"]
+)
+
+DB_REPLICA_LAG = Gauge(
+    "aiq_db_replica_lag_seconds",
+    "Replica replay lag as last measured by the workers",
+    multiprocess_mode="livemax"
+)
+
+# ========================================
+# Run Event Ingestion Metrics
+# ========================================
+RUN_EVENTS_INGESTED = Counter(
+    "aiq_run_events_ingested_total",
+    "Total Web PubSub run events written to the database",
+    ["outcome"]
+)
+
+RUN_EVENT_INGEST_LAG = Histogram(
+    "aiq_run_event_ingest_lag_seconds",
+    "Time from a run event being received to it being committed",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+RUN_EVENT_BATCH_SIZE = Histogram(
+    "aiq_run_event_batch_size",
+    "Number of run events written per database batch",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500)
+)
+
+RUN_EVENT_QUEUE_DEPTH = Gauge(
+    "aiq_run_event_queue_depth",
+    "Run events waiting to be written",
+    multiprocess_mode="livesum"
+)
+
+# ========================================
+# Trace Export Metrics
+# ========================================
+TRACES_EXPORTED = Counter(
+    "aiq_traces_exported_total",
+    "Total request traces handled by the background trace exporter",
+    ["outcome"]
+)
+
+TRACE_EXPORT_BATCH_SIZE = Histogram(
+    "aiq_trace_export_batch_size",
+    "Number of traces written per export batch",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500)
+)
+
+TRACE_EXPORT_QUEUE_DEPTH = Gauge(
+    "aiq_trace_export_queue_depth",
+    "Finished traces waiting to be exported",
+    multiprocess_mode="livesum"
+)
+
+# ========================================
+# Startup Metrics
+# ========================================
+STARTUP_PHASE_DURATION = Gauge(
+    "aiq_startup_phase_duration_seconds",
+    "Duration of each application startup phase in the last boot",
+    ["phase", "status"],
+    multiprocess_mode="livemax"
+)
+
+# ========================================
+# Login Enrichment Metrics
+# ========================================
+LOGIN_ENRICHMENT_STEPS = Counter(
+    "aiq_login_enrichment_steps_total",
+    "Login enrichment steps run in the background, by outcome",
+    ["step", "outcome"]
+)
+
 # ========================================
 # Feedback System Metrics
 # ========================================
@@ -242,21 +371,138 @@ AI_RESPONSE_TIME = Histogram(
 )
 
 
+# Endpoint label for requests that match no route (404s, scanners)
+UNMATCHED_ENDPOINT = "other"
+
+
+class RouteTemplateResolver:
+    """Resolves request paths to route templates for the endpoint label.
+
+    ``/api/v1/chat/sessions/3f2a...`` is recorded as
+    ``/api/v1/chat/sessions/{session_id}``, so the number of label values is
+    bounded by the number of routes rather than by the ids in the URLs.
+    Mounted sub-applications are followed, and paths matching no route
+    resolve to ``UNMATCHED_ENDPOINT``. Results are kept in an LRU keyed by
+    path, which is dropped whenever routes are added to the router.
+    """
+
+    def __init__(self, routes: Sequence[BaseRoute], cache_size: int = 10000):
+        """
+        Initialize the resolver.
+
+        Args:
+            routes: The application's routes (read live, not copied)
+            cache_size: Number of resolved paths to keep
+        """
+        self.routes = routes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._route_count = len(routes)
+        self._lock = threading.Lock()
+
+    def resolve(self, path: str) -> str:
+        """Return the route template matching ``path``."""
+        with self._lock:
+            if len(self.routes) != self._route_count:
+                self._cache.clear()
+                self._route_count = len(self.routes)
+            template = self._cache.get(path)
+            if template is not None:
+                self._cache.move_to_end(path)
+                return template
+
+        template = self._match(self.routes, path, "") or UNMATCHED_ENDPOINT
+
+        with self._lock:
+            self._cache[path] = template
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return template
+
+    def _match(self, routes: Sequence[BaseRoute], path: str, prefix: str) -> Optional[str]:
+        for route in routes:
+            path_regex = getattr(route, "path_regex", None)
+            if path_regex is None:
+                continue
+            match = path_regex.match(path)
+            if match is None:
+                continue
+            if isinstance(route, Mount):
+                remaining = "/" + match.group("path")
+                mounted = self._match(route.routes, remaining, prefix + route.path)
+                return mounted or f"{prefix}{route.path}"
+            return f"{prefix}{route.path}"
+        return None
+
+
+class EndpointLabelGuard:
+    """Caps the distinct (method, endpoint) label pairs recorded.
+
+    Route templates keep the label set small; the guard is the backstop for
+    anything that still slips through (e.g. arbitrary HTTP methods). Pairs
+    beyond the limit are recorded as ``UNMATCHED_ENDPOINT`` and counted in
+    ``ENDPOINT_LABEL_OVERFLOW``.
+    """
+
+    def __init__(self, max_labels: int = 500):
+        """
+        Initialize the guard.
+
+        Args:
+            max_labels: Distinct (method, endpoint) pairs allowed
+        """
+        self.max_labels = max_labels
+        self._seen: Set[Tuple[str, str]] = set()
+        self._warned = False
+        self._lock = threading.Lock()
+
+    def admit(self, method: str, endpoint: str) -> str:
+        """Return the endpoint label to record for this request."""
+        key = (method, endpoint)
+        if key in self._seen:
+            return endpoint
+
+        with self._lock:
+            if key in self._seen or len(self._seen) < self.max_labels:
+                self._seen.add(key)
+                return endpoint
+            if not self._warned:
+                self._warned = True
+                logger.warning(
+                    f"Prometheus endpoint label limit ({self.max_labels}) reached; "
+                    f"further endpoints are recorded as '{UNMATCHED_ENDPOINT}'"
+                )
+
+        ENDPOINT_LABEL_OVERFLOW.inc()
+        return UNMATCHED_ENDPOINT
+
+
 class PrometheusMiddleware(BaseHTTPMiddleware):
     """Middleware for Prometheus metrics collection."""
 
+    def __init__(self, app, **kwargs):
+        """Initialize the middleware."""
+        super().__init__(app, **kwargs)
+        self.label_guard = EndpointLabelGuard(settings.prometheus_max_endpoint_labels)
+        self._resolver: Optional[RouteTemplateResolver] = None
+
+    def _endpoint(self, request: Request) -> str:
+        """Bounded endpoint label for a request."""
+        # Built on first use: the application's router is only reachable from a request
+        if self._resolver is None:
+            self._resolver = RouteTemplateResolver(
+                request.app.router.routes, settings.prometheus_route_cache_size
+            )
+        endpoint = self._resolver.resolve(get_route_path(request.scope))
+        return self.label_guard.admit(request.method, endpoint)
+
     async def dispatch(self, request: Request, call_next: Callable) -> StarletteResponse:
         """Process request and collect metrics."""
         start_time = time.time()
         
         # Get route information
-        route = request.scope.get("route")
-        if route and isinstance(route, APIRoute):
-            endpoint = route.path
-            method = request.method
-        else:
-            endpoint = request.url.path
-            method = request.method
+        endpoint = self._endpoint(request)
+        method = request.method
         
         # Track correlation ID presence
         correlation_id = get_correlation_id()
@@ -288,10 +534,30 @@ class PrometheusMiddleware(BaseHTTPMiddleware):
 # ========================================
 # Metrics Endpoint
 # ========================================
+_MULTIPROCESS_REGISTRY: Optional[CollectorRegistry] = None
+
+
+def get_metrics_registry() -> CollectorRegistry:
+    """Get the registry to expose or forward.
+
+    In multiprocess mode this aggregates the metric files of every worker
+    (live and exited) in the pod; otherwise it is the process registry.
+    """
+    global _MULTIPROCESS_REGISTRY
+
+    if not MULTIPROCESS_DIR:
+        return REGISTRY
+    if _MULTIPROCESS_REGISTRY is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+        _MULTIPROCESS_REGISTRY = registry
+    return _MULTIPROCESS_REGISTRY
+
+
 def get_metrics() -> Response:
     """Get Prometheus metrics."""
     return Response(
-        generate_latest(),
+        generate_latest(get_metrics_registry()),
         media_type=CONTENT_TYPE_LATEST
     )
 
@@ -534,6 +800,94 @@ def record_database_operation(operation: str, table: str, duration: Optional[flo
         ).observe(duration)
 
 
+def record_db_pool_checkout(pool: str, wait_seconds: float, timed_out: bool = False):
+    """Record how long a connection checkout waited on a pool."""
+    DB_POOL_WAIT.labels(pool=pool).observe(wait_seconds)
+    if timed_out:
+        DB_POOL_TIMEOUTS.labels(pool=pool).inc()
+
+
+def record_db_pool_usage(pool: str, checked_out: int, capacity: int):
+    """Record the connections checked out of this worker's pool.
+
+    Args:
+        pool: Pool name (e.g. "primary")
+        checked_out: Connections currently in use
+        capacity: pool_size + max_overflow of the pool
+    """
+    DB_POOL_CHECKED_OUT.labels(pool=pool).set(checked_out)
+    DB_POOL_CAPACITY.labels(pool=pool).set(capacity)
+    DB_POOL_SATURATION.labels(pool=pool).set(checked_out / capacity if capacity else 0.0)
+
+
+def record_db_read_route(target: str, reason: str):
+    """Record where a read-only session was routed."""
+    DB_READ_ROUTES.labels(target=target, reason=reason).inc()
+
+
+def record_replica_lag(lag_seconds: Optional[float]):
+    """Record a replica lag measurement; None (replica unreachable) is not recorded."""
+    if lag_seconds is not None:
+        DB_REPLICA_LAG.set(lag_seconds)
+
+
+# ========================================
+# Run Event Ingestion Helpers
+# ========================================
+def record_run_event_batch(batch_size: int, queue_depth: int, lags: Dict[str, list]):
+    """Record one run event batch.
+
+    Args:
+        batch_size: Number of events in the batch
+        queue_depth: Events still waiting after the batch was taken
+        lags: Outcome ("saved", "skipped", "failed") -> lag in seconds per event
+    """
+    RUN_EVENT_BATCH_SIZE.observe(batch_size)
+    RUN_EVENT_QUEUE_DEPTH.set(queue_depth)
+    for outcome, outcome_lags in lags.items():
+        if not outcome_lags:
+            continue
+        RUN_EVENTS_INGESTED.labels(outcome=outcome).inc(len(outcome_lags))
+        for lag in outcome_lags:
+            RUN_EVENT_INGEST_LAG.observe(lag)
+
+
+# ========================================
+# Trace Export Helpers
+# ========================================
+def record_trace_export(outcomes: Dict[str, int], batch_size: Optional[int] = None, queue_depth: Optional[int] = None):
+    """Record traces handled by the trace exporter.
+
+    Args:
+        outcomes: Outcome ("written", "duplicate", "failed", "dropped") -> number of traces
+        batch_size: Number of traces in the exported batch, if a batch was written
+        queue_depth: Traces still waiting after the batch was taken
+    """
+    if batch_size is not None:
+        TRACE_EXPORT_BATCH_SIZE.observe(batch_size)
+    if queue_depth is not None:
+        TRACE_EXPORT_QUEUE_DEPTH.set(queue_depth)
+    for outcome, count in outcomes.items():
+        if count:
+            TRACES_EXPORTED.labels(outcome=outcome).inc(count)
+
+
+# ========================================
+# Startup Helpers
+# ========================================
+def record_startup_phase(phase: str, status: str, duration: float):
+    """Record how long a startup phase took and how it ended."""
+    STARTUP_PHASE_DURATION.labels(phase=phase, status=status).set(duration)
+
+
+# ========================================
+# Login Enrichment Helpers
+# ========================================
+def record_login_enrichment(step: str, outcome: str):
+    """Record the outcome of a login enrichment step (photo, groups)."""
+    LOGIN_ENRICHMENT_STEPS.labels(step=step, outcome=outcome).inc()
+
+
 # ========================================
 # Generic Metrics Recording (for dynamic metrics)
 # ========================================
@@ -556,7 +910,8 @@ def record_metric(metric_name: str, value: float, labels: Optional[Dict[str, str
         _DYNAMIC_METRICS[metric_key] = Gauge(
             metric_name,
             f"Dynamic metric: {metric_name}",
-            labelnames=label_names
+            labelnames=label_names,
+            multiprocess_mode="mostrecent"
         )
     
     # Record the metric value
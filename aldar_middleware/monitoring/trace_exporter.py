@@ -0,0 +1,317 @@
+"""Background export of finished request traces.
+
+Requests never write traces themselves: a finished trace is handed to the
+exporter, which buffers it in memory and writes batches of
+``distributed_traces`` rows (plus the slow ``database_query_traces`` recorded
+during the request) with one multi-row INSERT per table on its own session.
+When enabled, the same batch is emitted as spans to the OpenTelemetry SDK
+configured for Application Insights.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+from aldar_middleware.database.base import async_session
+from aldar_middleware.models import (
+    DatabaseQueryTrace,
+    DistributedTrace,
+    TraceSampleType,
+    TraceStatusType,
+)
+from aldar_middleware.monitoring.prometheus import record_trace_export
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.batching import drain_batches, run_batch_worker
+
+# Slow queries kept per trace; the counters on the trace still include all of them
+MAX_QUERIES_PER_TRACE = 50
+
+
+@dataclass
+class QueryRecord:
+    """A slow database query observed while a trace was active."""
+
+    query_type: str
+    query_sql: str
+    start_time: datetime
+    duration_ms: float
+    rows: Optional[int] = None
+    caller: Optional[str] = None
+    slow_threshold_ms: Optional[int] = None
+    status: str = "success"
+    error_message: Optional[str] = None
+
+    def to_row(self, trace_pk: uuid.UUID, correlation_id: str) -> Dict[str, Any]:
+        """Column values for a ``database_query_traces`` row."""
+        caller_file = caller_function = caller_line = None
+        if self.caller and self.caller != "unknown":
+            parts = self.caller.rsplit(":", 2)
+            if len(parts) == 3:
+                caller_file, caller_function = parts[0][:255], parts[1][:255]
+                caller_line = int(parts[2]) if parts[2].isdigit() else None
+        returns_rows = self.query_type == "SELECT"
+        return {
+            "id": uuid.uuid4(),
+            "trace_id": trace_pk,
+            "correlation_id": correlation_id,
+            "query_sql": self.query_sql,
+            "query_type": self.query_type[:20],
+            "start_time": self.start_time,
+            "end_time": self.start_time + timedelta(milliseconds=self.duration_ms),
+            "duration_ms": int(self.duration_ms),
+            "rows_affected": None if returns_rows else self.rows,
+            "rows_returned": self.rows if returns_rows else None,
+            "slow_query": True,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "caller_file": caller_file,
+            "caller_function": caller_function,
+            "caller_line": caller_line,
+            "status": self.status,
+            "error_message": self.error_message,
+            "created_at": self.start_time,
+        }
+
+
+@dataclass
+class TraceRecord:
+    """In-memory state of one request trace, from start until it is exported."""
+
+    correlation_id: str
+    trace_id: str
+    span_id: str
+    request_method: str
+    request_path: str
+    start_time: datetime
+    sampled: bool
+    sample_type: TraceSampleType
+    request_endpoint: Optional[str] = None
+    user_id: Optional[str] = None
+    parent_span_id: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    end_time: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    status: TraceStatusType = TraceStatusType.PENDING
+    http_status_code: Optional[int] = None
+    error_type: Optional[str] = None
+    error_message: Optional[str] = None
+    agent_count: int = 0
+    total_agent_time_ms: int = 0
+    database_query_count: int = 0
+    total_query_time_ms: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    queries: List[QueryRecord] = field(default_factory=list)
+    retention: Optional[str] = None
+
+    def add_query(self, query: QueryRecord) -> None:
+        """Keep a slow query for export, up to MAX_QUERIES_PER_TRACE."""
+        if len(self.queries) < MAX_QUERIES_PER_TRACE:
+            self.queries.append(query)
+
+    def to_row(self) -> Dict[str, Any]:
+        """Column values for a ``distributed_traces`` row."""
+        metadata = dict(self.metadata)
+        if self.retention:
+            metadata["retention"] = self.retention
+        created_at = self.end_time or self.start_time
+        return {
+            "id": uuid.uuid4(),
+            "correlation_id": self.correlation_id[:36],
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "user_id": self.user_id,
+            "request_method": self.request_method[:10],
+            "request_path": self.request_path[:2048],
+            "request_endpoint": self.request_endpoint[:255] if self.request_endpoint else None,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "http_status_code": self.http_status_code,
+            "error_type": self.error_type[:255] if self.error_type else None,
+            "error_message": self.error_message,
+            "agent_count": self.agent_count,
+            "database_query_count": self.database_query_count,
+            "total_agent_time_ms": self.total_agent_time_ms,
+            "total_query_time_ms": int(self.total_query_time_ms),
+            "trace_metadata": metadata or None,
+            "sampled": True,
+            "sample_type": self.sample_type,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+class TraceExporter:
+    """Buffers finished traces and writes them in batches from one worker task."""
+
+    def __init__(self):
+        """Initialize the exporter."""
+        self.batch_size = max(1, settings.trace_export_batch_size)
+        self.flush_interval = settings.trace_export_flush_interval_ms / 1000
+        self.otlp_enabled = settings.trace_export_otlp_enabled and otel_trace is not None
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    def submit(self, record: TraceRecord) -> bool:
+        """Queue a finished trace without blocking the request.
+
+        Returns:
+            True if the trace was buffered, False if it was dropped because the
+            exporter is not running or the buffer is full
+        """
+        if self._queue is None:
+            record_trace_export({"dropped": 1})
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            record_trace_export({"dropped": 1})
+            logger.warning("Trace export buffer full; dropping trace")
+            return False
+        return True
+
+    async def _run_worker(self) -> None:
+        """Drain the queue in batches until cancelled."""
+        await run_batch_worker(
+            self._queue,
+            self._export_batch,
+            self.batch_size,
+            self.flush_interval,
+            on_error=lambda batch, e: logger.error(f"Trace export batch failed: {e}"),
+        )
+
+    async def _export_batch(self, batch: List[TraceRecord]) -> None:
+        """Write a batch to the database and, if enabled, to OpenTelemetry."""
+        outcomes = {"written": 0, "duplicate": 0, "failed": 0}
+        try:
+            written = await self._write_batch(batch)
+            outcomes["written"] = written
+            outcomes["duplicate"] = len(batch) - written
+        except Exception as e:
+            outcomes["failed"] = len(batch)
+            logger.error(f"Failed to write {len(batch)} traces: {e}")
+
+        if self.otlp_enabled:
+            try:
+                self._emit_otlp(batch)
+            except Exception as e:
+                logger.warning(f"Failed to emit traces to OpenTelemetry: {e}")
+
+        queue_depth = self._queue.qsize() if self._queue is not None else 0
+        record_trace_export(outcomes, batch_size=len(batch), queue_depth=queue_depth)
+
+    async def _write_batch(self, batch: List[TraceRecord]) -> int:
+        """Insert trace rows and their slow queries; returns the traces written.
+
+        A trace whose correlation or trace id already exists (for example a
+        client re-sending an ``X-Correlation-ID``) is skipped instead of
+        failing the whole batch.
+        """
+        rows = [record.to_row() for record in batch]
+        async with async_session() as db:
+            result = await db.execute(
+                pg_insert(DistributedTrace)
+                .values(rows)
+                .on_conflict_do_nothing()
+                .returning(DistributedTrace.id)
+            )
+            inserted = {row[0] for row in result}
+
+            query_rows = [
+                query.to_row(row["id"], row["correlation_id"])
+                for record, row in zip(batch, rows)
+                if row["id"] in inserted
+                for query in record.queries
+            ]
+            if query_rows:
+                await db.execute(insert(DatabaseQueryTrace), query_rows)
+            await db.commit()
+        return len(inserted)
+
+    def _emit_otlp(self, batch: List[TraceRecord]) -> None:
+        """Emit each trace as a server span with its original timing."""
+        tracer = otel_trace.get_tracer(__name__)
+        for record in batch:
+            end_time = record.end_time or record.start_time
+            span = tracer.start_span(
+                f"{record.request_method} {record.request_endpoint or record.request_path}",
+                kind=SpanKind.SERVER,
+                start_time=int(record.start_time.timestamp() * 1e9),
+                attributes={
+                    "http.method": record.request_method,
+                    "http.target": record.request_path,
+                    "http.status_code": record.http_status_code or 0,
+                    "aiq.correlation_id": record.correlation_id,
+                    "aiq.trace_id": record.trace_id,
+                    "aiq.retention": record.retention or "",
+                    "aiq.db.query_count": record.database_query_count,
+                    "aiq.db.query_time_ms": int(record.total_query_time_ms),
+                    "aiq.agent.count": record.agent_count,
+                },
+            )
+            if record.status in (TraceStatusType.ERROR, TraceStatusType.TIMEOUT):
+                span.set_status(Status(StatusCode.ERROR, record.error_message))
+            span.end(end_time=int(end_time.timestamp() * 1e9))
+
+    async def start(self) -> None:
+        """Start the background export worker."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.trace_export_queue_size)
+        self.task = asyncio.create_task(self._run_worker())
+        self.running = True
+        logger.info(
+            f"Trace exporter started (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s, otlp={self.otlp_enabled})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the worker, exporting any traces still buffered."""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        if self._queue is not None:
+            batches = drain_batches(self._queue, self.batch_size)
+            self._queue = None
+            for batch in batches:
+                await self._export_batch(batch)
+        logger.info("Trace exporter stopped")
+
+
+# Global instance
+_trace_exporter: Optional[TraceExporter] = None
+
+
+def get_trace_exporter() -> TraceExporter:
+    """Get or create the global trace exporter.
+
+    Returns:
+        TraceExporter instance
+    """
+    global _trace_exporter
+
+    if _trace_exporter is None:
+        _trace_exporter = TraceExporter()
+
+    return _trace_exporter
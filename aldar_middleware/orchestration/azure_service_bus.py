@@ -1,49 +1,137 @@
-"""Azure Service Bus service for message queuing."""
+"""Azure Service Bus service for message queuing.
+
+Sending never blocks the event loop: :meth:`AzureServiceBusService.send_message`
+queues the message and waits for a background flusher, which coalesces
+pending messages into broker batches once ``service_bus_batch_max_messages``
+or ``service_bus_batch_max_bytes`` is reached, or the oldest has waited
+``service_bus_batch_max_delay_ms``. Batches are sent one at a time, so
+messages reach the queue in the order they were sent.
+
+Receiving uses a long-lived, prefetching receiver. :meth:`consume` runs
+handlers concurrently and completes each message once its handler returns;
+messages whose handler fails are abandoned and redelivered (at-least-once).
+
+The transport is a :class:`ServiceBusBackend`; an
+:class:`InMemoryServiceBusBroker` can stand in for Azure.
+"""
 
-import json
 import asyncio
-from typing import Dict, Any, Optional, List
+import json
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
 
-from azure.servicebus import ServiceBusClient, ServiceBusMessage
 from loguru import logger
 
+from aldar_middleware.orchestration.service_bus_backends import (
+    AzureServiceBusBackend,
+    PartialSendError,
+    ReceivedMessage,
+    ServiceBusBackend,
+)
 from aldar_middleware.settings import settings
 
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class _PendingMessage:
+    body: bytes
+    enqueued_at: float
+    sent: asyncio.Future
+
 
 class AzureServiceBusService:
     """Azure Service Bus service for message queuing."""
-    
-    def __init__(self):
-        """Initialize Azure Service Bus service."""
+
+    def __init__(
+        self,
+        backend: Optional[ServiceBusBackend] = None,
+        queue_name: Optional[str] = None,
+        max_batch_messages: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        max_batch_delay_ms: Optional[float] = None,
+        prefetch_count: Optional[int] = None,
+    ):
+        """
+        Initialize Azure Service Bus service.
+
+        Args:
+            backend: Transport; defaults to Azure, created from the connection string on connect
+            queue_name: Queue to send to and receive from
+            max_batch_messages: Messages per batch before it is sent
+            max_batch_bytes: Message bytes per batch before it is sent
+            max_batch_delay_ms: How long the first message of a batch waits for more
+            prefetch_count: Messages the receiver fetches ahead
+        """
         self.connection_string = settings.service_bus_connection_string
-        self.queue_name = settings.service_bus_queue_name
-        self.client: Optional[ServiceBusClient] = None
-        
+        self.queue_name = queue_name or settings.service_bus_queue_name
+        self.max_batch_messages = max_batch_messages or settings.service_bus_batch_max_messages
+        self.max_batch_bytes = max_batch_bytes or settings.service_bus_batch_max_bytes
+        self.max_batch_delay = (
+            max_batch_delay_ms if max_batch_delay_ms is not None else settings.service_bus_batch_max_delay_ms
+        ) / 1000
+        self.prefetch_count = prefetch_count if prefetch_count is not None else settings.service_bus_prefetch_count
+        self.backend = backend
+        self._owns_backend = backend is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[_PendingMessage] = deque()
+        self._pending_bytes = 0
+        self._has_pending: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+
     async def connect(self) -> bool:
         """Connect to Azure Service Bus."""
+        self._bind_loop()
+        if self.backend is not None:
+            return True
         try:
             if not self.connection_string:
                 logger.warning("Azure Service Bus connection string not provided")
                 return False
-                
-            self.client = ServiceBusClient.from_connection_string(
-                conn_str=self.connection_string
-            )
+
+            self.backend = AzureServiceBusBackend(self.connection_string, prefetch_count=self.prefetch_count)
+            self._owns_backend = True
             logger.info("Connected to Azure Service Bus")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to connect to Azure Service Bus: {e}")
             return False
-    
+
+    def _bind_loop(self) -> None:
+        """Start over on a new event loop (Celery tasks run each call on a fresh one)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            if self._pending:
+                logger.warning(f"Dropping {len(self._pending)} Service Bus messages queued on a closed event loop")
+            if self._owns_backend:
+                self.backend = None
+        self._loop = loop
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._flusher = None
+
+    def _is_full(self) -> bool:
+        return len(self._pending) >= self.max_batch_messages or self._pending_bytes >= self.max_batch_bytes
+
     async def send_message(self, message_body: Dict[str, Any], message_type: str = "default") -> bool:
-        """Send message to Azure Service Bus queue."""
+        """Send message to Azure Service Bus queue.
+
+        Returns once the batch holding the message was sent (True) or failed (False).
+        """
         try:
-            if not self.client:
-                if not await self.connect():
-                    return False
-            
+            if not await self.connect():
+                return False
+
             # Create message
             message_data = {
                 "type": message_type,
@@ -51,83 +139,202 @@ class AzureServiceBusService:
                 "timestamp": datetime.utcnow().isoformat(),
                 "source": "aldar-middleware"
             }
-            
-            message = ServiceBusMessage(
-                body=json.dumps(message_data).encode('utf-8'),
-                content_type="application/json"
-            )
-            
-            # Send message
-            sender = self.client.get_queue_sender(queue_name=self.queue_name)
-            sender.send_messages(message)
-            logger.info(f"Message sent to Azure Service Bus: {message_type}")
-            return True
-                    
+            body = json.dumps(message_data).encode('utf-8')
+
+            pending = _PendingMessage(body, self._loop.time(), self._loop.create_future())
+            self._pending.append(pending)
+            self._pending_bytes += len(body)
+            self._has_pending.set()
+            if self._is_full():
+                self._batch_full.set()
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.create_task(self._flush_loop())
+
+            return await asyncio.shield(pending.sent)
+
         except Exception as e:
             logger.error(f"Failed to send message to Azure Service Bus: {e}")
             return False
-    
+
+    async def _flush_loop(self) -> None:
+        while True:
+            if not self._pending:
+                self._has_pending.clear()
+                await self._has_pending.wait()
+            wait = self._pending[0].enqueued_at + self.max_batch_delay - self._loop.time()
+            if wait > 0 and not self._is_full():
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            await self._send_batch()
+
+    async def _send_batch(self) -> None:
+        # One batch at a time keeps the queue in send order
+        async with self._send_lock:
+            await self._send_next_batch()
+
+    async def _send_next_batch(self) -> None:
+        batch: List[_PendingMessage] = []
+        size = 0
+        while self._pending and len(batch) < self.max_batch_messages:
+            body = self._pending[0].body
+            if batch and size + len(body) > self.max_batch_bytes:
+                break
+            batch.append(self._pending.popleft())
+            size += len(body)
+        self._pending_bytes -= size
+        if not batch:
+            return
+
+        try:
+            await self.backend.send(self.queue_name, [pending.body for pending in batch])
+            logger.debug(f"Sent {len(batch)} messages ({size} bytes) to Azure Service Bus")
+            sent_count = len(batch)
+        except PartialSendError as e:
+            logger.error(f"Failed to send {len(batch) - e.sent_count} of {len(batch)} messages to Azure Service Bus: {e}")
+            sent_count = e.sent_count
+        except Exception as e:
+            logger.error(f"Failed to send {len(batch)} messages to Azure Service Bus: {e}")
+            sent_count = 0
+        # The backend sends in order, so the leading messages are the ones that went out
+        for index, pending in enumerate(batch):
+            if not pending.sent.done():
+                pending.sent.set_result(index < sent_count)
+
+    async def flush(self) -> None:
+        """Send everything queued so far, without waiting for the batch delay."""
+        while self._pending and self._loop is asyncio.get_running_loop():
+            await self._send_batch()
+
     async def receive_messages(self, max_messages: int = 10) -> List[Dict[str, Any]]:
         """Receive messages from Azure Service Bus queue."""
         try:
-            if not self.client:
-                if not await self.connect():
-                    return []
-            
-            messages = []
-            receiver = self.client.get_queue_receiver(queue_name=self.queue_name)
-            received_msgs = receiver.receive_messages(max_message_count=max_messages, max_wait_time=5)
-            
-            for msg in received_msgs:
-                try:
-                    message_data = json.loads(str(msg))
-                    messages.append(message_data)
-                    
-                    # Complete the message
-                    receiver.complete_message(msg)
-                    logger.info(f"Message processed: {message_data.get('type', 'unknown')}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process message: {e}")
-                    # Dead letter the message
-                    receiver.dead_letter_message(msg, reason="Processing failed")
-            
-            return messages
-            
+            if not await self.connect():
+                return []
+
+            received = await self.backend.receive(self.queue_name, max_messages, max_wait_time=5)
+            settled = await asyncio.gather(*(self._settle(message) for message in received))
+            return [message_data for message_data in settled if message_data is not None]
+
         except Exception as e:
             logger.error(f"Failed to receive messages from Azure Service Bus: {e}")
             return []
-    
+
+    async def _settle(self, message: ReceivedMessage, handler: Optional[MessageHandler] = None) -> Optional[Dict[str, Any]]:
+        """Decode, handle and complete one message; returns its data if it was completed."""
+        try:
+            message_data = json.loads(message.body)
+        except Exception as e:
+            logger.error(f"Failed to decode message {message.message_id}: {e}")
+            await self.backend.dead_letter(message, reason="Processing failed")
+            return None
+
+        if handler is not None:
+            try:
+                await handler(message_data)
+            except Exception as e:
+                # Redelivered until the queue's max delivery count dead-letters it
+                logger.error(
+                    f"Failed to process message {message.message_id} "
+                    f"(delivery {message.delivery_count}): {e}"
+                )
+                await self.backend.abandon(message)
+                return None
+
+        await self.backend.complete(message)
+        return message_data
+
+    async def consume(
+        self,
+        handler: MessageHandler,
+        concurrency: Optional[int] = None,
+        stop: Optional[asyncio.Event] = None,
+        max_wait_time: float = 5,
+    ) -> None:
+        """Handle messages until ``stop`` is set.
+
+        Up to ``concurrency`` handlers run at once; receiving continues while
+        they run, and each message is completed as soon as its handler
+        returns and the receiver is free (the Azure backend does not overlap
+        a receive call with settling). A message is completed only after its handler succeeded, so
+        a crash redelivers it (at-least-once); handlers must be idempotent.
+
+        Args:
+            handler: Called with each decoded message
+            concurrency: Handlers running at once
+            stop: Set to stop receiving; handlers in flight are awaited
+            max_wait_time: Seconds each receive call waits for messages
+        """
+        if not await self.connect():
+            return
+        concurrency = concurrency or settings.service_bus_consumer_concurrency
+        stop = stop or asyncio.Event()
+        slots = asyncio.Semaphore(concurrency)
+        in_flight = set()
+
+        async def process(message: ReceivedMessage) -> None:
+            try:
+                await self._settle(message, handler)
+            except Exception as e:
+                logger.error(f"Failed to settle message {message.message_id}: {e}")
+            finally:
+                slots.release()
+
+        try:
+            while not stop.is_set():
+                await slots.acquire()
+                # Receive as many messages as there are free handler slots
+                free = 1
+                while free < concurrency and not slots.locked():
+                    await slots.acquire()
+                    free += 1
+                try:
+                    received = await self.backend.receive(self.queue_name, free, max_wait_time)
+                except Exception as e:
+                    logger.error(f"Failed to receive messages from Azure Service Bus: {e}")
+                    received = []
+                    await asyncio.sleep(1)
+                for _ in range(free - len(received)):
+                    slots.release()
+                for message in received:
+                    task = asyncio.create_task(process(message))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+        finally:
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
     async def get_queue_properties(self) -> Optional[Dict[str, Any]]:
         """Get Azure Service Bus queue properties."""
         try:
-            if not self.client:
-                if not await self.connect():
-                    return None
-            
-            async with self.client:
-                # This would require additional Azure Service Bus management operations
-                # For now, return basic info
-                return {
-                    "queue_name": self.queue_name,
-                    "connected": True,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
+            if not await self.connect():
+                return None
+
+            # This would require additional Azure Service Bus management operations
+            # For now, return basic info
+            return {
+                "queue_name": self.queue_name,
+                "connected": True,
+                "pending_messages": len(self._pending),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+
         except Exception as e:
             logger.error(f"Failed to get queue properties: {e}")
             return None
-    
+
     async def health_check(self) -> Dict[str, Any]:
         """Perform health check on Azure Service Bus."""
         try:
-            if not self.connection_string:
+            if not self.connection_string and self.backend is None:
                 return {
                     "status": "error",
                     "message": "Azure Service Bus connection string not configured",
                     "timestamp": datetime.utcnow().isoformat()
                 }
-            
+
             if await self.connect():
                 return {
                     "status": "healthy",
@@ -142,7 +349,7 @@ class AzureServiceBusService:
                     "message": "Failed to connect to Azure Service Bus",
                     "timestamp": datetime.utcnow().isoformat()
                 }
-                
+
         except Exception as e:
             logger.error(f"Azure Service Bus health check failed: {e}")
             return {
@@ -151,12 +358,18 @@ class AzureServiceBusService:
                 "message": str(e),
                 "timestamp": datetime.utcnow().isoformat()
             }
-    
+
     async def close(self):
-        """Close Azure Service Bus connection."""
-        if self.client:
-            self.client.close()
-            self.client = None
+        """Send queued messages and close the Azure Service Bus connection."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self.backend is not None and self._owns_backend:
+            await self.backend.close()
+            self.backend = None
             logger.info("Azure Service Bus connection closed")
 
 
@@ -0,0 +1,263 @@
+"""Transports behind the Service Bus facade (see azure_service_bus.py).
+
+:class:`AzureServiceBusBackend` talks to Azure Service Bus with the native
+async SDK and keeps one sender and one prefetching receiver per queue for the
+life of the backend. :class:`InMemoryServiceBusBroker` implements the same
+peek-lock semantics in process, for tests and local runs without a
+namespace.
+"""
+
+import asyncio
+import bisect
+import itertools
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from azure.servicebus import ServiceBusMessage
+from azure.servicebus.aio import ServiceBusClient, ServiceBusReceiver, ServiceBusSender
+from azure.servicebus.exceptions import MessageSizeExceededError
+
+
+class PartialSendError(Exception):
+    """Raised by ``send`` when messages of earlier broker batches were sent before the error."""
+
+    def __init__(self, sent_count: int, error: Exception):
+        """
+        Initialize the error.
+
+        Args:
+            sent_count: Leading messages that were sent
+            error: Why the rest were not
+        """
+        super().__init__(f"Sent {sent_count} messages before failing: {error}")
+        self.sent_count = sent_count
+
+
+@dataclass
+class ReceivedMessage:
+    """A locked message; settle it with the backend that received it."""
+
+    body: bytes
+    delivery_count: int
+    message_id: Optional[str] = None
+    handle: Any = field(default=None, repr=False)  # Backend's own message object
+
+
+class ServiceBusBackend(ABC):
+    """Sends, receives and settles messages of a Service Bus namespace."""
+
+    @abstractmethod
+    async def send(self, queue_name: str, bodies: Sequence[bytes]) -> None:
+        """Send messages in order, in as few broker batches as their size allows.
+
+        Raises if any message could not be sent: :class:`PartialSendError`
+        when messages of earlier broker batches were sent already, the
+        underlying error when none were.
+        """
+
+    @abstractmethod
+    async def receive(self, queue_name: str, max_messages: int, max_wait_time: float) -> List[ReceivedMessage]:
+        """Receive and lock up to ``max_messages``, waiting at most ``max_wait_time`` seconds for the first."""
+
+    @abstractmethod
+    async def complete(self, message: ReceivedMessage) -> None:
+        """Remove a processed message from the queue."""
+
+    @abstractmethod
+    async def abandon(self, message: ReceivedMessage) -> None:
+        """Release the lock so the message is delivered again."""
+
+    @abstractmethod
+    async def dead_letter(self, message: ReceivedMessage, reason: str) -> None:
+        """Move a message that can never be processed to the dead-letter queue."""
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class AzureServiceBusBackend(ServiceBusBackend):
+    """Azure Service Bus through ``azure.servicebus.aio``.
+
+    A receiver is not safe to use from concurrent coroutines, so receiving
+    and settling on it are serialized by a lock per queue.
+    """
+
+    def __init__(self, connection_string: str, prefetch_count: int = 0):
+        """
+        Initialize the backend; links are opened on first use.
+
+        Args:
+            connection_string: Service Bus namespace connection string
+            prefetch_count: Messages each receiver fetches ahead of receive calls
+        """
+        self._client = ServiceBusClient.from_connection_string(conn_str=connection_string)
+        self.prefetch_count = prefetch_count
+        self._senders: Dict[str, ServiceBusSender] = {}
+        self._receivers: Dict[str, ServiceBusReceiver] = {}
+        self._receiver_locks: Dict[str, asyncio.Lock] = {}
+
+    def _sender(self, queue_name: str) -> ServiceBusSender:
+        sender = self._senders.get(queue_name)
+        if sender is None:
+            sender = self._senders[queue_name] = self._client.get_queue_sender(queue_name=queue_name)
+        return sender
+
+    def _receiver(self, queue_name: str) -> ServiceBusReceiver:
+        receiver = self._receivers.get(queue_name)
+        if receiver is None:
+            receiver = self._receivers[queue_name] = self._client.get_queue_receiver(
+                queue_name=queue_name, prefetch_count=self.prefetch_count
+            )
+            self._receiver_locks[queue_name] = asyncio.Lock()
+        return receiver
+
+    async def send(self, queue_name: str, bodies: Sequence[bytes]) -> None:
+        sender = self._sender(queue_name)
+        sent_count = 0
+        try:
+            batch = await sender.create_message_batch()
+            for body in bodies:
+                message = ServiceBusMessage(body=body, content_type="application/json")
+                try:
+                    batch.add_message(message)
+                except MessageSizeExceededError:
+                    if not len(batch):
+                        raise  # A single message over the broker's limit
+                    await sender.send_messages(batch)
+                    sent_count += len(batch)
+                    batch = await sender.create_message_batch()
+                    batch.add_message(message)
+            if len(batch):
+                await sender.send_messages(batch)
+        except Exception as e:
+            if sent_count:
+                raise PartialSendError(sent_count, e) from e
+            raise
+
+    async def receive(self, queue_name: str, max_messages: int, max_wait_time: float) -> List[ReceivedMessage]:
+        receiver = self._receiver(queue_name)
+        lock = self._receiver_locks[queue_name]
+        async with lock:
+            messages = await receiver.receive_messages(max_message_count=max_messages, max_wait_time=max_wait_time)
+        return [
+            ReceivedMessage(
+                body=b"".join(message.body),
+                delivery_count=message.delivery_count or 0,
+                message_id=message.message_id,
+                handle=(receiver, lock, message),
+            )
+            for message in messages
+        ]
+
+    async def complete(self, message: ReceivedMessage) -> None:
+        receiver, lock, raw = message.handle
+        async with lock:
+            await receiver.complete_message(raw)
+
+    async def abandon(self, message: ReceivedMessage) -> None:
+        receiver, lock, raw = message.handle
+        async with lock:
+            await receiver.abandon_message(raw)
+
+    async def dead_letter(self, message: ReceivedMessage, reason: str) -> None:
+        receiver, lock, raw = message.handle
+        async with lock:
+            await receiver.dead_letter_message(raw, reason=reason)
+
+    async def close(self) -> None:
+        for link in [*self._senders.values(), *self._receivers.values()]:
+            await link.close()
+        self._senders.clear()
+        self._receivers.clear()
+        self._receiver_locks.clear()
+        await self._client.close()
+
+
+@dataclass(order=True)
+class _StoredMessage:
+    sequence_number: int
+    body: bytes = field(compare=False)
+    delivery_count: int = field(default=0, compare=False)
+
+
+class InMemoryServiceBusBroker(ServiceBusBackend):
+    """In-process queues with Service Bus peek-lock semantics.
+
+    Messages are delivered in send order; abandoned messages return to their
+    place in the queue and are dead-lettered after ``max_delivery_count``
+    deliveries, as Service Bus does.
+    """
+
+    def __init__(self, send_latency: float = 0.0, max_delivery_count: int = 10):
+        """
+        Initialize the broker.
+
+        Args:
+            send_latency: Seconds each send call takes, standing in for the network round trip
+            max_delivery_count: Deliveries before an abandoned message is dead-lettered
+        """
+        self.send_latency = send_latency
+        self.max_delivery_count = max_delivery_count
+        self.queues: Dict[str, List[_StoredMessage]] = defaultdict(list)
+        self.dead_letters: Dict[str, List[bytes]] = defaultdict(list)
+        self.sent_batches: List[int] = []  # Messages per send call
+        self._locked: Dict[int, _StoredMessage] = {}
+        self._lock_queues: Dict[int, str] = {}
+        self._sequence = itertools.count(1)
+        self._available: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+
+    async def send(self, queue_name: str, bodies: Sequence[bytes]) -> None:
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        queue = self.queues[queue_name]
+        for body in bodies:
+            queue.append(_StoredMessage(next(self._sequence), bytes(body)))
+        self.sent_batches.append(len(bodies))
+        self._available[queue_name].set()
+
+    async def receive(self, queue_name: str, max_messages: int, max_wait_time: float) -> List[ReceivedMessage]:
+        queue = self.queues[queue_name]
+        if not queue:
+            available = self._available[queue_name]
+            available.clear()
+            try:
+                await asyncio.wait_for(available.wait(), max_wait_time)
+            except asyncio.TimeoutError:
+                return []
+        taken, queue[:max_messages] = queue[:max_messages], []
+        received = []
+        for stored in taken:
+            stored.delivery_count += 1
+            self._locked[stored.sequence_number] = stored
+            self._lock_queues[stored.sequence_number] = queue_name
+            received.append(
+                ReceivedMessage(stored.body, stored.delivery_count, str(stored.sequence_number), stored.sequence_number)
+            )
+        return received
+
+    def _unlock(self, message: ReceivedMessage) -> tuple:
+        if message.handle not in self._locked:
+            raise ValueError(f"Message {message.message_id} is not locked (already settled?)")
+        return self._locked.pop(message.handle), self._lock_queues.pop(message.handle)
+
+    async def complete(self, message: ReceivedMessage) -> None:
+        self._unlock(message)
+
+    async def abandon(self, message: ReceivedMessage) -> None:
+        stored, queue_name = self._unlock(message)
+        if stored.delivery_count >= self.max_delivery_count:
+            self.dead_letters[queue_name].append(stored.body)
+            return
+        bisect.insort(self.queues[queue_name], stored)
+        self._available[queue_name].set()
+
+    async def dead_letter(self, message: ReceivedMessage, reason: str) -> None:
+        stored, queue_name = self._unlock(message)
+        self.dead_letters[queue_name].append(stored.body)
+
+    @property
+    def locked_count(self) -> int:
+        """Messages received but not settled yet."""
+        return len(self._locked)
@@ -51,6 +51,10 @@ celery_app.conf.update(
             'task': 'check_agent_health_periodic',
             'schedule': settings.agent_health_check_interval_minutes * 60.0,  # Configurable interval (in seconds)
         },
+        'refresh-analytics-rollups-periodic': {
+            'task': 'refresh_analytics_rollups_periodic',
+            'schedule': settings.analytics_rollup_interval_minutes * 60.0,
+        },
     },
 )
 
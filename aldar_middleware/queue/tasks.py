@@ -20,6 +20,7 @@ from aldar_middleware.database.base import async_session, engine
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, update, and_, or_
 from aldar_middleware.models.menu import Agent
+from aldar_middleware.services.analytics_rollup import AnalyticsRollupService
 
 
 # Create a separate session factory for Celery tasks to avoid connection issues
@@ -230,6 +231,8 @@ def send_azure_service_bus_message(self, message_body: Dict[str, Any], message_t
         result = loop.run_until_complete(
             azure_service_bus.send_message(message_body, message_type)
         )
+        # The sender belongs to this loop; close it before the loop goes away
+        loop.run_until_complete(azure_service_bus.close())
         
         loop.close()
         
@@ -263,6 +266,7 @@ def health_check_azure_service_bus(self) -> Dict[str, Any]:
         result = loop.run_until_complete(
             azure_service_bus.health_check()
         )
+        loop.run_until_complete(azure_service_bus.close())
         
         loop.close()
         
@@ -463,6 +467,59 @@ def check_agent_health_periodic(self) -> Dict[str, Any]:
         raise
 
 
+@celery_app.task(bind=True, name="refresh_analytics_rollups_periodic")
+def refresh_analytics_rollups_periodic(self, full: bool = False) -> Dict[str, Any]:
+    """
+    Periodic task refreshing the daily agent usage and feedback rollups.
+    Recomputes only the days after each rollup's watermark (plus a short lookback);
+    pass full=True to rebuild from the first source row, e.g. after a backfill.
+    """
+    try:
+        return _run_async_safely(_refresh_analytics_rollups(full=full))
+    except Exception as e:
+        logger.error(f"Error refreshing analytics rollups: {e}", exc_info=True)
+        raise
+
+
+async def _refresh_analytics_rollups(full: bool = False) -> Dict[str, Any]:
+    """Refresh analytics rollups on a fresh session."""
+    db = get_celery_session()
+    try:
+        return await AnalyticsRollupService(db).refresh(full=full)
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+@celery_app.task(bind=True, name="enrich_user_login", ignore_result=True)
+def enrich_user_login(self, user_id: str) -> Dict[str, Any]:
+    """
+    Sync a user's profile photo and AD groups after login.
+    Queued by the Azure AD callback; the Graph token comes from the user's stored refresh token.
+    """
+    try:
+        return _run_async_safely(_enrich_user_login(user_id))
+    except Exception as e:
+        logger.error(f"Error enriching login for user {user_id}: {e}", exc_info=True)
+        raise
+
+
+async def _enrich_user_login(user_id: str) -> Dict[str, Any]:
+    """Run login enrichment on a fresh session."""
+    from aldar_middleware.services.login_enrichment import LoginEnrichmentService
+
+    db = get_celery_session()
+    try:
+        return await LoginEnrichmentService(db).enrich(user_id)
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
 async def _check_agent_health(agent: Agent) -> tuple[str, Optional[datetime]]:
     """
     Check health of a single agent by calling mcp_server_link and agent_health_url.
@@ -1,27 +1,24 @@
 """Admin-only agent management API routes."""
 
-import csv
-import io
 import json
 import logging
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Sequence
 from uuid import UUID
 from datetime import datetime, timezone
 import httpx
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Body, Request
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func, delete, asc, desc, nullslast, text
 
-from aldar_middleware.database.base import get_db
+from aldar_middleware.database.base import get_db, get_read_db
 from aldar_middleware.models.user import User
 from aldar_middleware.models.menu import Agent
 from aldar_middleware.models.agent_tags import AgentTag
 from aldar_middleware.models.agent_configuration import AgentConfiguration
 from aldar_middleware.models.attachment import Attachment
-from aldar_middleware.models.token_usage import TokenUsage
 from aldar_middleware.models.sessions import Session
 from aldar_middleware.auth.dependencies import get_current_admin_user
 from aldar_middleware.schemas.admin_agents import (
@@ -49,8 +46,10 @@ from aldar_middleware.schemas.admin_agents import (
 from aldar_middleware.schemas.feedback import PaginatedResponse
 from aldar_middleware.settings import settings
 from aldar_middleware.services.postgres_logs_service import postgres_logs_service
+from aldar_middleware.services.analytics_rollup import AnalyticsRollupService
 from aldar_middleware.settings.context import get_correlation_id
 from aldar_middleware.utils.agent_utils import set_agent_type
+from aldar_middleware.utils.csv_export import CSVExport, csv_export_response
 from aldar_middleware.services.agent_available_cache import get_agent_available_cache
 
 logger = logging.getLogger(__name__)
@@ -97,6 +96,29 @@ async def _resolve_attachment_id_to_url(db: AsyncSession, attachment_id: str) ->
         return None
 
 
+async def _resolve_attachment_ids_to_urls(db: AsyncSession, attachment_ids: Iterable[str]) -> Dict[str, str]:
+    """Resolve many attachment IDs to blob URLs with one query; unresolved IDs are omitted."""
+    uuids = {}
+    for attachment_id in attachment_ids:
+        try:
+            uuids[UUID(attachment_id)] = attachment_id
+        except ValueError:
+            logger.warning(f"Invalid UUID format: {attachment_id}")
+    if not uuids:
+        return {}
+    try:
+        result = await db.execute(
+            select(Attachment.id, Attachment.blob_url).where(
+                Attachment.id.in_(list(uuids)),
+                Attachment.is_active == True
+            )
+        )
+        return {uuids[row.id]: row.blob_url for row in result.all() if row.blob_url}
+    except Exception as e:
+        logger.error(f"Failed to resolve attachment IDs: {str(e)}")
+        return {}
+
+
 async def _get_agent_categories(db: AsyncSession, agent_id: int) -> list[str]:
     """Get categories for an agent."""
     try:
@@ -1671,7 +1693,7 @@ async def get_agent_analytics(
     page: int = Query(1, ge=1, description="Page number (1-indexed, default: 1)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records per page (default: 100, max: 1000)"),
     current_user: User = Depends(get_current_admin_user),  # Admin-only access enforced here
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> AgentAnalyticsResponse:
     """
     Get agent analytics with utilisation status heatmap (Admin Only).
@@ -1680,6 +1702,7 @@ async def get_agent_analytics(
     
     Returns a paginated list of agents with their status (enabled/disabled), type (user/enterprise), and usage statistics.
     Usage is calculated by counting how many times each agent_id appears in the agent_usage_metrics table.
+    Whole days before the rollup watermark are read from the agent_usage_daily rollup (refreshed by Celery Beat).
     
     **Usage Calculation:**
     - Counts total occurrences of each agent_id in agent_usage_metrics table
@@ -1776,28 +1799,11 @@ async def get_agent_analytics(
         if hide_super_agent:
             agents = [agent for agent in agents if agent.name != "Super Agent"]
         
-        # Get usage counts from agent_usage_metrics table
-        # Count how many times each agent_id appears in the table
+        # Get usage counts (rows in agent_usage_metrics) and last use per agent.
+        # Whole days come from the agent_usage_daily rollup, the rest live.
         # Note: Historical data should be migrated using the migration script:
-        # scripts/migrate_historical_usage_to_metrics.py
-        usage_filters = []
-        if date_from:
-            usage_filters.append(TokenUsage.created_at >= date_from)
-        if date_to:
-            usage_filters.append(TokenUsage.created_at <= date_to)
-            
-        # Query to count occurrences of each agent_id and get last used timestamp
-        usage_query = select(
-            TokenUsage.agent_id,
-            func.count(TokenUsage.id).label("usage_count"),
-            func.max(TokenUsage.created_at).label("last_used")
-        ).group_by(TokenUsage.agent_id)
-        
-        if usage_filters:
-            usage_query = usage_query.where(and_(*usage_filters))
-        
-        usage_result = await db.execute(usage_query)
-        usage_data = {row.agent_id: {"count": row.usage_count or 0, "last_used": row.last_used} for row in usage_result.all()}
+        # scripts/migrate_historical_usage_to_metrics.py (then run a full rollup refresh)
+        usage_data = await AnalyticsRollupService(db).get_agent_usage(date_from, date_to)
         
         # Calculate total usage across ALL agents (ignoring agent_name and type filters)
         # This ensures total_usage always reflects the complete database usage
@@ -1834,6 +1840,10 @@ async def get_agent_analytics(
         # Check if date filters are applied
         has_date_filter = date_from is not None or date_to is not None
         
+        icon_urls = await _resolve_attachment_ids_to_urls(
+            db, {agent.icon for agent in agents if agent.icon and _is_uuid(agent.icon)}
+        )
+        
         for agent in agents:
             agent_usage_info = usage_data.get(agent.id, {"count": 0, "last_used": None})
             agent_usage = agent_usage_info["count"]
@@ -1848,11 +1858,7 @@ async def get_agent_analytics(
             usage_counts.append(agent_usage)  # Track usage for max/min
             
             # Resolve icon if it's a UUID to get the blob URL
-            agent_icon = agent.icon
-            if agent_icon and _is_uuid(agent_icon):
-                resolved_icon = await _resolve_attachment_id_to_url(db, agent_icon)
-                if resolved_icon:
-                    agent_icon = resolved_icon
+            agent_icon = icon_urls.get(agent.icon, agent.icon)
             
             # Determine agent type
             is_user_agent = False
@@ -1992,13 +1998,13 @@ async def get_agent_monitoring(
         active_count = 0
         inactive_count = 0
         
+        icon_urls = await _resolve_attachment_ids_to_urls(
+            db, {agent.icon for agent in agents if agent.icon and _is_uuid(agent.icon)}
+        )
+        
         for agent in agents:
             # Resolve icon if it's a UUID to get the blob URL
-            agent_icon = agent.icon
-            if agent_icon and _is_uuid(agent_icon):
-                resolved_icon = await _resolve_attachment_id_to_url(db, agent_icon)
-                if resolved_icon:
-                    agent_icon = resolved_icon
+            agent_icon = icon_urls.get(agent.icon, agent.icon)
             
             # Special handling for Super Agent: always healthy and active if enabled and no MCP URL
             is_super_agent = agent.name == "Super Agent" and (not agent.mcp_url or agent.mcp_url.strip() == "")
@@ -2500,8 +2506,146 @@ async def list_agents(
         )
 
 
+AGENT_CSV_FIELDS = [
+    "agent_id",
+    "public_id",
+    "agent_name",
+    "agent_intro",
+    "description",
+    "agent_icon",
+    "mcp_server_link",
+    "agent_health_url",
+    "model_name",
+    "model_provider",
+    "categories",
+    "agent_enabled",
+    "is_deleted",
+    "is_healthy",
+    "health_status",
+    "last_health_check",
+    "instruction",
+    "include_in_teams",
+    "custom_feature_toggle",
+    "custom_feature_dropdown",
+    "custom_feature_text",
+    "tools",
+    "knowledge_sources",
+    "created_at",
+    "updated_at",
+    "last_used",
+]
+
+
+async def _agent_csv_rows(db: AsyncSession, agents: Sequence[Agent]) -> list[dict]:
+    """Render a batch of agents as CSV rows.
+
+    Categories, custom features and tools are loaded for the whole batch
+    with one query each, with the same fallbacks as the per-agent helpers.
+    """
+    from aldar_middleware.models.agent_tools import AgentTool
+
+    agent_ids = [agent.id for agent in agents]
+
+    tags: Dict[int, list[str]] = {agent_id: [] for agent_id in agent_ids}
+    tags_result = await db.execute(
+        select(AgentTag.agent_id, AgentTag.tag).where(
+            and_(
+                AgentTag.agent_id.in_(agent_ids),
+                AgentTag.tag_type == "category",
+                AgentTag.is_active == True
+            )
+        )
+    )
+    for agent_id, tag in tags_result.all():
+        tags[agent_id].append(tag)
+
+    feature_keys = {
+        "custom_feature_toggle": "toggle",
+        "custom_feature_dropdown": "dropdown",
+        "custom_feature_text": "text",
+    }
+    features: Dict[int, dict] = {agent_id: {} for agent_id in agent_ids}
+    configs_result = await db.execute(
+        select(AgentConfiguration).where(
+            AgentConfiguration.agent_id.in_(agent_ids),
+            AgentConfiguration.configuration_name.in_(list(feature_keys)),
+        )
+    )
+    for config in configs_result.scalars().all():
+        features[config.agent_id][feature_keys[config.configuration_name]] = config.values
+
+    tools: Dict[int, list[dict]] = {agent_id: [] for agent_id in agent_ids}
+    tools_result = await db.execute(
+        select(AgentTool)
+        .where(AgentTool.agent_id.in_(agent_ids))
+        .order_by(AgentTool.agent_id, AgentTool.tool_order)
+    )
+    for tool in tools_result.scalars().all():
+        tools[tool.agent_id].append({
+            "tool_name": tool.tool_name,
+            "tool_description": tool.tool_description,
+            "tool_url": tool.tool_url,
+            "tool_is_active": tool.tool_is_active,
+        })
+
+    rows = []
+    for agent in agents:
+        # Fall back to legacy_tags, then the legacy category field
+        categories = tags[agent.id]
+        if not categories:
+            if agent.legacy_tags and isinstance(agent.legacy_tags, list):
+                categories = agent.legacy_tags
+            elif agent.category:
+                categories = [agent.category]
+        categories_str = ", ".join(categories) if categories else ""
+
+        # Instruction is now stored directly in agents table
+        instruction = agent.instruction
+
+        agent_features = features[agent.id]
+        toggle_str = json.dumps(agent_features["toggle"]) if agent_features.get("toggle") else ""
+        dropdown_str = json.dumps(agent_features["dropdown"]) if agent_features.get("dropdown") else ""
+        text_str = json.dumps(agent_features["text"]) if agent_features.get("text") else ""
+
+        tools_str = json.dumps(tools[agent.id]) if tools[agent.id] else ""
+
+        # Format knowledge sources
+        knowledge_sources_str = json.dumps(agent.knowledge_sources) if agent.knowledge_sources else ""
+
+        rows.append({
+            "agent_id": str(agent.id),
+            "public_id": str(agent.public_id),
+            "agent_name": agent.name or "",
+            "agent_intro": (agent.intro or "").replace("\n", " ").replace("\r", ""),
+            "description": (agent.description or "").replace("\n", " ").replace("\r", ""),
+            "agent_icon": agent.icon or "",
+            "mcp_server_link": agent.mcp_url or "",
+            "agent_health_url": agent.health_url or "",
+            "model_name": agent.model_name or "",
+            "model_provider": agent.model_provider or "",
+            "categories": categories_str,
+            "agent_enabled": agent.is_enabled,
+            "is_deleted": agent.is_deleted,
+            "is_healthy": agent.is_healthy,
+            "health_status": agent.health_status or "",
+            "last_health_check": agent.last_health_check.isoformat() if agent.last_health_check else "",
+            "instruction": (instruction or "").replace("\n", " ").replace("\r", ""),
+            "include_in_teams": agent.include_in_teams,
+            "custom_feature_toggle": toggle_str,
+            "custom_feature_dropdown": dropdown_str,
+            "custom_feature_text": text_str,
+            "tools": tools_str,
+            "knowledge_sources": knowledge_sources_str,
+            "created_at": agent.created_at.isoformat() if agent.created_at else "",
+            "updated_at": agent.updated_at.isoformat() if agent.updated_at else "",
+            "last_used": agent.last_used.isoformat() if agent.last_used else "",
+        })
+    return rows
+
+
 @router.get("/export/csv")
 async def export_agents_csv(
+    request: Request,
     enabled: Optional[bool] = Query(None, description="Filter by enabled status"),
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search in agent name, intro, description"),
@@ -2509,7 +2653,7 @@ async def export_agents_csv(
     date_to: Optional[datetime] = Query(None, description="Filter agents created to this date (ISO format)"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
-) -> Response:
+) -> StreamingResponse:
     """Export agents data as CSV (admin only).
     
     This endpoint exports ALL agents including soft-deleted ones.
@@ -2560,124 +2704,86 @@ async def export_agents_csv(
                     date_to = date_to.astimezone(timezone.utc).replace(tzinfo=None)
                 query = query.where(Agent.last_used <= date_to)
         
-        # Get all agents (no pagination for export)
-        result = await db.execute(query.order_by(desc(Agent.created_at)))
-        agents = result.scalars().all()
-        
-        # Create CSV
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=[
-                "agent_id",
-                "public_id",
-                "agent_name",
-                "agent_intro",
-                "description",
-                "agent_icon",
-                "mcp_server_link",
-                "agent_health_url",
-                "model_name",
-                "model_provider",
-                "categories",
-                "agent_enabled",
-                "is_deleted",
-                "is_healthy",
-                "health_status",
-                "last_health_check",
-                "instruction",
-                "include_in_teams",
-                "custom_feature_toggle",
-                "custom_feature_dropdown",
-                "custom_feature_text",
-                "tools",
-                "knowledge_sources",
-                "created_at",
-                "updated_at",
-                "last_used",
-            ],
-        )
-        
-        csv_writer.writeheader()
-        for agent in agents:
-            # Get categories
-            categories = await _get_agent_categories(db, agent.id)
-            categories_str = ", ".join(categories) if categories else ""
-            
-            # Instruction is now stored directly in agents table
-            instruction = agent.instruction
-            
-            # Get custom features
-            features = await _get_custom_features(db, agent.id)
-            toggle_str = json.dumps(features.get("toggle", {})) if features.get("toggle") else ""
-            dropdown_str = json.dumps(features.get("dropdown", {})) if features.get("dropdown") else ""
-            text_str = json.dumps(features.get("text", {})) if features.get("text") else ""
-            
-            # Get tools
-            from aldar_middleware.models.agent_tools import AgentTool
-            tools_result = await db.execute(
-                select(AgentTool)
-                .where(AgentTool.agent_id == agent.id)
-                .order_by(AgentTool.tool_order)
-            )
-            tools = tools_result.scalars().all()
-            tools_list = [
-                {
-                    "tool_name": tool.tool_name,
-                    "tool_description": tool.tool_description,
-                    "tool_url": tool.tool_url,
-                    "tool_is_active": tool.tool_is_active,
+        request_correlation_id = get_correlation_id() or str(uuid.uuid4())
+        filters = {
+            "enabled": enabled,
+            "category": category,
+            "search": search,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+        }
+
+        async def write_export_log(
+            export_db: AsyncSession, log_action_type: str, log_level: str, message: str, **details: Any
+        ) -> None:
+            try:
+                admin_log_data = {
+                    "id": str(uuid.uuid4()),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "level": log_level,
+                    "action_type": log_action_type,
+                    "user_id": str(current_user.id),
+                    "email": current_user.email,
+                    "username": current_user.username or current_user.email,
+                    "correlation_id": request_correlation_id,
+                    "module": "admin_agents",
+                    "function": "export_agents_csv",
+                    "message": message,
+                    "log_data": {
+                        "action_type": log_action_type,
+                        "filters": filters,
+                        **details,
+                    }
                 }
-                for tool in tools
-            ]
-            tools_str = json.dumps(tools_list) if tools_list else ""
-            
-            # Format knowledge sources
-            knowledge_sources_str = json.dumps(agent.knowledge_sources) if agent.knowledge_sources else ""
-            
-            csv_writer.writerow({
-                "agent_id": str(agent.id),
-                "public_id": str(agent.public_id),
-                "agent_name": agent.name or "",
-                "agent_intro": (agent.intro or "").replace("\n", " ").replace("\r", ""),
-                "description": (agent.description or "").replace("\n", " ").replace("\r", ""),
-                "agent_icon": agent.icon or "",
-                "mcp_server_link": agent.mcp_url or "",
-                "agent_health_url": agent.health_url or "",
-                "model_name": agent.model_name or "",
-                "model_provider": agent.model_provider or "",
-                "categories": categories_str,
-                "agent_enabled": agent.is_enabled,
-                "is_deleted": agent.is_deleted,
-                "is_healthy": agent.is_healthy,
-                "health_status": agent.health_status or "",
-                "last_health_check": agent.last_health_check.isoformat() if agent.last_health_check else "",
-                "instruction": (instruction or "").replace("\n", " ").replace("\r", ""),
-                "include_in_teams": agent.include_in_teams,
-                "custom_feature_toggle": toggle_str,
-                "custom_feature_dropdown": dropdown_str,
-                "custom_feature_text": text_str,
-                "tools": tools_str,
-                "knowledge_sources": knowledge_sources_str,
-                "created_at": agent.created_at.isoformat() if agent.created_at else "",
-                "updated_at": agent.updated_at.isoformat() if agent.updated_at else "",
-                "last_used": agent.last_used.isoformat() if agent.last_used else "",
-            })
-        
-        csv_data = csv_buffer.getvalue()
-        
-        logger.info(
-            "Agents exported as CSV",
-            extra={
-                "user_id": str(current_user.id),
-                "row_count": len(agents),
-            },
-        )
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=agents_export.csv"},
+
+                await postgres_logs_service.write_admin_log(export_db, admin_log_data)
+            except Exception as e:
+                logger.error(f"Failed to write admin log for agents export: {e}", exc_info=True)
+
+        # Log admin action: ADMIN_AGENTS_EXPORTED, before any row is sent
+        async def log_export(export_db: AsyncSession) -> None:
+            await write_export_log(export_db, "ADMIN_AGENTS_EXPORTED", "INFO", "Agents export started", status="started")
+
+        async def log_export_completed(export_db: AsyncSession, row_count: int) -> None:
+            logger.info(
+                "Agents exported as CSV",
+                extra={
+                    "user_id": str(current_user.id),
+                    "row_count": row_count,
+                },
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_AGENTS_EXPORT_COMPLETED",
+                "INFO",
+                f"Agents exported as CSV: {row_count} rows",
+                status="completed",
+                row_count=row_count,
+            )
+
+        async def log_export_failed(export_db: AsyncSession, row_count: int, error: BaseException) -> None:
+            await write_export_log(
+                export_db,
+                "ADMIN_AGENTS_EXPORT_FAILED",
+                "ERROR",
+                f"Agents export failed after {row_count} rows",
+                status="failed",
+                row_count=row_count,
+                error=repr(error),
+            )
+
+        # Every matching agent is streamed (no pagination for export)
+        return csv_export_response(
+            CSVExport(
+                query=query.order_by(desc(Agent.created_at), Agent.id),
+                fieldnames=AGENT_CSV_FIELDS,
+                render_batch=_agent_csv_rows,
+                filename="agents_export.csv",
+                on_start=log_export,
+                on_complete=log_export_completed,
+                on_failure=log_export_failed,
+            ),
+            request,
         )
     
     except Exception as e:
@@ -4,9 +4,7 @@ import os
 from typing import Dict, Any, Optional
 from datetime import datetime
 from urllib.parse import urlparse
-from collections import deque
 import asyncio
-from asyncio import Lock
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Query
 from fastapi.responses import Response
 from fastapi.security import OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials
@@ -22,6 +20,14 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.attributes import flag_modified
 from aldar_middleware.database.base import get_db
+from aldar_middleware.services.login_enrichment import (
+    PHOTO_ETAG_PREFERENCE,
+    LoginEnrichmentService,
+    enqueue_login_enrichment,
+)
+from aldar_middleware.services.profile_photo_cache import get_profile_photo_cache
+from aldar_middleware.utils.http_cache import etag_matches
+from aldar_middleware.services.sliding_window_limiter import get_sliding_window_limiter
 from aldar_middleware.models.user import User
 from loguru import logger
 
@@ -35,19 +41,16 @@ code_verifier_store = {}
 AUTH_RATE_LIMIT_WINDOW_MINUTE = 60  # seconds
 AUTH_RATE_LIMIT_WINDOW_HOUR = 3600  # seconds
 
-_auth_rate_limit_store: Dict[str, deque] = {}
-_auth_rate_limit_lock = Lock()
-
 
 async def _enforce_auth_rate_limit(request: Request, identifier: Optional[str] = None) -> None:
     """Enforce rate limiting on authentication endpoints.
     
+    Limits are shared by every worker when Redis is available.
+
     Args:
         request: FastAPI request object
         identifier: Optional identifier (e.g., username) for user-based limiting
     """
-    from datetime import datetime, timedelta
-
     if not getattr(settings, "auth_rate_limit_enabled", True):
         return
 
@@ -58,53 +61,24 @@ async def _enforce_auth_rate_limit(request: Request, identifier: Optional[str] =
     client_ip = request.client.host if request.client else "unknown"
     rate_limit_key = f"{client_ip}:{identifier}" if identifier else client_ip
     
-    now = datetime.utcnow()
-    
-    async with _auth_rate_limit_lock:
-        # Get or create rate limit bucket
-        bucket = _auth_rate_limit_store.setdefault(rate_limit_key, deque())
-        
-        # Clean up old entries (older than 1 hour)
-        while bucket and (now - bucket[0]).total_seconds() > AUTH_RATE_LIMIT_WINDOW_HOUR:
-            bucket.popleft()
-        
-        # Count requests in last minute
-        minute_ago = now - timedelta(seconds=AUTH_RATE_LIMIT_WINDOW_MINUTE)
-        requests_last_minute = sum(1 for ts in bucket if ts > minute_ago)
-        
-        # Count requests in last hour
-        hour_ago = now - timedelta(seconds=AUTH_RATE_LIMIT_WINDOW_HOUR)
-        requests_last_hour = len(bucket)
-        
-        # Check rate limits
-        if requests_last_minute >= limit_per_minute:
-            logger.warning(
-                f"Auth rate limit exceeded (per minute): {rate_limit_key}, "
-                f"attempts={requests_last_minute}/{limit_per_minute}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many authentication attempts. Please wait before trying again.",
-                headers={"Retry-After": str(AUTH_RATE_LIMIT_WINDOW_MINUTE)}
-            )
-        
-        if requests_last_hour >= limit_per_hour:
-            logger.warning(
-                f"Auth rate limit exceeded (per hour): {rate_limit_key}, "
-                f"attempts={requests_last_hour}/{limit_per_hour}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many authentication attempts. Please wait before trying again.",
-                headers={"Retry-After": str(AUTH_RATE_LIMIT_WINDOW_HOUR)}
-            )
-        
-        # Record this request
-        bucket.append(now)
-        
-        # Clean up empty buckets periodically
-        if not bucket:
-            _auth_rate_limit_store.pop(rate_limit_key, None)
+    decision = await get_sliding_window_limiter().hit(
+        f"auth:{rate_limit_key}",
+        [
+            (limit_per_minute, AUTH_RATE_LIMIT_WINDOW_MINUTE),
+            (limit_per_hour, AUTH_RATE_LIMIT_WINDOW_HOUR),
+        ],
+    )
+    if not decision.allowed:
+        period = "minute" if decision.window == AUTH_RATE_LIMIT_WINDOW_MINUTE else "hour"
+        logger.warning(
+            f"Auth rate limit exceeded (per {period}): {rate_limit_key}, "
+            f"attempts={decision.count}/{decision.limit}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication attempts. Please wait before trying again.",
+            headers={"Retry-After": str(decision.retry_after)}
+        )
 
 
 # Pydantic model for preference updates
@@ -476,22 +450,9 @@ async def azure_ad_callback(
             # isOnboarded is typically a custom field, not from Azure AD - default to False
             is_onboarded = merged_user_info.get("isOnboarded") or merged_user_info.get("is_onboarded") or False
 
-            # Fetch user profile photo from Microsoft Graph API
-            # We'll store it in blob storage after user is created/updated
-            profile_photo_bytes = None
+            # The profile photo is stored in blob storage by the login enrichment
+            # job queued below; until then the proxy endpoint serves it from Graph
             profile_photo_url = None
-            if user_id:
-                try:
-                    # Download photo bytes if available
-                    photo_bytes = await azure_ad_auth.get_user_profile_photo_bytes(access_token, user_id)
-                    if photo_bytes:
-                        profile_photo_bytes = photo_bytes
-                        logger.info(f"Profile photo found for user {user_id} (size: {len(photo_bytes)} bytes)")
-                    else:
-                        logger.debug(f"No profile photo found for user {user_id}")
-                except Exception as e:
-                    logger.warning(f"Error fetching profile photo for user {user_id}: {e}")
-                    # Continue without profile photo - don't fail login
 
             if not user_id:
                 raise HTTPException(
@@ -580,9 +541,9 @@ async def azure_ad_callback(
                     await db.refresh(user)
                     logger.info(f"Successfully created user: {user.email}")
                     
-                    # Profile photo: not uploaded to blob during login (avoids timeout).
+                    # Profile photo: uploaded to blob by the login enrichment job.
                     # Photo is served via proxy endpoint from Microsoft Graph when needed.
-                    if profile_photo_bytes:
+                    if user.azure_ad_id:
                         profile_photo_url = f"{settings.api_prefix}/auth/users/{user.id}/profile-photo"
                     
                     # Initialize user preferences with all required fields
@@ -649,9 +610,9 @@ async def azure_ad_callback(
                             # Set first_logged_in_at if not already set
                             if not user.first_logged_in_at:
                                 user.first_logged_in_at = datetime.utcnow()
-                            # Profile photo: not uploaded to blob during login (avoids timeout).
+                            # Profile photo: uploaded to blob by the login enrichment job.
                             # Photo is served via proxy endpoint from Microsoft Graph when needed.
-                            if profile_photo_bytes:
+                            if user.azure_ad_id:
                                 profile_photo_url = f"{settings.api_prefix}/auth/users/{user.id}/profile-photo"
                             
                             # Initialize/update user preferences with all required fields
@@ -727,9 +688,9 @@ async def azure_ad_callback(
                 # Set first_logged_in_at if not already set
                 if not user.first_logged_in_at:
                     user.first_logged_in_at = datetime.utcnow()
-                # Profile photo: not uploaded to blob during login (avoids timeout).
+                # Profile photo: uploaded to blob by the login enrichment job.
                 # Photo is served via proxy endpoint from Microsoft Graph when needed.
-                if profile_photo_bytes:
+                if user.azure_ad_id:
                     profile_photo_url = f"{settings.api_prefix}/auth/users/{user.id}/profile-photo"
                 
                 # Initialize/update user preferences with all required fields
@@ -749,145 +710,13 @@ async def azure_ad_callback(
                     logger.error(f"Error updating user: {commit_error}")
                     raise
 
-        # Sync user's Azure AD groups to pivot table
-        # This flow:
-        # 1. Gets user's email
-        # 2. Calls MS Graph API internally to fetch all AD groups for the user
-        # 3. Replaces old AD groups in user pivot table with new ones (or creates new entry if doesn't exist)
-        user_pivot = None
-        try:
-            from aldar_middleware.services.rbac_pivot_service import RBACPivotService
-            pivot_service = RBACPivotService(db)
-            # Use email as primary identifier (field renamed from user_name to email)
-            # Fallback to username only if email is not available
-            user_email = user.email or user.username
-            if user_email:
-                # This internally calls MS Graph API to get AD groups, then updates/replaces pivot table entry
-                user_pivot = await pivot_service.sync_user_ad_groups(user_email, access_token)
-                logger.info(f"Successfully synced AD groups for user: {user_email}")
-        except Exception as e:
-            # Log error but don't fail login if AD group sync fails
-            logger.error(f"Failed to sync AD groups for user {user.email}: {e}", exc_info=True)
-
-        # Check if user should be admin based on Azure AD groups
-        # If user belongs to any admin group IDs from settings, set is_admin=True
-        # Note: This will override any manual admin assignments on login
-        try:
-            admin_group_ids = settings.admin_group_ids_list
-            
-            # Only proceed if admin groups are configured
-            if not admin_group_ids:
-                logger.debug(
-                    f"No admin group IDs configured in settings - "
-                    f"skipping admin check for user {user.email}"
-                )
-            elif user_pivot:
-                # User has AD groups synced - check for admin group membership
-                user_ad_groups = user_pivot.azure_ad_groups or []
-                # Check if user has any of the admin group IDs
-                user_groups_set = set(str(gid) for gid in user_ad_groups)
-                admin_groups_set = set(str(gid).strip() for gid in admin_group_ids)
-                matched_groups = user_groups_set & admin_groups_set
-                is_admin = bool(matched_groups)
-                
-                # Log the comparison for debugging
-                logger.info(
-                    f"Admin group check for user {user.email}: "
-                    f"user_groups={sorted(user_groups_set)}, "
-                    f"admin_groups={sorted(admin_groups_set)}, "
-                    f"matched_groups={sorted(matched_groups)}, "
-                    f"is_admin={is_admin}"
-                )
-                
-                # Reload user from database to ensure it's attached to the session
-                # This is necessary because the user object might be detached after AD group sync
-                result = await db.execute(
-                    select(User).where(User.id == user.id)
-                )
-                user_in_session = result.scalar_one_or_none()
-                
-                if not user_in_session:
-                    logger.warning(
-                        f"Could not reload user {user.email} from database for admin check"
-                    )
-                else:
-                    # Always update admin status based on group membership
-                    # This ensures that if user loses admin groups, is_admin is set to False
-                    if user_in_session.is_admin != is_admin:
-                        user_in_session.is_admin = is_admin
-                        try:
-                            await db.commit()
-                            await db.refresh(user_in_session)
-                            # Update the original user object reference
-                            user.is_admin = user_in_session.is_admin
-                            logger.info(
-                                f"Updated admin status for user {user.email}: "
-                                f"is_admin={is_admin} "
-                                f"(matched groups: {sorted(matched_groups) if matched_groups else 'none'})"
-                            )
-                        except Exception as commit_error:
-                            await db.rollback()
-                            logger.error(
-                                f"Failed to commit admin status change for user {user.email}: "
-                                f"{commit_error}",
-                                exc_info=True
-                            )
-                    else:
-                        logger.debug(
-                            f"Admin status unchanged for user {user.email}: "
-                            f"is_admin={user_in_session.is_admin} "
-                            f"(matched groups: {sorted(matched_groups) if matched_groups else 'none'})"
-                        )
-            else:
-                # Admin groups configured but user has no AD groups synced
-                # This could mean:
-                # 1. AD group sync failed (already logged above)
-                # 2. User doesn't belong to any AD groups
-                # Set to False if currently True (user lost admin groups or they were removed from env)
-                
-                # Reload user from database to ensure it's attached to the session
-                result = await db.execute(
-                    select(User).where(User.id == user.id)
-                )
-                user_in_session = result.scalar_one_or_none()
-                
-                if not user_in_session:
-                    logger.warning(
-                        f"Could not reload user {user.email} from database for admin check"
-                    )
-                elif user_in_session.is_admin:
-                    user_in_session.is_admin = False
-                    try:
-                        await db.commit()
-                        await db.refresh(user_in_session)
-                        # Update the original user object reference
-                        user.is_admin = user_in_session.is_admin
-                        logger.info(
-                            f"Removed admin status for user {user.email} "
-                            f"(no AD groups synced or user not in admin groups)"
-                        )
-                    except Exception as commit_error:
-                        await db.rollback()
-                        logger.error(
-                            f"Failed to remove admin status for user {user.email}: "
-                            f"{commit_error}",
-                            exc_info=True
-                        )
-        except Exception as e:
-            # Log error but don't fail login if admin check fails
-            # This ensures login still works even if admin check has issues
-            logger.error(
-                f"Failed to check admin status for user {user.email}: {e}",
-                exc_info=True
-            )
+            # Admin status follows the admin groups on every login, so it is
+            # checked here: the background job below can be dropped or fail
+            await LoginEnrichmentService(db).sync_admin(user, access_token)
 
-        # Refresh user object one final time to ensure we have the latest data
-        # (especially is_admin status which might have been updated above)
-        try:
-            await db.refresh(user)
-        except Exception:
-            # If refresh fails, continue with current user object
-            pass
+        # Profile photo storage and AD group sync run in the background so the
+        # token is issued as soon as the user row is saved
+        enqueue_login_enrichment(str(user.id), access_token)
 
         # CRITICAL FIX: Get application-scoped token for backend API authentication
         # The Graph API token (access_token) has aud=https://graph.microsoft.com
@@ -1420,6 +1249,7 @@ async def logout(
 @router.get("/users/{user_id}/profile-photo")
 async def get_user_profile_photo(
     user_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Get user profile photo as image.
@@ -1428,8 +1258,12 @@ async def get_user_profile_photo(
     otherwise falls back to Microsoft Graph API.
     Authentication is NOT required - profile photos can be accessed without auth for frontend img tags.
     
+    Photos (and users without one) are cached per worker, and responses carry
+    a strong ETag: a matching If-None-Match is answered with 304 Not Modified.
+    
     Args:
         user_id: Internal user UUID or Azure AD ID
+        request: FastAPI request object
         db: Database session
         
     Returns:
@@ -1460,120 +1294,26 @@ async def get_user_profile_photo(
                 detail="User not found"
             )
         
-        # First, try to serve from blob storage
-        blob_path = get_profile_photo_blob_path(user)
-        if blob_path:
-            try:
-                from aldar_middleware.orchestration.blob_storage import BlobStorageService
-                # Use main storage container for profile photos
-                blob_service = BlobStorageService(container_name=settings.azure_storage_container_name)
-                photo_bytes = await blob_service.download_blob(blob_path)
-                
-                logger.debug(f"Serving profile photo from blob storage for user {user.email}")
-                return Response(
-                    content=photo_bytes,
-                    media_type="image/jpeg",
-                    headers={
-                        "Cache-Control": "public, max-age=86400",  # Cache for 24 hours
-                    }
-                )
-            except Exception as blob_error:
-                logger.warning(f"Error fetching profile photo from blob storage: {blob_error}, falling back to Graph API")
-                # Fall through to Graph API fallback
-        
-        # Fallback to Microsoft Graph API if blob storage is not available
-        if not user.azure_ad_id:
+        # Key by the stored photo version so a photo replaced elsewhere is not served stale
+        preferences = user.preferences if isinstance(user.preferences, dict) else {}
+        version = preferences.get(PHOTO_ETAG_PREFERENCE) or get_profile_photo_blob_path(user) or "graph"
+        photo = await get_profile_photo_cache().get_or_load(
+            f"{user.id}:{version}", lambda: _load_profile_photo(user, db)
+        )
+        if photo.missing:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="User does not have Azure AD profile and no photo in blob storage"
+                detail="Profile photo not found or not available"
             )
         
-        # Get access token using refresh token
-        if not user.azure_ad_refresh_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User refresh token not available"
-            )
-        
-        # Extract all needed user data before async operations to avoid database connection issues
-        user_email = user.email
-        user_azure_ad_id = user.azure_ad_id
-        refresh_token = user.azure_ad_refresh_token
-        
-        # Refresh the access token
-        try:
-            token_response = await azure_ad_auth.refresh_access_token(refresh_token)
-            access_token = token_response.get("access_token")
-            
-            if not access_token:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Failed to get access token"
-                )
-        except Exception as e:
-            logger.error(f"Error refreshing token for profile photo: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Failed to authenticate with Azure AD"
-            )
-        
-        # Fetch photo bytes from Microsoft Graph
-        try:
-            photo_bytes = await azure_ad_auth.get_user_profile_photo_bytes(access_token, user_azure_ad_id)
-            
-            if not photo_bytes:
-                logger.warning(f"Profile photo not available for user {user_email} (ID: {user_azure_ad_id})")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Profile photo not found or not available"
-                )
-            
-            # Store in blob storage for future use (async, don't wait)
-            try:
-                from aldar_middleware.orchestration.blob_storage import BlobStorageService
-                # Use main storage container for profile photos
-                blob_service = BlobStorageService(container_name=settings.azure_storage_container_name)
-                # Delete old photo if exists
-                old_blob_path = get_profile_photo_blob_path(user)
-                if old_blob_path:
-                    try:
-                        await blob_service.delete_blob(old_blob_path)
-                    except Exception:
-                        pass  # Ignore delete errors
-                # Upload new photo
-                photo_url, blob_path, _ = await blob_service.upload_profile_photo(
-                    file_content=photo_bytes,
-                    user_id=str(user.id),
-                    overwrite=True
-                )
-                set_profile_photo_blob_path(user, blob_path)
-                # Update user in database (async, don't block response)
-                flag_modified(user, "preferences")
-                await db.commit()
-                logger.info(f"Profile photo stored in blob storage for user {user_email}")
-            except Exception as store_error:
-                logger.warning(f"Error storing profile photo in blob storage: {store_error}")
-                # Continue - photo is still served from Graph API
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error fetching profile photo for user {user_email}: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to fetch profile photo from Microsoft Graph"
-            )
-        
-        # Return image with proper headers
+        headers = {
+            "ETag": photo.etag,
+            "Cache-Control": f"public, max-age={settings.profile_photo_max_age_seconds}",
+        }
+        if etag_matches(request.headers.get("if-none-match"), photo.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
         # Microsoft Graph returns JPEG images by default
-        logger.debug(f"Serving profile photo from Graph API for user {user.email}")
-        return Response(
-            content=photo_bytes,
-            media_type="image/jpeg",
-            headers={
-                "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
-            }
-        )
+        return Response(content=photo.content, media_type="image/jpeg", headers=headers)
         
     except HTTPException:
         raise
@@ -1583,3 +1323,104 @@ async def get_user_profile_photo(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch profile photo"
         )
+
+
+async def _load_profile_photo(user: User, db: AsyncSession) -> Optional[bytes]:
+    """Load a user's photo from blob storage, falling back to Microsoft Graph.
+    
+    Returns:
+        Photo bytes, or None if the user has no photo
+    
+    Raises:
+        HTTPException: If Graph cannot be authenticated against
+    """
+    # First, try to serve from blob storage
+    blob_path = get_profile_photo_blob_path(user)
+    if blob_path:
+        try:
+            from aldar_middleware.orchestration.blob_storage import BlobStorageService
+            # Use main storage container for profile photos
+            blob_service = BlobStorageService(container_name=settings.azure_storage_container_name)
+            photo_bytes = await blob_service.download_blob(blob_path)
+            logger.debug(f"Loaded profile photo from blob storage for user {user.email}")
+            return photo_bytes
+        except Exception as blob_error:
+            logger.warning(f"Error fetching profile photo from blob storage: {blob_error}, falling back to Graph API")
+            # Fall through to Graph API fallback
+    
+    # Fallback to Microsoft Graph API if blob storage is not available
+    if not user.azure_ad_id:
+        logger.debug(f"User {user.email} has no Azure AD profile and no photo in blob storage")
+        return None
+    
+    # Get access token using refresh token
+    if not user.azure_ad_refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User refresh token not available"
+        )
+    
+    # Extract all needed user data before async operations to avoid database connection issues
+    user_email = user.email
+    user_azure_ad_id = user.azure_ad_id
+    refresh_token = user.azure_ad_refresh_token
+    
+    # Refresh the access token
+    try:
+        token_response = await azure_ad_auth.refresh_access_token(refresh_token)
+        access_token = token_response.get("access_token")
+        
+        if not access_token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Failed to get access token"
+            )
+    except Exception as e:
+        logger.error(f"Error refreshing token for profile photo: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Failed to authenticate with Azure AD"
+        )
+    
+    # Fetch photo bytes from Microsoft Graph
+    try:
+        photo_bytes = await azure_ad_auth.get_user_profile_photo_bytes(access_token, user_azure_ad_id)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching profile photo for user {user_email}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch profile photo from Microsoft Graph"
+        )
+    
+    if not photo_bytes:
+        logger.warning(f"Profile photo not available for user {user_email} (ID: {user_azure_ad_id})")
+        return None
+    
+    # Store in blob storage for future use
+    try:
+        from aldar_middleware.orchestration.blob_storage import BlobStorageService
+        # Use main storage container for profile photos
+        blob_service = BlobStorageService(container_name=settings.azure_storage_container_name)
+        # Delete old photo if exists
+        old_blob_path = get_profile_photo_blob_path(user)
+        if old_blob_path:
+            try:
+                await blob_service.delete_blob(old_blob_path)
+            except Exception:
+                pass  # Ignore delete errors
+        # Upload new photo
+        photo_url, blob_path, _ = await blob_service.upload_profile_photo(
+            file_content=photo_bytes,
+            user_id=str(user.id),
+            overwrite=True
+        )
+        set_profile_photo_blob_path(user, blob_path)
+        flag_modified(user, "preferences")
+        await db.commit()
+        logger.info(f"Profile photo stored in blob storage for user {user_email}")
+    except Exception as store_error:
+        logger.warning(f"Error storing profile photo in blob storage: {store_error}")
+        # Continue - photo is still served from Graph API
+    
+    logger.debug(f"Loaded profile photo from Graph API for user {user_email}")
+    return photo_bytes
@@ -1,20 +1,18 @@
 """Chat API routes."""
 
-from typing import List, Dict, Any, Optional, Literal, Tuple, Deque, Union
+from typing import List, Dict, Any, Optional, Literal, Tuple, Union
 from uuid import UUID, uuid4, uuid5, NAMESPACE_DNS
 import hashlib
 import json
 from datetime import datetime, timedelta, timezone
-from collections import deque
-from asyncio import Lock
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Header
-from sqlalchemy import select, desc, func, case, and_, or_, exists, Boolean, cast, text, update, String, literal
+from sqlalchemy import select, desc, func, and_, or_, cast, text, update, String, literal
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field, model_validator, field_validator, ConfigDict
 
-from aldar_middleware.database.base import get_db
+from aldar_middleware.database.base import get_db, get_read_db
 from aldar_middleware.database.redis_client import get_redis
 from aldar_middleware.models.user import User
 from aldar_middleware.models.sessions import Session
@@ -24,11 +22,14 @@ from aldar_middleware.models.feedback import FeedbackData, FeedbackEntityType, F
 from aldar_middleware.models.attachment import Attachment
 from aldar_middleware.models.starter_prompt import StarterPrompt
 from aldar_middleware.utils.agent_utils import determine_agent_type
+from aldar_middleware.utils.pagination import InvalidCursorError
 from aldar_middleware.utils.streaming_utils import check_streaming_status
 from aldar_middleware.auth.dependencies import get_current_user
 from aldar_middleware.orchestration.blob_storage import BlobStorageService
 from aldar_middleware.auth.obo_utils import add_mcp_token_to_jwt
 from aldar_middleware.services.ai_service import AIService
+from aldar_middleware.services.chat_search_service import search_user_sessions
+from aldar_middleware.services.sliding_window_limiter import get_sliding_window_limiter
 from aldar_middleware.services.question_tracker_service import increment_question_count
 from aldar_middleware.settings.context import get_correlation_id
 from aldar_middleware.settings.settings import settings
@@ -585,6 +586,7 @@ async def create_chat_session(
                 role="user",
             )
             db.add(message)
+            await _record_session_message(db, session, message)
             await db.commit()
             await db.refresh(session)
             message_saved = True
@@ -666,8 +668,10 @@ async def search_chat_sessions(
     date_to: Optional[datetime] = Query(None, description="Filter chats created on or before this date (ISO format)"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor; takes precedence over offset"),
+    include_total: bool = Query(True, description="Set to false to skip counting all matches"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Search chat sessions by title and message content."""
     correlation_id = get_correlation_id()
@@ -683,8 +687,6 @@ async def search_chat_sessions(
 
     _validate_query_length(trimmed_query, "q")
 
-    search_pattern = f"%{trimmed_query}%"
-
     filters = [Session.user_id == current_user.id]
 
     # Date filters (inclusive)
@@ -756,70 +758,25 @@ async def search_chat_sessions(
         if agent_conditions:
             filters.append(or_(*agent_conditions))
 
-    title_match_expr = Session.session_name.ilike(search_pattern)
-    message_match_exists = exists().where(
-        and_(
-            Message.session_id == Session.id,
-            Message.content.ilike(search_pattern)
-        )
-    )
-    filters.append(or_(title_match_expr, message_match_exists))
-
-    # Aggregate message stats
-    message_stats_subq = (
-        select(
-            Message.session_id.label("session_id"),
-            func.count(Message.id).label("message_count"),
-            func.max(Message.created_at).label("last_message_at")
-        )
-        .group_by(Message.session_id)
-        .subquery()
-    )
-
-    title_score = case((title_match_expr, 1.0), else_=0.0)
-    message_score = case((message_match_exists, 1.0), else_=0.0)
-    relevance_score_expr = (title_score * 0.6 + message_score * 0.4).label("relevance_score")
-
-    stmt = (
-        select(
-            Session,
-            func.coalesce(message_stats_subq.c.message_count, 0).label("message_count"),
-            func.coalesce(message_stats_subq.c.last_message_at, Session.updated_at).label("last_message_at"),
-            relevance_score_expr,
+    try:
+        search_page = await search_user_sessions(
+            db,
+            query=trimmed_query,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_total=include_total,
         )
-        .outerjoin(message_stats_subq, message_stats_subq.c.session_id == Session.id)
-        .where(*filters)
-        .order_by(desc(relevance_score_expr), desc(func.coalesce(Session.updated_at, Session.created_at)))
-        .offset(offset)
-        .limit(limit)
-    )
-
-    result = await db.execute(stmt)
-    rows = result.all()
-
-    session_ids = [row[0].id for row in rows]
-
-    # Count total results matching the filters
-    count_stmt = select(func.count()).select_from(Session).where(*filters)
-    total_count = (await db.execute(count_stmt)).scalar() or 0
-
-    snippets: Dict[UUID, str] = {}
-    first_messages: Dict[UUID, str] = {}
-    if session_ids:
-        message_stmt = (
-            select(Message.session_id, Message.content, Message.created_at)
-            .where(Message.session_id.in_(session_ids))
-            .order_by(Message.session_id, Message.created_at)
+    except InvalidCursorError as e:
+        _raise_chat_error(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_code="VALIDATION_ERROR",
+            error_message=str(e),
+            details={"field": "cursor", "message": "Restart the search without a cursor"},
         )
-        message_rows = await db.execute(message_stmt)
-        q_lower = trimmed_query.lower()
-        for chat_id_value, content, _created_at in message_rows:
-            if content is None:
-                continue
-            if chat_id_value not in first_messages:
-                first_messages[chat_id_value] = content
-            if chat_id_value not in snippets and q_lower in content.lower():
-                snippets[chat_id_value] = content
+    rows = search_page.rows
+    total_count = search_page.total_count
 
     # Prepare agent lookups
     agent_candidates: Dict[str, Dict[str, Optional[str]]] = {}
@@ -854,8 +811,8 @@ async def search_chat_sessions(
                         agents.append({"agent_id": item, "agent_name": None})
         return agents
 
-    for row in rows:
-        metadata = row[0].session_metadata or {}
+    for session_obj, _relevance_score in rows:
+        metadata = session_obj.session_metadata or {}
         for agent_entry in normalize_agents(metadata):
             agent_id_val = agent_entry.get("agent_id")
             agent_name_val = agent_entry.get("agent_name")
@@ -894,7 +851,6 @@ async def search_chat_sessions(
 
     # Build results
     results_list = []
-    q_lower = trimmed_query.lower()
 
     def build_snippet_text(raw_text: Optional[str]) -> Optional[str]:
         if not raw_text:
@@ -904,7 +860,7 @@ async def search_chat_sessions(
             return cleaned[:197] + "..."
         return cleaned
 
-    for session_obj, message_count, _last_message_at, relevance_score in rows:
+    for session_obj, relevance_score in rows:
         metadata = session_obj.session_metadata or {}
 
         agent_entries = normalize_agents(metadata)
@@ -935,23 +891,10 @@ async def search_chat_sessions(
                 )
 
         chat_id_value = session_obj.id
-        snippet_text = (
-            snippets.get(chat_id_value)
-            or first_messages.get(chat_id_value)
-            or session_obj.session_name
-        )
+        snippet_text = search_page.snippets.get(chat_id_value) or session_obj.session_name
         snippet_formatted = build_snippet_text(snippet_text)
 
-        title_value = session_obj.session_name or ""
-        title_match = 1.0 if title_value and q_lower in title_value.lower() else 0.0
-        snippet_match = 1.0 if snippet_text and q_lower in snippet_text.lower() else 0.0
-        combined_relevance = max(float(relevance_score or 0.0), 0.6 * title_match + 0.4 * snippet_match)
-
-        is_favorite = metadata.get("is_favorite")
-        if is_favorite is None:
-            is_favorite = metadata.get("isFavorite")
-        if is_favorite is None:
-            is_favorite = metadata.get("is_favourite", False)
+        is_favorite = session_obj.is_favorite
 
         results_list.append(
             {
@@ -960,14 +903,14 @@ async def search_chat_sessions(
                 "snippet": snippet_formatted,
                 "created_at": session_obj.created_at.isoformat(),
                 "updated_at": (session_obj.updated_at or session_obj.created_at).isoformat(),
-                "message_count": int(message_count or 0),
+                "message_count": search_page.message_counts.get(chat_id_value, 0),
                 "is_favorite": bool(is_favorite),
                 "agents_used": agents_used,
-                "relevance_score": round(min(combined_relevance, 1.0), 4),
+                "relevance_score": round(min(relevance_score, 1.0), 4),
             }
         )
 
-    has_more = offset + len(results_list) < total_count
+    has_more = search_page.next_cursor is not None
     
     return {
         "success": True,
@@ -975,6 +918,7 @@ async def search_chat_sessions(
         "results": results_list,
         "total_count": total_count,
         "has_more": has_more,
+        "next_cursor": search_page.next_cursor,
         "correlation_id": correlation_id,
     }
 
@@ -1078,7 +1022,7 @@ async def get_chat_sessions(
     date_from: Optional[datetime] = Query(None, description="Start date filter (ISO format)"),
     date_to: Optional[datetime] = Query(None, description="End date filter (ISO format)"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Dict[str, Any]:
     """Retrieve chat sessions using grouping, filters, and pagination."""
     correlation_id = get_correlation_id()
@@ -1088,7 +1032,9 @@ async def get_chat_sessions(
     month_start = today_start.replace(day=1)
     one_month_ago = month_start - timedelta(days=1)  # End of previous month
 
-    activity_field = func.coalesce(Session.last_message_interaction_at, Session.updated_at, Session.created_at)
+    # Buckets filter on the column the list is ordered by (kept current by
+    # _record_session_message), so a session sorts into the bucket it is shown in
+    activity_field = Session.last_activity_at
     filters = [Session.user_id == current_user.id]
 
     await _enforce_chat_rate_limit(current_user)
@@ -1153,7 +1099,6 @@ async def get_chat_sessions(
         groups_response, grouped_total, grouped_has_more = await _build_grouped_session_summary(
             db=db,
             base_filters=filters,
-            activity_field=activity_field,
             limit=limit,
             offset=offset,
             today_start=today_start,
@@ -1228,55 +1173,29 @@ async def get_chat_sessions(
         older_end = datetime(current_year - 1, 1, 1, 0, 0, 0, 0)  # Start of previous year
         filters.append(activity_field < older_end)
 
-    message_stats_subq = (
-        select(
-            Message.session_id.label("session_id"),
-            func.count(Message.id).label("message_count"),
-            func.max(Message.created_at).label("last_message_at"),
-        )
-        .where(Message.content_type != "system")
-        .group_by(Message.session_id)
-        .subquery()
-    )
-
-    last_message_subq = (
-        select(
-            Message.session_id.label("session_id"),
-            Message.content.label("content"),
-            Message.created_at.label("created_at"),
-            Message.content_type.label("message_type"),
-            func.row_number()
-            .over(
-                partition_by=Message.session_id,
-                order_by=Message.created_at.desc(),
-            )
-            .label("row_number"),
+    # Latest non-system message of each listed session only: one backward scan
+    # of idx_messages_session_created per row of the page
+    last_message = (
+        select(Message.content.label("content"))
+        .where(
+            Message.session_id == Session.id,
+            Message.content_type != "system",
         )
-        .where(Message.content_type != "system")
-        .subquery()
-    )
-
-    activity_coalesce = func.coalesce(
-        message_stats_subq.c.last_message_at, Session.updated_at, Session.created_at
+        .order_by(Message.created_at.desc())
+        .limit(1)
+        .lateral("last_message")
     )
 
     stmt = (
         select(
             Session,
-            func.coalesce(message_stats_subq.c.message_count, 0).label("message_count"),
-            activity_coalesce.label("last_activity_at"),
-            last_message_subq.c.content.label("last_message_content"),
-        )
-        .outerjoin(message_stats_subq, message_stats_subq.c.session_id == Session.id)
-        .outerjoin(
-            last_message_subq,
-            and_(
-                last_message_subq.c.session_id == Session.id,
-                last_message_subq.c.row_number == 1,
-            ),
+            Session.message_count,
+            Session.last_activity_at,
+            last_message.c.content.label("last_message_content"),
         )
+        .outerjoin(last_message, literal(True))
         .where(*filters)
-        .order_by(desc(activity_coalesce))
+        .order_by(desc(Session.last_activity_at))
         .offset(offset)
         .limit(limit)
     )
@@ -1398,11 +1317,7 @@ async def get_chat_sessions(
     sessions: List[Dict[str, Any]] = []
     for session_obj, message_count, last_activity_at, last_message_content in rows:
         metadata = session_obj.session_metadata or {}
-        is_favorite = metadata.get("is_favorite")
-        if is_favorite is None:
-            is_favorite = metadata.get("isFavorite")
-        if is_favorite is None:
-            is_favorite = metadata.get("is_favourite", False)
+        is_favorite = session_obj.is_favorite
 
         agent_entries = normalize_agents(metadata)
         seen_agent_ids: set[str] = set()
@@ -1512,7 +1427,7 @@ async def get_chat_sessions_group(
     date_from: Optional[datetime] = Query(None, description="Start date filter (ISO format)"),
     date_to: Optional[datetime] = Query(None, description="End date filter (ISO format)"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Dict[str, Any]:
     """Return grouped chat sessions with counts and paginated entries."""
     correlation_id = get_correlation_id()
@@ -1538,7 +1453,6 @@ async def get_chat_sessions_group(
     # Older: Before the previous calendar year
     older_end = previous_year_start  # Start of previous year (exclusive)
 
-    activity_field = func.coalesce(Session.last_message_interaction_at, Session.updated_at, Session.created_at)
     base_filters: List[Any] = [Session.user_id == current_user.id]
 
     await _enforce_chat_rate_limit(current_user)
@@ -1712,7 +1626,6 @@ async def get_chat_sessions_group(
     groups_response, grouped_total, grouped_has_more = await _build_grouped_session_summary(
         db=db,
         base_filters=base_filters,
-        activity_field=activity_field,  # Pass activity_field for internal use
         limit=limit,
         offset=actual_offset,
         group_id=group_id,  # Pass group_id for group-specific pagination
@@ -1790,11 +1703,7 @@ async def get_chat_session(
     if not primary_agent_name:
         primary_agent_name = metadata.get("agent_name") or metadata.get("agentName")
     
-    is_favorite = metadata.get("is_favorite")
-    if is_favorite is None:
-        is_favorite = metadata.get("isFavorite")
-    if is_favorite is None:
-        is_favorite = metadata.get("is_favourite", False)
+    is_favorite = session.is_favorite
     attachments = metadata.get("attachments", [])
     attachment_count = metadata.get("attachment_count", len(attachments))
     
@@ -2001,12 +1910,11 @@ async def mark_chat_session_favourite(
 
     _ensure_session_active(session)
 
-    metadata = session.session_metadata or {}
+    metadata = dict(session.session_metadata or {})
     
-    # Update metadata with favorite status
-    metadata["is_favorite"] = is_favorite_value
-    metadata.pop("isFavorite", None)
-    metadata.pop("is_favourite", None)
+    # The is_favorite column is the only favourite flag; drop any copies left in metadata
+    for key in FAVORITE_METADATA_KEYS:
+        metadata.pop(key, None)
     # Clean up the stored timestamp from metadata if it exists
     metadata.pop("original_updated_at_before_favorite", None)
     
@@ -2017,6 +1925,7 @@ async def mark_chat_session_favourite(
         .where(Session.id == session.id)
         .values(
             session_metadata=metadata,
+            is_favorite=bool(is_favorite_value),
             updated_at=current_updated_at  # Preserve original timestamp
         )
     )
@@ -2216,6 +2125,7 @@ async def get_chat_messages_by_session(
     include_system: bool = Query(False, description="Include system messages"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     redis_client = Depends(get_redis)
 ) -> Dict[str, Any]:
     """Retrieve chat messages for a session with pagination and rich metadata from agno_sessions table."""
@@ -2463,6 +2373,7 @@ async def get_chat_messages_by_session(
     try:
         # Query agno_sessions table - it has session_id (string) and user_id (email or UUID)
         # Try multiple strategies with the determined agno_session_id
+        # The runs column is the bulk of this endpoint's reads: fetch it through read_db
         agno_row = None
         
         # List of session_id candidates to try (in order of priority)
@@ -2493,7 +2404,7 @@ async def get_chat_messages_by_session(
                 "session_id": str(candidate_id)
             }
             logger.info(f"Querying agno_sessions with session_id={candidate_id} (session_id only)")
-            result = await db.execute(query, params)
+            result = await read_db.execute(query, params)
             agno_row = result.first()
             
             if agno_row:
@@ -2515,7 +2426,7 @@ async def get_chat_messages_by_session(
                     "user_email": current_user.email
                 }
                 logger.info(f"Querying agno_sessions with session_id={candidate_id}, user_email={current_user.email}")
-                result = await db.execute(query, params)
+                result = await read_db.execute(query, params)
                 agno_row = result.first()
                 
                 if agno_row:
@@ -2537,7 +2448,7 @@ async def get_chat_messages_by_session(
                     "user_uuid": str(current_user.id)
                 }
                 logger.info(f"Querying agno_sessions with session_id={candidate_id}, user_uuid={current_user.id}")
-                result = await db.execute(query, params)
+                result = await read_db.execute(query, params)
                 agno_row = result.first()
                 
                 if agno_row:
@@ -5639,6 +5550,7 @@ async def send_chat_message(
         now_utc = datetime.utcnow()
         session.last_message_interaction_at = now_utc
         session.updated_at = now_utc
+        await _record_session_message(db, session, user_message, now_utc)
         
         await db.commit()
         await db.refresh(session)
@@ -5913,6 +5825,7 @@ async def send_chat_message(
             now_utc = datetime.utcnow()
             session.last_message_interaction_at = now_utc
             session.updated_at = now_utc
+            await _record_session_message(db, session, ai_message, now_utc)
             await db.commit()
             await db.refresh(ai_message)
             ai_message_id = str(ai_message.id)
@@ -5953,6 +5866,7 @@ async def send_chat_message(
             now_utc = datetime.utcnow()
             session.last_message_interaction_at = now_utc
             session.updated_at = now_utc
+            await _record_session_message(db, session, ai_message, now_utc)
             await db.commit()
             await db.refresh(ai_message)
             ai_message_id = str(ai_message.id)
@@ -6701,7 +6615,6 @@ async def _build_grouped_session_summary(
     *,
     db: AsyncSession,
     base_filters: List[Any],
-    activity_field: Any,  # Use the same activity_field expression from the endpoint
     limit: int,
     offset: int,
     group_id: Optional[str] = None,
@@ -6718,25 +6631,11 @@ async def _build_grouped_session_summary(
     date_to: Optional[datetime] = None,  # Date filter - applied using sort_activity
     current_user: Optional[User] = None,
 ) -> Tuple[List[Dict[str, Any]], int, bool]:
-    # Use the activity_field passed from the endpoint to ensure consistency with date filters
-    message_stats_subq = (
-        select(
-            Message.session_id.label("session_id"),
-            func.count(Message.id).label("message_count"),
-            func.max(Message.created_at).label("last_message_at"),
-        )
-        .where(Message.content_type != "system")
-        .group_by(Message.session_id)
-        .subquery()
-    )
+    # Activity and message counts are denormalized onto sessions (kept current by
+    # _record_session_message), so every group below is a single range scan on
+    # idx_sessions_user_favorite_activity instead of aggregating all messages.
+    sort_activity = Session.last_activity_at
 
-    # Use the same activity calculation for grouping as we use for sorting/display
-    # This ensures sessions are grouped based on their actual last activity (last message or session update)
-    # Priority: last_message_at (from Message table) > last_message_interaction_at > updated_at > created_at
-    sort_activity = func.coalesce(message_stats_subq.c.last_message_at, activity_field)
-    
-    # Apply date filters using sort_activity (includes Message timestamps) to match grouping logic
-    # This ensures date filters use the same activity calculation as grouping
     if date_from:
         base_filters.append(sort_activity >= date_from)
     if date_to:
@@ -6825,14 +6724,7 @@ async def _build_grouped_session_summary(
     for group_name, extra_filters in groups_map.items():
         # Combine base_filters (includes date filters) with group-specific filters
         filters = list(base_filters) + extra_filters
-        # Date filters in base_filters use sort_activity (includes Message timestamps)
-        # Join with message_stats_subq so sort_activity can be used in WHERE clause
-        count_stmt = (
-            select(func.count())
-            .select_from(Session)
-            .outerjoin(message_stats_subq, message_stats_subq.c.session_id == Session.id)
-            .where(*filters)
-        )
+        count_stmt = select(func.count()).select_from(Session).where(*filters)
         group_total = (await db.execute(count_stmt)).scalar() or 0
         total_count += group_total
         
@@ -6851,10 +6743,9 @@ async def _build_grouped_session_summary(
                     Agent,
                     Session.session_name,  # Explicitly select session_name to ensure fresh data
                     sort_activity.label("last_activity"),
-                    func.coalesce(message_stats_subq.c.message_count, 0).label("message_count"),
+                    Session.message_count,
                 )
                 .join(Agent, Session.agent_id == Agent.id)
-                .outerjoin(message_stats_subq, message_stats_subq.c.session_id == Session.id)
                 .where(*filters)
                 .order_by(desc(sort_activity))
                 .offset(group_offset)
@@ -7543,17 +7434,7 @@ async def _build_grouped_session_summary(
                 primary_agent_id = str(agent_obj.public_id) if agent_obj and agent_obj.public_id else None
                 primary_agent_name = agent_obj.name if agent_obj else None
 
-                # Check if session is favorite
-                is_favorite = False
-                for key in FAVORITE_METADATA_KEYS:
-                    favorite_value = metadata.get(key)
-                    if favorite_value:
-                        if isinstance(favorite_value, bool):
-                            is_favorite = favorite_value
-                        elif isinstance(favorite_value, str):
-                            is_favorite = favorite_value.lower() == "true"
-                        if is_favorite:
-                            break
+                is_favorite = bool(session_obj.is_favorite)
 
                 # Extract agents_involved from run data
                 run_data = runs_map.get(session_id_str) or runs_map.get(session_public_id_str)
@@ -7661,8 +7542,6 @@ RATE_LIMIT_REQUESTS_PER_MINUTE = settings.rate_limit_requests
 RATE_LIMIT_WINDOW_SECONDS = settings.rate_limit_window
 # SESSION_TTL_HOURS removed - session expiration is disabled
 
-_rate_limit_store: Dict[str, Deque[datetime]] = {}
-_rate_limit_lock = Lock()
 
 
 def _chat_error_response(
@@ -7789,68 +7668,50 @@ def _ensure_session_active(session: Session) -> None:
 
 
 async def _enforce_chat_rate_limit(user: User) -> None:
-    user_key = str(user.id)
-    now = datetime.utcnow()
-    async with _rate_limit_lock:
-        bucket = _rate_limit_store.setdefault(user_key, deque())
-        while bucket and (now - bucket[0]).total_seconds() > RATE_LIMIT_WINDOW_SECONDS:
-            bucket.popleft()
-        if not bucket:
-            _rate_limit_store.pop(user_key, None)
-            bucket = _rate_limit_store.setdefault(user_key, deque())
-        if len(bucket) >= RATE_LIMIT_REQUESTS_PER_MINUTE:
-            _raise_chat_error(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                error_code="RATE_LIMIT_EXCEEDED",
-                error_message="Rate limit exceeded. Please wait before making more requests.",
-                details={"field": "rate_limit", "message": "Maximum 100 requests per minute"},
-            )
-        bucket.append(now)
+    decision = await get_sliding_window_limiter().hit(
+        f"chat:{user.id}", [(RATE_LIMIT_REQUESTS_PER_MINUTE, RATE_LIMIT_WINDOW_SECONDS)]
+    )
+    if not decision.allowed:
+        _raise_chat_error(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            error_code="RATE_LIMIT_EXCEEDED",
+            error_message="Rate limit exceeded. Please wait before making more requests.",
+            details={"field": "rate_limit", "message": "Maximum 100 requests per minute"},
+        )
 
 
-def _favorite_flag_clause():
-    """Build a SQL expression that matches sessions marked as favourite."""
-    expressions = [
-        or_(
-            func.lower(Session.session_metadata[key].as_string()) == "true",
-            cast(Session.session_metadata.op('->>')(key), Boolean).is_(True),
+async def _record_session_message(
+    db: AsyncSession,
+    session: Session,
+    message: Message,
+    activity_at: Optional[datetime] = None,
+) -> None:
+    """Update the session's denormalized sidebar activity for a new message.
+
+    Must run in the same transaction that adds the message. The counter is
+    incremented in SQL so concurrent writers to one session never lose a count.
+    System messages touch neither column, matching the migration 0030 backfill.
+    """
+    if message.content_type == "system":
+        return
+    await db.execute(
+        update(Session)
+        .where(Session.id == session.id)
+        .values(
+            message_count=Session.message_count + 1,
+            last_activity_at=activity_at or datetime.utcnow(),
         )
-        for key in FAVORITE_METADATA_KEYS
-    ]
-    return or_(*expressions)
+    )
 
 
-def _not_favorite_flag_clause():
-    """Build a SQL expression that matches sessions NOT marked as favourite.
-    
-    A session is NOT a favorite if NONE of the favorite keys are set to true.
-    This uses explicit checks that handle NULL values (when key doesn't exist).
+def _favorite_flag_clause():
+    """Build a SQL expression that matches sessions marked as favourite.
+
+    Served by idx_sessions_user_favorite_activity.
     """
-    # For each favorite key, ensure it's not true
-    not_favorite_conditions = []
-    for key in FAVORITE_METADATA_KEYS:
-        # Extract the value using ->> which returns NULL if key doesn't exist
-        key_value_raw = Session.session_metadata.op('->>')(key)
-        key_value_str = func.lower(key_value_raw)
-        key_value_bool = cast(key_value_raw, Boolean)
-        
-        # Key is NOT true if:
-        # 1. Key doesn't exist (extracted value is NULL) - handled by COALESCE
-        # 2. Key exists but string value is not "true"
-        # 3. Key exists but boolean value is not True
-        key_not_true = and_(
-            # String value is not "true" (or NULL/empty)
-            func.coalesce(key_value_str, "") != "true",
-            # Boolean value is not True (or NULL/False)
-            func.coalesce(key_value_bool, False).is_(False),
-        )
-        not_favorite_conditions.append(key_not_true)
-    
-    # A session is NOT a favorite if ALL favorite keys are not true
-    # Since favorite clause uses OR (any key true = favorite),
-    # NOT favorite means ALL keys must not be true
-    if not_favorite_conditions:
-        return and_(*not_favorite_conditions)
-    else:
-        # Fallback: always true condition
-        return Session.id.isnot(None)
\ No newline at end of file
+    return Session.is_favorite.is_(True)
+
+
+def _not_favorite_flag_clause():
+    """Build a SQL expression that matches sessions NOT marked as favourite."""
+    return Session.is_favorite.is_(False)
\ No newline at end of file
@@ -13,17 +13,6 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response,
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from azure.core.exceptions import AzureError
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from PIL import Image
-
-try:
-    from svglib.svglib import svg2rlg
-    SVG_SUPPORT = True
-except ImportError:
-    SVG_SUPPORT = False
 
 from aldar_middleware.auth.dependencies import get_current_user
 from aldar_middleware.database.base import get_db
@@ -175,6 +164,20 @@ async def export_chat_session(
     if response_format == "json":
         file_bytes = json.dumps(export_payload, indent=2, default=str).encode("utf-8")
     else:
+        # reportlab and Pillow are only needed for PDF exports; importing them
+        # here keeps them out of workers that never export one
+        from PIL import Image
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen import canvas
+
+        try:
+            from svglib.svglib import svg2rlg
+            svg_support = True
+        except ImportError:
+            svg_support = False
+
         buffer = BytesIO()
         pdf_canvas = canvas.Canvas(buffer, pagesize=letter)
         page_width, page_height = letter
@@ -333,7 +336,7 @@ async def export_chat_session(
                         logger.warning(f"Failed to load PNG logo: {e}")
                 
                 # Try SVG if PNG not available and svglib is installed
-                if not logo_drawn and SVG_SUPPORT and logo_path_svg.exists():
+                if not logo_drawn and svg_support and logo_path_svg.exists():
                     try:
                         drawing = svg2rlg(str(logo_path_svg))
                         if drawing:
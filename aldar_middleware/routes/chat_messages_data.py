@@ -6,6 +6,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from aldar_middleware.database.base import get_db
 from aldar_middleware.models.user import User
@@ -14,10 +15,8 @@ from aldar_middleware.models.messages import Message
 from aldar_middleware.models.menu import Agent
 from aldar_middleware.models.feedback import FeedbackData, FeedbackEntityType, FeedbackRating
 from aldar_middleware.models.run import Run
-from aldar_middleware.models.event import Event
 from aldar_middleware.models.run_message import RunMessage
 from aldar_middleware.models.run_metrics import RunMetrics
-from aldar_middleware.models.run_input import RunInput
 from aldar_middleware.models.memory import Memory
 from aldar_middleware.auth.dependencies import get_current_user
 from aldar_middleware.settings.context import get_correlation_id
@@ -100,6 +99,15 @@ async def _enforce_chat_rate_limit(user: User) -> None:
         bucket.append(now)
 
 
+async def _load_agents_by_id(db: AsyncSession, agent_ids: set) -> Dict[int, Agent]:
+    """Fetch the given agents in one query, keyed by agent id."""
+    agent_ids = {agent_id for agent_id in agent_ids if agent_id}
+    if not agent_ids:
+        return {}
+    result = await db.execute(select(Agent).where(Agent.id.in_(agent_ids)))
+    return {agent.id: agent for agent in result.scalars().all()}
+
+
 def _construct_events_from_run_data(
     run: Run,
     session_id_str: str,
@@ -275,14 +283,31 @@ async def get_chat_messages_data_by_session(
         all_messages.reverse()
         
         # Query runs from runs table for this session
-        # Try both public_id and id as session_id might be stored as either
-        runs_query = select(Run).where(
-            (Run.session_id == session_id_str) | (Run.session_id == session_id_alt)
-        ).order_by(Run.created_at.desc())
+        # Try both public_id and id as session_id might be stored as either.
+        # Child rows are loaded with one IN query per table for all runs, so the
+        # statement count does not grow with the number of runs.
+        runs_query = (
+            select(Run)
+            .where((Run.session_id == session_id_str) | (Run.session_id == session_id_alt))
+            .options(
+                selectinload(Run.events),
+                selectinload(Run.metrics),
+                selectinload(Run.input_data),
+                selectinload(Run.messages),
+            )
+            .order_by(Run.created_at.desc())
+        )
         
         runs_result = await db.execute(runs_query)
         runs = list(runs_result.scalars().all())
         
+        # Resolve agents for runs and messages in one query
+        agents_by_id = await _load_agents_by_id(
+            db,
+            {run.agent_id for run in runs} | {msg.agent_id for msg in all_messages},
+        )
+        session_summary_refreshed = False
+        
         logger.info(
             f"Found {len(runs)} runs for session_id={session_id_str} "
             f"(also tried {session_id_alt})"
@@ -294,13 +319,8 @@ async def get_chat_messages_data_by_session(
         runs_map: Dict[str, Dict[str, Any]] = {}  # run_id -> run data including events, team info
         
         for run in runs:
-            # Query events for this run
-            events_query = select(Event).where(
-                Event.run_id == run.run_id
-            ).order_by(Event.created_at)
-            
-            events_result = await db.execute(events_query)
-            events = list(events_result.scalars().all())
+            # Events for this run, oldest first
+            events = sorted(run.events, key=lambda event: event.created_at)
             
             logger.info(
                 f"Run {run.run_id}: Found {len(events)} events. "
@@ -313,12 +333,8 @@ async def get_chat_messages_data_by_session(
                 agent_name_lower = run.agent_name.lower()
                 is_team_run = "router" in agent_name_lower or "team" in agent_name_lower
             
-            # Query metrics for this run (needed for constructing events if events are missing)
-            metrics_query = select(RunMetrics).where(
-                RunMetrics.run_id == run.run_id
-            )
-            metrics_result = await db.execute(metrics_query)
-            metrics = metrics_result.scalar_one_or_none()
+            # Metrics for this run (needed for constructing events if events are missing)
+            metrics = run.metrics
             
             logger.info(
                 f"Run {run.run_id}: Found metrics={metrics is not None}, "
@@ -328,20 +344,8 @@ async def get_chat_messages_data_by_session(
                 f"total_tokens={metrics.total_tokens if metrics else None}"
             )
             
-            # Query input for this run
-            input_query = select(RunInput).where(
-                RunInput.run_id == run.run_id
-            )
-            input_result = await db.execute(input_query)
-            run_input = input_result.scalar_one_or_none()
-            
-            # Query run_messages for this run
-            run_messages_query = select(RunMessage).where(
-                RunMessage.run_id == run.run_id
-            ).order_by(RunMessage.created_at)
-            
-            run_messages_result = await db.execute(run_messages_query)
-            run_messages = list(run_messages_result.scalars().all())
+            run_input = run.input_data
+            run_messages = run.messages
             
             # Extract team_id and team_name from run FIRST (before processing events)
             # This way events can inherit team info from the run
@@ -432,7 +436,9 @@ async def get_chat_messages_data_by_session(
                     # Session.summary is the primary source for session_summary in this event type
                     if event.event_type == "TeamSessionSummaryCompleted":
                         # Refresh session from database to get latest summary (summary might be updated after event creation)
-                        await db.refresh(session, ["summary", "updated_at", "session_data", "session_state"])
+                        if not session_summary_refreshed:
+                            await db.refresh(session, ["summary", "updated_at", "session_data", "session_state"])
+                            session_summary_refreshed = True
                         
                         # Prefer session_summary from event content if available, otherwise use Session.summary
                         if "session_summary" not in event_data:
@@ -589,15 +595,11 @@ async def get_chat_messages_data_by_session(
             agent_name = run.agent_name
             agent_public_id = None
             
-            if run.agent_id:
-                agent_result = await db.execute(
-                    select(Agent).where(Agent.id == run.agent_id)
-                )
-                agent = agent_result.scalar_one_or_none()
-                if agent:
-                    agent_public_id = str(agent.public_id)
-                    if not agent_name:
-                        agent_name = agent.name
+            agent = agents_by_id.get(run.agent_id)
+            if agent:
+                agent_public_id = str(agent.public_id)
+                if not agent_name:
+                    agent_name = agent.name
             
             # Count messages in this run
             message_count = len(run_messages)
@@ -724,21 +726,10 @@ async def get_chat_messages_data_by_session(
                     "created_at": feedback.created_at.isoformat() if feedback.created_at else None,
                 }
         
-        # Query all run_messages for all runs in this session (once, outside the loop)
-        all_run_messages_map: Dict[str, List[RunMessage]] = {}  # run_id -> list of RunMessage
-        if runs:
-            all_run_ids = [run.run_id for run in runs]
-            all_run_messages_query = select(RunMessage).where(
-                RunMessage.run_id.in_(all_run_ids)
-            )
-            all_run_messages_result = await db.execute(all_run_messages_query)
-            all_run_messages = list(all_run_messages_result.scalars().all())
-            
-            # Group by run_id
-            for run_msg in all_run_messages:
-                if run_msg.run_id not in all_run_messages_map:
-                    all_run_messages_map[run_msg.run_id] = []
-                all_run_messages_map[run_msg.run_id].append(run_msg)
+        # run_id -> list of RunMessage (already loaded with the runs)
+        all_run_messages_map: Dict[str, List[RunMessage]] = {
+            run.run_id: list(run.messages) for run in runs if run.messages
+        }
         
         # Build message payloads
         for msg in all_messages:
@@ -747,14 +738,10 @@ async def get_chat_messages_data_by_session(
             agent_name = None
             agent_public_id = None
             
-            if msg.agent_id:
-                agent_result = await db.execute(
-                    select(Agent).where(Agent.id == msg.agent_id)
-                )
-                agent = agent_result.scalar_one_or_none()
-                if agent:
-                    agent_public_id = str(agent.public_id)
-                    agent_name = agent.name
+            agent = agents_by_id.get(msg.agent_id)
+            if agent:
+                agent_public_id = str(agent.public_id)
+                agent_name = agent.name
             
             # Extract attachments from message
             attachments = []
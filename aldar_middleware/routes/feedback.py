@@ -1,10 +1,9 @@
 """Feedback API routes."""
 
-import csv
-import io
 import logging
-from datetime import datetime
-from typing import Optional
+import uuid
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Sequence
 
 from fastapi import (
     APIRouter,
@@ -13,15 +12,17 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Request,
     UploadFile,
     status,
 )
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from aldar_middleware.auth.dependencies import get_current_user
-from aldar_middleware.database.base import get_db
-from aldar_middleware.models.feedback import FeedbackEntityType, FeedbackRating
+from aldar_middleware.database.base import get_db, get_read_db
+from aldar_middleware.models.feedback import FeedbackData, FeedbackEntityType, FeedbackFile, FeedbackRating
 from aldar_middleware.models.user import User
 from aldar_middleware.schemas.feedback import (
     FeedbackCreateRequest,
@@ -41,7 +42,10 @@ from aldar_middleware.monitoring.prometheus import (
 from aldar_middleware.orchestration.blob_storage import BlobStorageService
 from aldar_middleware.services.feedback_analytics import FeedbackAnalyticsService
 from aldar_middleware.services.feedback_service import FeedbackService
+from aldar_middleware.services.postgres_logs_service import postgres_logs_service
 from aldar_middleware.settings.context import get_correlation_id
+from aldar_middleware.utils.csv_export import CSVExport, csv_export_response
+from aldar_middleware.utils.pagination import InvalidCursorError
 
 logger = logging.getLogger(__name__)
 
@@ -569,6 +573,8 @@ async def list_feedback(
     limit: int = Query(20, ge=1, le=100),
     sort_by: Optional[str] = Query(None, description="Sort by field: user_email, user_full_name, date, comment"),
     sort_order: Optional[str] = Query("DESC", description="Sort order: ASC or DESC"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor; takes precedence over page"),
+    include_total: bool = Query(True, description="Set to false to skip counting matching feedback"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> PaginatedResponse[FeedbackResponse]:
@@ -589,7 +595,7 @@ async def list_feedback(
         # If not admin, filter to user's own feedback
         filter_user_id = None if is_admin else user_id
         
-        feedback_list, total = await feedback_service.list_feedback(
+        feedback_list, total, next_cursor = await feedback_service.list_feedback(
             user_id=filter_user_id,
             entity_type=entity_type,
             entity_id=entity_id,
@@ -603,6 +609,8 @@ async def list_feedback(
             exclude_user_id=is_admin,
             sort_by=sort_by,
             sort_order=sort_order,
+            cursor=cursor,
+            include_total=include_total,
         )
 
         # Fetch agent information for feedback items
@@ -910,7 +918,9 @@ async def list_feedback(
             feedback_responses.append(FeedbackResponse(**feedback_dict))
 
         # Total count is already calculated correctly in the service with search filters applied
-        total_pages = (total + limit - 1) // limit if total > 0 else 0
+        total_pages = None
+        if total is not None:
+            total_pages = (total + limit - 1) // limit if total > 0 else 0
 
         return PaginatedResponse(
             items=feedback_responses,
@@ -918,8 +928,11 @@ async def list_feedback(
             page=page,
             limit=limit,
             total_pages=total_pages,
+            next_cursor=next_cursor,
         )
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
     except Exception as e:
         logger.error(
             f"Failed to list feedback: {str(e)}",
@@ -1018,7 +1031,7 @@ async def get_analytics_summary(
     entity_type: Optional[FeedbackEntityType] = Query(None),
     agent_id: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> FeedbackAnalyticsSummary:
     """
     Get feedback analytics summary.
@@ -1073,7 +1086,7 @@ async def get_feedback_trends(
     days_back: int = Query(7, ge=1, le=90),
     entity_type: Optional[FeedbackEntityType] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> list[FeedbackTrendsResponse]:
     """
     Get feedback trends over time.
@@ -1117,6 +1130,51 @@ async def get_feedback_trends(
         )
 
 
+FEEDBACK_CSV_FIELDS = [
+    "feedback_id",
+    "user_id",
+    "user_email",
+    "entity_id",
+    "entity_type",
+    "agent_id",
+    "rating",
+    "comment",
+    "file_count",
+    "correlation_id",
+    "created_at",
+    "updated_at",
+]
+
+
+async def _feedback_csv_rows(db: AsyncSession, feedback_list: Sequence[FeedbackData]) -> List[dict]:
+    """Render a batch of feedback as CSV rows, counting their files in one query."""
+    file_counts_result = await db.execute(
+        select(FeedbackFile.feedback_id, func.count())
+        .where(FeedbackFile.feedback_id.in_([feedback.feedback_id for feedback in feedback_list]))
+        .group_by(FeedbackFile.feedback_id)
+    )
+    file_counts = dict(file_counts_result.all())
+
+    return [
+        {
+            "feedback_id": str(feedback.feedback_id),
+            "user_id": feedback.user_id,
+            "user_email": feedback.user_email or "",
+            "entity_id": feedback.entity_id,
+            "entity_type": feedback.entity_type.value,
+            "agent_id": feedback.agent_id or "",
+            "rating": feedback.rating.value,
+            # Fallback: export feedback_id in comment when original comment is missing
+            "comment": ((feedback.comment or str(feedback.feedback_id)) or "").replace("\n", " "),
+            "file_count": file_counts.get(feedback.feedback_id, 0),
+            "correlation_id": feedback.correlation_id or "",
+            "created_at": feedback.created_at.isoformat(),
+            "updated_at": feedback.updated_at.isoformat(),
+        }
+        for feedback in feedback_list
+    ]
+
+
 @router.get(
     "/export/csv",
     responses={
@@ -1124,6 +1182,7 @@ async def get_feedback_trends(
     },
 )
 async def export_feedback_csv(
+    request: Request,
     entity_type: Optional[FeedbackEntityType] = Query(None),
     entity_id: Optional[str] = Query(None),
     agent_id: Optional[str] = Query(None),
@@ -1134,7 +1193,7 @@ async def export_feedback_csv(
     sort_order: Optional[str] = Query("DESC", description="Sort order: ASC or DESC"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-) -> Response:
+) -> StreamingResponse:
     """
     Export feedback as CSV.
     
@@ -1152,7 +1211,7 @@ async def export_feedback_csv(
         # If not admin, filter to user's own feedback
         filter_user_id = None if is_admin else user_id
         
-        feedback_list, _ = await feedback_service.list_feedback(
+        query = feedback_service.export_query(
             user_id=filter_user_id,
             entity_type=entity_type,
             entity_id=entity_id,
@@ -1160,65 +1219,99 @@ async def export_feedback_csv(
             rating=rating,
             date_from=date_from,
             date_to=date_to,
-            page=1,
-            limit=10000,
             exclude_user_id=is_admin,
             sort_by=sort_by,
             sort_order=sort_order,
         )
 
-        # Create CSV
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=[
-                "feedback_id",
-                "user_id",
-                "user_email",
-                "entity_id",
-                "entity_type",
-                "agent_id",
-                "rating",
-                "comment",
-                "file_count",
-                "correlation_id",
-                "created_at",
-                "updated_at",
-            ],
-        )
+        filters = {
+            "entity_type": entity_type.value if entity_type else None,
+            "entity_id": entity_id,
+            "agent_id": agent_id,
+            "rating": rating.value if rating else None,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+        }
+
+        async def write_export_log(
+            export_db: AsyncSession, log_action_type: str, log_level: str, message: str, **details: Any
+        ) -> None:
+            # Only admin exports (all users' feedback) go to the admin audit log
+            if not is_admin:
+                return
+            try:
+                admin_log_data = {
+                    "id": str(uuid.uuid4()),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "level": log_level,
+                    "action_type": log_action_type,
+                    "user_id": user_id,
+                    "email": current_user.email,
+                    "username": current_user.username or current_user.email,
+                    "correlation_id": correlation_id or str(uuid.uuid4()),
+                    "module": "feedback",
+                    "function": "export_feedback_csv",
+                    "message": message,
+                    "log_data": {
+                        "action_type": log_action_type,
+                        "filters": filters,
+                        **details,
+                    }
+                }
+
+                await postgres_logs_service.write_admin_log(export_db, admin_log_data)
+            except Exception as e:
+                logger.error(f"Failed to write admin log for feedback export: {e}", exc_info=True)
 
-        csv_writer.writeheader()
-        for feedback in feedback_list:
-            csv_writer.writerow({
-                "feedback_id": str(feedback.feedback_id),
-                "user_id": feedback.user_id,
-                "user_email": feedback.user_email or "",
-                "entity_id": feedback.entity_id,
-                "entity_type": feedback.entity_type.value,
-                "agent_id": feedback.agent_id or "",
-                "rating": feedback.rating.value,
-                # Fallback: export feedback_id in comment when original comment is missing
-                "comment": ((feedback.comment or str(feedback.feedback_id)) or "").replace("\n", " "),
-                "file_count": len(feedback.files),
-                "correlation_id": feedback.correlation_id or "",
-                "created_at": feedback.created_at.isoformat(),
-                "updated_at": feedback.updated_at.isoformat(),
-            })
-
-        csv_data = csv_buffer.getvalue()
+        # Log admin action: ADMIN_FEEDBACK_EXPORTED, before any row is sent
+        async def log_export(export_db: AsyncSession) -> None:
+            await write_export_log(
+                export_db, "ADMIN_FEEDBACK_EXPORTED", "INFO", "Feedback export started", status="started"
+            )
 
-        logger.info(
-            "Feedback exported as CSV",
-            extra={
-                "correlation_id": correlation_id,
-                "row_count": len(feedback_list),
-            },
-        )
+        async def log_export_completed(export_db: AsyncSession, row_count: int) -> None:
+            logger.info(
+                "Feedback exported as CSV",
+                extra={
+                    "correlation_id": correlation_id,
+                    "row_count": row_count,
+                },
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_FEEDBACK_EXPORT_COMPLETED",
+                "INFO",
+                f"Feedback exported as CSV: {row_count} rows",
+                status="completed",
+                row_count=row_count,
+            )
+
+        async def log_export_failed(export_db: AsyncSession, row_count: int, error: BaseException) -> None:
+            logger.error(
+                f"Feedback export failed after {row_count} rows: {error!r}",
+                extra={"correlation_id": correlation_id},
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_FEEDBACK_EXPORT_FAILED",
+                "ERROR",
+                f"Feedback export failed after {row_count} rows",
+                status="failed",
+                row_count=row_count,
+                error=repr(error),
+            )
 
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=feedback.csv"},
+        return csv_export_response(
+            CSVExport(
+                query=query,
+                fieldnames=FEEDBACK_CSV_FIELDS,
+                render_batch=_feedback_csv_rows,
+                filename="feedback.csv",
+                on_start=log_export,
+                on_complete=log_export_completed,
+                on_failure=log_export_failed,
+            ),
+            request,
         )
 
     except Exception as e:
@@ -627,10 +627,11 @@ async def toggle_agent_pin(
     await db.commit()
     await db.refresh(user_pin)
 
-    # Invalidate cached /api/v1/agent/available responses so pin state is fresh
+    # Drop this user's overlay of cached /api/v1/agent/available responses so pin
+    # state is fresh; other users' entries and the shared catalog stay cached
     cache = get_agent_available_cache()
     if cache:
-        await cache.invalidate_all()
+        await cache.invalidate_user(str(user.id))
     
     return {"message": f"Agent {'pinned' if pin_request.is_pinned else 'unpinned'} successfully"}
 
@@ -15,7 +15,8 @@ from aldar_middleware.models import (
     TraceStatusType,
     User,
 )
-from aldar_middleware.auth.dependencies import get_current_user_id
+from aldar_middleware.auth.dependencies import get_current_admin_user, get_current_user_id
+from aldar_middleware.monitoring.database_tracing import get_database_tracer
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -59,6 +60,37 @@ class RequestResponseAuditResponse(BaseModel):
     created_at: str
 
 
+class HotStatementCaller(BaseModel):
+    """Sampled caller of a statement fingerprint."""
+    caller: str
+    count: int
+
+
+class HotStatementResponse(BaseModel):
+    """Response model for one statement fingerprint aggregate."""
+    fingerprint: str
+    query_type: str
+    calls: int
+    errors: int
+    slow_calls: int
+    rows: int
+    total_ms: float
+    mean_ms: float
+    p95_ms: float
+    max_ms: float
+    callers: List[HotStatementCaller]
+
+
+class HotStatementsResponse(BaseModel):
+    """Response model for the hot statements report."""
+    since: float
+    fingerprints: int
+    calls: int
+    errors: int
+    total_ms: float
+    statements: List[HotStatementResponse]
+
+
 class DatabaseQueryTraceResponse(BaseModel):
     """Response model for database query trace."""
     id: str
@@ -403,4 +435,38 @@ async def get_slow_queries(
         ]
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving slow queries: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving slow queries: {str(e)}")
+
+
+@router.get("/hot-statements", response_model=HotStatementsResponse)
+async def get_hot_statements(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total_time", description="total_time, calls, mean_time, max_time or errors"),
+    current_user: User = Depends(get_current_admin_user),
+) -> HotStatementsResponse:
+    """Get the most expensive SQL statement fingerprints in this process (admin only).
+    
+    Aggregates are kept in memory per worker process since start or the last reset.
+    
+    Args:
+        limit: Number of fingerprints to return
+        order_by: Ranking key
+        current_user: Current admin user
+        
+    Returns:
+        Totals and the top statement fingerprints
+    """
+    tracer = get_database_tracer()
+    try:
+        statements = tracer.hot_statements(limit=limit, order_by=order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return HotStatementsResponse(**tracer.summary(), statements=statements)
+
+
+@router.delete("/hot-statements", status_code=204)
+async def reset_hot_statements(
+    current_user: User = Depends(get_current_admin_user),
+) -> None:
+    """Reset the in-memory statement aggregates of this process (admin only)."""
+    get_database_tracer().reset()
@@ -3,7 +3,6 @@
 import logging
 from datetime import datetime
 from typing import Optional, Dict, Any
-from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,7 +17,9 @@ from aldar_middleware.models.agent_tags import AgentTag
 from aldar_middleware.models.agent_configuration import AgentConfiguration
 from aldar_middleware.models.attachment import Attachment
 from aldar_middleware.auth.dependencies import get_current_user
+from aldar_middleware.models.rbac import RBACAgentPivot
 from aldar_middleware.services.rbac_pivot_service import RBACPivotService
+from aldar_middleware.services.login_enrichment import membership_hash
 from aldar_middleware.utils.helpers import is_uuid, resolve_attachment_data
 from aldar_middleware.services.agent_available_cache import get_agent_available_cache
 from aldar_middleware.schemas.admin_agents import (
@@ -106,7 +107,7 @@ async def _get_custom_features(db: AsyncSession, agent_id: int) -> dict:
     }
 
 
-async def _build_user_agent_response(db: AsyncSession, agent: Agent, agent_data: dict, is_pinned: bool = False, last_used: Optional[datetime] = None) -> UserAvailableAgentResponse:
+async def _build_user_agent_response(db: AsyncSession, agent: Optional[Agent], agent_data: dict, is_pinned: bool = False, last_used: Optional[datetime] = None) -> UserAvailableAgentResponse:
     """Build user-facing agent response."""
     # Use pre-extracted agent data to avoid SQLAlchemy lazy loading issues
     # Use public_id as the primary agent_id for the response
@@ -229,6 +230,244 @@ async def _build_user_agent_response(db: AsyncSession, agent: Agent, agent_data:
     )
 
 
+def _is_user_agent(agent_data: Dict[str, Any]) -> bool:
+    """Whether an agent is a user agent (access via UserAgentAccess) rather than an enterprise agent (RBAC)."""
+    if agent_data["category"] == "user_agents":
+        return True
+    return bool(agent_data["legacy_tags"]) and "user_agents" in agent_data["legacy_tags"]
+
+
+async def _load_catalog_page(
+    db: AsyncSession,
+    category: Optional[str],
+    limit: int,
+    offset: int
+) -> Dict[str, Any]:
+    """
+    Load a page of the agent catalog, independent of the requesting user.
+
+    Agent entries are built with pin and last-used fields at their defaults;
+    the user's values are applied by :func:`_assemble_available_agents`.
+    The result is JSON-serializable so it can be cached as is.
+    """
+    # Start with query for enabled agents with ACTIVE status
+    # Includes both enterprise agents and ACTIVE user agents
+    # Excludes DRAFT agents and any non-ACTIVE status agents
+    # Excludes soft-deleted agents
+    query = select(Agent).where(
+        and_(
+            Agent.is_enabled == True,
+            Agent.is_deleted == False,
+            or_(
+                Agent.status.ilike('active'),  # Case-insensitive match for 'active'
+                Agent.status.is_(None)  # Include NULL status for backward compatibility
+            )
+        )
+    )
+
+    # Apply category filter if provided
+    if category:
+        try:
+            # Try to filter by agent_tags table
+            query = query.join(AgentTag).where(
+                and_(
+                    AgentTag.tag == category,
+                    AgentTag.tag_type == "category",
+                    AgentTag.is_active == True
+                )
+            )
+        except Exception:
+            # Fallback to legacy category field
+            query = query.where(Agent.category == category)
+
+    # Get total count
+    count_query = select(func.count()).select_from(query.subquery())
+    total_result = await db.execute(count_query)
+    total_count = total_result.scalar()
+
+    # Apply pagination
+    query = query.order_by(Agent.created_at.desc()).offset(offset).limit(limit + 1)
+
+    result = await db.execute(query)
+    agents = result.scalars().all()
+
+    has_more = len(agents) > limit
+    if has_more:
+        agents = agents[:limit]
+
+    # Extract all agent data immediately to avoid SQLAlchemy lazy loading issues
+    # after potential rollbacks
+    agent_data_list = [
+        {
+            "id": agent.id,
+            "public_id": str(agent.public_id),
+            "agent_id": agent.agent_id,  # Legacy UUID string field for user agents
+            "name": agent.name,
+            "intro": agent.intro,
+            "icon": agent.icon,
+            "legacy_tags": agent.legacy_tags,
+            "category": agent.category,
+        }
+        for agent in agents
+    ]
+
+    entries = []
+    for agent_data in agent_data_list:
+        agent_response = await _build_user_agent_response(db, None, agent_data)
+        entries.append({
+            "id": agent_data["id"],
+            "name": agent_data["name"],
+            "is_user_agent": _is_user_agent(agent_data),
+            "response": agent_response.model_dump(mode='json'),
+        })
+
+    # Get total enabled agents count for user permissions (exclude drafted agents)
+    total_enabled_query = select(func.count()).select_from(Agent).where(
+        and_(
+            Agent.is_enabled == True,
+            or_(
+                Agent.status.ilike('active'),
+                Agent.status.is_(None)
+            )
+        )
+    )
+    total_enabled_result = await db.execute(total_enabled_query)
+
+    return {
+        "agents": entries,
+        "total_count": total_count,
+        "has_more": has_more,
+        "total_enabled_agents": total_enabled_result.scalar(),
+    }
+
+
+async def _load_user_overlay(db: AsyncSession, user: User) -> Dict[str, Any]:
+    """
+    Load the per-user data of the available agents list.
+
+    Covers all of the user's agents rather than one page, so a single overlay
+    serves every page and category.
+    """
+    # Get user pinning information
+    pin_result = await db.execute(
+        select(UserAgentPin.agent_id, UserAgentPin.is_pinned)
+        .where(UserAgentPin.user_id == user.id)
+    )
+    pins = {str(row.agent_id): bool(row.is_pinned) for row in pin_result.all()}
+
+    # Get user-specific last_used from Session table
+    # Query the most recent session for each agent the user has used
+    session_result = await db.execute(
+        select(
+            Session.agent_id,
+            func.max(
+                func.coalesce(
+                    Session.last_message_interaction_at,
+                    Session.updated_at,
+                    Session.created_at
+                )
+            ).label('last_used')
+        )
+        .where(
+            and_(
+                Session.user_id == user.id,
+                Session.deleted_at.is_(None)  # Exclude soft-deleted sessions
+            )
+        )
+        .group_by(Session.agent_id)
+    )
+    last_used = {
+        str(row.agent_id): row.last_used.isoformat()
+        for row in session_result.all()
+        if row.last_used is not None
+    }
+
+    # Get user agent access IDs (for user_agents category)
+    from aldar_middleware.models.user_agent_access import UserAgentAccess
+    access_result = await db.execute(
+        select(UserAgentAccess.agent_id)
+        .where(
+            and_(
+                UserAgentAccess.user_id == user.id,
+                UserAgentAccess.is_active == True
+            )
+        )
+    )
+
+    # Get user's AD groups for RBAC (use email as primary identifier)
+    user_email = user.email or user.username
+    groups = await RBACPivotService(db).get_user_ad_groups(user_email) if user_email else []
+
+    return {
+        "pins": pins,
+        "last_used": last_used,
+        "user_agent_access": sorted({row.agent_id for row in access_result.all()}),
+        "groups_fingerprint": membership_hash(groups) if groups else None,
+    }
+
+
+async def _load_rbac_access(db: AsyncSession, user_groups: list, agent_names: list) -> list:
+    """
+    Get which enterprise agents of a page a set of AD groups can access.
+
+    Access is granted when the user's groups and the agent's groups intersect
+    (see ``RBACPivotService.check_user_has_access_to_agent``); the result only
+    depends on the groups, so it is shared by users with the same memberships.
+    """
+    user_groups = set(user_groups)
+    if not user_groups or not agent_names:
+        return []
+
+    result = await db.execute(
+        select(RBACAgentPivot.agent_name, RBACAgentPivot.azure_ad_groups)
+        .where(RBACAgentPivot.agent_name.in_(agent_names))
+    )
+    return sorted(
+        row.agent_name
+        for row in result.all()
+        if user_groups & set(row.azure_ad_groups or [])
+    )
+
+
+def _assemble_available_agents(
+    page: Dict[str, Any],
+    overlay: Dict[str, Any],
+    accessible_agent_names: list
+) -> UserAvailableAgentsResponse:
+    """Combine a catalog page, the user's RBAC access and the user's overlay into a response."""
+    user_agent_access = set(overlay["user_agent_access"])
+    accessible_agent_names = set(accessible_agent_names)
+
+    agent_responses = []
+    for entry in page["agents"]:
+        if entry["is_user_agent"]:
+            # For user agents, check UserAgentAccess table
+            has_access = entry["id"] in user_agent_access
+        else:
+            # For enterprise agents, use RBAC (Azure AD groups)
+            has_access = entry["name"] in accessible_agent_names
+
+        # Only include agents the user has access to
+        if has_access:
+            agent_id = str(entry["id"])
+            agent_responses.append(UserAvailableAgentResponse(**{
+                **entry["response"],
+                "is_pinned": overlay["pins"].get(agent_id, False),
+                "lastUsed": overlay["last_used"].get(agent_id),
+            }))
+
+    return UserAvailableAgentsResponse(
+        success=bool(agent_responses),
+        agents=agent_responses,
+        total_count=page["total_count"] if agent_responses else 0,
+        has_more=page["has_more"] if agent_responses else False,
+        user_permissions={
+            "accessible_agents_count": len(agent_responses),
+            "total_enabled_agents": page["total_enabled_agents"]
+        }
+    )
+
+
 @router.get("/available", response_model=UserAvailableAgentsResponse)
 async def get_available_agents(
     category: Optional[str] = Query(None, description="Filter by category"),
@@ -246,278 +485,48 @@ async def get_available_agents(
     - Excludes user agents (category='user_agents') - user agents are not shown here
     - Filters agents based on user's assigned permissions/roles via Azure AD RBAC
     - Does not expose sensitive admin fields
+
+    The response is assembled from the layers of ``AgentAvailableCache``: the
+    shared catalog page, the RBAC access of the user's group fingerprint and
+    the user's own overlay. Each layer is loaded from the database on a miss.
     """
+    user_id = str(current_user.id)
     try:
-        # Try cache first
-        if cache:
-            cached_response = await cache.get_cached_response(
-                user_id=str(current_user.id),
-                category=category,
-                limit=limit,
-                offset=offset
-            )
-            if cached_response:
-                # Defensive stale-cache check: ensure cached agents are not soft-deleted
-                # This handles cases where cache was populated before invalidation logic.
-                try:
-                    cached_agents = cached_response.get("agents", [])
-                    cached_public_ids = []
-                    for cached_agent in cached_agents:
-                        cached_agent_id = cached_agent.get("agent_id")
-                        if cached_agent_id and is_uuid(cached_agent_id):
-                            cached_public_ids.append(UUID(cached_agent_id))
-
-                    if cached_public_ids:
-                        deleted_count_result = await db.execute(
-                            select(func.count()).select_from(Agent).where(
-                                and_(
-                                    Agent.public_id.in_(cached_public_ids),
-                                    Agent.is_deleted == True,
-                                )
-                            )
-                        )
-                        deleted_count = deleted_count_result.scalar() or 0
-                        if deleted_count > 0:
-                            logger.info(
-                                f"Cache STALE: agent_available for user {current_user.id} contains {deleted_count} deleted agents; rebuilding"
-                            )
-                            cached_response = None
-                except Exception as e:
-                    logger.warning(f"Failed cache stale-check for user {current_user.id}: {e}")
-
-            if cached_response:
-                logger.info(f"Cache HIT: agent_available for user {current_user.id}")
-                return UserAvailableAgentsResponse(**cached_response)
-            logger.info(f"Cache MISS: agent_available for user {current_user.id}")
-
-        # Start with query for enabled agents with ACTIVE status
-        # Includes both enterprise agents and ACTIVE user agents
-        # Excludes DRAFT agents and any non-ACTIVE status agents
-        # Excludes soft-deleted agents
-        query = select(Agent).where(
-            and_(
-                Agent.is_enabled == True,
-                Agent.is_deleted == False,
-                or_(
-                    Agent.status.ilike('active'),  # Case-insensitive match for 'active'
-                    Agent.status.is_(None)  # Include NULL status for backward compatibility
-                )
-            )
-        )
-        
-        # Apply category filter if provided
-        if category:
-            try:
-                # Try to filter by agent_tags table
-                from aldar_middleware.models.agent_tags import AgentTag
-                query = query.join(AgentTag).where(
-                    and_(
-                        AgentTag.tag == category,
-                        AgentTag.tag_type == "category",
-                        AgentTag.is_active == True
-                    )
-                )
-            except Exception:
-                # Fallback to legacy category field
-                query = query.where(Agent.category == category)
-        
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total_count = total_result.scalar()
-        
-        # Apply pagination
-        query = query.order_by(Agent.created_at.desc()).offset(offset).limit(limit + 1)
-        
-        result = await db.execute(query)
-        agents = result.scalars().all()
-        
-        has_more = len(agents) > limit
-        if has_more:
-            agents = agents[:limit]
-        
-        # Extract all agent data immediately to avoid SQLAlchemy lazy loading issues
-        # after potential rollbacks
-        agent_data_list = []
-        for agent in agents:
-            # Extract all fields we need immediately while agent object is still valid
-            agent_data = {
-                "id": agent.id,
-                "public_id": str(agent.public_id),
-                "agent_id": agent.agent_id,  # Legacy UUID string field for user agents
-                "name": agent.name,
-                "intro": agent.intro,
-                "icon": agent.icon,
-                "legacy_tags": agent.legacy_tags,
-                "category": agent.category,
-            }
-            agent_data_list.append((agent, agent_data))
-        
-        # Get user pinning information
-        user_pins = {}
-        user_last_used = {}
-        if agent_data_list:
-            agent_ids = [agent_data["id"] for _, agent_data in agent_data_list]
-            pin_result = await db.execute(
-                select(UserAgentPin)
-                .where(
-                    and_(
-                        UserAgentPin.user_id == current_user.id,
-                        UserAgentPin.agent_id.in_(agent_ids)
-                    )
-                )
-            )
-            user_pins = {pin.agent_id: pin for pin in pin_result.scalars().all()}
-            
-            # Get user-specific last_used from Session table
-            # Query the most recent session for each agent-user combination
-            session_result = await db.execute(
-                select(
-                    Session.agent_id,
-                    func.max(
-                        func.coalesce(
-                            Session.last_message_interaction_at,
-                            Session.updated_at,
-                            Session.created_at
-                        )
-                    ).label('last_used')
-                )
-                .where(
-                    and_(
-                        Session.user_id == current_user.id,
-                        Session.agent_id.in_(agent_ids),
-                        Session.deleted_at.is_(None)  # Exclude soft-deleted sessions
-                    )
-                )
-                .group_by(Session.agent_id)
-            )
-            user_last_used = {row.agent_id: row.last_used for row in session_result.all()}
-        
-        # Build responses with RBAC access checking (enterprise agents only)
-        # Note: User agents are already filtered out at the query level
-        agent_responses = []
-        pivot_service = RBACPivotService(db)
-        
-        # Get user's email for RBAC check (use email as primary identifier)
-        user_email = current_user.email or current_user.username
-        
-        # Get user agent access IDs (for user_agents category)
-        from aldar_middleware.models.user_agent_access import UserAgentAccess
-        user_agent_ids = [agent_data["id"] for _, agent_data in agent_data_list]
-        user_agent_access_result = await db.execute(
-            select(UserAgentAccess.agent_id)
-            .where(
-                and_(
-                    UserAgentAccess.user_id == current_user.id,
-                    UserAgentAccess.agent_id.in_(user_agent_ids),
-                    UserAgentAccess.is_active == True
-                )
-            )
-        )
-        user_agent_access_ids = {row.agent_id for row in user_agent_access_result.all()}
-        
-        for agent, agent_data in agent_data_list:
-            has_access = False
-            
-            # Check if this is a user agent
-            is_user_agent = agent_data["category"] == "user_agents"
-            if not is_user_agent and agent_data["legacy_tags"]:
-                is_user_agent = "user_agents" in agent_data["legacy_tags"]
-            
-            if is_user_agent:
-                # For user agents, check UserAgentAccess table
-                has_access = agent_data["id"] in user_agent_access_ids
-            else:
-                # For enterprise agents, use RBAC (Azure AD groups)
-                if user_email:
-                    try:
-                        has_access = await pivot_service.check_user_has_access_to_agent(
-                            user_email, 
-                            agent.name
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"Error checking RBAC access for user '{user_email}' to agent '{agent.name}': {e}"
-                        )
-                        # If RBAC check fails, deny access by default
-                        has_access = False
-            
-            # Only include agents the user has access to
-            if has_access:
-                # Get pin status for this agent
-                user_pin = user_pins.get(agent_data["id"])
-                is_pinned = user_pin.is_pinned if user_pin else False
-                
-                # Get user-specific last_used for this agent
-                user_specific_last_used = user_last_used.get(agent_data["id"])
-                
-                agent_response = await _build_user_agent_response(db, agent, agent_data, is_pinned, user_specific_last_used)
-                agent_responses.append(agent_response)
-        
-        # Get total enabled agents count for user permissions (exclude drafted agents)
-        total_enabled_query = select(func.count()).select_from(Agent).where(
-            and_(
-                Agent.is_enabled == True,
-                or_(
-                    Agent.status.ilike('active'),
-                    Agent.status.is_(None)
-                )
-            )
-        )
-        total_enabled_result = await db.execute(total_enabled_query)
-        total_enabled_agents = total_enabled_result.scalar()
-        
-        if not agent_responses:
-            response = UserAvailableAgentsResponse(
-                success=False,
-                agents=[],
-                total_count=0,
-                has_more=False,
-                user_permissions={
-                    "accessible_agents_count": 0,
-                    "total_enabled_agents": total_enabled_agents
-                }
-            )
-            # Cache the empty response
+        version = await cache.get_current_version() if cache else 1
+
+        page = await cache.get_base(version, category, limit, offset) if cache else None
+        if page is None:
+            page = await _load_catalog_page(db, category, limit, offset)
             if cache:
-                response_dict = response.model_dump(mode='json')
-                await cache.set_cached_response(
-                    user_id=str(current_user.id),
-                    category=category,
-                    limit=limit,
-                    offset=offset,
-                    response_data=response_dict,
-                    ttl=900  # 15 minutes
+                await cache.set_base(version, category, limit, offset, page)
+
+        overlay = await cache.get_user_overlay(version, user_id) if cache else None
+        if overlay is None:
+            overlay = await _load_user_overlay(db, current_user)
+            if cache:
+                await cache.set_user_overlay(version, user_id, overlay)
+
+        fingerprint = overlay["groups_fingerprint"]
+        accessible = None
+        if fingerprint is None:
+            # No AD groups: no enterprise agent is accessible
+            accessible = []
+        elif cache:
+            accessible = await cache.get_rbac_access(version, fingerprint, category, limit, offset)
+        if accessible is None:
+            # Key the result by the groups it was computed from, which may be
+            # newer than the overlay's fingerprint
+            user_email = current_user.email or current_user.username
+            user_groups = await RBACPivotService(db).get_user_ad_groups(user_email) if user_email else []
+            enterprise_names = [entry["name"] for entry in page["agents"] if not entry["is_user_agent"]]
+            accessible = await _load_rbac_access(db, user_groups, enterprise_names)
+            if cache and user_groups:
+                await cache.set_rbac_access(
+                    version, membership_hash(user_groups), category, limit, offset, accessible
                 )
-                logger.info(f"Cache SET: agent_available for user {current_user.id} (empty response)")
-            return response
-        
-        response = UserAvailableAgentsResponse(
-            success=True,
-            agents=agent_responses,
-            total_count=total_count,
-            has_more=has_more,
-            user_permissions={
-                "accessible_agents_count": len(agent_responses),
-                "total_enabled_agents": total_enabled_agents
-            }
-        )
 
-        # Cache the response
-        if cache:
-            response_dict = response.model_dump(mode='json')
-            await cache.set_cached_response(
-                user_id=str(current_user.id),
-                category=category,
-                limit=limit,
-                offset=offset,
-                response_data=response_dict,
-                ttl=900  # 15 minutes
-            )
-            logger.info(f"Cache SET: agent_available for user {current_user.id}")
+        return _assemble_available_agents(page, overlay, accessible)
 
-        return response
-        
     except Exception as e:
         logger.error(f"Failed to get available agents: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -1,20 +1,19 @@
 """User-facing logs API routes."""
 
-import csv
-import io
 import json
 import logging
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
 from datetime import datetime, timezone
 from uuid import UUID as UUIDType
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
+from sqlalchemy import or_, select, text
 
-from aldar_middleware.database.base import get_db
+from aldar_middleware.database.base import get_db, get_read_db
+from aldar_middleware.models.logs import UserLog
 from aldar_middleware.models.user import User
 from aldar_middleware.models.sessions import Session
 from aldar_middleware.models.messages import Message
@@ -32,6 +31,7 @@ from aldar_middleware.services.postgres_logs_service import postgres_logs_servic
 from aldar_middleware.schemas.feedback import PaginatedResponse
 from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id
+from aldar_middleware.utils.csv_export import CSVExport, csv_export_response
 
 logger = logging.getLogger(__name__)
 
@@ -659,8 +659,10 @@ async def query_user_logs(
     offset: Optional[int] = Query(None, ge=0, description="Number of logs to skip (deprecated, use page)"),
     sort_by: Optional[str] = Query(None, description="Sort by field: timestamp, createdAt, eventType, email, name"),
     sort_order: Optional[str] = Query("DESC", description="Sort order: ASC or DESC"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor (takes precedence over page/offset)"),
+    include_total: bool = Query(True, description="Count all matching items; disable for faster deep paging"),
     current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> PaginatedResponse[UserLogEventResponse]:
     """Query user logs in 3.0 format matching Figma design.
     
@@ -701,10 +703,12 @@ async def query_user_logs(
             search=search,
             sort_by=sort_by,
             sort_order=sort_order,
+            cursor=cursor,
+            include_total=include_total,
         )
         
         items = result.get("items", [])
-        total = result.get("total", 0)
+        total = result.get("total")
         
         logger.info(f"Retrieved {len(items)} user log items from dedicated collection (page: {page}, size: {size}, total: {total})")
         
@@ -964,7 +968,9 @@ async def query_user_logs(
             enriched_items.append(enriched_item)
         
         # Calculate pagination
-        total_pages = (total + size - 1) // size if total > 0 and size > 0 else 1
+        total_pages = None
+        if total is not None:
+            total_pages = (total + size - 1) // size if total > 0 and size > 0 else 1
         
         return PaginatedResponse(
             items=enriched_items,
@@ -972,6 +978,8 @@ async def query_user_logs(
             page=page,
             limit=size,
             total_pages=total_pages,
+            total_is_estimate=result.get("total_is_estimate", False),
+            next_cursor=result.get("next_cursor"),
         )
     except ValueError as e:
         raise HTTPException(
@@ -986,412 +994,407 @@ async def query_user_logs(
         ) from e
 
 
-@router.get("/logs/export/csv")
-async def export_user_logs_csv(
-    date_from: Optional[datetime] = Query(None, description="Filter logs from this date (ISO format)"),
-    date_to: Optional[datetime] = Query(None, description="Filter logs to this date (ISO format)"),
-    correlation_id: Optional[str] = Query(None, description="Filter by correlation ID"),
-    event_type: Optional[str] = Query(None, description="Filter by event type"),
-    search: Optional[str] = Query(None, description="Search across name, email, user_id, and log data fields"),
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db),
-) -> Response:
-    """Export user logs as CSV (admin only)."""
-    try:
-        # Query all matching logs (no pagination for export)
-        result = await postgres_logs_service.query_user_logs(
-            db=db,
-            limit=100000,  # Large limit for export
-            offset=0,
-            date_from=date_from,
-            date_to=date_to,
-            correlation_id=correlation_id,
-            event_type=event_type,
-            search=search,
-            sort_by="timestamp",
-            sort_order="DESC",
-        )
-        
-        items = result.get("items", [])
+USER_LOG_CSV_FIELDS = [
+    "ID",
+    "Timestamp",
+    "EventType",
+    "Name",
+    "Email",
+    "Role",
+    "Operation type",
+    "User department",
+    "Agent ID",
+    "agentName",
+    "agentType",
+    "userInput",
+    "conversationId",
+    "messageId",
+    "tokens_used",
+    "processing_time_ms",
+    "correlation_id",
+    "log_data",
+]
+
+
+async def _user_log_csv_rows(db: AsyncSession, logs: Sequence[UserLog]) -> List[Dict[str, Any]]:
+    """Render a batch of user logs as CSV rows, looking up their users in one query."""
+    items = [postgres_logs_service.user_log_to_dict(log) for log in logs]
+
+# Fetch user information for enrichment
+    user_ids_to_fetch = set()
+    emails_to_fetch = set()
+    for item in items:
+        # user_id can be in userId or user_id field
+        user_id = item.get("userId") or item.get("user_id")
+        if user_id:
+            try:
+                UUIDType(user_id)
+                user_ids_to_fetch.add(user_id)
+            except (ValueError, TypeError):
+                pass
         
-        # Fetch user information for enrichment
-        from aldar_middleware.models.user import User as UserModel
-        user_ids_to_fetch = set()
-        emails_to_fetch = set()
-        for item in items:
-            # user_id can be in userId or user_id field
-            user_id = item.get("userId") or item.get("user_id")
-            if user_id:
+        # Also collect emails for lookup
+        email = item.get("email")
+        if email and email != "N/A":
+            emails_to_fetch.add(email)
+    
+    users_map = {}
+    if user_ids_to_fetch or emails_to_fetch:
+        try:
+            user_uuid_ids = []
+            for user_id_str in user_ids_to_fetch:
                 try:
-                    UUIDType(user_id)
-                    user_ids_to_fetch.add(user_id)
+                    user_uuid_ids.append(UUIDType(user_id_str))
                 except (ValueError, TypeError):
                     pass
             
-            # Also collect emails for lookup
-            email = item.get("email")
-            if email and email != "N/A":
-                emails_to_fetch.add(email)
-        
-        users_map = {}
-        if user_ids_to_fetch or emails_to_fetch:
-            try:
-                user_uuid_ids = []
-                for user_id_str in user_ids_to_fetch:
-                    try:
-                        user_uuid_ids.append(UUIDType(user_id_str))
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Build query to fetch users by ID or email
-                user_query = select(UserModel)
-                conditions = []
-                if user_uuid_ids:
-                    conditions.append(UserModel.id.in_(user_uuid_ids))
-                if emails_to_fetch:
-                    conditions.append(UserModel.email.in_(emails_to_fetch))
+            # Build query to fetch users by ID or email
+            user_query = select(User)
+            conditions = []
+            if user_uuid_ids:
+                conditions.append(User.id.in_(user_uuid_ids))
+            if emails_to_fetch:
+                conditions.append(User.email.in_(emails_to_fetch))
+            
+            if conditions:
+                user_query = user_query.where(or_(*conditions))
+                user_result = await db.execute(user_query)
+                users = user_result.scalars().all()
                 
-                if conditions:
-                    from sqlalchemy import or_
-                    user_query = user_query.where(or_(*conditions))
-                    user_result = await db.execute(user_query)
-                    users = user_result.scalars().all()
+                for user in users:
+                    full_name = user.full_name
+                    if not full_name:
+                        if user.azure_display_name:
+                            full_name = user.azure_display_name
+                        elif user.first_name or user.last_name:
+                            full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
                     
-                    for user in users:
-                        full_name = user.full_name
-                        if not full_name:
-                            if user.azure_display_name:
-                                full_name = user.azure_display_name
-                            elif user.first_name or user.last_name:
-                                full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
-                        
-                        profile_photo = None
-                        if user.azure_ad_id:
-                            profile_photo = f"{settings.api_prefix}/auth/users/{user.id}/profile-photo"
-                        
-                        user_info = {
-                            "full_name": full_name,
-                            "department": user.azure_department,
-                            "role": "ADMIN" if user.is_admin else "NORMAL",
-                            "azure_ad_id": user.azure_ad_id,
-                            "email": user.email,
-                            "profile_photo": profile_photo,
-                        }
-                        # Map by both ID and email for easier lookup
-                        users_map[str(user.id)] = user_info
-                        users_map[user.email] = user_info
-            except Exception as e:
-                logger.warning(f"Error fetching user information for logs: {str(e)}")
-        
-        # Create CSV with specific columns as requested
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=[
-                "ID",
-                "Timestamp",
-                "EventType",
-                "Name",
-                "Email",
-                "Role",
-                "Operation type",
-                "User department",
-                "Agent ID",
-                "agentName",
-                "agentType",
-                "userInput",
-                "conversationId",
-                "messageId",
-                "tokens_used",
-                "processing_time_ms",
-                "correlation_id",
-                "log_data",
-            ],
-        )
+                    profile_photo = None
+                    if user.azure_ad_id:
+                        profile_photo = f"{settings.api_prefix}/auth/users/{user.id}/profile-photo"
+                    
+                    user_info = {
+                        "full_name": full_name,
+                        "department": user.azure_department,
+                        "role": "ADMIN" if user.is_admin else "NORMAL",
+                        "azure_ad_id": user.azure_ad_id,
+                        "email": user.email,
+                        "profile_photo": profile_photo,
+                    }
+                    # Map by both ID and email for easier lookup
+                    users_map[str(user.id)] = user_info
+                    users_map[user.email] = user_info
+        except Exception as e:
+            logger.warning(f"Error fetching user information for logs: {str(e)}")
+    
+    rows = []
+    for item in items:
+        # The item structure from query_user_logs has log_data fields at top level
+        # plus id, timestamp, createdAt, eventType fields
+        # log_data JSONB is already merged into the item dict
         
-        # Track if any tokens_used or processing_time_ms are present
-        tokens_used_found = False
-        processing_time_found = False
-        csv_rows = []
-        for item in items:
-            # The item structure from query_user_logs has log_data fields at top level
-            # plus id, timestamp, createdAt, eventType fields
-            # log_data JSONB is already merged into the item dict
-            
-            # Get raw fields
-            item_id = item.get("id") or item.get("_id") or ""
-            created_at = item.get("createdAt") or item.get("timestamp") or ""
-            event_type = item.get("eventType") or item.get("action_type") or ""
+        # Get raw fields
+        item_id = item.get("id") or item.get("_id") or ""
+        created_at = item.get("createdAt") or item.get("timestamp") or ""
+        event_type = item.get("eventType") or item.get("action_type") or ""
 
-            # Get user_id - can be in userId or user_id
-            user_id = item.get("userId") or item.get("user_id")
-            email = item.get("email", "")
+        # Get user_id - can be in userId or user_id
+        user_id = item.get("userId") or item.get("user_id")
+        email = item.get("email", "")
 
-            # Get user info if available - try by user_id first, then by email
-            user_info = {}
-            if user_id and user_id in users_map:
-                user_info = users_map[user_id]
-            elif email and email in users_map:
-                user_info = users_map[email]
+        # Get user info if available - try by user_id first, then by email
+        user_info = {}
+        if user_id and user_id in users_map:
+            user_info = users_map[user_id]
+        elif email and email in users_map:
+            user_info = users_map[email]
 
-            # Extract event payload - check multiple possible locations
-            event_payload = (
-                item.get("eventPayload", {}) or
-                item.get("body", {}) or
-                {}
-            )
+        # Extract event payload - check multiple possible locations
+        event_payload = (
+            item.get("eventPayload", {}) or
+            item.get("body", {}) or
+            {}
+        )
 
-            # agent fields
-            agent = event_payload.get("agent", {})
-            agent_id = None
-            agent_name = None
-            agent_type = None
-            if isinstance(agent, dict):
-                agent_id = agent.get("agentId") or agent.get("agent_id") or agent.get("agent_public_id")
-                agent_name = agent.get("agentName") or agent.get("agent_name")
-                agent_type = agent.get("agentType") or agent.get("agent_type")
-            else:
-                # sometimes agent is present at top level
-                agent_id = event_payload.get("agentId") or event_payload.get("agent_id")
-                agent_name = event_payload.get("agentName") or event_payload.get("agent_name")
-                agent_type = event_payload.get("agentType") or event_payload.get("agent_type")
+        # agent fields
+        agent = event_payload.get("agent", {})
+        agent_id = None
+        agent_name = None
+        agent_type = None
+        if isinstance(agent, dict):
+            agent_id = agent.get("agentId") or agent.get("agent_id") or agent.get("agent_public_id")
+            agent_name = agent.get("agentName") or agent.get("agent_name")
+            agent_type = agent.get("agentType") or agent.get("agent_type")
+        else:
+            # sometimes agent is present at top level
+            agent_id = event_payload.get("agentId") or event_payload.get("agent_id")
+            agent_name = event_payload.get("agentName") or event_payload.get("agent_name")
+            agent_type = event_payload.get("agentType") or event_payload.get("agent_type")
 
-            # userInput and conversationId
-            user_input = (
-                event_payload.get("userInput", "") or
-                event_payload.get("user_input", "") or
-                item.get("userInput", "") or
-                ""
-            )
+        # userInput and conversationId
+        user_input = (
+            event_payload.get("userInput", "") or
+            event_payload.get("user_input", "") or
+            item.get("userInput", "") or
+            ""
+        )
 
-            conversation_id = (
-                event_payload.get("conversationId", "") or
-                event_payload.get("conversation_id", "") or
-                event_payload.get("sessionId", "") or
-                item.get("conversationId", "") or
-                item.get("conversation_id", "") or
-                ""
-            )
+        conversation_id = (
+            event_payload.get("conversationId", "") or
+            event_payload.get("conversation_id", "") or
+            event_payload.get("sessionId", "") or
+            item.get("conversationId", "") or
+            item.get("conversation_id", "") or
+            ""
+        )
 
-            # messageId if present
-            message_id = event_payload.get("messageId") or event_payload.get("message_id") or item.get("messageId") or item.get("message_id") or ""
+        # messageId if present
+        message_id = event_payload.get("messageId") or event_payload.get("message_id") or item.get("messageId") or item.get("message_id") or ""
 
-            # metrics: try multiple locations/fieldnames (eventPayload.metrics, top-level metrics, tokens_used, processing_time_ms, etc.)
-            tokens_used = None
-            processing_time = None
+        # metrics: try multiple locations/fieldnames (eventPayload.metrics, top-level metrics, tokens_used, processing_time_ms, etc.)
+        tokens_used = None
+        processing_time = None
 
-            # Common locations for metrics
-            metrics_candidates = []
-            if isinstance(event_payload, dict):
-                metrics_candidates.append(event_payload.get("metrics"))
-                metrics_candidates.append(event_payload.get("metrics_ms"))
-                metrics_candidates.append(event_payload.get("token_usage"))
-                metrics_candidates.append(event_payload.get("tokens"))
+        # Common locations for metrics
+        metrics_candidates = []
+        if isinstance(event_payload, dict):
+            metrics_candidates.append(event_payload.get("metrics"))
+            metrics_candidates.append(event_payload.get("metrics_ms"))
+            metrics_candidates.append(event_payload.get("token_usage"))
+            metrics_candidates.append(event_payload.get("tokens"))
 
-            # also check top-level item fields
-            metrics_candidates.append(item.get("metrics"))
-            metrics_candidates.append(item.get("log_data", {}).get("metrics") if isinstance(item.get("log_data"), dict) else None)
+        # also check top-level item fields
+        metrics_candidates.append(item.get("metrics"))
+        metrics_candidates.append(item.get("log_data", {}).get("metrics") if isinstance(item.get("log_data"), dict) else None)
 
-            # Walk candidates looking for tokenUsage/used or processingTime
-            for m in metrics_candidates:
-                if not m or not isinstance(m, dict):
-                    continue
-                # tokenUsage shape: {"used": <n>, ...}
-                token_usage = m.get("tokenUsage") or m.get("token_usage") or m.get("tokens") or m.get("tokenCount")
-                if isinstance(token_usage, dict):
-                    if tokens_used is None:
-                        tokens_used = token_usage.get("used") or token_usage.get("count") or token_usage.get("total")
-                else:
-                    # token usage might be a plain number on the metrics object
-                    if tokens_used is None:
-                        tokens_used = m.get("tokens_used") or m.get("tokens") or m.get("token_count")
+        # Walk candidates looking for tokenUsage/used or processingTime
+        for m in metrics_candidates:
+            if not m or not isinstance(m, dict):
+                continue
+            # tokenUsage shape: {"used": <n>, ...}
+            token_usage = m.get("tokenUsage") or m.get("token_usage") or m.get("tokens") or m.get("tokenCount")
+            if isinstance(token_usage, dict):
+                if tokens_used is None:
+                    tokens_used = token_usage.get("used") or token_usage.get("count") or token_usage.get("total")
+            else:
+                # token usage might be a plain number on the metrics object
+                if tokens_used is None:
+                    tokens_used = m.get("tokens_used") or m.get("tokens") or m.get("token_count")
 
-                # processing time may be stored as processingTime (ms), processing_time_ms, or processingTimeMs
-                if processing_time is None:
-                    processing_time = m.get("processingTime") or m.get("processing_time_ms") or m.get("processingTimeMs") or m.get("processing_time")
+            # processing time may be stored as processingTime (ms), processing_time_ms, or processingTimeMs
+            if processing_time is None:
+                processing_time = m.get("processingTime") or m.get("processing_time_ms") or m.get("processingTimeMs") or m.get("processing_time")
 
-                # break early if we found both
-                if tokens_used is not None and processing_time is not None:
-                    break
+            # break early if we found both
+            if tokens_used is not None and processing_time is not None:
+                break
 
-            # Fallback: check event_payload and item for direct fields
-            if tokens_used is None:
-                tokens_used = event_payload.get("tokens_used") if isinstance(event_payload, dict) else None
-            if tokens_used is None:
-                tokens_used = item.get("tokens_used") or item.get("token_usage") or item.get("tokens")
+        # Fallback: check event_payload and item for direct fields
+        if tokens_used is None:
+            tokens_used = event_payload.get("tokens_used") if isinstance(event_payload, dict) else None
+        if tokens_used is None:
+            tokens_used = item.get("tokens_used") or item.get("token_usage") or item.get("tokens")
 
-            if processing_time is None:
-                processing_time = event_payload.get("processing_time_ms") if isinstance(event_payload, dict) else None
-            if processing_time is None:
-                processing_time = item.get("processing_time_ms") or item.get("processing_time") or item.get("processingTimeMs")
+        if processing_time is None:
+            processing_time = event_payload.get("processing_time_ms") if isinstance(event_payload, dict) else None
+        if processing_time is None:
+            processing_time = item.get("processing_time_ms") or item.get("processing_time") or item.get("processingTimeMs")
 
-            # Normalize numeric values to strings for CSV output
-            try:
-                if tokens_used is not None:
-                    tokens_used = int(tokens_used)
-            except Exception:
-                # leave as-is (string) if conversion fails
-                pass
+        # Normalize numeric values to strings for CSV output
+        try:
+            if tokens_used is not None:
+                tokens_used = int(tokens_used)
+        except Exception:
+            # leave as-is (string) if conversion fails
+            pass
 
-            try:
-                if processing_time is not None:
-                    processing_time = int(processing_time)
-            except Exception:
-                pass
+        try:
+            if processing_time is not None:
+                processing_time = int(processing_time)
+        except Exception:
+            pass
 
-            # Operation type is the action_type/eventType
-            operation_type = event_type
+        # Operation type is the action_type/eventType
+        operation_type = event_type
 
-            # Get user fields - prioritize user_info (from DB join), then item fields
-            name = (
-                user_info.get("full_name", "") or
-                item.get("name", "") or
-                item.get("full_name", "")
-            )
-            email = (
-                item.get("email", "") or
-                user_info.get("email", "")
-            )
-            role = (
-                user_info.get("role", "") or
-                item.get("role", "") or
-                item.get("user_role", "")
-            )
-            department = (
-                user_info.get("department", "") or
-                item.get("department", "")
-            )
+        # Get user fields - prioritize user_info (from DB join), then item fields
+        name = (
+            user_info.get("full_name", "") or
+            item.get("name", "") or
+            item.get("full_name", "")
+        )
+        email = (
+            item.get("email", "") or
+            user_info.get("email", "")
+        )
+        role = (
+            user_info.get("role", "") or
+            item.get("role", "") or
+            item.get("user_role", "")
+        )
+        department = (
+            user_info.get("department", "") or
+            item.get("department", "")
+        )
 
-            # Clean up text fields - remove newlines and extra spaces
-            if user_input:
-                user_input = str(user_input).replace("\n", " ").replace("\r", "").strip()
+        # Clean up text fields - remove newlines and extra spaces
+        if user_input:
+            user_input = str(user_input).replace("\n", " ").replace("\r", "").strip()
 
-            # Prepare log_data as JSON string - look in multiple possible fields
-            log_data = None
-            if isinstance(item.get("log_data"), dict):
-                log_data = item.get("log_data")
-            elif isinstance(item.get("body"), dict):
-                log_data = item.get("body")
-            elif isinstance(item.get("data"), dict):
-                log_data = item.get("data")
-            elif isinstance(item.get("log"), dict):
-                log_data = item.get("log")
+        # Prepare log_data as JSON string - look in multiple possible fields
+        log_data = None
+        if isinstance(item.get("log_data"), dict):
+            log_data = item.get("log_data")
+        elif isinstance(item.get("body"), dict):
+            log_data = item.get("body")
+        elif isinstance(item.get("data"), dict):
+            log_data = item.get("data")
+        elif isinstance(item.get("log"), dict):
+            log_data = item.get("log")
+        else:
+            # last resort: use event_payload if it seems informative
+            if isinstance(event_payload, dict) and event_payload:
+                log_data = event_payload
             else:
-                # last resort: use event_payload if it seems informative
-                if isinstance(event_payload, dict) and event_payload:
-                    log_data = event_payload
-                else:
-                    log_data = item.get("log_data") or item.get("body") or {}
+                log_data = item.get("log_data") or item.get("body") or {}
 
-            try:
-                log_data_str = json.dumps(log_data) if log_data else ""
-            except Exception:
-                log_data_str = str(log_data)
+        try:
+            log_data_str = json.dumps(log_data) if log_data else ""
+        except Exception:
+            log_data_str = str(log_data)
 
-            if tokens_used not in (None, ""):
-                tokens_used_found = True
-            if processing_time not in (None, ""):
-                processing_time_found = True
-            row = {
-                "ID": item_id or "",
-                "Timestamp": created_at if isinstance(created_at, str) else (created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)),
-                "EventType": operation_type or "",
-                "Name": name or "",
-                "Email": email or "",
-                "Role": role or "",
-                "Operation type": operation_type or "",
-                "User department": department or "",
-                "Agent ID": agent_id or "",
-                "agentName": agent_name or "",
-                "agentType": agent_type or "",
-                "userInput": user_input or "",
-                "conversationId": conversation_id or "",
-                "messageId": message_id or "",
-                "tokens_used": tokens_used if tokens_used is not None else "",
-                "processing_time_ms": processing_time if processing_time is not None else "",
-                "correlation_id": item.get("correlationId") or item.get("correlation_id") or item.get("correlation_id", "") or "",
-                "log_data": log_data_str,
-            }
-            csv_rows.append(row)
-        # Remove tokens_used and/or processing_time_ms columns if not found in any row
-        fieldnames = [
-            "ID",
-            "Timestamp",
-            "EventType",
-            "Name",
-            "Email",
-            "Role",
-            "Operation type",
-            "User department",
-            "Agent ID",
-            "agentName",
-            "agentType",
-            "userInput",
-            "conversationId",
-            "messageId",
-            "correlation_id",
-            "log_data",
-        ]
-        if tokens_used_found:
-            fieldnames.insert(fieldnames.index("correlation_id"), "tokens_used")
-        if processing_time_found:
-            fieldnames.insert(fieldnames.index("correlation_id"), "processing_time_ms")
-        # Write header and rows with only the present columns
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
-        csv_writer.writeheader()
-        for row in csv_rows:
-            filtered_row = {k: v for k, v in row.items() if k in fieldnames}
-            csv_writer.writerow(filtered_row)
-        csv_data = csv_buffer.getvalue()
-        
-        logger.info(
-            "User logs exported as CSV",
-            extra={
-                "user_id": str(current_user.id),
-                "row_count": len(items),
-            },
+        row = {
+            "ID": item_id or "",
+            "Timestamp": created_at if isinstance(created_at, str) else (created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)),
+            "EventType": operation_type or "",
+            "Name": name or "",
+            "Email": email or "",
+            "Role": role or "",
+            "Operation type": operation_type or "",
+            "User department": department or "",
+            "Agent ID": agent_id or "",
+            "agentName": agent_name or "",
+            "agentType": agent_type or "",
+            "userInput": user_input or "",
+            "conversationId": conversation_id or "",
+            "messageId": message_id or "",
+            "tokens_used": tokens_used if tokens_used is not None else "",
+            "processing_time_ms": processing_time if processing_time is not None else "",
+            "correlation_id": item.get("correlationId") or item.get("correlation_id") or item.get("correlation_id", "") or "",
+            "log_data": log_data_str,
+        }
+        rows.append(row)
+    return rows
+
+
+@router.get("/logs/export/csv")
+async def export_user_logs_csv(
+    request: Request,
+    date_from: Optional[datetime] = Query(None, description="Filter logs from this date (ISO format)"),
+    date_to: Optional[datetime] = Query(None, description="Filter logs to this date (ISO format)"),
+    correlation_id: Optional[str] = Query(None, description="Filter by correlation ID"),
+    event_type: Optional[str] = Query(None, description="Filter by event type"),
+    search: Optional[str] = Query(None, description="Search across name, email, user_id, and log data fields"),
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Export user logs as CSV (admin only).
+
+    Every matching log is streamed, newest first.
+    """
+    try:
+        query = await postgres_logs_service.user_logs_export_query(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            correlation_id=correlation_id,
+            event_type=event_type,
+            search=search,
         )
-        
-        # Log admin action: ADMIN_USER_LOGS_EXPORTED
-        try:
-            request_correlation_id = get_correlation_id() or str(uuid.uuid4())
-            admin_log_data = {
-                "id": str(uuid.uuid4()),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "level": "INFO",
-                "action_type": "ADMIN_USER_LOGS_EXPORTED",
-                "user_id": str(current_user.id),
-                "email": current_user.email,
-                "username": current_user.username or current_user.email,
-                "correlation_id": request_correlation_id,
-                "module": "user_logs",
-                "function": "export_user_logs_csv",
-                "message": f"User logs exported as CSV: {len(items)} rows",
-                "log_data": {
-                    "action_type": "ADMIN_USER_LOGS_EXPORTED",
-                    "row_count": len(items),
-                    "filters": {
-                        "date_from": date_from.isoformat() if date_from else None,
-                        "date_to": date_to.isoformat() if date_to else None,
-                        "correlation_id": correlation_id,
-                        "event_type": event_type,
-                        "search": search,
+        request_correlation_id = get_correlation_id() or str(uuid.uuid4())
+
+        filters = {
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+            "correlation_id": correlation_id,
+            "event_type": event_type,
+            "search": search,
+        }
+
+        async def write_export_log(
+            export_db: AsyncSession, action_type: str, level: str, message: str, **details: Any
+        ) -> None:
+            try:
+                admin_log_data = {
+                    "id": str(uuid.uuid4()),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "level": level,
+                    "action_type": action_type,
+                    "user_id": str(current_user.id),
+                    "email": current_user.email,
+                    "username": current_user.username or current_user.email,
+                    "correlation_id": request_correlation_id,
+                    "module": "user_logs",
+                    "function": "export_user_logs_csv",
+                    "message": message,
+                    "log_data": {
+                        "action_type": action_type,
+                        "filters": filters,
+                        **details,
                     }
                 }
-            }
-            
-            # Write to PostgreSQL synchronously using the same db session
-            await postgres_logs_service.write_admin_log(db, admin_log_data)
-        except Exception as e:
-            logger.error(f"Failed to write admin log for user logs export: {e}", exc_info=True)
-        
-        return Response(
-            content=csv_data,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=user_logs_export.csv"},
+
+                await postgres_logs_service.write_admin_log(export_db, admin_log_data)
+            except Exception as e:
+                logger.error(f"Failed to write admin log for user logs export: {e}", exc_info=True)
+
+        # Log admin action: ADMIN_USER_LOGS_EXPORTED, before any row is sent
+        async def log_export(export_db: AsyncSession) -> None:
+            await write_export_log(
+                export_db, "ADMIN_USER_LOGS_EXPORTED", "INFO", "User logs export started", status="started"
+            )
+
+        async def log_export_completed(export_db: AsyncSession, row_count: int) -> None:
+            logger.info(
+                "User logs exported as CSV",
+                extra={
+                    "user_id": str(current_user.id),
+                    "row_count": row_count,
+                },
+            )
+            await write_export_log(
+                export_db,
+                "ADMIN_USER_LOGS_EXPORT_COMPLETED",
+                "INFO",
+                f"User logs exported as CSV: {row_count} rows",
+                status="completed",
+                row_count=row_count,
+            )
+
+        async def log_export_failed(export_db: AsyncSession, row_count: int, error: BaseException) -> None:
+            await write_export_log(
+                export_db,
+                "ADMIN_USER_LOGS_EXPORT_FAILED",
+                "ERROR",
+                f"User logs export failed after {row_count} rows",
+                status="failed",
+                row_count=row_count,
+                error=repr(error),
+            )
+
+        return csv_export_response(
+            CSVExport(
+                query=query,
+                fieldnames=USER_LOG_CSV_FIELDS,
+                render_batch=_user_log_csv_rows,
+                filename="user_logs_export.csv",
+                on_start=log_export,
+                on_complete=log_export_completed,
+                on_failure=log_export_failed,
+            ),
+            request,
         )
-    
+
     except Exception as e:
         logger.error(
             f"Failed to export user logs: {str(e)}",
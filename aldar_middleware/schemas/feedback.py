@@ -211,7 +211,9 @@ class PaginatedResponse(BaseModel, Generic[T]):
     """Paginated response wrapper."""
 
     items: List[T]
-    total: int
+    total: Optional[int]  # None when the client passed include_total=false
     page: int
     limit: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int]
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None  # Pass back as ``cursor`` for the next page
\ No newline at end of file
@@ -2,20 +2,35 @@
 Agent Available Cache Service
 
 Redis-based caching for /api/v1/agent/available endpoint to improve performance.
-Uses version-based global invalidation for efficient cache management.
+
+A response is assembled from three cached layers, so that invalidation only
+throws away what actually changed:
+
+- base: the page of the agent catalog with prebuilt agent entries, shared by
+  every user; keyed by the catalog version
+- rbac: which agents of that page a set of AD groups can access; keyed by the
+  catalog version and a fingerprint of the groups, shared by every user with
+  the same memberships
+- user: a thin per-user overlay with pins, last-used times, access to user
+  agents and the group fingerprint
+
+Catalog changes (agent create/update/delete) bump the catalog version, which
+makes every layer unreachable. Per-user actions such as pinning only drop
+that user's overlay.
 
 Usage:
     from aldar_middleware.services.agent_available_cache import get_agent_available_cache
 
     cache = get_agent_available_cache()
+    version = await cache.get_current_version()
 
-    # Try to get from cache
-    response = await cache.get_cached_response(user_id, category, limit, offset)
-    if response is None:
-        # Cache miss - fetch from database
-        response = await fetch_agents_from_db(...)
-        # Store in cache
-        await cache.set_cached_response(user_id, category, limit, offset, response, ttl=900)
+    base = await cache.get_base(version, category, limit, offset)
+    if base is None:
+        base = await load_catalog_page(...)
+        await cache.set_base(version, category, limit, offset, base)
+
+    # Pin toggled: only this user's overlay is rebuilt
+    await cache.invalidate_user(user_id)
 """
 
 from typing import Dict, Optional, Any
@@ -30,17 +45,16 @@ class AgentAvailableCache:
     Caching layer for /api/v1/agent/available endpoint.
 
     Features:
-    - User-specific caching (RBAC-aware)
-    - Global version-based invalidation
+    - Shared catalog and RBAC layers, per-user overlay
+    - Global version-based invalidation for catalog changes
+    - Per-user invalidation for pins and other user actions
     - Graceful Redis fallback to disabled state
     - Query parameter awareness (category, limit, offset)
-
-    The cache uses a global version number to invalidate all user caches
-    efficiently. When an agent is created/updated/deleted, the version
-    is incremented, making all existing cache entries unreachable.
     """
 
+    # Catalog version; the key name predates the layered cache
     GLOBAL_VERSION_KEY = "agent_available:global_version"
+    DEFAULT_TTL = 900  # 15 minutes
 
     def __init__(self, redis_client: Optional[Any] = None, enabled: bool = True):
         """
@@ -56,29 +70,21 @@ class AgentAvailableCache:
         if not self.enabled and redis_client is None:
             logger.info("Agent available caching disabled - Redis client not available")
 
-    def _make_key(
-        self,
-        user_id: str,
-        category: Optional[str],
-        limit: int,
-        offset: int,
-        version: int
-    ) -> str:
-        """
-        Generate cache key with namespace and version.
+    @staticmethod
+    def _page(category: Optional[str], limit: int, offset: int) -> str:
+        return f"{category if category else 'ALL'}:{limit}:{offset}"
 
-        Args:
-            user_id: User UUID
-            category: Category filter (or "ALL" if None)
-            limit: Pagination limit
-            offset: Pagination offset
-            version: Global cache version
+    def _base_key(self, version: int, category: Optional[str], limit: int, offset: int) -> str:
+        """Key of a catalog page: agent_available:base:{version}:{category}:{limit}:{offset}"""
+        return f"agent_available:base:{version}:{self._page(category, limit, offset)}"
 
-        Returns:
-            Cache key string in format: agent_available:{user_id}:{category}:{limit}:{offset}:{version}
-        """
-        category_key = category if category else "ALL"
-        return f"agent_available:{user_id}:{category_key}:{limit}:{offset}:{version}"
+    def _rbac_key(self, version: int, fingerprint: str, category: Optional[str], limit: int, offset: int) -> str:
+        """Key of the access list of a page: agent_available:rbac:{version}:{fingerprint}:{category}:{limit}:{offset}"""
+        return f"agent_available:rbac:{version}:{fingerprint}:{self._page(category, limit, offset)}"
+
+    def _user_key(self, version: int, user_id: str) -> str:
+        """Key of a user's overlay: agent_available:user:{version}:{user_id}"""
+        return f"agent_available:user:{version}:{user_id}"
 
     async def get_current_version(self) -> int:
         """
@@ -94,7 +100,7 @@ class AgentAvailableCache:
             version = await self.redis.get(self.GLOBAL_VERSION_KEY)
             if version is None:
                 # Initialize version to 1 if not set
-                await self.redis.set(self.GLOBAL_VERSION_KEY, 1)
+                await self.redis.set(self.GLOBAL_VERSION_KEY, 1, nx=True)
                 return 1
             return int(version)
         except Exception as e:
@@ -119,115 +125,88 @@ class AgentAvailableCache:
             logger.error(f"Failed to increment cache version: {e}")
             return 1
 
-    async def get_cached_response(
-        self,
-        user_id: str,
-        category: Optional[str],
-        limit: int,
-        offset: int
-    ) -> Optional[Dict[str, Any]]:
-        """
-        Get cached agent list response for a user.
-
-        Args:
-            user_id: User UUID
-            category: Category filter (or None for all)
-            limit: Pagination limit
-            offset: Pagination offset
-
-        Returns:
-            Cached response dict if found, None if cache miss or disabled
-        """
+    async def _get_json(self, key: str) -> Optional[Any]:
         if not self.enabled:
             return None
-
         try:
-            # Get current version
-            version = await self.get_current_version()
-
-            # Generate cache key with version
-            key = self._make_key(user_id, category, limit, offset, version)
-
-            # Try to get from cache
             cached = await self.redis.get(key)
-
-            if cached:
-                logger.debug(
-                    f"Cache HIT: agent_available for user {user_id}, "
-                    f"category={category or 'ALL'}, limit={limit}, offset={offset}"
-                )
-                # Parse JSON string back to dict
-                if isinstance(cached, bytes):
-                    cached = cached.decode('utf-8')
-                return json.loads(cached)
-
-            logger.debug(
-                f"Cache MISS: agent_available for user {user_id}, "
-                f"category={category or 'ALL'}, limit={limit}, offset={offset}"
-            )
+        except Exception as e:
+            logger.warning(f"Cache get error for {key}: {e}")
             return None
+        if cached is None:
+            logger.debug(f"Cache MISS: {key}")
+            return None
+        logger.debug(f"Cache HIT: {key}")
+        if isinstance(cached, bytes):
+            cached = cached.decode('utf-8')
+        return json.loads(cached)
 
+    async def _set_json(self, key: str, value: Any, ttl: int) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            await self.redis.setex(key, ttl, json.dumps(value))
+            return True
         except Exception as e:
-            logger.warning(f"Cache get error for user {user_id}: {e}")
-            return None
+            logger.warning(f"Cache set error for {key}: {e}")
+            return False
 
-    async def set_cached_response(
+    async def get_base(self, version: int, category: Optional[str], limit: int, offset: int) -> Optional[Dict[str, Any]]:
+        """Get a cached catalog page, or None on a miss."""
+        return await self._get_json(self._base_key(version, category, limit, offset))
+
+    async def set_base(
         self,
-        user_id: str,
+        version: int,
         category: Optional[str],
         limit: int,
         offset: int,
-        response_data: Dict[str, Any],
-        ttl: int = 900
+        page: Dict[str, Any],
+        ttl: int = DEFAULT_TTL
     ) -> bool:
-        """
-        Cache agent list response for a user.
-
-        Args:
-            user_id: User UUID
-            category: Category filter (or None for all)
-            limit: Pagination limit
-            offset: Pagination offset
-            response_data: Complete response dict to cache
-            ttl: Time to live in seconds (default: 900 = 15 minutes)
-
-        Returns:
-            True if cached successfully, False otherwise
-        """
-        if not self.enabled:
-            return False
-
-        try:
-            # Get current version
-            version = await self.get_current_version()
-
-            # Generate cache key with version
-            key = self._make_key(user_id, category, limit, offset, version)
+        """Cache a catalog page shared by every user."""
+        return await self._set_json(self._base_key(version, category, limit, offset), page, ttl)
 
-            # Serialize response
-            value = json.dumps(response_data)
+    async def get_rbac_access(
+        self,
+        version: int,
+        fingerprint: str,
+        category: Optional[str],
+        limit: int,
+        offset: int
+    ) -> Optional[list]:
+        """Get the agents of a page a group fingerprint can access, or None on a miss."""
+        return await self._get_json(self._rbac_key(version, fingerprint, category, limit, offset))
 
-            # Store in cache with TTL
-            await self.redis.setex(key, ttl, value)
+    async def set_rbac_access(
+        self,
+        version: int,
+        fingerprint: str,
+        category: Optional[str],
+        limit: int,
+        offset: int,
+        agent_ids: list,
+        ttl: int = DEFAULT_TTL
+    ) -> bool:
+        """Cache the agents of a page a group fingerprint can access."""
+        return await self._set_json(self._rbac_key(version, fingerprint, category, limit, offset), agent_ids, ttl)
 
-            logger.debug(
-                f"Cached agent_available for user {user_id}, "
-                f"category={category or 'ALL'}, limit={limit}, offset={offset} "
-                f"(TTL: {ttl}s, version: {version})"
-            )
-            return True
+    async def get_user_overlay(self, version: int, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's overlay (pins, last used, user agent access, group fingerprint)."""
+        return await self._get_json(self._user_key(version, user_id))
 
-        except Exception as e:
-            logger.warning(f"Cache set error for user {user_id}: {e}")
-            return False
+    async def set_user_overlay(self, version: int, user_id: str, overlay: Dict[str, Any], ttl: int = DEFAULT_TTL) -> bool:
+        """Cache a user's overlay."""
+        return await self._set_json(self._user_key(version, user_id), overlay, ttl)
 
     async def invalidate_all(self) -> int:
         """
         Invalidate all cached agent responses (all users).
 
-        This is done by incrementing the global version number.
-        All existing cache entries (with old version in key) become
-        unreachable and will eventually expire via TTL.
+        Use for catalog changes only; per-user changes go through
+        :meth:`invalidate_user`. This is done by incrementing the global
+        version number: all existing layers (with the old version in their
+        key) become unreachable and will eventually expire via TTL.
 
         Returns:
             New version number
@@ -238,10 +217,10 @@ class AgentAvailableCache:
 
     async def invalidate_user(self, user_id: str) -> bool:
         """
-        Invalidate cached responses for a specific user (optional, not currently used).
+        Invalidate the per-user overlay of one user.
 
-        This would require scanning for all keys matching the user pattern,
-        which is expensive. The global version-based invalidation is preferred.
+        The shared catalog and RBAC layers, and every other user's overlay,
+        stay cached.
 
         Args:
             user_id: User UUID
@@ -253,13 +232,10 @@ class AgentAvailableCache:
             return False
 
         try:
-            # This would require SCAN operation which is expensive
-            # For now, we use global version-based invalidation instead
-            logger.warning(
-                f"User-specific invalidation requested for {user_id}, "
-                "but global invalidation is preferred for performance"
-            )
-            return False
+            version = await self.get_current_version()
+            await self.redis.delete(self._user_key(version, user_id))
+            logger.debug(f"Invalidated agent_available overlay for user {user_id}")
+            return True
 
         except Exception as e:
             logger.warning(f"Cache invalidation error for user {user_id}: {e}")
@@ -0,0 +1,423 @@
+"""Daily rollups behind the admin agent and feedback analytics.
+
+``agent_usage_daily`` and ``feedback_daily`` hold one row per agent and day.
+A Celery Beat job refreshes them incrementally: each rollup keeps a watermark
+date in ``analytics_rollup_state`` and every day before it is complete. A
+refresh recomputes the days from a short lookback before the old watermark up
+to yesterday (late writes land there), plus any older day whose feedback was
+edited or deleted since the previous refresh.
+
+Readers split a date filter into whole days before the watermark, answered
+from the rollup, and the partial days at either end plus everything after the
+watermark, answered from the source tables. Until the first refresh has run
+everything is answered from the source tables.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from aldar_middleware.models.analytics_rollup import (
+    AgentUsageDaily,
+    AnalyticsRollupState,
+    FeedbackDaily,
+)
+from aldar_middleware.models.feedback import FeedbackData, FeedbackEntityType
+from aldar_middleware.models.token_usage import TokenUsage
+from aldar_middleware.settings import settings
+
+USAGE_ROLLUP = "agent_usage_daily"
+FEEDBACK_ROLLUP = "feedback_daily"
+FEEDBACK_DIMENSIONS = ("day", "agent_id", "entity_type")
+
+# Advisory lock held while refreshing so overlapping Beat runs skip instead of racing
+_REFRESH_LOCK_KEY = 0x4A9E_0035
+
+# (start, end, end_inclusive); None means unbounded on that side
+LiveRange = Tuple[Optional[datetime], Optional[datetime], bool]
+
+
+@dataclass
+class RollupWindow:
+    """A created_at filter split into rollup days and live source ranges."""
+
+    first_day: Optional[date] = None
+    end_day: Optional[date] = None
+    live_ranges: List[LiveRange] = field(default_factory=list)
+
+    @property
+    def uses_rollup(self) -> bool:
+        """Whether any whole days are read from the rollup."""
+        return self.end_day is not None
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def plan_window(
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    watermark: Optional[date],
+) -> RollupWindow:
+    """Split ``date_from <= created_at <= date_to`` against a rollup watermark.
+
+    Args:
+        date_from: Inclusive lower bound, or None for no bound
+        date_to: Inclusive upper bound, or None for no bound
+        watermark: First day not covered by the rollup, or None if it was never refreshed
+
+    Returns:
+        The whole days to read from the rollup and the ranges to read live
+    """
+    date_from, date_to = _naive_utc(date_from), _naive_utc(date_to)
+    if watermark is None:
+        return RollupWindow(live_ranges=[(date_from, date_to, True)])
+
+    first_day = None
+    if date_from is not None:
+        first_day = date_from.date()
+        if date_from > _day_start(first_day):
+            first_day += timedelta(days=1)
+
+    # A day is whole only if date_to reaches the next midnight
+    end_day = watermark if date_to is None else min(watermark, date_to.date())
+
+    if first_day is not None and end_day <= first_day:
+        return RollupWindow(live_ranges=[(date_from, date_to, True)])
+
+    live_ranges: List[LiveRange] = []
+    if date_from is not None and date_from < _day_start(first_day):
+        live_ranges.append((date_from, _day_start(first_day), False))
+    live_ranges.append((_day_start(end_day), date_to, True))
+    return RollupWindow(first_day=first_day, end_day=end_day, live_ranges=live_ranges)
+
+
+def _live_condition(column, window: RollupWindow):
+    clauses = []
+    for start, end, end_inclusive in window.live_ranges:
+        bounds = []
+        if start is not None:
+            bounds.append(column >= start)
+        if end is not None:
+            bounds.append(column <= end if end_inclusive else column < end)
+        clauses.append(and_(*bounds) if bounds else true())
+    return or_(*clauses)
+
+
+def _rollup_condition(column, window: RollupWindow):
+    bounds = [column < window.end_day]
+    if window.first_day is not None:
+        bounds.append(column >= window.first_day)
+    return and_(*bounds)
+
+
+class AnalyticsRollupService:
+    """Refreshes and reads the daily analytics rollups."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        """Initialize rollup service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+        self.lookback_days = settings.analytics_rollup_lookback_days
+        self._watermarks: Dict[str, Optional[date]] = {}
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get_watermark(self, name: str) -> Optional[date]:
+        """First day not covered by a rollup, or None if it was never refreshed.
+
+        Read once per service instance, so one analytics request sees one watermark.
+        """
+        if name not in self._watermarks:
+            result = await self.db.execute(
+                select(AnalyticsRollupState.watermark).where(AnalyticsRollupState.name == name)
+            )
+            self._watermarks[name] = result.scalar_one_or_none()
+        return self._watermarks[name]
+
+    async def get_agent_usage(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """Usage count and last use per agent id.
+
+        Args:
+            date_from: Optional inclusive start (UTC)
+            date_to: Optional inclusive end (UTC)
+
+        Returns:
+            Agent id -> {"count": int, "last_used": datetime or None}
+        """
+        window = plan_window(date_from, date_to, await self.get_watermark(USAGE_ROLLUP))
+        usage: Dict[int, Dict[str, Any]] = {}
+
+        def merge(agent_id: int, count: int, last_used: Optional[datetime]) -> None:
+            entry = usage.setdefault(agent_id, {"count": 0, "last_used": None})
+            entry["count"] += count or 0
+            if last_used is not None and (entry["last_used"] is None or last_used > entry["last_used"]):
+                entry["last_used"] = last_used
+
+        if window.uses_rollup:
+            result = await self.db.execute(
+                select(
+                    AgentUsageDaily.agent_id,
+                    func.sum(AgentUsageDaily.usage_count),
+                    func.max(AgentUsageDaily.last_used_at),
+                )
+                .where(_rollup_condition(AgentUsageDaily.day, window))
+                .group_by(AgentUsageDaily.agent_id)
+            )
+            for agent_id, count, last_used in result.all():
+                merge(agent_id, count, last_used)
+
+        result = await self.db.execute(
+            select(
+                TokenUsage.agent_id,
+                func.count(TokenUsage.id),
+                func.max(TokenUsage.created_at),
+            )
+            .where(_live_condition(TokenUsage.created_at, window))
+            .group_by(TokenUsage.agent_id)
+        )
+        for agent_id, count, last_used in result.all():
+            merge(agent_id, count, last_used)
+
+        return usage
+
+    async def get_feedback_counts(
+        self,
+        group_by: Sequence[str],
+        date_from: datetime,
+        date_to: datetime,
+        entity_type: Optional[FeedbackEntityType] = None,
+        agent_id: Optional[str] = None,
+        with_agent_only: bool = False,
+    ) -> Dict[Tuple[Any, ...], int]:
+        """Live (not deleted) feedback counts grouped by dimensions and rating.
+
+        Args:
+            group_by: Dimensions from FEEDBACK_DIMENSIONS ("day", "agent_id", "entity_type")
+            date_from: Inclusive start (UTC)
+            date_to: Inclusive end (UTC)
+            entity_type: Optional entity type filter
+            agent_id: Optional agent ID filter
+            with_agent_only: Skip feedback that has no agent
+
+        Returns:
+            (dimension values..., rating) -> count
+        """
+        unknown = set(group_by) - set(FEEDBACK_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown feedback dimensions: {sorted(unknown)}")
+
+        window = plan_window(date_from, date_to, await self.get_watermark(FEEDBACK_ROLLUP))
+        counts: Dict[Tuple[Any, ...], int] = {}
+
+        def merge(rows) -> None:
+            for *key, count in rows:
+                key = tuple(key)
+                counts[key] = counts.get(key, 0) + (count or 0)
+
+        if window.uses_rollup:
+            rollup_columns = {
+                "day": FeedbackDaily.day,
+                "agent_id": func.nullif(FeedbackDaily.agent_id, ""),
+                "entity_type": FeedbackDaily.entity_type,
+            }
+            columns = [rollup_columns[name] for name in group_by] + [FeedbackDaily.rating]
+            query = select(*columns, func.sum(FeedbackDaily.feedback_count)).where(
+                _rollup_condition(FeedbackDaily.day, window)
+            )
+            if entity_type:
+                query = query.where(FeedbackDaily.entity_type == entity_type)
+            if agent_id:
+                query = query.where(FeedbackDaily.agent_id == agent_id)
+            if with_agent_only:
+                query = query.where(FeedbackDaily.agent_id != "")
+            merge((await self.db.execute(query.group_by(*columns))).all())
+
+        live_columns = {
+            "day": func.date(FeedbackData.created_at),
+            "agent_id": FeedbackData.agent_id,
+            "entity_type": FeedbackData.entity_type,
+        }
+        columns = [live_columns[name] for name in group_by] + [FeedbackData.rating]
+        query = select(*columns, func.count(FeedbackData.feedback_id)).where(
+            and_(
+                _live_condition(FeedbackData.created_at, window),
+                FeedbackData.deleted_at.is_(None),
+            )
+        )
+        if entity_type:
+            query = query.where(FeedbackData.entity_type == entity_type)
+        if agent_id:
+            query = query.where(FeedbackData.agent_id == agent_id)
+        if with_agent_only:
+            query = query.where(FeedbackData.agent_id.isnot(None))
+        merge((await self.db.execute(query.group_by(*columns))).all())
+
+        return counts
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    async def refresh(self, now: Optional[datetime] = None, full: bool = False) -> Dict[str, Any]:
+        """Bring both rollups up to yesterday (UTC) and commit.
+
+        Args:
+            now: Current UTC time (defaults to utcnow)
+            full: Rebuild from the first source row instead of the watermark
+
+        Returns:
+            Summary of the refresh
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+
+        locked = await self.db.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_KEY)))
+        if not locked.scalar():
+            logger.info("Analytics rollup refresh already running; skipping")
+            return {"skipped": True}
+
+        usage_state = await self._get_state(USAGE_ROLLUP)
+        usage_start = await self._refresh_start(usage_state, TokenUsage.created_at, today, full)
+        usage_days = (today - usage_start).days
+        if usage_days > 0:
+            await self._rebuild_usage(usage_start, today, now)
+        await self._set_state(USAGE_ROLLUP, today, now)
+
+        feedback_state = await self._get_state(FEEDBACK_ROLLUP)
+        feedback_start = await self._refresh_start(feedback_state, FeedbackData.created_at, today, full)
+        ranges = [(feedback_start, today)] if feedback_start < today else []
+        if feedback_state is not None and not full:
+            # Older days whose feedback was edited or soft-deleted since the last refresh
+            changed = await self.db.execute(
+                select(func.date(FeedbackData.created_at))
+                .where(
+                    FeedbackData.updated_at >= feedback_state.refreshed_at,
+                    FeedbackData.created_at < _day_start(feedback_start),
+                )
+                .distinct()
+            )
+            ranges.extend((day, day + timedelta(days=1)) for (day,) in changed.all())
+        for start, end in ranges:
+            await self._rebuild_feedback(start, end, now)
+        await self._set_state(FEEDBACK_ROLLUP, today, now)
+
+        await self.db.commit()
+        self._watermarks.clear()
+
+        summary = {
+            "skipped": False,
+            "watermark": today.isoformat(),
+            "usage_days": max(usage_days, 0),
+            "feedback_days": sum((end - start).days for start, end in ranges),
+        }
+        logger.info(f"Analytics rollups refreshed: {summary}")
+        return summary
+
+    async def _get_state(self, name: str) -> Optional[AnalyticsRollupState]:
+        result = await self.db.execute(
+            select(AnalyticsRollupState).where(AnalyticsRollupState.name == name)
+        )
+        return result.scalar_one_or_none()
+
+    async def _set_state(self, name: str, watermark: date, refreshed_at: datetime) -> None:
+        statement = pg_insert(AnalyticsRollupState).values(
+            name=name, watermark=watermark, refreshed_at=refreshed_at
+        )
+        await self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[AnalyticsRollupState.name],
+                set_={"watermark": statement.excluded.watermark, "refreshed_at": statement.excluded.refreshed_at},
+            )
+        )
+
+    async def _refresh_start(
+        self,
+        state: Optional[AnalyticsRollupState],
+        created_at_column,
+        today: date,
+        full: bool,
+    ) -> date:
+        """First day to recompute: the lookback before the watermark, or the first source day."""
+        if state is not None and not full:
+            return min(state.watermark, today) - timedelta(days=self.lookback_days)
+        first = (await self.db.execute(select(func.min(created_at_column)))).scalar()
+        return first.date() if first is not None else today
+
+    async def _rebuild_usage(self, start: date, end: date, now: datetime) -> None:
+        """Recompute agent_usage_daily for days in [start, end)."""
+        await self.db.execute(
+            delete(AgentUsageDaily).where(AgentUsageDaily.day >= start, AgentUsageDaily.day < end)
+        )
+        day = func.date(TokenUsage.created_at)
+        await self.db.execute(
+            insert(AgentUsageDaily).from_select(
+                [
+                    "day", "agent_id", "usage_count", "input_tokens", "output_tokens",
+                    "total_tokens", "last_used_at", "refreshed_at",
+                ],
+                select(
+                    day,
+                    TokenUsage.agent_id,
+                    func.count(TokenUsage.id),
+                    func.coalesce(func.sum(TokenUsage.input_tokens), 0),
+                    func.coalesce(func.sum(TokenUsage.output_tokens), 0),
+                    func.coalesce(func.sum(TokenUsage.total_tokens), 0),
+                    func.max(TokenUsage.created_at),
+                    literal(now),
+                )
+                .where(
+                    TokenUsage.created_at >= _day_start(start),
+                    TokenUsage.created_at < _day_start(end),
+                )
+                .group_by(day, TokenUsage.agent_id),
+            )
+        )
+
+    async def _rebuild_feedback(self, start: date, end: date, now: datetime) -> None:
+        """Recompute feedback_daily for days in [start, end)."""
+        await self.db.execute(
+            delete(FeedbackDaily).where(FeedbackDaily.day >= start, FeedbackDaily.day < end)
+        )
+        day = func.date(FeedbackData.created_at)
+        agent = func.coalesce(FeedbackData.agent_id, "")
+        await self.db.execute(
+            insert(FeedbackDaily).from_select(
+                ["day", "agent_id", "entity_type", "rating", "feedback_count", "refreshed_at"],
+                select(
+                    day,
+                    agent,
+                    FeedbackData.entity_type,
+                    FeedbackData.rating,
+                    func.count(FeedbackData.feedback_id),
+                    literal(now),
+                )
+                .where(
+                    FeedbackData.created_at >= _day_start(start),
+                    FeedbackData.created_at < _day_start(end),
+                    FeedbackData.deleted_at.is_(None),
+                )
+                .group_by(day, agent, FeedbackData.entity_type, FeedbackData.rating),
+            )
+        )
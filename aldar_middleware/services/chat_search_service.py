@@ -0,0 +1,199 @@
+"""Full-text chat session search backed by Postgres tsvector indexes."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, desc, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from aldar_middleware.models.messages import Message
+from aldar_middleware.models.sessions import Session
+from aldar_middleware.utils.pagination import KeysetColumn, paginate_keyset, split_keyset_rows
+
+# Must match the configuration used by the generated search_vector columns
+SEARCH_TS_CONFIG = literal_column("'simple'::regconfig")
+
+# ts_rank normalization 32 maps rank to rank/(rank+1), keeping scores in [0, 1)
+RANK_NORMALIZATION = 32
+TITLE_RANK_WEIGHT = 0.6
+MESSAGE_RANK_WEIGHT = 0.4
+
+MAX_QUERY_TERMS = 16
+CURSOR_SIGNATURE = "chat_search:relevance:DESC"
+SNIPPET_HEADLINE_OPTIONS = 'MaxFragments=1, MaxWords=35, MinWords=15, StartSel="", StopSel=""'
+
+_TERM_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+@dataclass
+class ChatSearchPage:
+    """One page of chat session search results."""
+
+    rows: List[Tuple[Session, float]] = field(default_factory=list)
+    total_count: Optional[int] = 0
+    next_cursor: Optional[str] = None
+    message_counts: Dict[UUID, int] = field(default_factory=dict)
+    snippets: Dict[UUID, str] = field(default_factory=dict)
+
+
+def build_prefix_tsquery(query: str) -> Optional[str]:
+    """Convert free text into a prefix-matching tsquery expression.
+
+    Every word must match (AND) and each word matches as a prefix, so a
+    partially typed word such as ``budg`` still finds ``budget``.
+
+    Args:
+        query: Raw user search text
+
+    Returns:
+        tsquery text (e.g. ``"q3:* & budg:*"``) or None if the text has no words
+    """
+    terms = _TERM_PATTERN.findall(query.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+async def search_user_sessions(
+    db: AsyncSession,
+    query: str,
+    filters: List[Any],
+    limit: int,
+    offset: int,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+) -> ChatSearchPage:
+    """Search sessions by title and message content.
+
+    Matching and ranking use the GIN-indexed ``search_vector`` columns;
+    message aggregates and snippets are computed only for sessions that pass
+    ``filters`` (which must include the current user's ``Session.user_id``).
+
+    Args:
+        db: Database session
+        query: Raw user search text
+        filters: Session filters (user, agent, date range)
+        limit: Page size
+        offset: Page offset, ignored when a cursor is given
+        cursor: Opaque cursor from a previous page
+        include_total: If False, skip the count query
+
+    Returns:
+        ChatSearchPage with ranked sessions, total count, message counts and snippets
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    tsquery_text = build_prefix_tsquery(query)
+    if tsquery_text is None:
+        return ChatSearchPage()
+
+    tsquery = func.to_tsquery(SEARCH_TS_CONFIG, tsquery_text)
+
+    user_session_ids = select(Session.id).where(*filters)
+    message_hits = (
+        select(
+            Message.session_id.label("session_id"),
+            func.max(
+                func.ts_rank(Message.search_vector, tsquery, RANK_NORMALIZATION)
+            ).label("message_rank"),
+        )
+        .where(
+            Message.session_id.in_(user_session_ids),
+            Message.search_vector.op("@@")(tsquery),
+        )
+        .group_by(Message.session_id)
+        .subquery()
+    )
+
+    title_match = Session.search_vector.op("@@")(tsquery)
+    title_rank = case(
+        (title_match, func.ts_rank(Session.search_vector, tsquery, RANK_NORMALIZATION)),
+        else_=0.0,
+    )
+    message_rank = func.coalesce(message_hits.c.message_rank, 0.0)
+    relevance_expr = (
+        title_rank * TITLE_RANK_WEIGHT + message_rank * MESSAGE_RANK_WEIGHT
+    ).label("relevance_score")
+    match_filter = or_(title_match, message_hits.c.session_id.isnot(None))
+
+    # Session.id breaks ties so the cursor position is unique
+    sort_keys = [
+        KeysetColumn(relevance_expr.element, descending=True),
+        KeysetColumn(func.coalesce(Session.updated_at, Session.created_at), descending=True),
+        KeysetColumn(Session.id, descending=True),
+    ]
+    stmt = paginate_keyset(
+        select(Session)
+        .outerjoin(message_hits, message_hits.c.session_id == Session.id)
+        .where(*filters, match_filter),
+        sort_keys,
+        limit=limit,
+        signature=CURSOR_SIGNATURE,
+        cursor=cursor,
+        offset=offset,
+    )
+    result_rows = (await db.execute(stmt)).all()
+    sessions, next_cursor = split_keyset_rows(
+        result_rows, sort_keys, limit=limit, signature=CURSOR_SIGNATURE
+    )
+    rows = [(session, float(row[1] or 0.0)) for session, row in zip(sessions, result_rows)]
+
+    total_count = None
+    if include_total:
+        count_stmt = (
+            select(func.count())
+            .select_from(Session)
+            .outerjoin(message_hits, message_hits.c.session_id == Session.id)
+            .where(*filters, match_filter)
+        )
+        total_count = (await db.execute(count_stmt)).scalar() or 0
+
+    page = ChatSearchPage(rows=rows, total_count=total_count, next_cursor=next_cursor)
+    session_ids = [session.id for session, _ in rows]
+    if not session_ids:
+        return page
+
+    count_rows = await db.execute(
+        select(Message.session_id, func.count(Message.id))
+        .where(Message.session_id.in_(session_ids))
+        .group_by(Message.session_id)
+    )
+    page.message_counts = {session_id: count for session_id, count in count_rows}
+
+    # Best-matching message per session, highlighted by Postgres
+    snippet_rows = await db.execute(
+        select(
+            Message.session_id,
+            func.ts_headline(
+                SEARCH_TS_CONFIG, Message.content, tsquery, SNIPPET_HEADLINE_OPTIONS
+            ),
+        )
+        .where(
+            Message.session_id.in_(session_ids),
+            Message.search_vector.op("@@")(tsquery),
+        )
+        .order_by(
+            Message.session_id,
+            desc(func.ts_rank(Message.search_vector, tsquery)),
+            Message.created_at,
+        )
+        .distinct(Message.session_id)
+    )
+    page.snippets = {session_id: text for session_id, text in snippet_rows if text}
+
+    # Title-only matches fall back to the first message of the session
+    missing = [session_id for session_id in session_ids if session_id not in page.snippets]
+    if missing:
+        first_rows = await db.execute(
+            select(Message.session_id, Message.content)
+            .where(Message.session_id.in_(missing), Message.content.isnot(None))
+            .order_by(Message.session_id, Message.created_at)
+            .distinct(Message.session_id)
+        )
+        for session_id, content in first_rows:
+            page.snippets.setdefault(session_id, content)
+
+    return page
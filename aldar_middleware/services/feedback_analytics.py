@@ -3,7 +3,7 @@
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,6 +14,7 @@ from aldar_middleware.models.feedback import (
     FeedbackEntityType,
     FeedbackRating,
 )
+from aldar_middleware.services.analytics_rollup import AnalyticsRollupService
 from aldar_middleware.settings.context import get_correlation_id
 from aldar_middleware.settings import settings
 
@@ -33,6 +34,7 @@ class FeedbackAnalyticsService:
         self.db = db
         self.redis = redis
         self.cache_ttl = settings.feedback_analytics_cache_ttl_seconds
+        self.rollups = AnalyticsRollupService(db)
 
     async def get_analytics_summary(
         self,
@@ -267,26 +269,9 @@ class FeedbackAnalyticsService:
         date_to: datetime,
     ) -> Dict[str, int]:
         """Get counts aggregated by rating."""
-        query = select(
-            FeedbackData.rating, func.count(FeedbackData.feedback_id)
-        ).where(
-            and_(
-                FeedbackData.created_at >= date_from,
-                FeedbackData.created_at <= date_to,
-                FeedbackData.deleted_at.is_(None),
-            )
-        )
-
-        if entity_type:
-            query = query.where(FeedbackData.entity_type == entity_type)
-
-        if agent_id:
-            query = query.where(FeedbackData.agent_id == agent_id)
+        rows = await self._get_feedback_rows((), entity_type, agent_id, date_from, date_to)
 
-        query = query.group_by(FeedbackData.rating)
-
-        result = await self.db.execute(query)
-        counts = {row[0].value: row[1] for row in result.all()}
+        counts = {rating.value: count for rating, count in rows}
 
         return counts
 
@@ -297,28 +282,11 @@ class FeedbackAnalyticsService:
         date_to: datetime,
     ) -> List[Dict]:
         """Get breakdown by entity type."""
-        query = select(
-            FeedbackData.entity_type,
-            FeedbackData.rating,
-            func.count(FeedbackData.feedback_id),
-        ).where(
-            and_(
-                FeedbackData.created_at >= date_from,
-                FeedbackData.created_at <= date_to,
-                FeedbackData.deleted_at.is_(None),
-            )
-        )
-
-        if agent_id:
-            query = query.where(FeedbackData.agent_id == agent_id)
-
-        query = query.group_by(FeedbackData.entity_type, FeedbackData.rating)
-
-        result = await self.db.execute(query)
+        rows = await self._get_feedback_rows(("entity_type",), None, agent_id, date_from, date_to)
 
         # Aggregate by entity type
         breakdown = {}
-        for entity_type, rating, count in result.all():
+        for entity_type, rating, count in rows:
             key = entity_type.value
             if key not in breakdown:
                 breakdown[key] = {
@@ -355,32 +323,12 @@ class FeedbackAnalyticsService:
         date_to: datetime,
     ) -> List[Dict]:
         """Get daily breakdown."""
-        query = select(
-            func.date(FeedbackData.created_at).label("date"),
-            FeedbackData.rating,
-            func.count(FeedbackData.feedback_id),
-        ).where(
-            and_(
-                FeedbackData.created_at >= date_from,
-                FeedbackData.created_at <= date_to,
-                FeedbackData.deleted_at.is_(None),
-            )
-        )
-
-        if entity_type:
-            query = query.where(FeedbackData.entity_type == entity_type)
-
-        if agent_id:
-            query = query.where(FeedbackData.agent_id == agent_id)
-
-        query = query.group_by(func.date(FeedbackData.created_at), FeedbackData.rating)
-        query = query.order_by(func.date(FeedbackData.created_at))
-
-        result = await self.db.execute(query)
+        rows = await self._get_feedback_rows(("day",), entity_type, agent_id, date_from, date_to)
+        rows.sort(key=lambda row: row[0])
 
         # Aggregate by date
         breakdown = {}
-        for date, rating, count in result.all():
+        for date, rating, count in rows:
             key = date.isoformat()
             if key not in breakdown:
                 breakdown[key] = {
@@ -416,29 +364,13 @@ class FeedbackAnalyticsService:
         date_to: datetime,
     ) -> List[Dict]:
         """Get breakdown by agent."""
-        query = select(
-            FeedbackData.agent_id,
-            FeedbackData.rating,
-            func.count(FeedbackData.feedback_id),
-        ).where(
-            and_(
-                FeedbackData.created_at >= date_from,
-                FeedbackData.created_at <= date_to,
-                FeedbackData.deleted_at.is_(None),
-                FeedbackData.agent_id.isnot(None),
-            )
+        rows = await self._get_feedback_rows(
+            ("agent_id",), entity_type, None, date_from, date_to, with_agent_only=True
         )
 
-        if entity_type:
-            query = query.where(FeedbackData.entity_type == entity_type)
-
-        query = query.group_by(FeedbackData.agent_id, FeedbackData.rating)
-
-        result = await self.db.execute(query)
-
         # Aggregate by agent
         breakdown = {}
-        for agent_id, rating, count in result.all():
+        for agent_id, rating, count in rows:
             if agent_id not in breakdown:
                 breakdown[agent_id] = {
                     "agent_id": agent_id,
@@ -466,6 +398,26 @@ class FeedbackAnalyticsService:
 
         return list(breakdown.values())
 
+    async def _get_feedback_rows(
+        self,
+        group_by: Tuple[str, ...],
+        entity_type: Optional[FeedbackEntityType],
+        agent_id: Optional[str],
+        date_from: datetime,
+        date_to: datetime,
+        with_agent_only: bool = False,
+    ) -> List[Tuple]:
+        """Get (dimension values..., rating, count) rows from the daily rollup plus a live tail."""
+        counts = await self.rollups.get_feedback_counts(
+            group_by,
+            date_from,
+            date_to,
+            entity_type=entity_type,
+            agent_id=agent_id,
+            with_agent_only=with_agent_only,
+        )
+        return [(*key, count) for key, count in counts.items()]
+
     def _generate_cache_key(
         self,
         operation: str,
@@ -5,10 +5,11 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import and_, func, or_, select, asc, desc, nullslast, nullsfirst, BigInteger, String, cast
+from sqlalchemy import and_, func, or_, select, BigInteger, String, cast
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 
 from aldar_middleware.models.feedback import (
     FeedbackData,
@@ -19,6 +20,7 @@ from aldar_middleware.models.feedback import (
 from aldar_middleware.models.user import User
 from aldar_middleware.settings.context import get_correlation_id
 from aldar_middleware.settings import settings
+from aldar_middleware.utils.pagination import InvalidCursorError, KeysetColumn, paginate_keyset, split_keyset_rows
 
 logger = logging.getLogger(__name__)
 
@@ -224,6 +226,258 @@ class FeedbackService:
             )
             raise
 
+    def _list_query(
+        self,
+        user_id: Optional[str] = None,
+        entity_type: Optional[FeedbackEntityType] = None,
+        entity_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        rating: Optional[FeedbackRating] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+        exclude_user_id: bool = False,
+        sort_by: Optional[str] = None,
+    ) -> Select:
+        """Select live feedback matching the list filters, joined as search and sorting need."""
+        query = select(FeedbackData).where(FeedbackData.deleted_at.is_(None))
+
+        # Apply filters
+        if user_id and not exclude_user_id:
+            query = query.where(FeedbackData.user_id == user_id)
+
+        if entity_type:
+            query = query.where(FeedbackData.entity_type == entity_type)
+
+        if entity_id:
+            query = query.where(FeedbackData.entity_id == entity_id)
+
+        if agent_id:
+            query = query.where(FeedbackData.agent_id == agent_id)
+
+        if rating:
+            query = query.where(FeedbackData.rating == rating)
+
+        if date_from:
+            # Use full datetime comparison to respect time ranges
+            # Convert to UTC naive datetime for comparison
+            if date_from.tzinfo is not None:
+                date_from = date_from.astimezone(timezone.utc).replace(tzinfo=None)
+            query = query.where(FeedbackData.created_at >= date_from)
+
+        if date_to:
+            # Use full datetime comparison to respect time ranges
+            # Convert to UTC naive datetime for comparison
+            if date_to.tzinfo is not None:
+                date_to = date_to.astimezone(timezone.utc).replace(tzinfo=None)
+            query = query.where(FeedbackData.created_at <= date_to)
+
+        # Initialize join flags
+        needs_user_join = sort_by and sort_by.lower() == "user_full_name"
+        needs_user_join_for_search = False
+        needs_agent_join_for_search = False
+
+        # Add search filter - search across multiple fields
+        if search:
+            search_term = f"%{search}%"
+            search_lower = search.lower()
+            
+            logger.debug(f"Feedback search initiated for: '{search}'")
+            
+            # Build search conditions for fields directly in FeedbackData
+            search_conditions = [
+                FeedbackData.user_id.ilike(search_term),
+                FeedbackData.user_email.ilike(search_term) if FeedbackData.user_email else False,
+                FeedbackData.session_id.ilike(search_term) if FeedbackData.session_id else False,
+                FeedbackData.comment.ilike(search_term) if FeedbackData.comment else False,
+            ]
+            
+            # Search in metadata_json.agent.agent_name using PostgreSQL JSONB operators
+            # Cast JSON to JSONB first, then use -> operator for nested access and ->> for text extraction
+            # Use coalesce to handle NULL values (when agent or agent_name doesn't exist)
+            metadata_jsonb = cast(FeedbackData.metadata_json, JSONB)
+            # Use -> to get 'agent' object, then -> to get 'agent_name', then ->> to get text
+            agent_obj = metadata_jsonb.op('->')('agent')
+            agent_name_text = agent_obj.op('->>')('agent_name')
+            metadata_agent_name_condition = cast(
+                func.coalesce(agent_name_text, ''),
+                String
+            ).ilike(search_term)
+            search_conditions.append(metadata_agent_name_condition)
+            
+            # For user_full_name and agent_name, we need to join with User and Agent tables
+            # We'll do left outer joins to search in these related tables
+            needs_user_join_for_search = True
+            needs_agent_join_for_search = True
+            
+            # Join with User table for searching user_full_name
+            if needs_user_join_for_search:
+                if not needs_user_join:  # Only join if not already joined for sorting
+                    query = query.join(
+                        User,
+                        func.cast(FeedbackData.user_id, PG_UUID) == User.id,
+                        isouter=True
+                    )
+                # Add search conditions for user fields
+                # Search in full_name, azure_display_name, first_name, last_name, email
+                user_search_conditions = [
+                    User.full_name.ilike(search_term) if User.full_name else False,
+                    User.azure_display_name.ilike(search_term) if User.azure_display_name else False,
+                    User.first_name.ilike(search_term) if User.first_name else False,
+                    User.last_name.ilike(search_term) if User.last_name else False,
+                    User.email.ilike(search_term) if User.email else False,
+                ]
+                search_conditions.extend([c for c in user_search_conditions if c is not False])
+            
+            # Search for agents by name in Messages and Sessions
+            # Since FeedbackData.agent_id is NULL, we need to search via entity relationships
+            # Use subqueries to avoid collecting massive ID lists
+            if needs_agent_join_for_search:
+                from aldar_middleware.models.menu import Agent
+                from aldar_middleware.models.messages import Message
+                from aldar_middleware.models.sessions import Session
+                
+                # Create subquery for message IDs with matching agents
+                # Match on both Message.id and Message.public_id
+                message_id_subquery = (
+                    select(func.lower(cast(Message.id, String)))
+                    .select_from(Message)
+                    .join(Agent, Message.agent_id == Agent.id)
+                    .where(Agent.name.ilike(search_term))
+                )
+                
+                message_public_id_subquery = (
+                    select(func.lower(cast(Message.public_id, String)))
+                    .select_from(Message)
+                    .join(Agent, Message.agent_id == Agent.id)
+                    .where(Agent.name.ilike(search_term))
+                )
+                
+                # Create subquery for session IDs with matching agents
+                # Match on both Session.id and Session.public_id
+                session_id_subquery = (
+                    select(func.lower(cast(Session.id, String)))
+                    .select_from(Session)
+                    .join(Agent, Session.agent_id == Agent.id)
+                    .where(Agent.name.ilike(search_term))
+                )
+                
+                session_public_id_subquery = (
+                    select(func.lower(cast(Session.public_id, String)))
+                    .select_from(Session)
+                    .join(Agent, Session.agent_id == Agent.id)
+                    .where(Agent.name.ilike(search_term))
+                )
+                
+                # Match feedback where entity_id is in any of these subqueries
+                agent_search_condition = or_(
+                    func.lower(cast(FeedbackData.entity_id, String)).in_(message_id_subquery),
+                    func.lower(cast(FeedbackData.entity_id, String)).in_(message_public_id_subquery),
+                    func.lower(cast(FeedbackData.entity_id, String)).in_(session_id_subquery),
+                    func.lower(cast(FeedbackData.entity_id, String)).in_(session_public_id_subquery)
+                )
+                search_conditions.append(agent_search_condition)
+                logger.debug(f"Added agent name search condition using subqueries")
+            
+            # Apply search filter with OR logic - match if any field contains the search term
+            valid_conditions = [c for c in search_conditions if c is not False]
+            if valid_conditions:
+                query = query.where(or_(*valid_conditions))
+
+        # Apply sorting
+        # If sorting by user_full_name, we need to join with User table
+        # (needs_user_join already initialized above)
+        
+        if needs_user_join:
+            # Join with User table for sorting by full_name
+            # Cast user_id (String) to UUID for join with User.id
+            # Use PostgreSQL's UUID casting function
+            query = query.join(
+                User,
+                func.cast(FeedbackData.user_id, PG_UUID) == User.id,
+                isouter=True
+            )
+
+        return query
+
+    @staticmethod
+    def _list_sort_keys(sort_by: Optional[str], sort_order: Optional[str]) -> Tuple[List[KeysetColumn], str]:
+        """Keyset sort keys and cursor signature for a feedback list sort."""
+        # Apply sorting; the trailing feedback_id keeps the keyset unique
+        sort_by_lower = (sort_by or "").lower()
+        sort_order_upper = (sort_order or "DESC").upper()
+
+        # Validate sort_order
+        if sort_order_upper not in ["ASC", "DESC"]:
+            sort_order_upper = "DESC"
+        descending = sort_order_upper == "DESC"
+
+        if sort_by_lower == "user_email":
+            sort_key = KeysetColumn(FeedbackData.user_email, descending, nullable=True)
+        elif sort_by_lower == "user_full_name":
+            # Use COALESCE to handle NULL full_name by falling back to azure_display_name or first_name + last_name
+            full_name_expr = func.coalesce(
+                User.full_name,
+                User.azure_display_name,
+                func.concat(func.coalesce(User.first_name, ''), ' ', func.coalesce(User.last_name, ''))
+            )
+            sort_key = KeysetColumn(full_name_expr, descending, nullable=True)
+        elif sort_by_lower == "date":
+            sort_key = KeysetColumn(FeedbackData.created_at, descending)
+        elif sort_by_lower == "comment":
+            # Special handling for comment sorting:
+            # - ASC: NULL/empty comments at the end
+            # - DESC: NULL/empty comments at the beginning
+            # Use NULLIF to treat empty/whitespace-only strings as NULL for consistent sorting
+            field = func.nullif(func.trim(func.coalesce(FeedbackData.comment, '')), '')
+            sort_key = KeysetColumn(field, descending, nullable=True, nulls_first=descending)
+        else:
+            # Default (or invalid sort_by): created_at desc, latest first
+            sort_by_lower = "date"
+            sort_key = KeysetColumn(FeedbackData.created_at, descending=True)
+        sort_keys = [sort_key, KeysetColumn(FeedbackData.feedback_id, sort_key.descending)]
+        # Signed with the effective ordering, so equivalent requests share cursors
+        cursor_signature = f"feedback:{sort_by_lower}:{'DESC' if sort_key.descending else 'ASC'}"
+        return sort_keys, cursor_signature
+
+    def export_query(
+        self,
+        user_id: Optional[str] = None,
+        entity_type: Optional[FeedbackEntityType] = None,
+        entity_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        rating: Optional[FeedbackRating] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+        exclude_user_id: bool = False,
+        sort_by: Optional[str] = None,
+        sort_order: Optional[str] = "DESC",
+    ) -> Select:
+        """
+        Select all feedback matching the list filters, in list order.
+
+        Takes the same filters as list_feedback, without pagination; files
+        are not loaded.
+
+        Returns:
+            Select of FeedbackData rows for streaming exports
+        """
+        query = self._list_query(
+            user_id=user_id,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            agent_id=agent_id,
+            rating=rating,
+            date_from=date_from,
+            date_to=date_to,
+            search=search,
+            exclude_user_id=exclude_user_id,
+            sort_by=sort_by,
+        )
+        sort_keys, _ = self._list_sort_keys(sort_by, sort_order)
+        return query.order_by(*(key.order_by() for key in sort_keys))
+
     async def list_feedback(
         self,
         user_id: Optional[str] = None,
@@ -239,7 +493,9 @@ class FeedbackService:
         exclude_user_id: bool = False,
         sort_by: Optional[str] = None,
         sort_order: Optional[str] = "DESC",
-    ) -> Tuple[List[FeedbackData], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Tuple[List[FeedbackData], Optional[int], Optional[str]]:
         """
         List feedback with optional filters.
 
@@ -254,175 +510,37 @@ class FeedbackService:
             page: Page number (1-based)
             limit: Items per page
             exclude_user_id: If True, return feedback for admin (user_id ignored)
+            cursor: Opaque cursor from a previous page; takes precedence over page
+            include_total: If False, skip the count query
 
         Returns:
-            Tuple of (feedback_list, total_count)
+            Tuple of (feedback_list, total_count, next_cursor). total_count is
+            None when include_total is False; next_cursor is None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or was issued for another sort
         """
         correlation_id = get_correlation_id()
 
         try:
-            query = select(FeedbackData).where(FeedbackData.deleted_at.is_(None))
-
-            # Apply filters
-            if user_id and not exclude_user_id:
-                query = query.where(FeedbackData.user_id == user_id)
-
-            if entity_type:
-                query = query.where(FeedbackData.entity_type == entity_type)
-
-            if entity_id:
-                query = query.where(FeedbackData.entity_id == entity_id)
-
-            if agent_id:
-                query = query.where(FeedbackData.agent_id == agent_id)
-
-            if rating:
-                query = query.where(FeedbackData.rating == rating)
-
-            if date_from:
-                # Use full datetime comparison to respect time ranges
-                # Convert to UTC naive datetime for comparison
-                if date_from.tzinfo is not None:
-                    date_from = date_from.astimezone(timezone.utc).replace(tzinfo=None)
-                query = query.where(FeedbackData.created_at >= date_from)
-
-            if date_to:
-                # Use full datetime comparison to respect time ranges
-                # Convert to UTC naive datetime for comparison
-                if date_to.tzinfo is not None:
-                    date_to = date_to.astimezone(timezone.utc).replace(tzinfo=None)
-                query = query.where(FeedbackData.created_at <= date_to)
-
-            # Initialize join flags
-            needs_user_join = sort_by and sort_by.lower() == "user_full_name"
-            needs_user_join_for_search = False
-            needs_agent_join_for_search = False
-
-            # Add search filter - search across multiple fields
-            if search:
-                search_term = f"%{search}%"
-                search_lower = search.lower()
-                
-                logger.debug(f"Feedback search initiated for: '{search}'")
-                
-                # Build search conditions for fields directly in FeedbackData
-                search_conditions = [
-                    FeedbackData.user_id.ilike(search_term),
-                    FeedbackData.user_email.ilike(search_term) if FeedbackData.user_email else False,
-                    FeedbackData.session_id.ilike(search_term) if FeedbackData.session_id else False,
-                    FeedbackData.comment.ilike(search_term) if FeedbackData.comment else False,
-                ]
-                
-                # Search in metadata_json.agent.agent_name using PostgreSQL JSONB operators
-                # Cast JSON to JSONB first, then use -> operator for nested access and ->> for text extraction
-                # Use coalesce to handle NULL values (when agent or agent_name doesn't exist)
-                metadata_jsonb = cast(FeedbackData.metadata_json, JSONB)
-                # Use -> to get 'agent' object, then -> to get 'agent_name', then ->> to get text
-                agent_obj = metadata_jsonb.op('->')('agent')
-                agent_name_text = agent_obj.op('->>')('agent_name')
-                metadata_agent_name_condition = cast(
-                    func.coalesce(agent_name_text, ''),
-                    String
-                ).ilike(search_term)
-                search_conditions.append(metadata_agent_name_condition)
-                
-                # For user_full_name and agent_name, we need to join with User and Agent tables
-                # We'll do left outer joins to search in these related tables
-                needs_user_join_for_search = True
-                needs_agent_join_for_search = True
-                
-                # Join with User table for searching user_full_name
-                if needs_user_join_for_search:
-                    if not needs_user_join:  # Only join if not already joined for sorting
-                        query = query.join(
-                            User,
-                            func.cast(FeedbackData.user_id, PG_UUID) == User.id,
-                            isouter=True
-                        )
-                    # Add search conditions for user fields
-                    # Search in full_name, azure_display_name, first_name, last_name, email
-                    user_search_conditions = [
-                        User.full_name.ilike(search_term) if User.full_name else False,
-                        User.azure_display_name.ilike(search_term) if User.azure_display_name else False,
-                        User.first_name.ilike(search_term) if User.first_name else False,
-                        User.last_name.ilike(search_term) if User.last_name else False,
-                        User.email.ilike(search_term) if User.email else False,
-                    ]
-                    search_conditions.extend([c for c in user_search_conditions if c is not False])
-                
-                # Search for agents by name in Messages and Sessions
-                # Since FeedbackData.agent_id is NULL, we need to search via entity relationships
-                # Use subqueries to avoid collecting massive ID lists
-                if needs_agent_join_for_search:
-                    from aldar_middleware.models.menu import Agent
-                    from aldar_middleware.models.messages import Message
-                    from aldar_middleware.models.sessions import Session
-                    
-                    # Create subquery for message IDs with matching agents
-                    # Match on both Message.id and Message.public_id
-                    message_id_subquery = (
-                        select(func.lower(cast(Message.id, String)))
-                        .select_from(Message)
-                        .join(Agent, Message.agent_id == Agent.id)
-                        .where(Agent.name.ilike(search_term))
-                    )
-                    
-                    message_public_id_subquery = (
-                        select(func.lower(cast(Message.public_id, String)))
-                        .select_from(Message)
-                        .join(Agent, Message.agent_id == Agent.id)
-                        .where(Agent.name.ilike(search_term))
-                    )
-                    
-                    # Create subquery for session IDs with matching agents
-                    # Match on both Session.id and Session.public_id
-                    session_id_subquery = (
-                        select(func.lower(cast(Session.id, String)))
-                        .select_from(Session)
-                        .join(Agent, Session.agent_id == Agent.id)
-                        .where(Agent.name.ilike(search_term))
-                    )
-                    
-                    session_public_id_subquery = (
-                        select(func.lower(cast(Session.public_id, String)))
-                        .select_from(Session)
-                        .join(Agent, Session.agent_id == Agent.id)
-                        .where(Agent.name.ilike(search_term))
-                    )
-                    
-                    # Match feedback where entity_id is in any of these subqueries
-                    agent_search_condition = or_(
-                        func.lower(cast(FeedbackData.entity_id, String)).in_(message_id_subquery),
-                        func.lower(cast(FeedbackData.entity_id, String)).in_(message_public_id_subquery),
-                        func.lower(cast(FeedbackData.entity_id, String)).in_(session_id_subquery),
-                        func.lower(cast(FeedbackData.entity_id, String)).in_(session_public_id_subquery)
-                    )
-                    search_conditions.append(agent_search_condition)
-                    logger.debug(f"Added agent name search condition using subqueries")
-                
-                # Apply search filter with OR logic - match if any field contains the search term
-                valid_conditions = [c for c in search_conditions if c is not False]
-                if valid_conditions:
-                    query = query.where(or_(*valid_conditions))
-
-            # Apply sorting
-            # If sorting by user_full_name, we need to join with User table
-            # (needs_user_join already initialized above)
-            
-            if needs_user_join:
-                # Join with User table for sorting by full_name
-                # Cast user_id (String) to UUID for join with User.id
-                # Use PostgreSQL's UUID casting function
-                query = query.join(
-                    User,
-                    func.cast(FeedbackData.user_id, PG_UUID) == User.id,
-                    isouter=True
-                )
+            query = self._list_query(
+                user_id=user_id,
+                entity_type=entity_type,
+                entity_id=entity_id,
+                agent_id=agent_id,
+                rating=rating,
+                date_from=date_from,
+                date_to=date_to,
+                search=search,
+                exclude_user_id=exclude_user_id,
+                sort_by=sort_by,
+            )
+            needs_user_join = bool(sort_by) and sort_by.lower() == "user_full_name"
             
             # Get total count (before applying sorting/pagination)
             # Build count query with same filters and joins as main query
             # Check if we have joins (for search or sorting)
-            has_joins_for_count = (search and (needs_user_join_for_search or needs_agent_join_for_search)) or needs_user_join
+            has_joins_for_count = bool(search) or needs_user_join
             
             # Build count query base
             if has_joins_for_count:
@@ -547,75 +665,28 @@ class FeedbackService:
                 if valid_conditions:
                     count_query = count_query.where(or_(*valid_conditions))
             
-            count_result = await self.db.execute(count_query)
-            total_count = count_result.scalar_one()
-
-            # Apply sorting
-            order_by_clause = None
-            if sort_by:
-                sort_by_lower = sort_by.lower()
-                sort_order_upper = (sort_order or "DESC").upper()
-                
-                # Validate sort_order
-                if sort_order_upper not in ["ASC", "DESC"]:
-                    sort_order_upper = "DESC"
-                
-                # Map sort_by to model fields
-                if sort_by_lower == "user_email":
-                    field = FeedbackData.user_email
-                    if sort_order_upper == "ASC":
-                        order_by_clause = nullslast(asc(field))
-                    else:
-                        order_by_clause = nullslast(desc(field))
-                elif sort_by_lower == "user_full_name":
-                    # Use COALESCE to handle NULL full_name by falling back to azure_display_name or first_name + last_name
-                    # For simplicity, we'll sort by full_name, and if NULL, use azure_display_name
-                    full_name_expr = func.coalesce(
-                        User.full_name,
-                        User.azure_display_name,
-                        func.concat(func.coalesce(User.first_name, ''), ' ', func.coalesce(User.last_name, ''))
-                    )
-                    if sort_order_upper == "ASC":
-                        order_by_clause = nullslast(asc(full_name_expr))
-                    else:
-                        order_by_clause = nullslast(desc(full_name_expr))
-                elif sort_by_lower == "date":
-                    # Sort by created_at
-                    field = FeedbackData.created_at
-                    if sort_order_upper == "ASC":
-                        order_by_clause = asc(field)
-                    else:
-                        order_by_clause = desc(field)
-                elif sort_by_lower == "comment":
-                    # Special handling for comment sorting:
-                    # - ASC: NULL/empty comments at the end
-                    # - DESC: NULL/empty comments at the beginning
-                    # Use NULLIF to treat empty/whitespace-only strings as NULL for consistent sorting
-                    field = func.nullif(func.trim(func.coalesce(FeedbackData.comment, '')), '')
-                    if sort_order_upper == "ASC":
-                        # ASC: NULLs last (at the end)
-                        order_by_clause = nullslast(asc(field))
-                    else:
-                        # DESC: NULLs first (at the beginning)
-                        order_by_clause = nullsfirst(desc(field))
-                else:
-                    # Invalid sort_by, default to created_at desc
-                    order_by_clause = desc(FeedbackData.created_at)
-            else:
-                # Default sorting by created_at desc (latest first)
-                order_by_clause = desc(FeedbackData.created_at)
+            total_count = None
+            if include_total:
+                count_result = await self.db.execute(count_query)
+                total_count = count_result.scalar_one()
+
+            sort_keys, cursor_signature = self._list_sort_keys(sort_by, sort_order)
 
             # Apply pagination
             offset = (page - 1) * limit
-            query = (
-                query.order_by(order_by_clause)
-                .offset(offset)
-                .limit(limit)
-                .options(selectinload(FeedbackData.files))
+            query = paginate_keyset(
+                query.options(selectinload(FeedbackData.files)),
+                sort_keys,
+                limit=limit,
+                signature=cursor_signature,
+                cursor=cursor,
+                offset=offset,
             )
 
             result = await self.db.execute(query)
-            feedback_list = result.scalars().all()
+            feedback_list, next_cursor = split_keyset_rows(
+                result.all(), sort_keys, limit=limit, signature=cursor_signature
+            )
 
             logger.info(
                 f"Listed feedback",
@@ -631,8 +702,10 @@ class FeedbackService:
                 },
             )
 
-            return feedback_list, total_count
+            return feedback_list, total_count, next_cursor
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(
                 f"Failed to list feedback: {str(e)}",
@@ -0,0 +1,358 @@
+"""Login enrichment that runs after the Azure AD callback has returned.
+
+The callback upserts the user row, checks the admin groups (see
+:meth:`LoginEnrichmentService.sync_admin`) and issues the session token.
+Storing the Graph profile photo in blob storage and syncing the user's AD
+groups into ``rbac_user_pivot`` happen in a job:
+
+- on a Celery worker when a broker is configured (the job carries the user id
+  only; the worker gets a Graph token from the stored refresh token), or
+- on a small pool of in-process worker tasks otherwise.
+
+The admin check stays on the callback path because the job can be dropped or
+fail: a user removed from the admin groups must lose ``is_admin`` on their
+next login regardless. It costs one Graph call, and none when no admin groups
+are configured.
+
+Both background steps skip their writes when nothing changed: the photo is downloaded
+and re-uploaded only when its Graph ETag differs from the stored one, and the
+pivot row is replaced only when the hash of the group membership differs.
+"""
+
+import asyncio
+import hashlib
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from aldar_middleware.auth.azure_ad import azure_ad_auth
+from aldar_middleware.database.base import async_session
+from aldar_middleware.models.rbac import RBACUserPivot
+from aldar_middleware.models.user import User
+from aldar_middleware.monitoring.prometheus import record_login_enrichment
+from aldar_middleware.services.agent_available_cache import get_agent_available_cache
+from aldar_middleware.services.rbac_pivot_service import RBACPivotService
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.user_utils import get_profile_photo_blob_path, set_profile_photo_blob_path
+
+# Preference key holding the Graph ETag of the stored profile photo
+PHOTO_ETAG_PREFERENCE = "profile_photo_etag"
+
+
+def membership_hash(group_ids: Iterable[Any]) -> str:
+    """Order-independent hash of a set of AD group ids."""
+    return hashlib.sha256("\n".join(sorted({str(gid) for gid in group_ids})).encode()).hexdigest()
+
+
+async def _none() -> None:
+    return None
+
+
+def _default_blob_service():
+    from aldar_middleware.orchestration.blob_storage import BlobStorageService
+
+    return BlobStorageService(container_name=settings.azure_storage_container_name)
+
+
+class LoginEnrichmentService:
+    """Runs the enrichment steps for one user on a database session."""
+
+    def __init__(self, db: AsyncSession, graph=None, blob_service_factory=None):
+        """
+        Initialize the service.
+
+        Args:
+            db: Database session
+            graph: Microsoft Graph client (``azure_ad_auth`` by default)
+            blob_service_factory: Returns the blob storage service for photos
+        """
+        self.db = db
+        self.graph = graph or azure_ad_auth
+        self.blob_service_factory = blob_service_factory or _default_blob_service
+
+    async def enrich(self, user_id: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+        """Sync the profile photo and AD groups of a user.
+
+        Args:
+            user_id: Internal user id
+            access_token: Graph access token; obtained from the user's refresh
+                token when not given
+
+        Returns:
+            Outcome of each step, e.g. ``{"photo": "unchanged", "groups": "synced"}``
+        """
+        user = await self.db.get(User, uuid.UUID(str(user_id)))
+        if user is None:
+            return {"status": "user_not_found"}
+
+        if access_token is None:
+            if not user.azure_ad_refresh_token:
+                return {"status": "no_refresh_token"}
+            access_token = (await self.graph.get_graph_token(user.azure_ad_refresh_token)).get("access_token")
+            if not access_token:
+                return {"status": "no_access_token"}
+
+        # Both Graph reads are independent; database writes below stay sequential
+        etag, groups = await asyncio.gather(
+            self.graph.get_user_profile_photo_etag(access_token, user.azure_ad_id) if user.azure_ad_id else _none(),
+            self.graph.get_user_groups(access_token),
+            return_exceptions=True,
+        )
+
+        return {
+            "photo": await self._sync_photo(user, access_token, etag),
+            "groups": await self._sync_groups(user, groups),
+        }
+
+    async def sync_admin(self, user: User, access_token: str) -> bool:
+        """Grant or revoke admin from the user's current Graph group membership.
+
+        Runs in the login callback. Without configured admin groups it leaves
+        ``is_admin`` as it is and makes no Graph call.
+
+        Returns:
+            The user's admin status after the check
+        """
+        if not settings.admin_group_ids_list:
+            return bool(user.is_admin)
+        try:
+            groups = await self.graph.get_user_groups(access_token)
+        except Exception as e:
+            logger.error(f"Failed to fetch AD groups for admin check of user {user.email}: {e}")
+            groups = None
+        return await self._sync_admin(user, groups)
+
+    async def _sync_photo(self, user: User, access_token: str, etag: Any) -> str:
+        """Store the Graph photo in blob storage unless its ETag is unchanged."""
+        if isinstance(etag, BaseException):
+            logger.warning(f"Could not read profile photo metadata for user {user.email}: {etag}")
+            return self._record("photo", "failed")
+        if not etag:
+            return self._record("photo", "missing")
+        if etag == (user.preferences or {}).get(PHOTO_ETAG_PREFERENCE) and get_profile_photo_blob_path(user):
+            return self._record("photo", "unchanged")
+
+        try:
+            photo_bytes = await self.graph.get_user_profile_photo_bytes(access_token, user.azure_ad_id)
+            if not photo_bytes:
+                return self._record("photo", "missing")
+            _, blob_path, _ = await self.blob_service_factory().upload_profile_photo(
+                file_content=photo_bytes,
+                user_id=str(user.id),
+                overwrite=True,
+            )
+            set_profile_photo_blob_path(user, blob_path)
+            user.preferences[PHOTO_ETAG_PREFERENCE] = etag
+            flag_modified(user, "preferences")
+            await self.db.commit()
+        except Exception as e:
+            await self._rollback(user)
+            logger.warning(f"Error storing profile photo for user {user.email}: {e}")
+            return self._record("photo", "failed")
+
+        logger.info(f"Profile photo stored in blob storage for user {user.email}")
+        return self._record("photo", "uploaded")
+
+    async def _sync_groups(self, user: User, groups: Any) -> str:
+        """Replace the user's pivot row unless the group membership is unchanged."""
+        email = user.email or user.username
+        if isinstance(groups, BaseException):
+            logger.error(f"Failed to fetch AD groups for user {email}: {groups}")
+            return self._record("groups", "failed")
+
+        current = await self.db.scalar(select(RBACUserPivot.azure_ad_groups).where(RBACUserPivot.email == email))
+        if current is not None and membership_hash(current) == membership_hash(groups):
+            return self._record("groups", "unchanged")
+
+        try:
+            await RBACPivotService(self.db).sync_user_ad_groups_direct(email, groups)
+        except Exception as e:
+            # The pivot service has rolled back already
+            await self.db.refresh(user)
+            logger.error(f"Failed to sync AD groups for user {email}: {e}")
+            return self._record("groups", "failed")
+        logger.info(f"Synced {len(groups)} AD groups for user {email}")
+        # The available-agents overlay holds the fingerprint of the old groups
+        cache = get_agent_available_cache()
+        if cache:
+            await cache.invalidate_user(str(user.id))
+        return self._record("groups", "synced")
+
+    async def _sync_admin(self, user: User, groups: Optional[List[str]]) -> bool:
+        """Grant or revoke admin from membership of the configured admin groups.
+
+        A failed group fetch (``groups`` is None) revokes admin rather than
+        keeping a possibly stale grant.
+        """
+        admin_groups: Set[str] = {str(gid).strip() for gid in settings.admin_group_ids_list}
+        if not admin_groups:
+            return bool(user.is_admin)
+
+        email = user.email
+        matched = {str(gid) for gid in groups or []} & admin_groups
+        is_admin = bool(matched)
+        if user.is_admin != is_admin:
+            user.is_admin = is_admin
+            try:
+                await self.db.commit()
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"Failed to update admin status for user {email}: {e}")
+                return not is_admin
+            logger.info(
+                f"Updated admin status for user {email}: is_admin={is_admin} "
+                f"(matched groups: {sorted(matched) if matched else 'none'})"
+            )
+        return is_admin
+
+    async def _rollback(self, user: User) -> None:
+        """Roll back a failed step and reload the user for the next one."""
+        await self.db.rollback()
+        await self.db.refresh(user)
+
+    @staticmethod
+    def _record(step: str, outcome: str) -> str:
+        record_login_enrichment(step, outcome)
+        return outcome
+
+
+class LoginEnrichmentWorker:
+    """In-process job queue drained by a few worker tasks."""
+
+    def __init__(self, concurrency: Optional[int] = None, queue_size: Optional[int] = None, session_factory=None):
+        """
+        Initialize the worker.
+
+        Args:
+            concurrency: Number of worker tasks
+            queue_size: Pending jobs kept before new ones are dropped
+            session_factory: Returns a new database session context manager
+        """
+        self.concurrency = max(1, concurrency or settings.login_enrichment_concurrency)
+        self.queue_size = queue_size or settings.login_enrichment_queue_size
+        self.session_factory = session_factory or async_session
+        self.tasks: List[asyncio.Task] = []
+        self._queue: Optional[asyncio.Queue] = None
+        # Users with a job queued; a second login before it runs adds nothing
+        self._pending: Set[str] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self.tasks)
+
+    def submit(self, user_id: str, access_token: Optional[str] = None) -> bool:
+        """Queue an enrichment job, starting the workers on first use.
+
+        Returns:
+            True if the job was queued (or one is already queued for the user),
+            False if the queue is full
+        """
+        if not self.running:
+            self.start()
+        if user_id in self._pending:
+            return True
+        try:
+            self._queue.put_nowait((user_id, access_token))
+        except asyncio.QueueFull:
+            logger.warning(f"Login enrichment queue full; skipping enrichment for user {user_id}")
+            record_login_enrichment("job", "dropped")
+            return False
+        self._pending.add(user_id)
+        return True
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self.tasks = [
+            asyncio.create_task(self._run_worker(), name=f"login-enrichment-{index}")
+            for index in range(self.concurrency)
+        ]
+        logger.info(f"Login enrichment worker started (concurrency={self.concurrency})")
+
+    async def join(self) -> None:
+        """Wait until every queued job has run."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; queued jobs are dropped (the next login retries)."""
+        for task in self.tasks:
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    async def _run_worker(self) -> None:
+        while True:
+            user_id, access_token = await self._queue.get()
+            self._pending.discard(user_id)
+            try:
+                async with self.session_factory() as db:
+                    result = await LoginEnrichmentService(db).enrich(user_id, access_token)
+                logger.debug(f"Login enrichment for user {user_id}: {result}")
+            except Exception as e:
+                logger.error(f"Login enrichment failed for user {user_id}: {e}", exc_info=True)
+                record_login_enrichment("job", "failed")
+            finally:
+                self._queue.task_done()
+
+
+# Global instance
+_login_enrichment_worker: Optional[LoginEnrichmentWorker] = None
+
+
+def get_login_enrichment_worker() -> LoginEnrichmentWorker:
+    """Get or create the global in-process enrichment worker."""
+    global _login_enrichment_worker
+
+    if _login_enrichment_worker is None:
+        _login_enrichment_worker = LoginEnrichmentWorker()
+
+    return _login_enrichment_worker
+
+
+def _use_celery() -> bool:
+    backend = settings.login_enrichment_backend
+    if backend == "celery":
+        return True
+    if backend != "auto" or not settings.celery_broker_url:
+        return False
+    try:
+        import celery  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def enqueue_login_enrichment(user_id: str, access_token: Optional[str] = None) -> str:
+    """Schedule enrichment of a user who just logged in.
+
+    Args:
+        user_id: Internal user id
+        access_token: Graph access token from the login; used by the
+            in-process worker only, never sent to the broker
+
+    Returns:
+        Where the job went: ``celery``, ``in_process``, ``dropped`` or ``disabled``
+    """
+    if settings.login_enrichment_backend == "disabled":
+        return "disabled"
+
+    if _use_celery():
+        try:
+            from aldar_middleware.queue.tasks import enrich_user_login
+
+            enrich_user_login.delay(str(user_id))
+            return "celery"
+        except Exception as e:
+            logger.warning(f"Could not queue login enrichment on Celery, running in-process: {e}")
+
+    return "in_process" if get_login_enrichment_worker().submit(str(user_id), access_token) else "dropped"
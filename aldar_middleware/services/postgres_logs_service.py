@@ -1,14 +1,23 @@
 """Service for writing and querying logs from PostgreSQL tables."""
 
+import json
 import uuid
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-from sqlalchemy import select, func, and_, desc, asc, nullslast, String, cast
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import select, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 from loguru import logger
 
 from aldar_middleware.models.logs import UserLog, AdminLog
 from aldar_middleware.models.user import User
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.pagination import (
+    InvalidCursorError,
+    KeysetColumn,
+    paginate_keyset,
+    split_keyset_rows,
+)
 
 
 class PostgresLogsService:
@@ -135,6 +144,260 @@ class PostgresLogsService:
             await db.rollback()
             return False
 
+    async def _matching_user_ids(self, db: AsyncSession, search: str) -> List[uuid.UUID]:
+        """Find users whose name or email matches the search text.
+
+        Resolved up front so the log query can filter on the indexed
+        ``user_uuid`` column instead of joining users for every candidate row.
+        At most ``logs_search_max_users`` users are returned; logs of further
+        matching users are then found only through ``search_text``.
+        """
+        max_users = settings.logs_search_max_users
+        search_pattern = f"%{search}%"
+        result = await db.execute(
+            select(User.id)
+            .where(or_(User.full_name.ilike(search_pattern), User.email.ilike(search_pattern)))
+            .limit(max_users + 1)
+        )
+        user_ids = list(result.scalars().all())
+        if len(user_ids) > max_users:
+            logger.warning(
+                f"Log search '{search}' matches more than {max_users} users; "
+                f"filtering on the first {max_users} (logs_search_max_users)"
+            )
+            del user_ids[max_users:]
+        return user_ids
+
+    async def _count_logs(self, db: AsyncSession, matching: Select) -> Tuple[int, bool]:
+        """Count matching logs exactly up to a limit, estimating beyond it.
+
+        Args:
+            db: Database session
+            matching: Unordered select of the matching log ids
+
+        Returns:
+            Tuple of (total, is_estimate)
+        """
+        exact_limit = settings.logs_exact_count_limit
+        capped_count = select(func.count()).select_from(matching.limit(exact_limit + 1).subquery())
+        total = (await db.execute(capped_count)).scalar_one()
+        if total <= exact_limit:
+            return total, False
+
+        try:
+            # Planner row estimate for the full predicate; EXPLAIN does not run the query.
+            # The savepoint keeps the transaction usable for the fallback if it fails.
+            compiled = matching.compile(
+                dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+            )
+            async with db.begin_nested():
+                connection = await db.connection()
+                plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return max(total, int(plan[0]["Plan"]["Plan Rows"])), True
+        except Exception as e:
+            logger.warning(f"Falling back to exact log count, estimate failed: {e}")
+            exact_count = select(func.count()).select_from(matching.subquery())
+            return (await db.execute(exact_count)).scalar_one(), False
+
+    async def _user_log_conditions(
+        self,
+        db: AsyncSession,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        event_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> List[Any]:
+        """Build the user log filters shared by listing and export."""
+        conditions = []
+        
+        if date_from:
+            # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-10T18:30:00.000Z)
+            # Filter by created_at since that's what's shown in the response as createdAt
+            # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
+            if date_from.tzinfo is None:
+                # If timezone-naive, assume it's UTC and make it timezone-aware
+                date_from = date_from.replace(tzinfo=timezone.utc)
+            else:
+                # Convert to UTC if not already
+                date_from = date_from.astimezone(timezone.utc)
+            logger.info(f"Filtering user logs: date_from={date_from.isoformat()} (UTC)")
+            # Filter by created_at to match what's shown in response (createdAt)
+            conditions.append(UserLog.created_at >= date_from)
+        if date_to:
+            # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-12T18:29:59.999Z)
+            # Filter by created_at since that's what's shown in the response as createdAt
+            # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
+            if date_to.tzinfo is None:
+                # If timezone-naive, assume it's UTC and make it timezone-aware
+                date_to = date_to.replace(tzinfo=timezone.utc)
+            else:
+                # Convert to UTC if not already
+                date_to = date_to.astimezone(timezone.utc)
+            logger.info(f"Filtering user logs: date_to={date_to.isoformat()} (UTC)")
+            # Filter by created_at to match what's shown in response (createdAt)
+            conditions.append(UserLog.created_at <= date_to)
+        if event_type:
+            conditions.append(UserLog.action_type == event_type)
+        if user_id:
+            conditions.append(UserLog.user_id == str(user_id))
+        if correlation_id:
+            conditions.append(UserLog.correlation_id == correlation_id)
+        
+        # Add search filter - search across multiple fields
+        if search:
+            # search_text is a generated, trigram-indexed concatenation of:
+            # email, action_type (eventType) and the log_data fields name,
+            # email, eventType and the four agentName paths
+            # (eventPayload.agent, eventPayload, body.agent, body).
+            search_conditions = [UserLog.search_text.ilike(f"%{search.lower()}%")]
+
+            # Search in User.full_name / User.email
+            matching_user_ids = await self._matching_user_ids(db, search)
+            if matching_user_ids:
+                search_conditions.append(UserLog.user_uuid.in_(matching_user_ids))
+            
+            # Note: We explicitly exclude searching in:
+            # - user_id (UserLog.user_id column - contains UUIDs that cause false matches)
+            # - agentId (log_data->>'agentId' or log_data->'eventPayload'->>'agentId')
+            # - messageId (log_data->>'messageId' or log_data->'eventPayload'->>'messageId')
+            # - conversationId (log_data->>'conversationId' or log_data->'eventPayload'->>'conversationId')
+            # - userInput (log_data->>'userInput' or log_data->'eventPayload'->>'userInput')
+            # - role (from user info, not in log_data typically)
+            # - department (from user info, not in log_data typically)
+            
+            # Combine all search conditions with OR
+            conditions.append(or_(*search_conditions))
+        return conditions
+
+    async def _admin_log_conditions(
+        self,
+        db: AsyncSession,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        level: Optional[str] = None,
+        action_type: Optional[str] = None,
+        module: Optional[str] = None,
+        function: Optional[str] = None,
+        email: Optional[str] = None,
+        user_id: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> List[Any]:
+        """Build the admin log filters shared by listing and export."""
+        conditions = []
+        
+        if date_from:
+            # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-10T18:30:00.000Z)
+            # Filter by timestamp field (admin logs use timestamp, shown as timestamp in response)
+            # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
+            if date_from.tzinfo is None:
+                # If timezone-naive, assume it's UTC and make it timezone-aware
+                date_from = date_from.replace(tzinfo=timezone.utc)
+            else:
+                # Convert to UTC if not already
+                date_from = date_from.astimezone(timezone.utc)
+            logger.info(f"Filtering admin logs: date_from={date_from.isoformat()} (UTC)")
+            # Filter by timestamp to match what's shown in response
+            conditions.append(AdminLog.timestamp >= date_from)
+        if date_to:
+            # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-12T18:29:59.999Z)
+            # Filter by timestamp field (admin logs use timestamp, shown as timestamp in response)
+            # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
+            if date_to.tzinfo is None:
+                # If timezone-naive, assume it's UTC and make it timezone-aware
+                date_to = date_to.replace(tzinfo=timezone.utc)
+            else:
+                # Convert to UTC if not already
+                date_to = date_to.astimezone(timezone.utc)
+            logger.info(f"Filtering admin logs: date_to={date_to.isoformat()} (UTC)")
+            # Filter by timestamp to match what's shown in response
+            conditions.append(AdminLog.timestamp <= date_to)
+        if level:
+            conditions.append(AdminLog.level == level.upper())
+        if action_type:
+            conditions.append(AdminLog.action_type == action_type)
+        if module:
+            conditions.append(AdminLog.module == module)
+        if function:
+            conditions.append(AdminLog.function == function)
+        if email:
+            conditions.append(AdminLog.email == email)
+        if user_id:
+            conditions.append(AdminLog.user_id == str(user_id))
+        if search:
+            # search_text is a generated, trigram-indexed concatenation of:
+            # email, username, action_type (eventType), message and the
+            # log_data fields name, body.name (eventPayload.name) and
+            # body.description (agent description).
+            search_conditions = [AdminLog.search_text.ilike(f"%{search.lower()}%")]
+
+            # Search in User.full_name / User.email
+            matching_user_ids = await self._matching_user_ids(db, search)
+            if matching_user_ids:
+                search_conditions.append(AdminLog.user_uuid.in_(matching_user_ids))
+            
+            # Combine all search conditions with OR
+            conditions.append(or_(*search_conditions))
+        return conditions
+
+    @staticmethod
+    def user_log_to_dict(item: UserLog) -> Dict[str, Any]:
+        """Flatten a user log row: its log_data plus the column fields."""
+        log_dict = item.log_data.copy() if item.log_data else {}
+        # Ensure required fields are present
+        log_dict["id"] = item.id
+        log_dict["timestamp"] = item.timestamp.isoformat() if item.timestamp else None
+        log_dict["createdAt"] = item.created_at.isoformat() if item.created_at else None
+        log_dict["eventType"] = item.action_type  # action_type in DB maps to eventType in JSON response
+        return log_dict
+
+    @staticmethod
+    def admin_log_to_dict(item: AdminLog) -> Dict[str, Any]:
+        """Flatten an admin log row: its log_data overridden by the column fields."""
+        log_dict = item.log_data.copy() if item.log_data else {}
+        # Override with actual column values if they exist
+        log_dict["id"] = item.id
+        log_dict["timestamp"] = item.timestamp.isoformat() if item.timestamp else None
+        log_dict["level"] = item.level
+        log_dict["action_type"] = item.action_type
+        log_dict["user_id"] = item.user_id
+        log_dict["email"] = item.email
+        log_dict["username"] = item.username
+        log_dict["correlation_id"] = item.correlation_id
+        log_dict["module"] = item.module
+        log_dict["function"] = item.function
+        log_dict["message"] = item.message
+        return log_dict
+
+    async def user_logs_export_query(self, db: AsyncSession, **filters: Any) -> Select:
+        """Select every user log matching ``filters``, newest first.
+
+        Args:
+            db: Database session (used to resolve the search filter)
+            **filters: Filters accepted by :meth:`query_user_logs`
+
+        Returns:
+            Unpaginated select of UserLog rows for streaming exports
+        """
+        conditions = await self._user_log_conditions(db, **filters)
+        return select(UserLog).where(*conditions).order_by(UserLog.timestamp.desc(), UserLog.id.desc())
+
+    async def admin_logs_export_query(self, db: AsyncSession, **filters: Any) -> Select:
+        """Select every admin log matching ``filters``, newest first.
+
+        Args:
+            db: Database session (used to resolve the search filter)
+            **filters: Filters accepted by :meth:`query_admin_logs`
+
+        Returns:
+            Unpaginated select of AdminLog rows for streaming exports
+        """
+        conditions = await self._admin_log_conditions(db, **filters)
+        return select(AdminLog).where(*conditions).order_by(AdminLog.timestamp.desc(), AdminLog.id.desc())
+
     async def query_user_logs(
         self,
         db: AsyncSession,
@@ -148,251 +411,124 @@ class PostgresLogsService:
         search: Optional[str] = None,
         sort_by: Optional[str] = None,
         sort_order: Optional[str] = "DESC",
+        cursor: Optional[str] = None,
+        include_total: bool = True,
     ) -> Dict[str, Any]:
         """Query user logs from PostgreSQL user_logs table.
         
         Args:
             db: Database session
             limit: Maximum number of logs to return
-            offset: Number of logs to skip
+            offset: Number of logs to skip (ignored when cursor is given)
             date_from: Start date filter
             date_to: End date filter
             event_type: Filter by action type (e.g., USER_CONVERSATION_CREATED, USER_MESSAGE_CREATED)
             user_id: Filter by user ID
             correlation_id: Filter by correlation ID
             search: Search across email, user_id, name (via User join), and log_data JSONB fields
+            cursor: Opaque keyset cursor from a previous page's 'next_cursor'
+            include_total: Whether to count matching logs
             
         Returns:
-            Dictionary with 'items' (list of logs) and 'total' (total count)
+            Dictionary with 'items' (list of logs), 'total' (total count, None
+            when not requested), 'total_is_estimate' (True when total is the
+            planner estimate) and 'next_cursor' (None on the last page)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or from another sort
         """
         try:
-            from sqlalchemy import or_
-            
-            # Check if we need to join with User table for sorting by name or searching
+            # Check if we need to join with User table for sorting by name
             needs_user_join = False
             if sort_by:
                 sort_by_lower = sort_by.lower()
                 if sort_by_lower in ["name", "full_name", "fullname"]:
                     needs_user_join = True
             
-            # If search is provided, we need to join with User table to search by name
-            if search:
-                needs_user_join = True
-            
             # Build query with optional join
             if needs_user_join:
-                # Join with User table to access full_name for sorting/searching
-                # User.id is UUID, UserLog.user_id is String, so we need to cast
-                query = select(UserLog).outerjoin(
-                    User, UserLog.user_id == cast(User.id, String)
-                )
-                count_query = select(func.count(UserLog.id)).outerjoin(
-                    User, UserLog.user_id == cast(User.id, String)
-                )
+                # Join with User table to access full_name for sorting (user_uuid
+                # is the indexed uuid form of user_id, so no cast is needed)
+                query = select(UserLog).outerjoin(User, UserLog.user_uuid == User.id)
             else:
                 query = select(UserLog)
-                count_query = select(func.count(UserLog.id))
-            
-            # Build filters
-            conditions = []
-            
-            if date_from:
-                # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-10T18:30:00.000Z)
-                # Filter by created_at since that's what's shown in the response as createdAt
-                # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
-                if date_from.tzinfo is None:
-                    # If timezone-naive, assume it's UTC and make it timezone-aware
-                    date_from = date_from.replace(tzinfo=timezone.utc)
-                else:
-                    # Convert to UTC if not already
-                    date_from = date_from.astimezone(timezone.utc)
-                logger.info(f"Filtering user logs: date_from={date_from.isoformat()} (UTC)")
-                # Filter by created_at to match what's shown in response (createdAt)
-                conditions.append(UserLog.created_at >= date_from)
-            if date_to:
-                # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-12T18:29:59.999Z)
-                # Filter by created_at since that's what's shown in the response as createdAt
-                # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
-                if date_to.tzinfo is None:
-                    # If timezone-naive, assume it's UTC and make it timezone-aware
-                    date_to = date_to.replace(tzinfo=timezone.utc)
-                else:
-                    # Convert to UTC if not already
-                    date_to = date_to.astimezone(timezone.utc)
-                logger.info(f"Filtering user logs: date_to={date_to.isoformat()} (UTC)")
-                # Filter by created_at to match what's shown in response (createdAt)
-                conditions.append(UserLog.created_at <= date_to)
-            if event_type:
-                conditions.append(UserLog.action_type == event_type)
-            if user_id:
-                conditions.append(UserLog.user_id == str(user_id))
-            if correlation_id:
-                conditions.append(UserLog.correlation_id == correlation_id)
-            
-            # Add search filter - search across multiple fields
-            if search:
-                search_pattern = f"%{search}%"
-                search_conditions = []
-                
-                # Search in email column
-                search_conditions.append(UserLog.email.ilike(search_pattern))
-                
-                # Search in action_type (eventType) - allows searching for event types like USER_CONVERSATION_DELETED
-                search_conditions.append(UserLog.action_type.ilike(search_pattern))
-                
-                # Note: We do NOT search in user_id column to prevent matching UUIDs
-                # user_id contains UUIDs which can cause false matches (e.g., "04" matching in "408db9ec...")
-                
-                # Search in User.full_name (requires join)
-                if needs_user_join:
-                    search_conditions.append(User.full_name.ilike(search_pattern))
-                    # Also search in User.email as fallback
-                    search_conditions.append(User.email.ilike(search_pattern))
-                
-                # Search in specific log_data JSONB fields only (excluding agentId, messageId, conversationId, userInput, role, department)
-                # Instead of searching the entire log_data, search only in allowed fields
-                # This prevents searching in excluded fields like agentId, messageId, conversationId, userInput, role, department
-                
-                # Search in log_data->>'name' (if exists, using COALESCE to handle NULL)
-                search_conditions.append(
-                    cast(func.coalesce(UserLog.log_data['name'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->>'email' (already searched via UserLog.email, but also check log_data)
-                search_conditions.append(
-                    cast(func.coalesce(UserLog.log_data['email'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->>'eventType' (if exists in JSONB)
-                search_conditions.append(
-                    cast(func.coalesce(UserLog.log_data['eventType'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->'eventPayload'->'agent'->>'agentName' (if exists)
-                search_conditions.append(
-                    cast(func.coalesce(
-                        UserLog.log_data['eventPayload']['agent']['agentName'].astext, ''
-                    ), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->'eventPayload'->>'agentName' (alternative path)
-                search_conditions.append(
-                    cast(func.coalesce(
-                        UserLog.log_data['eventPayload']['agentName'].astext, ''
-                    ), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->'body'->'agent'->>'agentName' (alternative path for body)
-                search_conditions.append(
-                    cast(func.coalesce(
-                        UserLog.log_data['body']['agent']['agentName'].astext, ''
-                    ), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->'body'->>'agentName' (alternative path)
-                search_conditions.append(
-                    cast(func.coalesce(
-                        UserLog.log_data['body']['agentName'].astext, ''
-                    ), String).ilike(search_pattern)
-                )
-                
-                # Note: We explicitly exclude searching in:
-                # - user_id (UserLog.user_id column - contains UUIDs that cause false matches)
-                # - agentId (log_data->>'agentId' or log_data->'eventPayload'->>'agentId')
-                # - messageId (log_data->>'messageId' or log_data->'eventPayload'->>'messageId')
-                # - conversationId (log_data->>'conversationId' or log_data->'eventPayload'->>'conversationId')
-                # - userInput (log_data->>'userInput' or log_data->'eventPayload'->>'userInput')
-                # - role (from user info, not in log_data typically)
-                # - department (from user info, not in log_data typically)
-                
-                # Combine all search conditions with OR
-                conditions.append(or_(*search_conditions))
+            
+            conditions = await self._user_log_conditions(
+                db,
+                date_from=date_from,
+                date_to=date_to,
+                event_type=event_type,
+                user_id=user_id,
+                correlation_id=correlation_id,
+                search=search,
+            )
             
             if conditions:
                 query = query.where(and_(*conditions))
-                count_query = count_query.where(and_(*conditions))
             
-            # Apply sorting
-            order_by_clauses = []
-            if sort_by:
-                sort_by_lower = sort_by.lower()
-                sort_order_upper = (sort_order or "DESC").upper()
-                
-                # Validate sort_order
-                if sort_order_upper not in ["ASC", "DESC"]:
-                    sort_order_upper = "DESC"
-                
-                # Map sort_by to UserLog model fields or User model fields
-                if sort_by_lower in ["timestamp", "created_at", "createdat"]:
-                    field = UserLog.timestamp
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                elif sort_by_lower in ["event_type", "eventtype", "action_type"]:
-                    field = UserLog.action_type
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
-                elif sort_by_lower == "email":
-                    field = UserLog.email
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
-                elif sort_by_lower in ["name", "full_name", "fullname"]:
-                    # Sort by User.full_name (requires join)
-                    if needs_user_join:
-                        field = User.full_name
-                        if sort_order_upper == "ASC":
-                            order_by_clauses.append(nullslast(asc(field)))
-                        else:
-                            order_by_clauses.append(nullslast(desc(field)))
-                        # Add secondary sort by timestamp (DESC for newest first)
-                        order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
-                    else:
-                        # Fallback if join wasn't set up (shouldn't happen)
-                        order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
-                else:
-                    # Invalid sort_by, default to timestamp DESC
-                    order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
+            # Apply sorting (keyset: sort key, then newest first, then id)
+            sort_order_upper = (sort_order or "DESC").upper()
+            if sort_order_upper not in ["ASC", "DESC"]:
+                sort_order_upper = "DESC"
+            descending = sort_order_upper == "DESC"
+            sort_by_lower = (sort_by or "timestamp").lower()
+
+            newest_first = KeysetColumn(UserLog.timestamp, descending=True)
+            if sort_by_lower in ["event_type", "eventtype", "action_type"]:
+                sort_keys = [KeysetColumn(UserLog.action_type, descending=descending), newest_first]
+            elif sort_by_lower == "email":
+                sort_keys = [
+                    KeysetColumn(UserLog.email, descending=descending, nullable=True),
+                    newest_first,
+                ]
+            elif sort_by_lower in ["name", "full_name", "fullname"]:
+                # Sort by User.full_name (requires join)
+                sort_keys = [
+                    KeysetColumn(User.full_name, descending=descending, nullable=True),
+                    newest_first,
+                ]
+            elif sort_by_lower in ["timestamp", "created_at", "createdat"]:
+                sort_keys = [KeysetColumn(UserLog.timestamp, descending=descending)]
             else:
-                # Default sorting by timestamp DESC (latest first)
-                order_by_clauses.append(nullslast(desc(UserLog.timestamp)))
-            
-            query = query.order_by(*order_by_clauses)
-            
-            # Apply pagination
-            query = query.offset(offset).limit(limit)
+                # Invalid sort_by, default to timestamp DESC
+                sort_by_lower, sort_order_upper = "timestamp", "DESC"
+                sort_keys = [newest_first]
+            sort_keys.append(KeysetColumn(UserLog.id, descending=sort_keys[-1].descending))
+            cursor_signature = f"user_logs:{sort_by_lower}:{sort_order_upper}"
+
+            query = paginate_keyset(
+                query,
+                sort_keys,
+                limit=limit,
+                signature=cursor_signature,
+                cursor=cursor,
+                offset=offset,
+            )
             
             # Execute queries
             result = await db.execute(query)
-            items = result.scalars().all()
+            items, next_cursor = split_keyset_rows(
+                result.all(), sort_keys, limit=limit, signature=cursor_signature
+            )
             
-            count_result = await db.execute(count_query)
-            total = count_result.scalar_one()
+            total, total_is_estimate = None, False
+            if include_total:
+                total, total_is_estimate = await self._count_logs(
+                    db, select(UserLog.id).where(*conditions)
+                )
             
             # Convert to dict format (extract log_data JSONB)
-            items_list = []
-            for item in items:
-                log_dict = item.log_data.copy() if item.log_data else {}
-                # Ensure required fields are present
-                log_dict["id"] = item.id
-                log_dict["timestamp"] = item.timestamp.isoformat() if item.timestamp else None
-                log_dict["createdAt"] = item.created_at.isoformat() if item.created_at else None
-                log_dict["eventType"] = item.action_type  # action_type in DB maps to eventType in JSON response
-                items_list.append(log_dict)
+            items_list = [self.user_log_to_dict(item) for item in items]
             
             return {
                 "items": items_list,
-                "total": total
+                "total": total,
+                "total_is_estimate": total_is_estimate,
+                "next_cursor": next_cursor,
             }
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to query user logs from PostgreSQL: {e}")
             return {"items": [], "total": 0}
@@ -413,13 +549,15 @@ class PostgresLogsService:
         search: Optional[str] = None,
         sort_by: Optional[str] = None,
         sort_order: Optional[str] = "DESC",
+        cursor: Optional[str] = None,
+        include_total: bool = True,
     ) -> Dict[str, Any]:
         """Query admin logs from PostgreSQL admin_logs table.
         
         Args:
             db: Database session
             limit: Maximum number of logs to return
-            offset: Number of logs to skip
+            offset: Number of logs to skip (ignored when cursor is given)
             date_from: Start date filter
             date_to: End date filter
             level: Filter by log level (INFO, WARNING, ERROR, DEBUG)
@@ -428,242 +566,120 @@ class PostgresLogsService:
             email: Filter by email
             user_id: Filter by user ID
             search: Search in message field
+            cursor: Opaque keyset cursor from a previous page's 'next_cursor'
+            include_total: Whether to count matching logs
             
         Returns:
-            Dictionary with 'items' (list of logs) and 'total' (total count)
+            Dictionary with 'items' (list of logs), 'total' (total count, None
+            when not requested), 'total_is_estimate' (True when total is the
+            planner estimate) and 'next_cursor' (None on the last page)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or from another sort
         """
         try:
-            from sqlalchemy import or_
-            
-            # Check if we need to join with User table for sorting by name or searching
+            # Check if we need to join with User table for sorting by name
             needs_user_join = False
             if sort_by:
                 sort_by_lower = sort_by.lower()
                 if sort_by_lower in ["name", "full_name", "fullname"]:
                     needs_user_join = True
             
-            # If search is provided, we need to join with User table to search by name
-            if search:
-                needs_user_join = True
-            
             # Build query with optional join
             if needs_user_join:
-                # Join with User table to access full_name for sorting
-                # User.id is UUID, AdminLog.user_id is String, so we need to cast
-                query = select(AdminLog).outerjoin(
-                    User, AdminLog.user_id == cast(User.id, String)
-                )
-                count_query = select(func.count(AdminLog.id)).outerjoin(
-                    User, AdminLog.user_id == cast(User.id, String)
-                )
+                # Join with User table to access full_name for sorting (user_uuid
+                # is the indexed uuid form of user_id, so no cast is needed)
+                query = select(AdminLog).outerjoin(User, AdminLog.user_uuid == User.id)
             else:
                 query = select(AdminLog)
-                count_query = select(func.count(AdminLog.id))
-            
-            # Build filters
-            conditions = []
-            
-            if date_from:
-                # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-10T18:30:00.000Z)
-                # Filter by timestamp field (admin logs use timestamp, shown as timestamp in response)
-                # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
-                if date_from.tzinfo is None:
-                    # If timezone-naive, assume it's UTC and make it timezone-aware
-                    date_from = date_from.replace(tzinfo=timezone.utc)
-                else:
-                    # Convert to UTC if not already
-                    date_from = date_from.astimezone(timezone.utc)
-                logger.info(f"Filtering admin logs: date_from={date_from.isoformat()} (UTC)")
-                # Filter by timestamp to match what's shown in response
-                conditions.append(AdminLog.timestamp >= date_from)
-            if date_to:
-                # Frontend sends UTC datetime in ISO 8601 format (e.g., 2025-12-12T18:29:59.999Z)
-                # Filter by timestamp field (admin logs use timestamp, shown as timestamp in response)
-                # Ensure datetime is timezone-aware and in UTC for PostgreSQL TIMESTAMP WITH TIME ZONE comparison
-                if date_to.tzinfo is None:
-                    # If timezone-naive, assume it's UTC and make it timezone-aware
-                    date_to = date_to.replace(tzinfo=timezone.utc)
-                else:
-                    # Convert to UTC if not already
-                    date_to = date_to.astimezone(timezone.utc)
-                logger.info(f"Filtering admin logs: date_to={date_to.isoformat()} (UTC)")
-                # Filter by timestamp to match what's shown in response
-                conditions.append(AdminLog.timestamp <= date_to)
-            if level:
-                conditions.append(AdminLog.level == level.upper())
-            if action_type:
-                conditions.append(AdminLog.action_type == action_type)
-            if module:
-                conditions.append(AdminLog.module == module)
-            if function:
-                conditions.append(AdminLog.function == function)
-            if email:
-                conditions.append(AdminLog.email == email)
-            if user_id:
-                conditions.append(AdminLog.user_id == str(user_id))
-            if search:
-                # Search in: name, email, username, eventType, message, and eventPayload.name
-                search_pattern = f"%{search}%"
-                search_conditions = []
-                
-                logger.info(f"Admin logs search: pattern='{search_pattern}'")
-                
-                # Search in email column (top-level)
-                search_conditions.append(AdminLog.email.ilike(search_pattern))
-                
-                # Search in username column (top-level)
-                search_conditions.append(AdminLog.username.ilike(search_pattern))
-                
-                # Search in action_type (eventType - top-level)
-                search_conditions.append(AdminLog.action_type.ilike(search_pattern))
-                
-                # Search in message column (top-level)
-                search_conditions.append(AdminLog.message.ilike(search_pattern))
-                
-                # Search in User.full_name (name - top-level, requires join)
-                if needs_user_join:
-                    search_conditions.append(User.full_name.ilike(search_pattern))
-                    # Also search in User.email as fallback
-                    search_conditions.append(User.email.ilike(search_pattern))
-                
-                # Search in log_data->'body'->>'name' (eventPayload.name - nested in eventPayload/body)
-                # eventPayload is stored as "body" in log_data JSONB
-                # Use bracket notation for reliable nested access (same as user logs)
-                search_conditions.append(
-                    cast(func.coalesce(AdminLog.log_data['body']['name'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                # Also search in log_data->>'name' (if exists at top level)
-                search_conditions.append(
-                    cast(func.coalesce(AdminLog.log_data['name'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                # Search in log_data->'body'->>'description' (agent description)
-                search_conditions.append(
-                    cast(func.coalesce(AdminLog.log_data['body']['description'].astext, ''), String).ilike(search_pattern)
-                )
-                
-                logger.info(f"Added search conditions for pattern: {search_pattern}")
-                
-                # Combine all search conditions with OR
-                conditions.append(or_(*search_conditions))
+            
+            conditions = await self._admin_log_conditions(
+                db,
+                date_from=date_from,
+                date_to=date_to,
+                level=level,
+                action_type=action_type,
+                module=module,
+                function=function,
+                email=email,
+                user_id=user_id,
+                search=search,
+            )
             
             if conditions:
                 query = query.where(and_(*conditions))
-                count_query = count_query.where(and_(*conditions))
             
-            # Apply sorting
-            order_by_clauses = []
-            if sort_by:
-                sort_by_lower = sort_by.lower()
-                sort_order_upper = (sort_order or "DESC").upper()
-                
-                # Validate sort_order
-                if sort_order_upper not in ["ASC", "DESC"]:
-                    sort_order_upper = "DESC"
-                
-                # Map sort_by to AdminLog model fields or User model fields
-                if sort_by_lower in ["timestamp", "created_at", "createdat"]:
-                    field = AdminLog.timestamp
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                elif sort_by_lower in ["level"]:
-                    field = AdminLog.level
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                elif sort_by_lower in ["action_type", "actiontype", "event_type", "eventtype"]:
-                    field = AdminLog.action_type
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                elif sort_by_lower == "email":
-                    field = AdminLog.email
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                elif sort_by_lower in ["username", "user_name"]:
-                    field = AdminLog.username
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                elif sort_by_lower in ["name", "full_name", "fullname"]:
-                    # Sort by User.full_name (requires join)
-                    if needs_user_join:
-                        field = User.full_name
-                        if sort_order_upper == "ASC":
-                            order_by_clauses.append(nullslast(asc(field)))
-                        else:
-                            order_by_clauses.append(nullslast(desc(field)))
-                        # Add secondary sort by timestamp (DESC for newest first)
-                        order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                    else:
-                        # Fallback if join wasn't set up (shouldn't happen)
-                        order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                elif sort_by_lower == "module":
-                    field = AdminLog.module
-                    if sort_order_upper == "ASC":
-                        order_by_clauses.append(nullslast(asc(field)))
-                    else:
-                        order_by_clauses.append(nullslast(desc(field)))
-                    # Add secondary sort by timestamp (DESC for newest first)
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-                else:
-                    # Invalid sort_by, default to timestamp DESC
-                    order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
+            # Apply sorting (keyset: sort key, then newest first, then id)
+            sort_order_upper = (sort_order or "DESC").upper()
+            if sort_order_upper not in ["ASC", "DESC"]:
+                sort_order_upper = "DESC"
+            descending = sort_order_upper == "DESC"
+            sort_by_lower = (sort_by or "timestamp").lower()
+
+            newest_first = KeysetColumn(AdminLog.timestamp, descending=True)
+            secondary_fields = {
+                "level": (AdminLog.level, False),
+                "action_type": (AdminLog.action_type, True),
+                "actiontype": (AdminLog.action_type, True),
+                "event_type": (AdminLog.action_type, True),
+                "eventtype": (AdminLog.action_type, True),
+                "email": (AdminLog.email, True),
+                "username": (AdminLog.username, True),
+                "user_name": (AdminLog.username, True),
+                # Sort by User.full_name (requires join)
+                "name": (User.full_name, True),
+                "full_name": (User.full_name, True),
+                "fullname": (User.full_name, True),
+                "module": (AdminLog.module, True),
+            }
+            if sort_by_lower in secondary_fields:
+                field, nullable = secondary_fields[sort_by_lower]
+                sort_keys = [
+                    KeysetColumn(field, descending=descending, nullable=nullable),
+                    newest_first,
+                ]
+            elif sort_by_lower in ["timestamp", "created_at", "createdat"]:
+                sort_keys = [KeysetColumn(AdminLog.timestamp, descending=descending)]
             else:
-                # Default sorting by timestamp DESC (latest first)
-                order_by_clauses.append(nullslast(desc(AdminLog.timestamp)))
-            
-            query = query.order_by(*order_by_clauses)
-            
-            # Apply pagination
-            query = query.offset(offset).limit(limit)
+                # Invalid sort_by, default to timestamp DESC
+                sort_by_lower, sort_order_upper = "timestamp", "DESC"
+                sort_keys = [newest_first]
+            sort_keys.append(KeysetColumn(AdminLog.id, descending=sort_keys[-1].descending))
+            cursor_signature = f"admin_logs:{sort_by_lower}:{sort_order_upper}"
+
+            query = paginate_keyset(
+                query,
+                sort_keys,
+                limit=limit,
+                signature=cursor_signature,
+                cursor=cursor,
+                offset=offset,
+            )
             
             # Execute queries
             result = await db.execute(query)
-            items = result.scalars().all()
+            items, next_cursor = split_keyset_rows(
+                result.all(), sort_keys, limit=limit, signature=cursor_signature
+            )
             
-            count_result = await db.execute(count_query)
-            total = count_result.scalar_one()
+            total, total_is_estimate = None, False
+            if include_total:
+                total, total_is_estimate = await self._count_logs(
+                    db, select(AdminLog.id).where(*conditions)
+                )
             
             # Convert to LogEntryResponse format
-            items_list = []
-            for item in items:
-                log_dict = item.log_data.copy() if item.log_data else {}
-                # Override with actual column values if they exist
-                log_dict["id"] = item.id
-                log_dict["timestamp"] = item.timestamp.isoformat() if item.timestamp else None
-                log_dict["level"] = item.level
-                log_dict["action_type"] = item.action_type
-                log_dict["user_id"] = item.user_id
-                log_dict["email"] = item.email
-                log_dict["username"] = item.username
-                log_dict["correlation_id"] = item.correlation_id
-                log_dict["module"] = item.module
-                log_dict["function"] = item.function
-                log_dict["message"] = item.message
-                items_list.append(log_dict)
+            items_list = [self.admin_log_to_dict(item) for item in items]
             
             return {
                 "items": items_list,
-                "total": total
+                "total": total,
+                "total_is_estimate": total_is_estimate,
+                "next_cursor": next_cursor,
             }
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to query admin logs from PostgreSQL: {e}", exc_info=True)
             return {"items": [], "total": 0}
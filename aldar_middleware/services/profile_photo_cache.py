@@ -0,0 +1,168 @@
+"""Per-worker cache of profile photo bytes.
+
+The chat UI requests ``/auth/users/{id}/profile-photo`` for every avatar it
+renders. Photos are kept in a byte-size-bounded LRU together with a strong
+ETag derived from their content, so repeated requests are answered without
+reaching blob storage or Microsoft Graph (and with ``304 Not Modified`` when
+the browser already has the bytes). Users without a photo are cached as
+negative entries for a shorter time so Graph is not probed on every render.
+
+Entries are keyed by user id plus a version taken from the user row (the
+Graph photo ETag stored by login enrichment, or the blob path), so a photo
+replaced by another worker gets a new key instead of being served stale.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from aldar_middleware.settings import settings
+
+
+@dataclass(frozen=True)
+class CachedPhoto:
+    """A cached photo, or a negative entry when ``content`` is None."""
+
+    content: Optional[bytes]
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def missing(self) -> bool:
+        return self.content is None
+
+
+def photo_etag(content: bytes) -> str:
+    """Strong ETag of photo bytes."""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+class ProfilePhotoCache:
+    """LRU of photo bytes bounded by their total size."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+        clock=time.monotonic,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total size of cached photos; least recently used
+                photos are evicted beyond it
+            max_entries: Entries kept, "no photo" entries included
+            ttl_seconds: Lifetime of a cached photo
+            negative_ttl_seconds: Lifetime of a "no photo" entry
+            clock: Returns the current time in seconds
+        """
+        self.max_bytes = max_bytes
+        # A single photo may use at most this share of the cache
+        self.max_item_bytes = max_bytes // 8
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        self._items: "OrderedDict[str, CachedPhoto]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Loads in progress; concurrent misses for a key share one load
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[CachedPhoto]:
+        """Get a live entry, or None on a miss."""
+        entry = self._items.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Optional[bytes]]]) -> CachedPhoto:
+        """Get an entry, loading it on a miss.
+
+        Args:
+            key: Cache key
+            load: Returns the photo bytes, or None when there is no photo;
+                exceptions propagate and nothing is cached
+
+        Returns:
+            The cached (or uncacheably large) photo, or a negative entry
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = self._loading[key] = asyncio.ensure_future(self._load(key, load))
+        return await asyncio.shield(loading)
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Optional[bytes]]]) -> CachedPhoto:
+        try:
+            content = await load()
+            return self.put(key, content) if content else self.put_missing(key)
+        finally:
+            self._loading.pop(key, None)
+
+    def put(self, key: str, content: bytes) -> CachedPhoto:
+        """Cache photo bytes; photos too large for the cache are returned uncached."""
+        entry = CachedPhoto(content, photo_etag(content), self._clock() + self.ttl_seconds)
+        if len(content) <= self.max_item_bytes:
+            self._store(key, entry)
+        return entry
+
+    def put_missing(self, key: str) -> CachedPhoto:
+        """Remember that a user has no photo."""
+        entry = CachedPhoto(None, None, self._clock() + self.negative_ttl_seconds)
+        self._store(key, entry)
+        return entry
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.size_bytes = 0
+
+    def _store(self, key: str, entry: CachedPhoto) -> None:
+        self._remove(key)
+        self._items[key] = entry
+        self.size_bytes += len(entry.content or b"")
+        while self.size_bytes > self.max_bytes or len(self._items) > self.max_entries:
+            oldest = next(iter(self._items))
+            self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry.content or b"")
+
+
+# Global instance
+_profile_photo_cache: Optional[ProfilePhotoCache] = None
+
+
+def get_profile_photo_cache() -> ProfilePhotoCache:
+    """Get or create this worker's profile photo cache."""
+    global _profile_photo_cache
+
+    if _profile_photo_cache is None:
+        _profile_photo_cache = ProfilePhotoCache(
+            max_bytes=settings.profile_photo_cache_max_bytes,
+            max_entries=settings.profile_photo_cache_max_entries,
+            ttl_seconds=settings.profile_photo_cache_ttl_seconds,
+            negative_ttl_seconds=settings.profile_photo_negative_ttl_seconds,
+        )
+
+    return _profile_photo_cache
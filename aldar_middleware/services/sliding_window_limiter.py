@@ -0,0 +1,241 @@
+"""Sliding-window rate limiter shared by the auth and chat endpoints.
+
+A key (client IP, user id, ...) is allowed ``limit`` hits in any trailing
+``window`` seconds; several windows can be checked at once (e.g. 5/minute and
+20/hour). A rejected hit is not recorded, so a client that backs off regains
+capacity as its earlier hits age out.
+
+Two backends:
+
+- :class:`RedisSlidingWindowLimiter` keeps one sorted set of hit timestamps
+  per key and checks and records a hit in a single Lua script, so the limit
+  holds across every worker and pod.
+- :class:`InMemorySlidingWindowLimiter` is used when Redis is unavailable.
+  It has no lock: a hit runs without awaiting, so it cannot interleave with
+  another coroutine. Buckets are spread over shards that are swept one at a
+  time, which keeps memory bounded by the keys active in the longest window.
+"""
+
+import math
+import time
+import uuid
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from aldar_middleware.database.redis_client import get_redis_sync
+from aldar_middleware.settings import settings
+
+# (limit, window_seconds)
+Window = Tuple[int, int]
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of a rate-limited hit.
+
+    Attributes:
+        allowed: Whether the hit was accepted (and recorded)
+        limit: Limit of the exceeded window, or of the first window if allowed
+        window: Length in seconds of that window
+        count: Hits already recorded in that window
+        retry_after: Seconds until the exceeded window has room again
+    """
+
+    allowed: bool
+    limit: int
+    window: int
+    count: int
+    retry_after: int = 0
+
+
+class SlidingWindowLimiter:
+    """Interface of the sliding-window limiter backends."""
+
+    async def hit(self, key: str, windows: Sequence[Window]) -> RateLimitDecision:
+        """Record a hit for ``key`` unless it would exceed one of ``windows``.
+
+        Args:
+            key: Rate limit key, e.g. ``"chat:<user id>"``
+            windows: ``(limit, window_seconds)`` pairs that must all have room
+
+        Returns:
+            Decision for the first exceeded window, or an allowed decision
+        """
+        raise NotImplementedError
+
+
+class InMemorySlidingWindowLimiter(SlidingWindowLimiter):
+    """Per-process limiter over sharded lists of hit times."""
+
+    # Minimum hits between shard sweeps; the gap also grows with the size of
+    # the shard to sweep, so sweeping costs O(1) per hit
+    SWEEP_EVERY = 16
+
+    def __init__(self, shards: int = 64, clock=time.monotonic):
+        """
+        Initialize the limiter.
+
+        Args:
+            shards: Number of bucket shards
+            clock: Returns the current time in seconds
+        """
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(max(1, shards))]
+        self._clock = clock
+        self._hits_since_sweep = 0
+        self._next_sweep = 0
+        # Longest window seen; sweeps keep any bucket with a hit inside it
+        self._longest = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    async def hit(self, key: str, windows: Sequence[Window]) -> RateLimitDecision:
+        # No awaits below: the check and the append run as one step
+        now = self._clock()
+        longest = windows[0][1] if len(windows) == 1 else max(window for _, window in windows)
+        if longest > self._longest:
+            self._longest = longest
+        self._hits_since_sweep += 1
+        if self._hits_since_sweep >= self.SWEEP_EVERY:
+            self._maybe_sweep(now)
+
+        shard = self._shards[hash(key) % len(self._shards)]
+
+        hits = shard.get(key)
+        if hits is None:
+            hits = shard[key] = []
+        elif hits and hits[0] <= now - longest:
+            del hits[:bisect_right(hits, now - longest)]
+
+        for limit, window in windows:
+            start = bisect_right(hits, now - window) if window != longest else 0
+            count = len(hits) - start
+            if count >= limit:
+                # Room again once the oldest hit that must go has left the window
+                oldest = hits[start + count - limit] if limit > 0 else now
+                return RateLimitDecision(False, limit, window, count, max(1, math.ceil(oldest + window - now)))
+
+        limit, window = windows[0]
+        count = len(hits) - (bisect_right(hits, now - window) if window != longest else 0)
+        hits.append(now)
+        return RateLimitDecision(True, limit, window, count)
+
+    def _maybe_sweep(self, now: float) -> None:
+        """Sweep the next shard once enough hits have passed to pay for it."""
+        if self._hits_since_sweep * 2 >= len(self._shards[self._next_sweep]):
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        """Drop buckets of one shard with no hit inside the longest window."""
+        shard = self._shards[self._next_sweep]
+        self._next_sweep = (self._next_sweep + 1) % len(self._shards)
+        self._hits_since_sweep = 0
+        for key in [key for key, hits in shard.items() if not hits or hits[-1] <= now - self._longest]:
+            del shard[key]
+
+
+# KEYS[1]: sorted set of hit times; ARGV: now_ms, member, then limit/window_ms pairs.
+# Returns {allowed, window index (1-based), count, retry_after_ms}.
+_SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local longest = 0
+for i = 3, #ARGV, 2 do
+    longest = math.max(longest, tonumber(ARGV[i + 1]))
+end
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - longest)
+for i = 3, #ARGV, 2 do
+    local limit = tonumber(ARGV[i])
+    local window = tonumber(ARGV[i + 1])
+    local count = redis.call('ZCOUNT', key, '(' .. (now - window), '+inf')
+    if count >= limit then
+        local retry = window
+        if limit > 0 then
+            local oldest = redis.call('ZRANGEBYSCORE', key, '(' .. (now - window), '+inf', 'WITHSCORES', 'LIMIT', count - limit, 1)
+            if oldest[2] then
+                retry = tonumber(oldest[2]) + window - now
+            end
+        end
+        return {0, (i - 1) / 2, count, retry}
+    end
+end
+redis.call('ZADD', key, now, ARGV[2])
+redis.call('PEXPIRE', key, longest)
+local window = tonumber(ARGV[4])
+return {1, 1, redis.call('ZCOUNT', key, '(' .. (now - window), '+inf') - 1, 0}
+"""
+
+
+class RedisSlidingWindowLimiter(SlidingWindowLimiter):
+    """Cluster-wide limiter over Redis sorted sets.
+
+    Falls back to a per-process limiter while Redis is failing, so an outage
+    degrades to per-worker limits instead of rejecting or admitting everyone.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "sliding_window",
+        fallback: Optional[SlidingWindowLimiter] = None,
+        clock=time.time,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            redis: Redis async client
+            prefix: Key prefix of the sorted sets
+            fallback: Limiter used when a Redis call fails
+            clock: Returns the current wall-clock time in seconds
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else InMemorySlidingWindowLimiter()
+        self._clock = clock
+        self._script = redis.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    async def hit(self, key: str, windows: Sequence[Window]) -> RateLimitDecision:
+        now_ms = int(self._clock() * 1000)
+        args: List[int] = [now_ms, f"{now_ms}:{uuid.uuid4().hex}"]
+        for limit, window in windows:
+            args.extend((limit, window * 1000))
+
+        try:
+            allowed, index, count, retry_ms = await self._script(keys=[f"{self.prefix}:{key}"], args=args)
+        except RedisError as e:
+            logger.warning(f"Redis rate limiter unavailable, using per-process limits: {e}")
+            return await self.fallback.hit(key, windows)
+
+        limit, window = windows[int(index) - 1]
+        return RateLimitDecision(
+            bool(allowed), limit, window, int(count), max(1, math.ceil(int(retry_ms) / 1000)) if not allowed else 0
+        )
+
+
+_memory_limiter: Optional[InMemorySlidingWindowLimiter] = None
+_redis_limiter: Optional[RedisSlidingWindowLimiter] = None
+
+
+def get_sliding_window_limiter() -> SlidingWindowLimiter:
+    """Get the limiter for this process.
+
+    Uses Redis when the application's Redis client is available (and
+    ``rate_limit_backend`` is not ``memory``), the in-process limiter
+    otherwise.
+    """
+    global _memory_limiter, _redis_limiter
+
+    if _memory_limiter is None:
+        _memory_limiter = InMemorySlidingWindowLimiter(shards=settings.rate_limit_memory_shards)
+
+    redis_client = get_redis_sync() if settings.rate_limit_backend != "memory" else None
+    if redis_client is None:
+        return _memory_limiter
+
+    if _redis_limiter is None or _redis_limiter.redis is not redis_client:
+        _redis_limiter = RedisSlidingWindowLimiter(redis_client, fallback=_memory_limiter)
+    return _redis_limiter
@@ -1,220 +1,450 @@
-"""Web PubSub event listener service for automatically saving agent run events."""
+"""Web PubSub event listener service for automatically saving agent run events.
+
+Run events are buffered for a few milliseconds and written in batches: the
+sessions, agents and users referenced by a batch are resolved with one query
+each (backed by small in-process caches) and the agent_runs rows are upserted
+with a single ``INSERT ... ON CONFLICT``. A single worker drains the buffer,
+so events for the same run are always applied in the order they arrived.
+
+The upsert runs in a savepoint. If it fails (say one run references an agent
+that no longer exists) the batch is split in halves and retried, so only the
+runs whose rows cannot be written are reported as failed.
+"""
 
 import asyncio
-from typing import Dict, Any, Optional
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 from uuid import UUID
 
 from loguru import logger
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, or_, func
 
 from aldar_middleware.database.base import get_db
 from aldar_middleware.models.sessions import Session
 from aldar_middleware.models.agent_runs import AgentRun
 from aldar_middleware.models.menu import Agent
 from aldar_middleware.models.user import User
-from sqlalchemy import func
+from aldar_middleware.monitoring.prometheus import record_run_event_batch
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.batching import drain_batches, run_batch_worker
+
+
+@dataclass
+class _PendingRunEvent:
+    """A validated run event waiting to be written."""
+
+    event: str
+    run_id: str
+    session_id: str
+    run_data: Dict[str, Any]
+    received_at: float = field(default_factory=time.monotonic)
+    future: Optional[asyncio.Future] = None
+
+
+@dataclass
+class _RunUpsert:
+    """All events of one run in a batch, folded in arrival order."""
+
+    first: _PendingRunEvent
+    status: str
+    content: Optional[str] = None
+    error_message: Optional[str] = None
+
+
+class _LookupCache:
+    """Small LRU map for ids that never change once created."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+def _fold_run_events(events: Iterable[_PendingRunEvent]) -> Dict[str, _RunUpsert]:
+    """Collapse a batch into one upsert per run, applying events in order.
+
+    The last status wins; content and error_message keep the last non-empty
+    value, matching what applying the events one by one would leave behind.
+    """
+    runs: Dict[str, _RunUpsert] = {}
+    for pending in events:
+        data = pending.run_data
+        upsert = runs.get(pending.run_id)
+        if upsert is None:
+            upsert = runs[pending.run_id] = _RunUpsert(first=pending, status="")
+        upsert.status = str(data.get("status", "RUNNING")).lower()
+        if data.get("content"):
+            upsert.content = data["content"]
+        if data.get("error_message"):
+            upsert.error_message = data["error_message"]
+    return runs
 
 
 class WebPubSubEventListener:
     """Background service to listen and process Web PubSub events automatically."""
-    
+
     def __init__(self):
         self.running = False
         self.task: Optional[asyncio.Task] = None
-    
+        self.batch_size = settings.webpubsub_ingest_batch_size
+        self.flush_interval = settings.webpubsub_ingest_flush_interval_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        # session id or public_id -> (id, agent_id, user_id)
+        self._sessions = _LookupCache(settings.webpubsub_ingest_cache_size)
+        # ("agent_id" | "name", value) -> agents.id
+        self._agents = _LookupCache(settings.webpubsub_ingest_cache_size)
+        # lower(email) -> users.id
+        self._users = _LookupCache(settings.webpubsub_ingest_cache_size)
+
+    def _parse_run_event(self, event_data: Dict[str, Any]) -> Optional[_PendingRunEvent]:
+        """Validate an incoming event; returns None for events that are not saved."""
+        # Extract event type
+        event = event_data.get("event") or event_data.get("type") or event_data.get("event_type")
+
+        # Process all run-related events (RunCompleted, RunStarted, RunFailed, etc.)
+        if not event or not event.startswith("Run"):
+            logger.debug(f"Ignoring non-run event: {event}")
+            return None
+
+        # Extract run data - handle different payload structures
+        run_data = event_data.get("data", event_data)
+
+        session_id = run_data.get("session_id")
+        run_id = run_data.get("run_id")
+
+        if not session_id or not run_id:
+            logger.warning(f"Missing session_id or run_id in event {event}")
+            return None
+
+        return _PendingRunEvent(event=event, run_id=run_id, session_id=str(session_id), run_data=run_data)
+
     async def process_run_event(self, event_data: Dict[str, Any]) -> bool:
         """
         Process a run event (RunCompleted, RunStarted, etc.) and save to database.
-        
+
+        While the listener is running the event joins the current batch and
+        this returns once the batch is committed; otherwise it is written
+        immediately as a batch of one.
+
         Args:
             event_data: Event data from Web PubSub
-            
+
         Returns:
             True if processed successfully, False otherwise
         """
         try:
-            # Extract event type
-            event = event_data.get("event") or event_data.get("type") or event_data.get("event_type")
-            
-            # Process all run-related events (RunCompleted, RunStarted, RunFailed, etc.)
-            if not event or not event.startswith("Run"):
-                logger.debug(f"Ignoring non-run event: {event}")
-                return False
-            
-            # Extract run data - handle different payload structures
-            run_data = event_data.get("data", event_data)
-            
-            session_id = run_data.get("session_id")
-            run_id = run_data.get("run_id")
-            content = run_data.get("content")
-            status = run_data.get("status", "RUNNING")
-            
-            if not session_id or not run_id:
-                logger.warning(f"Missing session_id or run_id in event {event}")
+            pending = self._parse_run_event(event_data)
+            if pending is None:
                 return False
-            
-            # Save to database asynchronously
-            async for db in get_db():
-                try:
-                    # Find session by session_id
-                    session = None
-                    try:
-                        session_uuid = UUID(session_id)
-                        result = await db.execute(
-                            select(Session).where(Session.id == session_uuid)
-                        )
-                        session = result.scalar_one_or_none()
-                    except ValueError:
-                        pass
-                    
-                    if not session:
-                        try:
-                            session_uuid = UUID(session_id)
-                            result = await db.execute(
-                                select(Session).where(Session.public_id == session_uuid)
-                            )
-                            session = result.scalar_one_or_none()
-                        except ValueError:
-                            logger.warning(f"Invalid session_id format: {session_id}")
-                            return False
-                    
-                    if not session:
-                        logger.warning(f"Session not found: {session_id}")
-                        return False
-                    
-                    # Find or create AgentRun
-                    result = await db.execute(
-                        select(AgentRun).where(AgentRun.run_id == run_id)
-                    )
-                    agent_run = result.scalar_one_or_none()
-                    
-                    if agent_run:
-                        # Update existing run
-                        agent_run.status = status.lower()
-                        agent_run.updated_at = datetime.utcnow()
-                        if content:
-                            agent_run.content = content
-                        if run_data.get("error_message"):
-                            agent_run.error_message = run_data.get("error_message")
-                    else:
-                        # Create new run
-                        agent_id = run_data.get("agent_id")
-                        agent_name = run_data.get("agent_name")
-                        user_id_raw = run_data.get("user_id")
-                        
-                        # Find agent if agent_id is provided
-                        agent_db_id = None
-                        if agent_id or agent_name:
-                            conditions = []
-                            if agent_id:
-                                conditions.append(Agent.agent_id == agent_id)
-                            if agent_name:
-                                conditions.append(Agent.name == agent_name)
-                            
-                            if conditions:
-                                agent_result = await db.execute(
-                                    select(Agent).where(or_(*conditions))
-                                )
-                                agent = agent_result.scalar_one_or_none()
-                                if agent:
-                                    agent_db_id = agent.id
-                        
-                        if not agent_db_id:
-                            agent_db_id = session.agent_id
-                        
-                        # Get user_id - handle both UUID and email formats
-                        user_id = None
-                        if user_id_raw:
-                            # Try to parse as UUID first
-                            try:
-                                user_id = UUID(user_id_raw)
-                            except (ValueError, TypeError):
-                                # If not a valid UUID, try to find user by email
-                                logger.info(f"user_id '{user_id_raw}' is not a UUID, looking up by email")
-                                user_result = await db.execute(
-                                    select(User).where(func.lower(User.email) == user_id_raw.lower().strip())
-                                )
-                                user = user_result.scalar_one_or_none()
-                                if user:
-                                    user_id = user.id
-                                    logger.info(f"Found user by email '{user_id_raw}': user_id={user_id}")
-                                else:
-                                    logger.warning(f"User not found by email '{user_id_raw}', will use session.user_id")
-                        
-                        # Fall back to session.user_id if not found or not provided
-                        if not user_id:
-                            user_id = session.user_id
-                            logger.info(f"Using session.user_id: {user_id}")
-                        
-                        agent_run = AgentRun(
-                            run_id=run_id,
-                            session_id=session.id,
-                            agent_id=agent_db_id,
-                            user_id=user_id,
-                            agent_name=agent_name,
-                            content=content,
-                            content_type=run_data.get("content_type", "text"),
-                            status=status.lower(),
-                            error_message=run_data.get("error_message"),
-                            created_at=datetime.utcnow(),
-                            updated_at=datetime.utcnow()
-                        )
-                        db.add(agent_run)
-                    
-                    await db.commit()
-                    
-                    # SKIPPED: Message table update logic - using agno_sessions table instead for frontend data
-                    # The external team is storing all data in agno_sessions table, so we'll use that for frontend
-                    # if event == "RunCompleted" and content and status.upper() == "COMPLETED":
-                    #     ... (message update logic skipped)
-                    
-                    logger.info(
-                        f"Saved {event} event for run_id={run_id}, "
-                        f"session_id={session_id}, status={status}. "
-                        f"Note: Message table updates skipped - using agno_sessions table for frontend data."
-                    )
-                    return True
-                    
-                except Exception as e:
-                    await db.rollback()
-                    logger.error(f"Error saving {event} event to database: {str(e)}")
-                    return False
-                finally:
-                    break
-            
-            return True
-            
+
+            if self.running and self._queue is not None:
+                pending.future = asyncio.get_running_loop().create_future()
+                await self._queue.put(pending)
+                return await pending.future
+
+            results = await self._process_batch([pending])
+            return results[0]
+
         except Exception as e:
             logger.error(f"Error processing run event: {str(e)}")
             return False
-    
+
+    async def _run_worker(self) -> None:
+        """Drain the queue in batches until cancelled."""
+
+        def on_error(batch: List[_PendingRunEvent], e: Exception) -> None:
+            logger.error(f"Run event batch failed: {str(e)}")
+            self._resolve_futures(batch, [False] * len(batch))
+
+        await run_batch_worker(self._queue, self._process_batch, self.batch_size, self.flush_interval, on_error)
+
+    @staticmethod
+    def _resolve_futures(batch: List[_PendingRunEvent], results: List[bool]) -> None:
+        for pending, result in zip(batch, results):
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result(result)
+
+    async def _process_batch(self, batch: List[_PendingRunEvent]) -> List[bool]:
+        """Write a batch of run events and report success per event."""
+        results = [False] * len(batch)
+        saved: List[int] = []
+        failed = False
+        failed_runs: Set[str] = set()
+        index_by_id = {id(pending): index for index, pending in enumerate(batch)}
+
+        async for db in get_db():
+            try:
+                sessions = await self._resolve_sessions(db, {pending.session_id for pending in batch})
+                resolved = []
+                for pending in batch:
+                    if sessions.get(pending.session_id) is not None:
+                        resolved.append(pending)
+                    elif pending.session_id in sessions:
+                        logger.warning(f"Invalid session_id format: {pending.session_id}")
+                    else:
+                        logger.warning(f"Session not found: {pending.session_id}")
+
+                runs = _fold_run_events(resolved)
+                if runs:
+                    failed_runs = await self._save_runs(db, runs, sessions)
+                    await db.commit()
+                saved = [index_by_id[id(pending)] for pending in resolved if pending.run_id not in failed_runs]
+                for index in saved:
+                    results[index] = True
+
+                logger.info(
+                    f"Saved {len(saved)} run events for {len(runs) - len(failed_runs)} runs "
+                    f"({len(batch) - len(resolved)} skipped, {len(resolved) - len(saved)} failed)"
+                )
+            except Exception as e:
+                await db.rollback()
+                failed = True
+                logger.error(f"Error saving run events to database: {str(e)}")
+            finally:
+                break
+
+        now = time.monotonic()
+        lags: Dict[str, List[float]] = {"saved": [], "skipped": [], "failed": []}
+        for index, pending in enumerate(batch):
+            if results[index]:
+                outcome = "saved"
+            elif failed or pending.run_id in failed_runs:
+                outcome = "failed"
+            else:
+                outcome = "skipped"
+            lags[outcome].append(now - pending.received_at)
+        record_run_event_batch(
+            len(batch), self._queue.qsize() if self._queue is not None else 0, lags
+        )
+        self._resolve_futures(batch, results)
+        return results
+
+    async def _save_runs(
+        self,
+        db: AsyncSession,
+        runs: Dict[str, _RunUpsert],
+        sessions: Dict[str, Optional[Tuple[UUID, int, UUID]]],
+    ) -> Set[str]:
+        """Upsert runs in a savepoint, bisecting on failure; returns the run ids not saved."""
+        try:
+            async with db.begin_nested():
+                await self._upsert_runs(db, runs, sessions)
+            return set()
+        except Exception as e:
+            if len(runs) == 1:
+                logger.error(f"Error saving run {next(iter(runs))} to database: {str(e)}")
+                return set(runs)
+
+        items = list(runs.items())
+        middle = len(items) // 2
+        failed = await self._save_runs(db, dict(items[:middle]), sessions)
+        return failed | await self._save_runs(db, dict(items[middle:]), sessions)
+
+    async def _resolve_sessions(
+        self, db: AsyncSession, session_ids: Iterable[str]
+    ) -> Dict[str, Optional[Tuple[UUID, int, UUID]]]:
+        """Map session ids (id or public_id) to (id, agent_id, user_id).
+
+        Malformed ids map to None; unknown sessions are left out.
+        """
+        found: Dict[str, Optional[Tuple[UUID, int, UUID]]] = {}
+        missing: Dict[UUID, str] = {}
+        for session_id in session_ids:
+            cached = self._sessions.get(session_id)
+            if cached is not None:
+                found[session_id] = cached
+                continue
+            try:
+                missing[UUID(session_id)] = session_id
+            except ValueError:
+                found[session_id] = None
+
+        if missing:
+            result = await db.execute(
+                select(Session.id, Session.public_id, Session.agent_id, Session.user_id).where(
+                    or_(Session.id.in_(missing), Session.public_id.in_(missing))
+                )
+            )
+            by_public_id = {}
+            by_id = {}
+            for row in result.all():
+                value = (row.id, row.agent_id, row.user_id)
+                by_public_id[row.public_id] = value
+                by_id[row.id] = value
+            for session_uuid, session_id in missing.items():
+                # Match on id first, then public_id
+                value = by_id.get(session_uuid) or by_public_id.get(session_uuid)
+                if value is not None:
+                    self._sessions.put(session_id, value)
+                    found[session_id] = value
+        return found
+
+    async def _resolve_agents(
+        self, db: AsyncSession, runs: Iterable[_RunUpsert]
+    ) -> None:
+        """Load agents referenced by agent_id or name into the cache."""
+        agent_ids = set()
+        agent_names = set()
+        for upsert in runs:
+            data = upsert.first.run_data
+            if data.get("agent_id") and self._agents.get(("agent_id", data["agent_id"])) is None:
+                agent_ids.add(data["agent_id"])
+            if data.get("agent_name") and self._agents.get(("name", data["agent_name"])) is None:
+                agent_names.add(data["agent_name"])
+        if not agent_ids and not agent_names:
+            return
+
+        conditions = []
+        if agent_ids:
+            conditions.append(Agent.agent_id.in_(agent_ids))
+        if agent_names:
+            conditions.append(Agent.name.in_(agent_names))
+        result = await db.execute(select(Agent.id, Agent.agent_id, Agent.name).where(or_(*conditions)))
+        for row in result.all():
+            if row.agent_id in agent_ids:
+                self._agents.put(("agent_id", row.agent_id), row.id)
+            if row.name in agent_names:
+                self._agents.put(("name", row.name), row.id)
+
+    async def _resolve_users(
+        self, db: AsyncSession, runs: Iterable[_RunUpsert]
+    ) -> None:
+        """Load users referenced by email (non-UUID user_id values) into the cache."""
+        emails = set()
+        for upsert in runs:
+            user_id_raw = upsert.first.run_data.get("user_id")
+            if not user_id_raw or _parse_uuid(user_id_raw) is not None:
+                continue
+            email = str(user_id_raw).lower().strip()
+            if self._users.get(email) is None:
+                emails.add(email)
+        if not emails:
+            return
+
+        # Served by idx_users_email_lower
+        result = await db.execute(
+            select(User.id, func.lower(User.email).label("email")).where(
+                func.lower(User.email).in_(emails)
+            )
+        )
+        for row in result.all():
+            self._users.put(row.email, row.id)
+
+    def _agent_db_id(self, run_data: Dict[str, Any], session_agent_id: int) -> int:
+        agent_id = run_data.get("agent_id")
+        agent_name = run_data.get("agent_name")
+        agent_db_id = None
+        if agent_id:
+            agent_db_id = self._agents.get(("agent_id", agent_id))
+        if agent_db_id is None and agent_name:
+            agent_db_id = self._agents.get(("name", agent_name))
+        return agent_db_id or session_agent_id
+
+    def _user_id(self, run_data: Dict[str, Any], session_user_id: UUID) -> UUID:
+        # Get user_id - handle both UUID and email formats
+        user_id_raw = run_data.get("user_id")
+        if not user_id_raw:
+            return session_user_id
+        user_id = _parse_uuid(user_id_raw)
+        if user_id is not None:
+            return user_id
+        user_id = self._users.get(str(user_id_raw).lower().strip())
+        if user_id is None:
+            logger.warning(f"User not found by email '{user_id_raw}', will use session.user_id")
+            return session_user_id
+        return user_id
+
+    async def _upsert_runs(
+        self,
+        db: AsyncSession,
+        runs: Dict[str, _RunUpsert],
+        sessions: Dict[str, Optional[Tuple[UUID, int, UUID]]],
+    ) -> None:
+        """Insert new agent runs and update existing ones in one statement."""
+        await self._resolve_agents(db, runs.values())
+        await self._resolve_users(db, runs.values())
+
+        now = datetime.utcnow()
+        rows = []
+        for run_id, upsert in runs.items():
+            data = upsert.first.run_data
+            session_db_id, session_agent_id, session_user_id = sessions[upsert.first.session_id]
+            rows.append({
+                "id": uuid.uuid4(),
+                "public_id": uuid.uuid4(),
+                "run_id": run_id,
+                "session_id": session_db_id,
+                "agent_id": self._agent_db_id(data, session_agent_id),
+                "user_id": self._user_id(data, session_user_id),
+                "agent_name": data.get("agent_name"),
+                "content": upsert.content,
+                "content_type": data.get("content_type", "text"),
+                "status": upsert.status,
+                "error_message": upsert.error_message,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        stmt = pg_insert(AgentRun).values(rows)
+        excluded = stmt.excluded
+        # Existing runs only take the new status and any new content/error
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AgentRun.run_id],
+            set_={
+                "status": excluded.status,
+                "updated_at": excluded.updated_at,
+                "content": func.coalesce(excluded.content, AgentRun.content),
+                "error_message": func.coalesce(excluded.error_message, AgentRun.error_message),
+            },
+        )
+        await db.execute(stmt)
+
     async def process_event(self, event_data: Dict[str, Any]) -> bool:
         """
         Process any Web PubSub event.
-        
+
         Args:
             event_data: Event data from Web PubSub
-            
+
         Returns:
             True if processed successfully, False otherwise
         """
         return await self.process_run_event(event_data)
-    
+
     async def start_listening(self):
-        """Start the background listener (placeholder for future Web PubSub integration)."""
+        """Start the background listener and its batch writer."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.webpubsub_ingest_queue_size)
+        self.task = asyncio.create_task(self._run_worker())
         self.running = True
         logger.info("Web PubSub event listener started (ready to receive events)")
-        
+
         # In a real implementation, this would:
         # 1. Connect to Web PubSub
         # 2. Subscribe to events
         # 3. Process events as they arrive
         # For now, events will be processed via the webhook endpoint
-    
+
     async def stop_listening(self):
-        """Stop the background listener."""
+        """Stop the background listener, writing any events still buffered."""
         self.running = False
         if self.task:
             self.task.cancel()
@@ -222,9 +452,21 @@ class WebPubSubEventListener:
                 await self.task
             except asyncio.CancelledError:
                 pass
+            self.task = None
+
+        if self._queue is not None:
+            for batch in drain_batches(self._queue, self.batch_size):
+                await self._process_batch(batch)
+            self._queue = None
         logger.info("Web PubSub event listener stopped")
 
 
+def _parse_uuid(value: Any) -> Optional[UUID]:
+    try:
+        return UUID(str(value))
+    except (ValueError, TypeError):
+        return None
+
+
 # Global instance
 webpubsub_listener = WebPubSubEventListener()
-
@@ -0,0 +1,213 @@
+"""DAG scheduler for workflow step execution.
+
+Steps are started as soon as every step listed in their ``depends_on`` has
+finished, so independent branches of a workflow run concurrently and the
+wall-clock time of an execution approaches its critical path.
+"""
+
+import asyncio
+import heapq
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class WorkflowStepTimeoutError(asyncio.TimeoutError):
+    """Raised when a workflow step exceeds its timeout."""
+
+    def __init__(self, step_id: str, timeout_seconds: float):
+        super().__init__(f"Step {step_id} timed out after {timeout_seconds}s")
+        self.step_id = step_id
+        self.timeout_seconds = timeout_seconds
+
+
+class WorkflowCycleError(ValueError):
+    """Raised when workflow steps cannot be scheduled due to a dependency cycle."""
+
+
+class WorkflowDependencyError(ValueError):
+    """Raised when a step depends on a step id the workflow does not define."""
+
+
+RunStep = Callable[[Dict], Awaitable[Any]]
+OnStepComplete = Callable[[str, Any, Optional[BaseException]], Awaitable[None]]
+
+
+class WorkflowDagScheduler:
+    """Execute workflow steps as a dependency graph with a concurrency cap."""
+
+    def __init__(
+        self,
+        steps: List[Dict],
+        max_concurrency: int,
+        default_timeout_seconds: Optional[float] = None,
+        owners: Optional[Dict[str, str]] = None,
+    ):
+        """Initialize scheduler.
+
+        Args:
+            steps: Step definitions (each with ``id`` and optional ``depends_on``)
+            max_concurrency: Maximum number of steps running at once
+            default_timeout_seconds: Timeout applied to steps without
+                ``timeout_seconds`` in their definition (None disables it)
+            owners: Steps run by another step (children of a ``parallel``
+                step) mapped to that step; depending on a child waits for
+                its owner
+
+        Raises:
+            WorkflowDependencyError: If a ``depends_on`` id is neither a step
+                nor a child in ``owners``
+        """
+        self.steps = {step["id"]: step for step in steps}
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_timeout_seconds = default_timeout_seconds
+
+        self._order = {step["id"]: index for index, step in enumerate(steps)}
+        self._dependents: Dict[str, List[str]] = {sid: [] for sid in self.steps}
+        self._pending_deps: Dict[str, int] = {}
+        owners = owners or {}
+        for sid, step in self.steps.items():
+            deps: Dict[str, None] = {}
+            for dep in step.get("depends_on", []):
+                if dep in self.steps:
+                    deps[dep] = None
+                elif dep in owners:
+                    deps[owners[dep]] = None
+                else:
+                    raise WorkflowDependencyError(f"Step {sid} depends on unknown step {dep}")
+            self._pending_deps[sid] = len(deps)
+            for dep in deps:
+                self._dependents[dep].append(sid)
+
+        self._priority = self._critical_path_lengths()
+
+    def _critical_path_lengths(self) -> Dict[str, int]:
+        """Length of the longest chain of dependents below each step.
+
+        Ready steps are started longest-chain first so that, when the
+        concurrency cap binds, the critical path is never starved.
+        """
+        lengths: Dict[str, int] = {}
+        visiting: Set[str] = set()
+
+        def visit(sid: str) -> int:
+            if sid in lengths:
+                return lengths[sid]
+            if sid in visiting:
+                # Cycle; reported by run() once nothing is schedulable
+                return 0
+            visiting.add(sid)
+            length = 1 + max((visit(child) for child in self._dependents[sid]), default=0)
+            visiting.discard(sid)
+            lengths[sid] = length
+            return length
+
+        for sid in self.steps:
+            visit(sid)
+        return lengths
+
+    def _push_ready(self, ready: List[Tuple[int, int, str]], sid: str) -> None:
+        heapq.heappush(ready, (-self._priority[sid], self._order[sid], sid))
+
+    async def _run_with_timeout(self, run_step: RunStep, step_def: Dict) -> Any:
+        timeout = step_def.get("timeout_seconds", self.default_timeout_seconds)
+        if not timeout:
+            return await run_step(step_def)
+        try:
+            return await asyncio.wait_for(run_step(step_def), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise WorkflowStepTimeoutError(step_def["id"], timeout) from e
+
+    async def run(self, run_step: RunStep, on_complete: OnStepComplete) -> None:
+        """Run all steps.
+
+        ``on_complete`` is awaited from the scheduling loop (never concurrently
+        with itself) once per finished step. If it raises, running steps are
+        cancelled and the exception propagates.
+
+        Args:
+            run_step: Coroutine function executing a single step definition
+            on_complete: Callback receiving ``(step_id, result, error)``
+
+        Raises:
+            WorkflowCycleError: If some steps could never become ready
+        """
+        pending = dict(self._pending_deps)
+        ready: List[Tuple[int, int, str]] = []
+        for sid, count in pending.items():
+            if count == 0:
+                self._push_ready(ready, sid)
+
+        running: Dict[asyncio.Task, str] = {}
+        completed: Set[str] = set()
+
+        try:
+            while ready or running:
+                while ready and len(running) < self.max_concurrency:
+                    _, _, sid = heapq.heappop(ready)
+                    task = asyncio.create_task(
+                        self._run_with_timeout(run_step, self.steps[sid])
+                    )
+                    running[task] = sid
+
+                done, _ = await asyncio.wait(
+                    running.keys(), return_when=asyncio.FIRST_COMPLETED
+                )
+                # Report in definition order for deterministic persistence
+                for task in sorted(done, key=lambda t: self._order[running[t]]):
+                    sid = running.pop(task)
+                    error = task.exception()
+                    result = None if error else task.result()
+                    await on_complete(sid, result, error)
+                    completed.add(sid)
+
+                    for child in self._dependents[sid]:
+                        pending[child] -= 1
+                        if pending[child] == 0:
+                            self._push_ready(ready, child)
+        except BaseException:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            raise
+
+        if len(completed) < len(self.steps):
+            blocked = sorted(set(self.steps) - completed, key=self._order.get)
+            raise WorkflowCycleError(
+                f"Workflow steps have cyclic dependencies: {', '.join(blocked)}"
+            )
+
+
+class StepStatusBatcher:
+    """Collect WorkflowStep records and persist them with one flush per batch."""
+
+    def __init__(self, db: AsyncSession, batch_size: int):
+        """Initialize batcher.
+
+        Args:
+            db: Async database session
+            batch_size: Number of buffered records that triggers a flush
+        """
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self._buffer: List[Any] = []
+
+    def add(self, record: Any) -> None:
+        """Buffer a new or updated record for the next flush."""
+        self._buffer.append(record)
+
+    async def maybe_flush(self) -> None:
+        """Flush if the buffer has reached the batch size."""
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all buffered records in a single flush."""
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        self.db.add_all(records)
+        await self.db.flush()
+        logger.debug(f"Persisted {len(records)} workflow step update(s)")
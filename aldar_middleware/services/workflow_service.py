@@ -3,13 +3,15 @@
 import asyncio
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, desc
 
+from aldar_middleware.database.base import async_session
+from aldar_middleware.settings import settings
 from aldar_middleware.settings.context import get_correlation_id, track_agent_call
 from aldar_middleware.models.routing import (
     Workflow,
@@ -18,20 +20,31 @@ from aldar_middleware.models.routing import (
 )
 from aldar_middleware.models.mcp import AgentMethodExecution
 from aldar_middleware.services.agent_executor import AgentExecutor
+from aldar_middleware.services.workflow_scheduler import (
+    StepStatusBatcher,
+    WorkflowDagScheduler,
+)
 
 
 class WorkflowService:
     """Workflow orchestration and execution service."""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
         """Initialize workflow service.
 
         Args:
             db: Async database session
+            session_factory: Factory for the per-step sessions used by
+                concurrently running agent calls (defaults to the app factory)
         """
         self.db = db
+        self.session_factory = session_factory or async_session
         self.correlation_id = get_correlation_id()
-        self.executor = AgentExecutor(db)
+        self.executor = AgentExecutor()
 
     async def create_workflow(
         self,
@@ -242,6 +255,7 @@ class WorkflowService:
                 execution=execution,
                 steps=workflow.definition.get("steps", []),
                 context=context,
+                definition=workflow.definition,
             )
 
             # Update execution
@@ -418,6 +432,11 @@ class WorkflowService:
                 if dep not in step_ids:
                     raise ValueError(f"Step {step['id']} depends on non-existent step {dep}")
 
+        ordered = set(self._topological_sort([step["id"] for step in steps], steps))
+        if len(ordered) < len(steps):
+            cyclic = [step["id"] for step in steps if step["id"] not in ordered]
+            raise ValueError(f"Steps have cyclic dependencies: {', '.join(cyclic)}")
+
     def _build_execution_plan(self, definition: Dict) -> Dict:
         """Build execution plan from workflow definition.
 
@@ -479,29 +498,49 @@ class WorkflowService:
         execution: WorkflowExecution,
         steps: List[Dict],
         context: Dict,
+        definition: Optional[Dict] = None,
     ) -> Dict:
-        """Execute workflow steps in order.
+        """Execute workflow steps as a dependency graph.
+
+        Each step starts as soon as all of its ``depends_on`` steps have
+        finished, bounded by ``workflow_max_concurrent_steps``. Steps listed
+        under a ``parallel`` step are run by that step and not scheduled on
+        their own; steps depending on one of them wait for the ``parallel``
+        step. Step status updates are flushed in batches.
 
         Args:
             execution: WorkflowExecution object
             steps: List of step definitions
             context: Execution context
+            definition: Workflow definition (defaults to the execution's workflow)
 
         Returns:
             Final outputs
         """
+        if definition is None:
+            definition = execution.workflow.definition
+
         step_map = {step["id"]: step for step in steps}
-        execution_plan = self._build_execution_plan(execution.workflow.definition)
-        ordered_steps = execution_plan["order"]
+        owned_by_parallel = {
+            child_id: step["id"]
+            for step in steps
+            if step.get("type") == "parallel"
+            for child_id in step.get("parallel_steps", [])
+        }
+        scheduled_steps = [
+            step for step in steps if step["id"] not in owned_by_parallel
+        ]
 
-        for step_id in ordered_steps:
-            if step_id not in step_map:
-                continue
+        error_handling = definition.get("error_handling", {})
+        on_failure = error_handling.get("on_step_failure", "stop")
 
-            step_def = step_map[step_id]
+        batcher = StepStatusBatcher(self.db, settings.workflow_step_flush_batch_size)
+        step_records: Dict[str, WorkflowStep] = {}
+
+        async def run_step(step_def: Dict) -> Any:
+            step_id = step_def["id"]
             step_type = step_def.get("type", "agent_call")
 
-            # Create step execution record
             step_exec = WorkflowStep(
                 execution_id=execution.id,
                 step_id=step_id,
@@ -510,71 +549,82 @@ class WorkflowService:
                 status="running",
                 started_at=datetime.utcnow(),
             )
-            self.db.add(step_exec)
-            await self.db.flush()
-
-            try:
-                if step_type == "agent_call":
-                    result = await self._execute_agent_call(
-                        step_exec, step_def, context
-                    )
-                elif step_type == "condition":
-                    result = await self._execute_condition(
-                        step_exec, step_def, context
-                    )
-                elif step_type == "parallel":
-                    result = await self._execute_parallel(
-                        execution, step_exec, step_def, step_map, context
-                    )
-                elif step_type == "switch":
-                    result = await self._execute_switch(
-                        step_exec, step_def, context
-                    )
-                else:
-                    raise ValueError(f"Unknown step type: {step_type}")
+            step_records[step_id] = step_exec
+            batcher.add(step_exec)
+
+            if step_type == "agent_call":
+                return await self._execute_agent_call(step_exec, step_def, context)
+            if step_type == "condition":
+                return await self._execute_condition(step_exec, step_def, context)
+            if step_type == "parallel":
+                return await self._execute_parallel(
+                    execution, step_exec, step_def, step_map, context, batcher
+                )
+            if step_type == "switch":
+                return await self._execute_switch(step_exec, step_def, context)
+            raise ValueError(f"Unknown step type: {step_type}")
+
+        async def on_complete(
+            step_id: str, result: Any, error: Optional[BaseException]
+        ) -> None:
+            step_exec = step_records[step_id]
+            step_exec.completed_at = datetime.utcnow()
+            step_exec.duration_ms = int(
+                (step_exec.completed_at - step_exec.started_at).total_seconds() * 1000
+            )
 
+            if error is None:
                 # Store result in context
                 context["steps"][step_id] = {
                     "output": result,
                     "status": "success",
                 }
-
                 step_exec.outputs = result
                 step_exec.status = "success"
-
-            except Exception as e:
+            else:
                 logger.error(
                     "Step execution failed | step_id={step_id} error={error}",
                     step_id=step_id,
-                    error=str(e),
+                    error=str(error),
                 )
-
                 context["steps"][step_id] = {
                     "output": None,
-                    "error": str(e),
+                    "error": str(error),
                     "status": "error",
                 }
-
                 step_exec.status = "error"
-                step_exec.error_reason = str(e)
-
-                # Handle error strategy
-                error_handling = execution.workflow.definition.get("error_handling", {})
-                on_failure = error_handling.get("on_step_failure", "stop")
-
-                if on_failure == "stop":
-                    raise
-                # else: continue on error
-
-            finally:
-                step_exec.completed_at = datetime.utcnow()
-                step_exec.duration_ms = int(
-                    (step_exec.completed_at - step_exec.started_at).total_seconds() * 1000
-                )
-                await self.db.flush()
+                step_exec.error_reason = str(error)
+
+            batcher.add(step_exec)
+
+            if error is not None and on_failure == "stop":
+                await batcher.flush()
+                raise error
+            # else: continue on error
+            await batcher.maybe_flush()
+
+        timeout = settings.workflow_step_timeout_seconds or None
+        scheduler = WorkflowDagScheduler(
+            scheduled_steps,
+            max_concurrency=settings.workflow_max_concurrent_steps,
+            default_timeout_seconds=timeout,
+            owners=owned_by_parallel,
+        )
+        try:
+            await scheduler.run(run_step, on_complete)
+        except BaseException:
+            # Steps cancelled because another step failed
+            for step_exec in step_records.values():
+                if step_exec.status == "running":
+                    step_exec.status = "skipped"
+                    step_exec.completed_at = datetime.utcnow()
+                    batcher.add(step_exec)
+            raise
+        finally:
+            await batcher.flush()
 
         # Extract outputs
-        output_spec = execution.workflow.definition.get("output", {})
+        output_spec = definition.get("output", {})
         if output_spec.get("include"):
             outputs = {}
             for include_path in output_spec["include"]:
@@ -608,13 +658,15 @@ class WorkflowService:
         # Resolve parameters from context
         params = self._resolve_parameters(step_def.get("params", {}), context)
 
-        # Execute agent method
-        result = await self.executor.execute_method(
-            agent_id=agent_id,
-            method_id=method_id,
-            parameters=params,
-            correlation_id=context["correlation_id"],
-        )
+        # Execute agent method on its own session: steps run concurrently and
+        # an AsyncSession must not be shared between tasks.
+        async with self.session_factory() as step_db:
+            result = await self.executor.execute_method(
+                db=step_db,
+                method_id=method_id,
+                parameters=params,
+                agent_id=agent_id,
+            )
 
         step_exec.agent_id = agent_id
         step_exec.method_id = method_id
@@ -650,6 +702,7 @@ class WorkflowService:
         step_def: Dict,
         step_map: Dict,
         context: Dict,
+        batcher: StepStatusBatcher,
     ) -> Dict:
         """Execute parallel steps.
 
@@ -659,6 +712,7 @@ class WorkflowService:
             step_def: Step definition
             step_map: Map of all steps
             context: Execution context
+            batcher: Batcher persisting the child step records
 
         Returns:
             Aggregated results from parallel steps
@@ -681,8 +735,7 @@ class WorkflowService:
                 status="running",
                 started_at=datetime.utcnow(),
             )
-            self.db.add(parallel_step_exec)
-            await self.db.flush()
+            batcher.add(parallel_step_exec)
 
             if parallel_step_def.get("type") == "agent_call":
                 task = self._execute_agent_call(
@@ -722,8 +775,6 @@ class WorkflowService:
                 )
                 results[parallel_step_id] = context["steps"][parallel_step_id]["output"]
 
-                await self.db.flush()
-
         return {"parallel_results": results}
 
     async def _execute_switch(
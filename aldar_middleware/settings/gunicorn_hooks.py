@@ -0,0 +1,36 @@
+"""Gunicorn server hooks for AIQ Backend.
+
+Only the hooks the application needs, without server tuning; startup.sh
+passes everything else on the command line. gunicorn_runner.py uses them as
+well.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Prometheus multiprocess mode: workers keep metric values in mmap files in
+# this directory and /metrics aggregates them. Workers inherit the variable,
+# so it is set before any of them imports prometheus_client.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "aldar-middleware-prometheus"),
+)
+
+
+def on_starting(server):
+    """Called just before the master process is initialized."""
+    # Metric files left by a previous run would be added to this one's
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    # Workers split the database connection budget between them; the count
+    # includes any --workers override
+    os.environ.setdefault("ALDAR_DB_POOL_WORKERS", str(server.cfg.workers))
+
+
+def child_exit(server, worker):
+    """Called in the master just after a worker has exited."""
+    # Drop the exited worker's live gauges; its counters stay in the totals
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid, prometheus_multiproc_dir)
@@ -2,6 +2,7 @@
 
 import multiprocessing
 import os
+from runpy import run_path
 
 # Server socket
 bind = f"0.0.0.0:{os.getenv('ALDAR_PORT', '8000')}"
@@ -18,6 +19,13 @@ keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
 
+# Prometheus multiprocess directory and the on_starting/child_exit hooks.
+# Loaded by path: gunicorn reads this file outside the package.
+_hooks = run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_hooks.py"))
+prometheus_multiproc_dir = _hooks["prometheus_multiproc_dir"]
+on_starting = _hooks["on_starting"]
+child_exit = _hooks["child_exit"]
+
 # Logging
 accesslog = "-"
 errorlog = "-"
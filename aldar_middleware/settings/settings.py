@@ -77,6 +77,23 @@ class Settings(BaseSettings):
     db_base: str = Field(default="aldar")
     db_echo: bool = Field(default=False)
     db_url: Optional[str] = Field(default=None)
+    # Connection budget (see database/pool_budget.py). The budget is the most
+    # connections all replicas of this deployment may hold together; it is split
+    # across db_pool_replicas pods x workers per pod. Unset keeps a fixed pool of
+    # 20 + 30 overflow per worker.
+    db_connection_budget: Optional[int] = Field(default=None)
+    db_pool_replicas: int = Field(default=1)
+    db_pool_workers: Optional[int] = Field(default=None)  # Set by gunicorn_runner; defaults to workers_count
+    db_pool_overflow_fraction: float = Field(default=0.25)  # Share of each worker's connections opened only under load
+    db_pool_timeout: float = Field(default=30.0)  # Seconds a request queues for a connection before failing
+    # Behind pgbouncer in transaction mode: no asyncpg prepared statement caching
+    db_pgbouncer_transaction_mode: bool = Field(default=False)
+    # Read replica for endpoints using get_read_db (see database/read_routing.py)
+    db_replica_url: Optional[str] = Field(default=None)  # postgresql+asyncpg://...; unset reads from the primary
+    db_replica_connection_budget: Optional[int] = Field(default=None)  # Split like db_connection_budget
+    db_replica_max_lag_seconds: float = Field(default=5.0)  # Reads go to the primary above this replay lag
+    db_replica_lag_check_interval_seconds: float = Field(default=2.0)
+    db_read_your_writes_seconds: float = Field(default=10.0)  # A user's reads stay on the primary after they write
 
     # Redis
     redis_host: str = Field(default="localhost")
@@ -132,9 +149,30 @@ class Settings(BaseSettings):
     # Service Bus
     service_bus_connection_string: Optional[str] = Field(default=None)
     service_bus_queue_name: str = Field(default="aiq-queue")
+    service_bus_batch_max_messages: int = Field(default=100)  # Messages coalesced into one send
+    service_bus_batch_max_bytes: int = Field(default=256 * 1024)  # Standard tier message size limit
+    service_bus_batch_max_delay_ms: float = Field(default=20)  # How long a message waits for its batch to fill
+    service_bus_prefetch_count: int = Field(default=50)
+    service_bus_consumer_concurrency: int = Field(default=8)  # Handlers AzureServiceBusService.consume runs at once
 
     # Azure Web PubSub
     web_pubsub_connection_string: Optional[str] = Field(default=None)
+    webpubsub_ingest_batch_size: int = Field(
+        default=200,
+        description="Maximum number of run events written to the database in one batch",
+    )
+    webpubsub_ingest_flush_interval_ms: int = Field(
+        default=10,
+        description="How long the first event of a batch waits for more events before the batch is written",
+    )
+    webpubsub_ingest_queue_size: int = Field(
+        default=10000,
+        description="Run events buffered before producers are made to wait",
+    )
+    webpubsub_ingest_cache_size: int = Field(
+        default=10000,
+        description="Entries kept per session/agent/user lookup cache in the run event listener",
+    )
 
     # Event Grid
     eventgrid_topic_name: Optional[str] = Field(default=None)
@@ -153,6 +191,30 @@ class Settings(BaseSettings):
         description="Interval in minutes for periodic agent health checks. Set to 1 for testing."
     )
 
+    # Analytics Rollups
+    analytics_rollup_interval_minutes: int = Field(
+        default=15,
+        description="Interval in minutes for refreshing the daily agent usage and feedback rollups",
+    )
+    analytics_rollup_lookback_days: int = Field(
+        default=2,
+        description="Closed days before the watermark recomputed on every refresh to absorb late writes",
+    )
+
+    # Workflow Execution
+    workflow_max_concurrent_steps: int = Field(
+        default=8,
+        description="Maximum number of workflow steps executed concurrently per execution",
+    )
+    workflow_step_timeout_seconds: float = Field(
+        default=300.0,
+        description="Default per-step timeout; steps may override it with timeout_seconds. 0 disables it.",
+    )
+    workflow_step_flush_batch_size: int = Field(
+        default=10,
+        description="Number of step status updates buffered before they are flushed to the database",
+    )
+
     # MCP (Model Context Protocol)
     mcp_server_url: Optional[str] = Field(default=None)
     mcp_api_key: Optional[str] = Field(default=None)
@@ -160,6 +222,14 @@ class Settings(BaseSettings):
     # Monitoring
     prometheus_enabled: bool = Field(default=True)
     prometheus_port: int = Field(default=9090)
+    prometheus_max_endpoint_labels: int = Field(
+        default=500,
+        description="Distinct (method, endpoint) label pairs recorded before new ones are collapsed into 'other'",
+    )
+    prometheus_route_cache_size: int = Field(
+        default=10000,
+        description="Request paths whose resolved route template is cached by the Prometheus middleware",
+    )
     grafana_enabled: bool = Field(default=True)
     grafana_port: int = Field(default=3000)
     
@@ -228,12 +298,40 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_requests: int = Field(default=100)
     rate_limit_window: int = Field(default=60)  # seconds
+    rate_limit_backend: str = Field(
+        default="auto",
+        description="Sliding-window limiter backend: 'auto' (Redis when connected, else in-process) or 'memory'",
+    )
+    rate_limit_memory_shards: int = Field(default=64, description="Bucket shards of the in-process rate limiter")
 
     # Auth endpoint rate limiting (login/callback/token refresh)
     auth_rate_limit_enabled: bool = Field(default=True, description="Enable rate limiting on auth endpoints")
     auth_rate_limit_per_minute: int = Field(default=50, description="Max auth attempts per minute per IP")
     auth_rate_limit_per_hour: int = Field(default=50, description="Max auth attempts per hour per IP")
 
+    # Login enrichment (profile photo + AD group sync after the callback returns)
+    login_enrichment_backend: str = Field(
+        default="auto",
+        description="'auto' (Celery when a broker is configured, else in-process), 'celery', 'in_process' or 'disabled'",
+    )
+    login_enrichment_concurrency: int = Field(default=4)  # In-process workers
+    login_enrichment_queue_size: int = Field(default=1000)  # Pending in-process jobs before new ones are dropped
+
+    # Profile photo serving (per-worker cache behind /auth/users/{id}/profile-photo)
+    profile_photo_cache_max_bytes: int = Field(default=64 * 1024 * 1024)  # Total photo bytes kept per worker
+    profile_photo_cache_max_entries: int = Field(default=20000)  # Entries kept, "no photo" entries included
+    profile_photo_cache_ttl_seconds: int = Field(default=3600)  # Lifetime of a cached photo
+    profile_photo_negative_ttl_seconds: int = Field(default=900)  # Lifetime of a "user has no photo" entry
+    profile_photo_max_age_seconds: int = Field(default=86400)  # Browser Cache-Control max-age
+
+    # Worker boot budget, checked by tests/test_import_budget.py (see utils/import_profile.py)
+    import_time_budget_seconds: float = Field(default=10.0)  # Wall time to import aldar_middleware.application
+    import_rss_budget_mb: int = Field(default=256)  # Peak RSS of a process that has imported the app
+
+    # Prebuilt OpenAPI schema (python -m aldar_middleware.utils.openapi_cache --output PATH);
+    # used when its route fingerprint matches, otherwise generated at startup
+    openapi_cache_path: Optional[str] = Field(default=None)
+
     # Chat Configuration
     max_chat_history: int = Field(default=100)
     chat_timeout: int = Field(default=300)  # seconds
@@ -263,10 +361,23 @@ class Settings(BaseSettings):
     cosmos_logging_save_request_response: bool = Field(default=True)  # Save HTTP request/response bodies
     cosmos_log_verbose: bool = Field(default=False)  # Show verbose Cosmos DB logs in terminal
 
+    # PostgreSQL Log Queries
+    logs_exact_count_limit: int = Field(default=10000)  # Larger totals use the planner's row estimate
+    logs_search_max_users: int = Field(default=500)  # Users matched by name/email in log search; more are dropped with a warning
+
+    # CSV Exports
+    csv_export_batch_size: int = Field(default=1000)  # Rows fetched, enriched and written per batch
+    csv_export_gzip_enabled: bool = Field(default=True)  # Gzip exports for clients accepting it
+
     # Advanced Observability
     # Distributed Tracing Configuration
     distributed_tracing_enabled: bool = Field(default=True)  # Enable OpenTelemetry + Application Insights
     trace_sample_rate: str = Field(default="full")  # "full" (100%), "partial" (10%), "minimal" (1%)
+    trace_retention_slow_threshold_ms: int = Field(default=1000)  # Unsampled traces slower than this are still kept
+    trace_export_batch_size: int = Field(default=200)  # Traces written per exporter batch
+    trace_export_flush_interval_ms: int = Field(default=1000)  # Max time a trace waits in the export buffer
+    trace_export_queue_size: int = Field(default=10000)  # Buffered traces before new ones are dropped
+    trace_export_otlp_enabled: bool = Field(default=False)  # Also emit exported traces as OpenTelemetry spans
     
     # PII Masking Configuration
     pii_masking_enabled: bool = Field(default=True)  # Comprehensive PII masking in logs/traces
@@ -275,6 +386,7 @@ class Settings(BaseSettings):
     pii_mask_credit_cards: bool = Field(default=True)
     pii_mask_tokens: bool = Field(default=True)
     pii_mask_api_keys: bool = Field(default=True)
+    pii_mask_cache_size: int = Field(default=4096)  # Memoized masking results for short, repeated values
     
     # Request/Response Audit Configuration
     audit_log_enabled: bool = Field(default=True)
@@ -285,6 +397,8 @@ class Settings(BaseSettings):
     # Database Query Tracing
     trace_database_queries: bool = Field(default=True)
     trace_query_slow_threshold_ms: int = Field(default=100)  # Log queries slower than this
+    trace_query_caller_sample_rate: float = Field(default=0.01)  # Share of fast queries whose caller is captured
+    trace_query_max_fingerprints: int = Field(default=2000)  # Distinct statements tracked before grouping as <other>
 
     # Query Processing Configuration
     query_cache_ttl: int = Field(default=3600)  # seconds
@@ -0,0 +1,70 @@
+"""Queue-draining batch worker shared by the background writers.
+
+A single worker task takes items off an ``asyncio.Queue`` in batches: it waits
+for one item, then collects more until ``batch_size`` items are taken or
+``flush_interval`` seconds have passed since the first. Used by the trace
+exporter and the Web PubSub run event listener.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+BatchHandler = Callable[[List[Any]], Awaitable[Any]]
+
+
+async def _fill_batch(queue: asyncio.Queue, batch: List[Any], batch_size: int, flush_interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + flush_interval
+    while len(batch) < batch_size:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            return
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            return
+
+
+async def run_batch_worker(
+    queue: asyncio.Queue,
+    handle: BatchHandler,
+    batch_size: int,
+    flush_interval: float,
+    on_error: Callable[[List[Any], Exception], None],
+) -> None:
+    """Pass batches from ``queue`` to ``handle`` until cancelled.
+
+    When cancelled while collecting a batch, the items already taken off the
+    queue are handled before the cancellation propagates. A batch whose
+    ``handle`` call was interrupted is not handled again, since it may have
+    been partly written.
+
+    Args:
+        queue: Queue to drain
+        handle: Called with each batch
+        batch_size: Most items per batch
+        flush_interval: Seconds the first item of a batch waits for more
+        on_error: Called with the batch and the error when ``handle`` raises
+    """
+    while True:
+        batch = [await queue.get()]
+        handling = False
+        try:
+            await _fill_batch(queue, batch, batch_size, flush_interval)
+            handling = True
+            await handle(batch)
+        except asyncio.CancelledError:
+            # Stopping: handle what was taken off the queue but not handled yet
+            if not handling:
+                await handle(batch)
+            raise
+        except Exception as e:
+            on_error(batch, e)
+
+
+def drain_batches(queue: asyncio.Queue, batch_size: int) -> List[List[Any]]:
+    """Take everything left in ``queue``, split into batches of ``batch_size``."""
+    remaining = []
+    while not queue.empty():
+        remaining.append(queue.get_nowait())
+    return [remaining[start:start + batch_size] for start in range(0, len(remaining), batch_size)]
@@ -0,0 +1,181 @@
+"""Streaming CSV exports.
+
+Export endpoints build their filtered select up front and hand it to
+:func:`csv_export_response`. Rows are fetched in ``yield_per`` batches, each
+batch is turned into CSV rows by the endpoint's renderer (which is where
+related users or agents are looked up, once per batch) and the encoded text
+is sent as soon as it is produced, gzip-compressed when the client accepts
+it. Memory therefore depends on the batch size, not on the export size.
+
+The export runs on its own session: request-scoped sessions are closed before
+a streaming body is sent. Audit hooks get sessions of their own as well:
+``on_start`` runs before the first row is sent, so an export is recorded even
+if it never finishes, and ``on_complete`` or ``on_failure`` records how it
+ended.
+"""
+
+import asyncio
+import csv
+import io
+import zlib
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from aldar_middleware.database.base import async_session
+from aldar_middleware.settings import settings
+
+BatchRenderer = Callable[[AsyncSession, Sequence[Any]], Awaitable[Iterable[Dict[str, Any]]]]
+StartHook = Callable[[AsyncSession], Awaitable[Any]]
+CompletionHook = Callable[[AsyncSession, int], Awaitable[Any]]
+FailureHook = Callable[[AsyncSession, int, BaseException], Awaitable[Any]]
+
+
+@dataclass
+class CSVExport:
+    """A CSV export: the rows to fetch and how to write them.
+
+    Attributes:
+        query: Select of ORM entities, including its ORDER BY
+        fieldnames: CSV columns, in order
+        render_batch: Turns a batch of entities into CSV row dicts
+        filename: Download file name
+        on_start: Called with a session before the first row is sent (e.g. to
+            record an admin log)
+        on_complete: Called with the export session and the row count once
+            every row has been written
+        on_failure: Called with a session, the rows sent so far and the error
+            when the export fails or the client goes away
+        batch_size: Rows fetched and rendered at a time
+    """
+
+    query: Select
+    fieldnames: Sequence[str]
+    render_batch: BatchRenderer
+    filename: str
+    on_start: Optional[StartHook] = None
+    on_complete: Optional[CompletionHook] = None
+    on_failure: Optional[FailureHook] = None
+    batch_size: int = 0
+
+
+class _CSVChunkWriter:
+    """csv.DictWriter over a buffer that is drained after every batch."""
+
+    def __init__(self, fieldnames: Sequence[str]) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=fieldnames, extrasaction="ignore")
+
+    def header(self) -> str:
+        self._writer.writeheader()
+        return self._drain()
+
+    def rows(self, rows: Iterable[Dict[str, Any]]) -> str:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+
+async def iter_csv_export(export: CSVExport, compress: bool = False) -> AsyncIterator[bytes]:
+    """Yield the encoded CSV of an export, one chunk per fetched batch.
+
+    Errors after the first chunk cannot become an error response any more;
+    they are logged and re-raised, which aborts the download.
+    """
+    batch_size = export.batch_size or settings.csv_export_batch_size
+    writer = _CSVChunkWriter(export.fieldnames)
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    row_count = 0
+    try:
+        if export.on_start is not None:
+            async with async_session() as session:
+                await export.on_start(session)
+        yield encode(writer.header())
+        async with async_session() as session:
+            result = await session.stream_scalars(export.query.execution_options(yield_per=batch_size))
+            async for batch in result.partitions():
+                rows = list(await export.render_batch(session, batch))
+                row_count += len(rows)
+                chunk = encode(writer.rows(rows))
+                if chunk:
+                    yield chunk
+            await result.close()
+
+            if export.on_complete is not None:
+                await export.on_complete(session, row_count)
+        if compressor:
+            yield compressor.flush()
+    except BaseException as e:
+        if isinstance(e, Exception):
+            logger.error(f"CSV export {export.filename} failed after {row_count} rows: {e}", exc_info=True)
+        else:
+            logger.warning(f"CSV export {export.filename} aborted after {row_count} rows")
+        if export.on_failure is not None:
+            await _record_failure(export, row_count, e)
+        raise
+
+    logger.info(f"CSV export {export.filename} completed: {row_count} rows")
+
+
+async def _record_failure(export: CSVExport, row_count: int, error: BaseException) -> None:
+    async def record() -> None:
+        async with async_session() as session:
+            await export.on_failure(session, row_count, error)
+
+    try:
+        # Shielded: a client disconnect cancels the stream, the record must still be written
+        await asyncio.shield(record())
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to record failure of CSV export {export.filename}: {e}", exc_info=True)
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether the export may be sent gzip-encoded to this client."""
+    if not settings.csv_export_gzip_enabled:
+        return False
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        params = params.replace(" ", "")
+        if not params.startswith("q="):
+            return True
+        try:
+            return float(params[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def csv_export_response(export: CSVExport, request: Request) -> StreamingResponse:
+    """Stream an export as a CSV download."""
+    compress = accepts_gzip(request)
+    headers = {
+        "Content-Disposition": f"attachment; filename={export.filename}",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        iter_csv_export(export, compress=compress),
+        media_type="text/csv",
+        headers=headers,
+    )
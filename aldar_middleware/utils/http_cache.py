@@ -0,0 +1,14 @@
+"""HTTP conditional request helpers shared by endpoints that serve ETags."""
+
+from typing import Iterable, Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison, RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates: Iterable[str] = (value.strip() for value in if_none_match.split(","))
+    return any(
+        candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == etag
+        for candidate in candidates
+    )
@@ -0,0 +1,175 @@
+"""Import time and memory profile of the application.
+
+Every gunicorn worker imports ``aldar_middleware.application`` before it can
+serve a request, so the time and memory that import takes is paid per worker
+and on every worker recycle. :func:`profile_import` measures it in a fresh
+interpreter: wall time, peak RSS, the packages left loaded and, optionally,
+the per-module breakdown of ``python -X importtime``.
+
+Usage:
+    python -m aldar_middleware.utils.import_profile
+    python -m aldar_middleware.utils.import_profile --importtime --top 25
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+
+APP_MODULE = "aldar_middleware.application"
+
+# Prefix of the line the child process reports its measurements on
+_RESULT_MARKER = "IMPORT_PROFILE:"
+
+_CHILD = f"""
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform != "darwin":
+    max_rss *= 1024  # kilobytes on Linux, bytes on macOS
+packages = sorted({{name.partition(".")[0] for name in list(sys.modules)}})
+print({_RESULT_MARKER!r} + json.dumps({{"seconds": seconds, "max_rss_bytes": max_rss, "packages": packages}}))
+"""
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    """One line of ``-X importtime`` output."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportProfile:
+    """Measurements of importing a module in a fresh interpreter."""
+
+    module: str
+    seconds: float
+    max_rss_bytes: int
+    packages: FrozenSet[str]
+    timings: List[ImportTiming] = field(default_factory=list)
+
+    @property
+    def max_rss_mb(self) -> float:
+        return self.max_rss_bytes / (1024 * 1024)
+
+    def slowest(self, count: int = 15) -> List[ImportTiming]:
+        """Modules with the largest self time (needs ``importtime=True``)."""
+        return sorted(self.timings, key=lambda timing: timing.self_us, reverse=True)[:count]
+
+    def heaviest_packages(self, count: int = 15) -> List[ImportTiming]:
+        """Top-level packages by cumulative import time (needs ``importtime=True``)."""
+        packages: Dict[str, ImportTiming] = {}
+        for timing in self.timings:
+            if "." in timing.module:
+                continue
+            current = packages.get(timing.module)
+            if current is None or timing.cumulative_us > current.cumulative_us:
+                packages[timing.module] = timing
+        return sorted(packages.values(), key=lambda timing: timing.cumulative_us, reverse=True)[:count]
+
+    def format_report(self, count: int = 15) -> str:
+        """Human-readable summary, with the slowest imports when available."""
+        lines = [f"import {self.module}: {self.seconds:.2f}s, peak RSS {self.max_rss_mb:.0f} MB"]
+        if self.timings:
+            lines.append("slowest packages (cumulative ms):")
+            lines.extend(
+                f"  {timing.cumulative_us / 1000:9.1f}  {timing.module}" for timing in self.heaviest_packages(count)
+            )
+            lines.append("slowest modules (self ms):")
+            lines.extend(f"  {timing.self_us / 1000:9.1f}  {timing.module}" for timing in self.slowest(count))
+        return "\n".join(lines)
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parse the ``import time: self | cumulative | module`` lines of ``-X importtime``."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(
+            ImportTiming(
+                module=stripped,
+                self_us=int(parts[0]),
+                cumulative_us=int(parts[1]),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return timings
+
+
+def profile_import(
+    module: str = APP_MODULE,
+    importtime: bool = False,
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 300,
+) -> ImportProfile:
+    """Import a module in a fresh interpreter and measure it.
+
+    Args:
+        module: Module to import
+        importtime: Also collect the ``-X importtime`` breakdown; this slows
+            the import down, so budgets should be checked without it
+        env: Environment of the child process (defaults to this process's)
+        timeout: Seconds before the child is killed
+
+    Returns:
+        The measurements
+
+    Raises:
+        RuntimeError: If the import fails in the child process
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", _CHILD, module]
+    completed = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env=dict(os.environ if env is None else env),
+    )
+    result = next(
+        (line[len(_RESULT_MARKER):] for line in completed.stdout.splitlines() if line.startswith(_RESULT_MARKER)),
+        None,
+    )
+    if completed.returncode != 0 or result is None:
+        raise RuntimeError(f"Importing {module} failed (exit {completed.returncode}):\n{completed.stderr[-4000:]}")
+
+    data = json.loads(result)
+    return ImportProfile(
+        module=module,
+        seconds=data["seconds"],
+        max_rss_bytes=data["max_rss_bytes"],
+        packages=frozenset(data["packages"]),
+        timings=parse_importtime(completed.stderr) if importtime else [],
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile the import time and memory of the application")
+    parser.add_argument("module", nargs="?", default=APP_MODULE)
+    parser.add_argument("--importtime", action="store_true", help="include the -X importtime breakdown")
+    parser.add_argument("--top", type=int, default=15, help="entries per breakdown")
+    args = parser.parse_args(argv)
+
+    print(profile_import(args.module, importtime=args.importtime).format_report(args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Precomputed OpenAPI schema served from memory.
+
+Generating the schema walks every route and model of the application, which
+takes seconds with this many route modules. FastAPI does it lazily on the
+first ``/openapi.json`` request of each worker, while serving traffic.
+
+:class:`OpenAPISchemaCache` generates the schema once (in the background at
+startup, or at build time into a file), keeps it serialized together with an
+ETag derived from its content, and serves it from memory with
+``304 Not Modified`` support. The schema is only regenerated when the route
+table fingerprint changes.
+
+Usage (build time):
+    python -m aldar_middleware.utils.openapi_cache --output /app/openapi.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import operator
+import os
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI
+from loguru import logger
+from starlette.requests import Request
+from starlette.responses import Response
+
+from aldar_middleware.utils.http_cache import etag_matches
+
+
+@dataclass(frozen=True)
+class CachedSchema:
+    """A generated schema and its serialized form."""
+
+    fingerprint: str
+    schema: Dict[str, Any]
+    body: bytes
+    etag: str
+
+
+def _serialize(schema: Dict[str, Any]) -> bytes:
+    # Same encoding as FastAPI's JSONResponse for /openapi.json
+    return json.dumps(schema, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _describe_route(route: Any) -> str:
+    endpoint = getattr(route, "endpoint", None)
+    response_model = getattr(route, "response_model", None)
+    return "|".join([
+        type(route).__name__,
+        getattr(route, "path", ""),
+        ",".join(sorted(getattr(route, "methods", None) or ())),
+        f"{getattr(endpoint, '__module__', '')}.{getattr(endpoint, '__qualname__', '')}",
+        ",".join(str(tag) for tag in getattr(route, "tags", None) or ()),
+        str(getattr(route, "include_in_schema", "")),
+        getattr(response_model, "__qualname__", str(response_model)),
+    ])
+
+
+def route_fingerprint(app: FastAPI) -> str:
+    """Hash of everything in the route table the schema is generated from."""
+    digest = hashlib.sha256(f"{app.title}\0{app.version}\0{app.openapi_version}".encode())
+    for route in app.routes:
+        digest.update(_describe_route(route).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class OpenAPISchemaCache:
+    """Generates the schema when the route table changes and serves it from memory."""
+
+    def __init__(
+        self,
+        build: Callable[[], Dict[str, Any]],
+        fingerprint: Callable[[], str],
+        path: Optional[str] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            build: Generates the schema
+            fingerprint: Returns the current route table fingerprint
+            path: File holding a prebuilt schema; used when its fingerprint
+                matches, and rewritten after each generation
+        """
+        self._build = build
+        self._fingerprint = fingerprint
+        self.path = path
+        self._cached: Optional[CachedSchema] = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def current(self) -> Optional[CachedSchema]:
+        """The cached schema if it matches the current route table, else None."""
+        cached = self._cached
+        if cached is not None and cached.fingerprint == self._fingerprint():
+            return cached
+        return None
+
+    def get(self) -> CachedSchema:
+        """Get the schema, loading or generating it if the route table changed.
+
+        Generation is blocking; call it off the event loop.
+        """
+        cached = self.current()
+        if cached is not None:
+            return cached
+        with self._lock:
+            fingerprint = self._fingerprint()
+            cached = self._cached
+            if cached is None or cached.fingerprint != fingerprint:
+                cached = self._load(fingerprint) or self._generate(fingerprint)
+                self._cached = cached
+            return cached
+
+    def _generate(self, fingerprint: str) -> CachedSchema:
+        schema = self._build()
+        body = _serialize(schema)
+        cached = CachedSchema(fingerprint, schema, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        self.builds += 1
+        logger.info(f"Generated OpenAPI schema ({len(body)} bytes, etag {cached.etag})")
+        if self.path:
+            try:
+                self.write(self.path, cached)
+            except OSError as e:
+                logger.warning(f"Could not write OpenAPI schema to {self.path}: {e}")
+        return cached
+
+    def _load(self, fingerprint: str) -> Optional[CachedSchema]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable OpenAPI schema file {self.path}: {e}")
+            return None
+        if stored.get("fingerprint") != fingerprint:
+            return None
+        body = _serialize(stored["schema"])
+        return CachedSchema(fingerprint, stored["schema"], body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    @staticmethod
+    def write(path: str, cached: CachedSchema) -> None:
+        """Write a schema file; readers never see a partial file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".openapi-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": cached.fingerprint, "etag": cached.etag, "schema": cached.schema}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _memoized_fingerprint(app: FastAPI) -> Callable[[], str]:
+    """route_fingerprint of ``app``, recomputed only when the route objects change."""
+    last_routes: tuple = ()
+    last_fingerprint = ""
+
+    def fingerprint() -> str:
+        nonlocal last_routes, last_fingerprint
+        routes = app.routes
+        if len(routes) != len(last_routes) or not all(map(operator.is_, routes, last_routes)):
+            last_fingerprint = route_fingerprint(app)
+            last_routes = tuple(routes)
+        return last_fingerprint
+
+    return fingerprint
+
+
+def install_openapi_cache(app: FastAPI, build: Callable[[], Dict[str, Any]], path: Optional[str] = None) -> OpenAPISchemaCache:
+    """Serve ``app.openapi_url`` and ``app.openapi()`` from an :class:`OpenAPISchemaCache`.
+
+    Args:
+        app: Application; its routes may still be added after this call
+        build: Generates the schema
+        path: Optional prebuilt schema file (see :class:`OpenAPISchemaCache`)
+
+    Returns:
+        The cache, also available as ``app.state.openapi_cache``
+    """
+    cache = OpenAPISchemaCache(build, _memoized_fingerprint(app), path)
+    app.state.openapi_cache = cache
+    app.openapi = lambda: cache.get().schema
+
+    if app.openapi_url:
+        async def openapi(request: Request) -> Response:
+            cached = cache.current() or await asyncio.to_thread(cache.get)
+            headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+            if etag_matches(request.headers.get("if-none-match"), cached.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(cached.body, media_type="application/json", headers=headers)
+
+        # Replace the route FastAPI registered for the lazily generated schema
+        app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
+        app.add_route(app.openapi_url, openapi, include_in_schema=False)
+
+    return cache
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate the OpenAPI schema file served by the application")
+    parser.add_argument("--output", required=True, help="schema file; set ALDAR_OPENAPI_CACHE_PATH to it at runtime")
+    args = parser.parse_args(argv)
+
+    from aldar_middleware import app
+
+    cache: OpenAPISchemaCache = app.state.openapi_cache
+    cached = cache.get()
+    OpenAPISchemaCache.write(args.output, cached)
+    print(f"Wrote OpenAPI schema to {args.output} (fingerprint {cached.fingerprint[:12]}, etag {cached.etag})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
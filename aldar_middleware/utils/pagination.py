@@ -0,0 +1,193 @@
+"""Keyset (cursor) pagination helpers.
+
+Listing endpoints order by a sort key plus a unique id and, instead of
+``OFFSET``, continue from the last row of the previous page. The position is
+handed to clients as an opaque cursor, so fetching page 5000 costs the same
+as fetching page 1.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, asc, desc, false, nullsfirst, nullslast, or_, true, tuple_
+from sqlalchemy.sql import ColumnElement, Select
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or belongs to another sort."""
+
+
+@dataclass(frozen=True)
+class KeysetColumn:
+    """One ORDER BY key of a keyset-paginated query.
+
+    The last column of a keyset must be unique (normally the primary key).
+    """
+
+    column: Any
+    descending: bool = False
+    nullable: bool = False
+    nulls_first: bool = False
+
+    def order_by(self) -> ColumnElement:
+        """ORDER BY clause for this key."""
+        clause = desc(self.column) if self.descending else asc(self.column)
+        if not self.nullable:
+            # Plain ordering keeps plain btree indexes usable in both directions
+            return clause
+        return nullsfirst(clause) if self.nulls_first else nullslast(clause)
+
+    def after(self, value: Any) -> ColumnElement:
+        """Rows that sort strictly after ``value`` on this key."""
+        if value is None:
+            return self.column.isnot(None) if self.nulls_first else false()
+        beyond = self.column < value if self.descending else self.column > value
+        if self.nullable and not self.nulls_first:
+            return or_(beyond, self.column.is_(None))
+        return beyond
+
+    def equals(self, value: Any) -> ColumnElement:
+        """Rows that tie with ``value`` on this key."""
+        return self.column.is_(None) if value is None else self.column == value
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and len(value) == 1:
+        (tag, raw), = value.items()
+        if tag == "dt":
+            return datetime.fromisoformat(raw)
+        if tag == "d":
+            return date.fromisoformat(raw)
+        if tag == "uuid":
+            return UUID(raw)
+        if tag == "dec":
+            return Decimal(raw)
+    return value
+
+
+def encode_cursor(values: Sequence[Any], signature: str) -> str:
+    """Encode sort key values into an opaque cursor.
+
+    Args:
+        values: Sort key values of the last row on the page, in key order
+        signature: Identifies the listing and sort the cursor is valid for
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(
+        {"s": signature, "k": [_encode_value(v) for v in values]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, signature: str) -> List[Any]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was issued for a
+            different listing or sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_signature = payload["s"]
+        values = [_decode_value(v) for v in payload["k"]]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Malformed pagination cursor") from e
+    if cursor_signature != signature:
+        raise InvalidCursorError("Pagination cursor does not match the requested sort")
+    return values
+
+
+def keyset_filter(keys: Sequence[KeysetColumn], values: Sequence[Any]) -> ColumnElement:
+    """WHERE clause selecting rows after ``values`` in keyset order."""
+    if len(values) != len(keys):
+        raise InvalidCursorError("Pagination cursor does not match the requested sort")
+
+    uniform = len({key.descending for key in keys}) == 1
+    if uniform and all(not key.nullable and value is not None for key, value in zip(keys, values)):
+        # Row comparison lets Postgres turn the cursor into one index range
+        columns = tuple_(*(key.column for key in keys))
+        bound = tuple_(*values)
+        return columns < bound if keys[0].descending else columns > bound
+
+    branches = []
+    for index, key in enumerate(keys):
+        ties = [keys[i].equals(values[i]) for i in range(index)]
+        branches.append(and_(*ties, key.after(values[index])) if ties else key.after(values[index]))
+    return or_(*branches) if branches else true()
+
+
+def paginate_keyset(
+    query: Select,
+    keys: Sequence[KeysetColumn],
+    *,
+    limit: int,
+    signature: str,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+) -> Select:
+    """Apply keyset ordering, the cursor position and the page limit.
+
+    The sort key values are appended to the selected columns so the next
+    cursor can be built from the last row (see :func:`split_keyset_rows`).
+    One extra row is fetched to tell whether another page exists. ``offset``
+    is honoured only when no cursor is given, for backward compatibility.
+    """
+    query = query.add_columns(*(key.column for key in keys)).order_by(
+        *(key.order_by() for key in keys)
+    )
+    if cursor:
+        query = query.where(keyset_filter(keys, decode_cursor(cursor, signature)))
+    elif offset:
+        query = query.offset(offset)
+    return query.limit(limit + 1)
+
+
+def split_keyset_rows(
+    rows: Sequence[Any],
+    keys: Sequence[KeysetColumn],
+    *,
+    limit: int,
+    signature: str,
+) -> Tuple[List[Any], Optional[str]]:
+    """Split rows from a :func:`paginate_keyset` query into items and next cursor.
+
+    Returns:
+        Tuple of (items, next_cursor). Items are the originally selected
+        entity (or a tuple when several columns were selected); next_cursor
+        is None on the last page.
+    """
+    key_count = len(keys)
+    page = list(rows[:limit])
+    items = []
+    for row in page:
+        selected = tuple(row[:-key_count])
+        items.append(selected[0] if len(selected) == 1 else selected)
+
+    next_cursor = None
+    if len(rows) > limit and page:
+        next_cursor = encode_cursor(tuple(page[-1][-key_count:]), signature)
+    return items, next_cursor
@@ -0,0 +1,205 @@
+"""Concurrent, fail-soft application startup.
+
+Startup work is declared as a graph of :class:`StartupTask` objects. Every
+task starts as soon as the tasks it depends on have finished, so independent
+network handshakes (database, Redis, Cosmos, Azure) overlap instead of adding
+up. Each task has its own timeout, and a failing or timed-out task is logged
+and recorded without stopping the others.
+
+Foreground tasks are awaited before the application accepts requests;
+background tasks keep running after that, and :attr:`StartupGraph.ready`
+reports when all of them have settled (served on ``/api/v1/health/ready``),
+except warm-ups declared with ``gates_readiness=False``.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from aldar_middleware.monitoring.prometheus import record_startup_phase
+
+
+@dataclass
+class StartupTask:
+    """One unit of startup work.
+
+    Attributes:
+        name: Phase name used in logs, metrics and the readiness response
+        run: Coroutine function doing the work; its return value is kept in
+            :attr:`StartupGraph.results`
+        depends_on: Names of tasks that must finish first (successfully or not)
+        timeout: Seconds before the task is abandoned; None waits indefinitely
+        background: Whether startup may complete before this task does
+        gates_readiness: Whether :attr:`StartupGraph.ready` waits for this
+            task; False for warm-ups that requests do not depend on
+    """
+
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    depends_on: Sequence[str] = ()
+    timeout: Optional[float] = None
+    background: bool = False
+    gates_readiness: bool = True
+
+
+@dataclass
+class PhaseResult:
+    """Outcome of a startup task."""
+
+    status: str = "pending"  # pending, ok, failed, timeout
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    background: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {"status": self.status, "duration_ms": round(self.duration_ms, 1)}
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+class StartupGraph:
+    """Runs startup tasks concurrently in dependency order."""
+
+    def __init__(self, tasks: Sequence[StartupTask]):
+        """
+        Initialize the graph.
+
+        Args:
+            tasks: Startup tasks; dependencies must name tasks in the list
+
+        Raises:
+            ValueError: If a dependency is unknown, a name is repeated or the
+                dependencies form a cycle
+        """
+        self.tasks: Dict[str, StartupTask] = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Duplicate startup task: {task.name}")
+            self.tasks[task.name] = task
+        self._check_dependencies()
+
+        self.phases: Dict[str, PhaseResult] = {
+            name: PhaseResult(background=task.background) for name, task in self.tasks.items()
+        }
+        self.results: Dict[str, Any] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._background: Optional[asyncio.Future] = None
+        self._started_at: Optional[float] = None
+
+    def _check_dependencies(self) -> None:
+        visiting, visited = set(), set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Startup tasks form a cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.tasks[name].depends_on:
+                if dependency not in self.tasks:
+                    raise ValueError(f"Startup task {name} depends on unknown task {dependency}")
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.tasks:
+            visit(name, [])
+
+    @property
+    def ready(self) -> bool:
+        """Whether every task that gates readiness, background ones included, has finished."""
+        return all(
+            phase.status != "pending"
+            for name, phase in self.phases.items()
+            if self.tasks[name].gates_readiness
+        )
+
+    async def start(self) -> None:
+        """Start every task and wait for the foreground ones.
+
+        Background tasks that foreground tasks depend on are awaited too.
+        """
+        self._started_at = time.perf_counter()
+        for name in self.tasks:
+            self._running[name] = asyncio.create_task(self._run(self.tasks[name]), name=f"startup:{name}")
+
+        await asyncio.gather(
+            *(self._running[name] for name, task in self.tasks.items() if not task.background)
+        )
+        logger.info(f"Startup critical path completed in {self._elapsed_ms():.0f} ms")
+
+        pending = [self._running[name] for name, task in self.tasks.items() if task.background]
+        self._background = asyncio.gather(*pending)
+        self._background.add_done_callback(self._log_ready)
+
+    async def wait_ready(self) -> None:
+        """Wait until background tasks have finished as well."""
+        if self._background is not None:
+            await asyncio.shield(self._background)
+
+    async def stop(self) -> None:
+        """Cancel background tasks still running (e.g. on shutdown)."""
+        for task in self._running.values():
+            if not task.done():
+                task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if self._background is not None:
+            self._background.cancel()
+            await asyncio.gather(self._background, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Phase outcomes keyed by task name."""
+        return {name: phase.to_dict() for name, phase in self.phases.items()}
+
+    async def _run(self, task: StartupTask) -> None:
+        for dependency in task.depends_on:
+            await self._running[dependency]
+
+        phase = self.phases[task.name]
+        start = time.perf_counter()
+        try:
+            if task.timeout:
+                self.results[task.name] = await asyncio.wait_for(task.run(), timeout=task.timeout)
+            else:
+                self.results[task.name] = await task.run()
+            phase.status = "ok"
+        except asyncio.TimeoutError:
+            phase.status = "timeout"
+            phase.error = f"Timed out after {task.timeout:g}s" if task.timeout else "Timed out"
+        except Exception as e:
+            phase.status = "failed"
+            phase.error = f"{type(e).__name__}: {e}"
+        phase.duration_ms = (time.perf_counter() - start) * 1000
+
+        if phase.status == "ok":
+            logger.info(f"Startup phase {task.name} completed in {phase.duration_ms:.0f} ms")
+        else:
+            logger.warning(f"Startup phase {task.name} {phase.status} after {phase.duration_ms:.0f} ms: {phase.error}")
+        record_startup_phase(task.name, phase.status, phase.duration_ms / 1000)
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started_at) * 1000 if self._started_at else 0.0
+
+    def _log_ready(self, future: asyncio.Future) -> None:
+        if not future.cancelled():
+            logger.info(f"Startup completed in {self._elapsed_ms():.0f} ms (background subsystems ready)")
+
+
+# Graph of the running application, set by the lifespan
+_startup_graph: Optional[StartupGraph] = None
+
+
+def set_startup_graph(graph: Optional[StartupGraph]) -> None:
+    """Register the application's startup graph."""
+    global _startup_graph
+    _startup_graph = graph
+
+
+def get_startup_graph() -> Optional[StartupGraph]:
+    """Get the application's startup graph, if startup has begun."""
+    return _startup_graph
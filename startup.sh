@@ -17,6 +17,7 @@ fi
 
 echo "Starting gunicorn on 0.0.0.0:${PORT}"
 exec gunicorn -k uvicorn.workers.UvicornWorker \
+  --config aldar_middleware/settings/gunicorn_hooks.py \
   --bind "0.0.0.0:${PORT}" \
   --workers 2 \
   --timeout 120 \
@@ -0,0 +1,4 @@
+"""
+Performance Benchmarks
+Opt-in benchmarks run with `make benchmark` (set ALDAR_RUN_BENCHMARKS=1)
+"""
@@ -0,0 +1,185 @@
+"""Benchmark chat session search on a large message dataset.
+
+Seeds ALDAR_BENCHMARK_MESSAGES messages (default 1,000,000) into the
+configured database, then compares the legacy ILIKE search with the
+tsvector-backed search_user_sessions. Requires a migrated database; the
+seed data lives in one transaction that is rolled back at the end.
+"""
+
+import os
+import statistics
+import time
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from aldar_middleware.database.base import async_session
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.sessions import Session
+from aldar_middleware.models.user import User
+from aldar_middleware.services.chat_search_service import search_user_sessions
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("ALDAR_RUN_BENCHMARKS") != "1",
+    reason="Benchmarks are opt-in: set ALDAR_RUN_BENCHMARKS=1",
+)
+
+MESSAGE_COUNT = int(os.getenv("ALDAR_BENCHMARK_MESSAGES", "1000000"))
+MESSAGES_PER_SESSION = 50
+USER_COUNT = 20
+RUNS = 5
+SEED_CHUNK_SIZE = 100000
+
+VOCABULARY = [
+    "budget", "forecast", "leasing", "tenant", "villa", "handover", "contract",
+    "invoice", "marketing", "campaign", "yas", "saadiyat", "community", "retail",
+    "occupancy", "maintenance", "payment", "schedule", "approval", "report",
+    "meeting", "summary", "project", "design", "permit", "revenue", "quarter",
+]
+RARE_WORD = "zephyrine"
+
+SEED_SESSIONS_SQL = """
+    INSERT INTO sessions (id, public_id, user_id, agent_id, session_name, status,
+                          session_type, is_favorite, created_at, updated_at)
+    SELECT gen_random_uuid(), gen_random_uuid(),
+           (CAST(:user_ids AS uuid[]))[1 + g % :user_count], :agent_id,
+           'Chat ' || g || ' about ' || (CAST(:vocab AS text[]))[1 + g % :vocab_size],
+           'active', 'chat', false,
+           now() - g * interval '1 minute', now() - g * interval '1 minute'
+    FROM generate_series(1, CAST(:session_count AS integer)) AS g
+"""
+
+SEED_MESSAGES_SQL = """
+    WITH numbered AS (
+        SELECT id, user_id, agent_id, row_number() OVER (ORDER BY id) - 1 AS rn
+        FROM sessions WHERE user_id = ANY(CAST(:user_ids AS uuid[]))
+    )
+    INSERT INTO messages (id, public_id, session_id, user_id, agent_id, role, content,
+                          content_type, is_reply, is_refreshed, is_sent_directly_to_openai,
+                          is_internet_search_used, has_found_information,
+                          created_at, updated_at)
+    SELECT gen_random_uuid(), gen_random_uuid(), n.id, n.user_id, n.agent_id,
+           CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+           (CAST(:vocab AS text[]))[1 + (g * 7) % :vocab_size] || ' '
+             || (CAST(:vocab AS text[]))[1 + (g * 13) % :vocab_size] || ' '
+             || (CAST(:vocab AS text[]))[1 + (g * 17) % :vocab_size] || ' '
+             || (CAST(:vocab AS text[]))[1 + (g * 23) % :vocab_size] || ' '
+             || CASE WHEN g % 997 = 0 THEN :rare_word ELSE 'update' END || ' '
+             || md5(g::text),
+           'text', false, false, false, false, false,
+           now() - g * interval '1 second', now() - g * interval '1 second'
+    FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS g
+    JOIN numbered AS n ON n.rn = g % :session_count
+"""
+
+LEGACY_SEARCH_SQL = """
+    SELECT s.id,
+           coalesce(ms.message_count, 0),
+           (CASE WHEN s.session_name ILIKE :pattern THEN 1.0 ELSE 0.0 END) * 0.6
+             + (CASE WHEN EXISTS (SELECT 1 FROM messages m
+                                  WHERE m.session_id = s.id AND m.content ILIKE :pattern)
+                THEN 1.0 ELSE 0.0 END) * 0.4 AS relevance
+    FROM sessions s
+    LEFT OUTER JOIN (
+        SELECT session_id, count(id) AS message_count, max(created_at) AS last_message_at
+        FROM messages GROUP BY session_id
+    ) ms ON ms.session_id = s.id
+    WHERE s.user_id = :user_id
+      AND (s.session_name ILIKE :pattern
+           OR EXISTS (SELECT 1 FROM messages m
+                      WHERE m.session_id = s.id AND m.content ILIKE :pattern))
+    ORDER BY relevance DESC, coalesce(s.updated_at, s.created_at) DESC
+    LIMIT 20
+"""
+
+LEGACY_COUNT_SQL = """
+    SELECT count(*) FROM sessions s
+    WHERE s.user_id = :user_id
+      AND (s.session_name ILIKE :pattern
+           OR EXISTS (SELECT 1 FROM messages m
+                      WHERE m.session_id = s.id AND m.content ILIKE :pattern))
+"""
+
+LEGACY_SNIPPET_SQL = """
+    SELECT session_id, content, created_at FROM messages
+    WHERE session_id = ANY(:session_ids) ORDER BY session_id, created_at
+"""
+
+
+async def _seed(db):
+    users = [User(email=f"bench-{uuid.uuid4()}@example.com") for _ in range(USER_COUNT)]
+    agent = Agent(name=f"bench-agent-{uuid.uuid4()}")
+    db.add_all([*users, agent])
+    await db.flush()
+
+    user_ids = [str(user.id) for user in users]
+    session_count = max(1, MESSAGE_COUNT // MESSAGES_PER_SESSION)
+    params = {
+        "user_ids": user_ids,
+        "user_count": USER_COUNT,
+        "agent_id": agent.id,
+        "vocab": VOCABULARY,
+        "vocab_size": len(VOCABULARY),
+        "session_count": session_count,
+        "rare_word": RARE_WORD,
+    }
+    await db.execute(text(SEED_SESSIONS_SQL), params)
+    # Chunked so each statement stays within the driver's command timeout
+    for start in range(1, MESSAGE_COUNT + 1, SEED_CHUNK_SIZE):
+        stop = min(start + SEED_CHUNK_SIZE - 1, MESSAGE_COUNT)
+        await db.execute(text(SEED_MESSAGES_SQL), {**params, "start": start, "stop": stop})
+    await db.execute(text("ANALYZE sessions"))
+    await db.execute(text("ANALYZE messages"))
+    return [user.id for user in users]
+
+
+async def _time(coro_factory):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await coro_factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@pytest.mark.asyncio
+async def test_chat_search_full_text_vs_ilike():
+    """Full-text search beats ILIKE scanning on a 1M-message dataset."""
+    async with async_session() as db:
+        user_ids = await _seed(db)
+        try:
+            user_id = user_ids[0]
+            results = {}
+            for term in (RARE_WORD, "budget"):
+                pattern = f"%{term}%"
+
+                async def legacy():
+                    rows = (await db.execute(
+                        text(LEGACY_SEARCH_SQL), {"user_id": user_id, "pattern": pattern}
+                    )).all()
+                    await db.execute(
+                        text(LEGACY_COUNT_SQL), {"user_id": user_id, "pattern": pattern}
+                    )
+                    await db.execute(
+                        text(LEGACY_SNIPPET_SQL), {"session_ids": [row[0] for row in rows]}
+                    )
+
+                async def full_text():
+                    await search_user_sessions(
+                        db, term, [Session.user_id == user_id], limit=20, offset=0
+                    )
+
+                results[term] = (await _time(legacy), await _time(full_text))
+
+            print(f"\nChat search benchmark ({MESSAGE_COUNT:,} messages, median of {RUNS})")
+            for term, (legacy_ms, full_text_ms) in results.items():
+                print(
+                    f"  {term!r}: ILIKE {legacy_ms:.1f} ms | tsvector {full_text_ms:.1f} ms "
+                    f"| {legacy_ms / max(full_text_ms, 0.001):.1f}x"
+                )
+
+            legacy_ms, full_text_ms = results[RARE_WORD]
+            assert full_text_ms < legacy_ms
+        finally:
+            await db.rollback()
@@ -14,6 +14,7 @@ os.environ.setdefault('ALDAR_AZURE_GRAFANA_ENABLED', 'false')
 os.environ.setdefault('ALDAR_PROMETHEUS_ENABLED', 'false')
 
 import pytest
+import pytest_asyncio
 import asyncio
 from typing import AsyncGenerator
 from fastapi.testclient import TestClient
@@ -21,7 +22,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from aldar_middleware.application import get_app
-from aldar_middleware.database.base import Base, get_db
+from aldar_middleware.database.base import Base, engine, get_db
 from aldar_middleware.settings import settings
 
 
@@ -70,6 +71,26 @@ async def db_session(test_db) -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+@pytest_asyncio.fixture
+async def db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the application engine, rolled back after the test.
+
+    Commits inside the test become savepoints of the outer transaction.
+    """
+    # Drop connections pooled by earlier tests on other event loops
+    await engine.dispose()
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
 @pytest.fixture
 def client(db_session):
     """Create test client."""
@@ -0,0 +1,149 @@
+"""Tests for the layered /api/v1/agent/available cache.
+
+Redis is replaced by fakeredis. The endpoint tests require a migrated
+database and run inside a transaction that is rolled back at the end.
+"""
+
+import uuid
+
+import pytest
+
+from aldar_middleware.models.agent_tags import AgentTag
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.rbac import RBACAgentPivot, RBACUserPivot
+from aldar_middleware.models.user import User
+from aldar_middleware.routes import user_agents
+from aldar_middleware.routes.menu import toggle_agent_pin
+from aldar_middleware.routes.user_agents import get_available_agents
+from aldar_middleware.schemas.menu import UserPinRequest
+from aldar_middleware.services import agent_available_cache
+from aldar_middleware.services.agent_available_cache import AgentAvailableCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = AgentAvailableCache(fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(agent_available_cache, "_agent_available_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Record which layers the endpoint loads from the database."""
+    calls = []
+    for name in ("_load_catalog_page", "_load_user_overlay", "_load_rbac_access"):
+        original = getattr(user_agents, name)
+
+        async def spy(*args, _name=name, _original=original):
+            calls.append(_name)
+            return await _original(*args)
+
+        monkeypatch.setattr(user_agents, name, spy)
+    return calls
+
+
+class TestAgentAvailableCache:
+    """Test the cache layers and their invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user_drops_only_that_overlay(self, cache):
+        """Other users' overlays and the shared layers survive a per-user invalidation."""
+        version = await cache.get_current_version()
+        await cache.set_base(version, None, 20, 0, {"agents": []})
+        await cache.set_rbac_access(version, "fingerprint", None, 20, 0, ["agent"])
+        await cache.set_user_overlay(version, "alice", {"pins": {}})
+        await cache.set_user_overlay(version, "bob", {"pins": {}})
+
+        assert await cache.invalidate_user("alice") is True
+
+        assert await cache.get_user_overlay(version, "alice") is None
+        assert await cache.get_user_overlay(version, "bob") == {"pins": {}}
+        assert await cache.get_base(version, None, 20, 0) == {"agents": []}
+        assert await cache.get_rbac_access(version, "fingerprint", None, 20, 0) == ["agent"]
+        assert await cache.get_current_version() == version
+
+    @pytest.mark.asyncio
+    async def test_invalidate_all_drops_every_layer(self, cache):
+        """A catalog change makes every layer unreachable."""
+        version = await cache.get_current_version()
+        await cache.set_base(version, None, 20, 0, {"agents": []})
+        await cache.set_user_overlay(version, "bob", {"pins": {}})
+
+        new_version = await cache.invalidate_all()
+
+        assert new_version == version + 1
+        assert await cache.get_base(new_version, None, 20, 0) is None
+        assert await cache.get_user_overlay(new_version, "bob") is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_misses(self):
+        """Without Redis every layer misses and invalidation is a no-op."""
+        cache = AgentAvailableCache(None)
+
+        assert await cache.get_base(1, None, 20, 0) is None
+        assert await cache.set_user_overlay(1, "bob", {}) is False
+        assert await cache.invalidate_user("bob") is False
+
+
+class TestAvailableAgentsEndpoint:
+    """Test the endpoint against the layered cache."""
+
+    async def _setup(self, db):
+        category, group = f"test-{uuid.uuid4().hex[:8]}", str(uuid.uuid4())
+        agent = Agent(name=f"agent-{uuid.uuid4().hex}", intro="Intro", is_enabled=True, status="active")
+        db.add(agent)
+        await db.flush()
+        db.add(AgentTag(agent_id=agent.id, tag=category, tag_type="category", is_active=True))
+        db.add(RBACAgentPivot(agent_name=agent.name, azure_ad_groups=[group]))
+        users = []
+        for _ in range(2):
+            user = User(email=f"{uuid.uuid4().hex}@example.com")
+            db.add(user)
+            db.add(RBACUserPivot(email=user.email, azure_ad_groups=[group]))
+            users.append(user)
+        await db.flush()
+        return agent, category, users
+
+    @pytest.mark.asyncio
+    async def test_pin_toggle_leaves_other_users_hot(self, db, cache, loads):
+        """After one user pins an agent, only that user's overlay is reloaded."""
+        agent, category, (alice, bob) = await self._setup(db)
+
+        async def available(user):
+            return await get_available_agents(category=category, limit=20, offset=0, current_user=user, db=db, cache=cache)
+
+        await available(alice)
+        await available(bob)
+        # Catalog and RBAC access are shared by users with the same groups
+        assert loads.count("_load_catalog_page") == 1
+        assert loads.count("_load_rbac_access") == 1
+        assert loads.count("_load_user_overlay") == 2
+
+        await toggle_agent_pin(str(agent.public_id), UserPinRequest(is_pinned=True), alice, db)
+        loads.clear()
+
+        bob_response = await available(bob)
+        assert loads == []
+        alice_response = await available(alice)
+        assert loads == ["_load_user_overlay"]
+
+        assert [a.agent_id for a in alice_response.agents] == [str(agent.public_id)]
+        assert alice_response.agents[0].is_pinned is True
+        assert bob_response.agents[0].is_pinned is False
+
+    @pytest.mark.asyncio
+    async def test_users_without_matching_groups_are_filtered(self, db, cache):
+        """RBAC still applies: a user outside the agent's groups gets no agents."""
+        _, category, _ = await self._setup(db)
+        outsider = User(email=f"{uuid.uuid4().hex}@example.com")
+        db.add(outsider)
+        db.add(RBACUserPivot(email=outsider.email, azure_ad_groups=[str(uuid.uuid4())]))
+        await db.flush()
+
+        response = await get_available_agents(
+            category=category, limit=20, offset=0, current_user=outsider, db=db, cache=cache
+        )
+
+        assert response.success is False
+        assert response.agents == []
@@ -0,0 +1,120 @@
+"""Tests for the daily analytics rollups.
+
+Window planning is pure; the refresh tests require a migrated database and
+run inside a transaction that is rolled back at the end.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from aldar_middleware.models.feedback import FeedbackData, FeedbackEntityType, FeedbackRating
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.token_usage import TokenUsage
+from aldar_middleware.models.user import User
+from aldar_middleware.services.analytics_rollup import AnalyticsRollupService, plan_window
+
+NOW = datetime(2026, 3, 20, 15, 30)
+
+
+class TestPlanWindow:
+    """Test splitting a date filter into rollup days and live ranges."""
+
+    def test_whole_days_come_from_rollup(self):
+        """Partial edge days and days after the watermark are read live."""
+        window = plan_window(datetime(2026, 3, 1, 12), datetime(2026, 3, 20, 9), date(2026, 3, 18))
+
+        assert (window.first_day, window.end_day) == (date(2026, 3, 2), date(2026, 3, 18))
+        assert window.live_ranges == [
+            (datetime(2026, 3, 1, 12), datetime(2026, 3, 2), False),
+            (datetime(2026, 3, 18), datetime(2026, 3, 20, 9), True),
+        ]
+
+    def test_short_or_unrefreshed_ranges_are_live(self):
+        """Without a watermark or a whole day in range, everything is read live."""
+        assert not plan_window(None, None, None).uses_rollup
+        short = plan_window(datetime(2026, 3, 1, 1), datetime(2026, 3, 1, 23), date(2026, 3, 18))
+        assert short.live_ranges == [(datetime(2026, 3, 1, 1), datetime(2026, 3, 1, 23), True)]
+
+    def test_unbounded_range(self):
+        """No filter reads every rollup day and the live tail from the watermark."""
+        window = plan_window(None, None, date(2026, 3, 18))
+        assert (window.first_day, window.end_day) == (None, date(2026, 3, 18))
+        assert window.live_ranges == [(datetime(2026, 3, 18), None, True)]
+
+
+async def _seed(db):
+    user = User(email=f"rollup-{uuid.uuid4()}@example.com")
+    agents = [Agent(name=f"rollup-agent-{uuid.uuid4()}") for _ in range(2)]
+    db.add_all([user, *agents])
+    await db.flush()
+
+    feedback = []
+    for days_ago in range(10):
+        created_at = NOW - timedelta(days=days_ago, hours=days_ago % 3)
+        for index, agent in enumerate(agents[: 1 + days_ago % 2]):
+            db.add(TokenUsage(
+                user_id=user.id, agent_id=agent.id, model_name="gpt", total_tokens=10,
+                created_at=created_at + timedelta(minutes=index),
+            ))
+            item = FeedbackData(
+                user_id=str(user.id), entity_id=str(uuid.uuid4()), entity_type=FeedbackEntityType.RESPONSE,
+                agent_id=str(agent.public_id),
+                rating=FeedbackRating.THUMBS_UP if days_ago % 3 else FeedbackRating.THUMBS_DOWN,
+                created_at=created_at, updated_at=created_at,
+            )
+            db.add(item)
+            feedback.append(item)
+    await db.flush()
+    return agents, feedback
+
+
+async def _snapshot(db, agents):
+    service = AnalyticsRollupService(db)
+    windows = [(None, None), (NOW - timedelta(days=6, hours=5), NOW - timedelta(hours=2))]
+    agent_ids = {agent.id for agent in agents}
+    public_ids = {str(agent.public_id) for agent in agents}
+    snapshot = []
+    for date_from, date_to in windows:
+        usage = await service.get_agent_usage(date_from, date_to)
+        snapshot.append({agent_id: usage[agent_id] for agent_id in agent_ids if agent_id in usage})
+        counts = await service.get_feedback_counts(
+            ("day", "agent_id"), date_from or NOW - timedelta(days=30), date_to or NOW
+        )
+        snapshot.append({key: count for key, count in counts.items() if key[1] in public_ids})
+    return snapshot
+
+
+class TestRollupRefresh:
+    """Test that rollup-backed reads match live reads."""
+
+    @pytest.mark.asyncio
+    async def test_reads_are_unchanged_by_refresh(self, db):
+        """Answers are identical before and after the rollups are built."""
+        agents, _ = await _seed(db)
+        live = await _snapshot(db, agents)
+        assert all(live)
+
+        summary = await AnalyticsRollupService(db).refresh(now=NOW)
+        assert summary["watermark"] == NOW.date().isoformat()
+        assert await _snapshot(db, agents) == live
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh_picks_up_old_deletions(self, db):
+        """Feedback deleted on a day before the lookback is recomputed on the next refresh."""
+        agents, feedback = await _seed(db)
+        service = AnalyticsRollupService(db)
+        await service.refresh(now=NOW)
+
+        oldest = min(feedback, key=lambda item: item.created_at)
+        oldest.deleted_at = oldest.updated_at = NOW + timedelta(hours=1)
+        await db.flush()
+
+        later = NOW + timedelta(days=1, hours=2)
+        summary = await service.refresh(now=later)
+        assert summary["usage_days"] == 1 + service.lookback_days
+        assert summary["feedback_days"] == 1 + service.lookback_days + 1
+
+        counts = await service.get_feedback_counts(("day",), NOW - timedelta(days=30), later, agent_id=oldest.agent_id)
+        assert (oldest.created_at.date(), oldest.rating) not in counts
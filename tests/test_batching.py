@@ -0,0 +1,94 @@
+"""Tests for the shared queue-draining batch worker."""
+
+import asyncio
+
+import pytest
+
+from aldar_middleware.utils.batching import drain_batches, run_batch_worker
+
+
+def _queue(items):
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    return queue
+
+
+class TestRunBatchWorker:
+    """Test batch boundaries, errors and cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_batches_are_cut_by_size_and_interval(self):
+        """Queued items fill batches up to batch_size; a late item starts a new batch."""
+        queue = _queue(range(5))
+        batches = []
+
+        async def handle(batch):
+            batches.append(batch)
+
+        worker = asyncio.create_task(run_batch_worker(queue, handle, 2, 0.01, on_error=lambda batch, e: None))
+        await asyncio.sleep(0.05)
+        queue.put_nowait(5)
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+        assert batches == [[0, 1], [2, 3], [4], [5]]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_reported_and_worker_continues(self):
+        queue = _queue(["bad", "good"])
+        handled, failed = [], []
+
+        async def handle(batch):
+            if "bad" in batch:
+                raise RuntimeError("boom")
+            handled.extend(batch)
+
+        worker = asyncio.create_task(
+            run_batch_worker(queue, handle, 1, 0.01, on_error=lambda batch, e: failed.append((batch, str(e))))
+        )
+        await asyncio.sleep(0.05)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+        assert failed == [(["bad"], "boom")]
+        assert handled == ["good"]
+
+    @pytest.mark.asyncio
+    async def test_cancellation_handles_the_batch_being_collected(self):
+        """Items already taken off the queue are not lost when the worker stops."""
+        queue = _queue(["taken"])
+        batches = []
+
+        async def handle(batch):
+            batches.append(batch)
+
+        worker = asyncio.create_task(run_batch_worker(queue, handle, 10, 10, on_error=lambda batch, e: None))
+        await asyncio.sleep(0.01)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+        assert batches == [["taken"]]
+        assert drain_batches(_queue(range(5)), 2) == [[0, 1], [2, 3], [4]]
+
+    @pytest.mark.asyncio
+    async def test_cancellation_does_not_handle_a_batch_twice(self):
+        """A batch whose handle call was interrupted is not handled again."""
+        queue = _queue(["in-flight"])
+        calls = []
+
+        async def handle(batch):
+            calls.append(list(batch))
+            await asyncio.sleep(10)
+
+        worker = asyncio.create_task(run_batch_worker(queue, handle, 1, 0.01, on_error=lambda batch, e: None))
+        await asyncio.sleep(0.02)
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+        assert calls == [["in-flight"]]
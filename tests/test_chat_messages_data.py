@@ -0,0 +1,98 @@
+"""Query-count regression test for the chat messages-data endpoint.
+
+Requires a migrated database; seed data is rolled back at the end.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from aldar_middleware.database.base import async_session, engine
+from aldar_middleware.models.event import Event
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.messages import Message
+from aldar_middleware.models.run import Run
+from aldar_middleware.models.run_input import RunInput
+from aldar_middleware.models.run_message import RunMessage
+from aldar_middleware.models.run_metrics import RunMetrics
+from aldar_middleware.models.sessions import Session
+from aldar_middleware.models.user import User
+from aldar_middleware.routes.chat_messages_data import get_chat_messages_data_by_session
+
+
+async def _seed_session(db, run_count: int):
+    user = User(email=f"messages-data-{uuid.uuid4()}@example.com")
+    agents = [Agent(name=f"agent-{uuid.uuid4()}") for _ in range(3)]
+    db.add_all([user, *agents])
+    await db.flush()
+
+    session = Session(user_id=user.id, agent_id=agents[0].id, session_name="Query count")
+    db.add(session)
+    await db.flush()
+
+    start = datetime.utcnow() - timedelta(hours=1)
+    for index in range(run_count):
+        agent = agents[index % len(agents)]
+        created_at = start + timedelta(minutes=index)
+        run_id = str(uuid.uuid4())
+        db.add(Run(
+            run_id=run_id, agent_id=agent.id, session_id=str(session.public_id),
+            agent_name=agent.name, status="COMPLETED", content=f"answer {index}",
+            created_at=created_at,
+        ))
+        await db.flush()
+        db.add_all([
+            Event(event_id=str(uuid.uuid4()), run_id=run_id, event_type="RunStarted", created_at=created_at),
+            Event(event_id=str(uuid.uuid4()), run_id=run_id, event_type="RunCompleted", created_at=created_at),
+            RunMetrics(metrics_id=str(uuid.uuid4()), run_id=run_id, input_tokens=10, output_tokens=5, total_tokens=15),
+            RunInput(input_id=str(uuid.uuid4()), run_id=run_id, input_content=f"question {index}"),
+            RunMessage(message_id=str(uuid.uuid4()), run_id=run_id, role="user", content=f"question {index}", created_at=created_at),
+            RunMessage(message_id=str(uuid.uuid4()), run_id=run_id, role="assistant", content=f"answer {index}", created_at=created_at),
+            Message(session_id=session.id, user_id=user.id, agent_id=agent.id, role="user", content=f"question {index}", created_at=created_at),
+            Message(session_id=session.id, user_id=user.id, agent_id=agent.id, role="assistant", content=f"answer {index}", created_at=created_at),
+        ])
+    await db.flush()
+    return user, session
+
+
+async def _count_statements(db, user, session) -> int:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = await get_chat_messages_data_by_session(
+            session_id=session.id,
+            limit=20,
+            before_message_id=None,
+            include_system=False,
+            current_user=user,
+            db=db,
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response["runs_summary"], "runs were not hydrated"
+    assert all(run["metrics"] and run["input"] and run["message_count"] == 2 for run in response["runs_summary"])
+    assert all(run["agent_public_id"] for run in response["runs_summary"])
+    return len(statements)
+
+
+@pytest.mark.asyncio
+async def test_messages_data_statement_count_is_constant_per_page():
+    """A page with many runs costs the same number of statements as one with few."""
+    async with async_session() as db:
+        try:
+            small_user, small_session = await _seed_session(db, run_count=2)
+            large_user, large_session = await _seed_session(db, run_count=10)
+
+            small_count = await _count_statements(db, small_user, small_session)
+            large_count = await _count_statements(db, large_user, large_session)
+
+            assert large_count == small_count
+        finally:
+            await db.rollback()
@@ -0,0 +1,37 @@
+"""Tests for full-text chat session search helpers."""
+
+from aldar_middleware.services.chat_search_service import (
+    MAX_QUERY_TERMS,
+    build_prefix_tsquery,
+)
+
+
+class TestBuildPrefixTsquery:
+    """Test conversion of user input to tsquery text."""
+
+    def test_words_become_prefix_terms(self):
+        """Each word is AND-ed and prefix matched."""
+        assert build_prefix_tsquery("Q3 Budg") == "q3:* & budg:*"
+
+    def test_operators_and_punctuation_are_stripped(self):
+        """tsquery operators in user input cannot alter the query."""
+        assert build_prefix_tsquery("budget & !(forecast) | 'x':*") == (
+            "budget:* & forecast:* & x:*"
+        )
+
+    def test_underscores_split_terms(self):
+        """Underscores separate terms like the Postgres parser does."""
+        assert build_prefix_tsquery("snake_case") == "snake:* & case:*"
+
+    def test_non_latin_text_is_kept(self):
+        """Arabic words are searchable."""
+        assert build_prefix_tsquery("الميزانية") == "الميزانية:*"
+
+    def test_no_words_returns_none(self):
+        """Queries without any word characters produce no tsquery."""
+        assert build_prefix_tsquery("?!  --") is None
+
+    def test_term_count_is_capped(self):
+        """Very long queries are truncated to MAX_QUERY_TERMS terms."""
+        query = " ".join(f"w{i}" for i in range(MAX_QUERY_TERMS + 5))
+        assert build_prefix_tsquery(query).count(":*") == MAX_QUERY_TERMS
@@ -0,0 +1,153 @@
+"""Tests for the streaming CSV export engine.
+
+The streaming tests require a migrated database and run inside a transaction
+that is rolled back at the end.
+"""
+
+import csv
+import gzip
+import io
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+from starlette.requests import Request
+
+from aldar_middleware.models.user import User
+from aldar_middleware.utils.csv_export import CSVExport, accepts_gzip, iter_csv_export
+
+
+def _request(accept_encoding):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.fixture
+def export_db(db, monkeypatch):
+    @asynccontextmanager
+    async def export_session():
+        yield db
+
+    # The export opens its own session; hand it the test transaction instead
+    monkeypatch.setattr("aldar_middleware.utils.csv_export.async_session", export_session)
+    return db
+
+
+async def _export_users(db, count):
+    domain = f"{uuid.uuid4().hex}.example.com"
+    db.add_all([User(email=f"user{index:02d}@{domain}") for index in range(count)])
+    await db.flush()
+
+    batches = []
+
+    async def render_batch(session, users):
+        batches.append(len(users))
+        return [{"email": user.email, "ignored": True} for user in users]
+
+    completed = []
+
+    async def on_complete(session, row_count):
+        completed.append(row_count)
+
+    export = CSVExport(
+        query=select(User).where(User.email.like(f"%@{domain}")).order_by(User.email),
+        fieldnames=["email"],
+        render_batch=render_batch,
+        filename="users.csv",
+        on_complete=on_complete,
+        batch_size=4,
+    )
+    return export, batches, completed
+
+
+class TestIterCSVExport:
+    """Test streaming an export in batches."""
+
+    @pytest.mark.asyncio
+    async def test_rows_are_rendered_and_sent_per_batch(self, export_db):
+        """Each fetched batch becomes one chunk after the header chunk."""
+        export, batches, completed = await _export_users(export_db, 10)
+
+        chunks = [chunk async for chunk in iter_csv_export(export)]
+
+        assert batches == [4, 4, 2]
+        assert len(chunks) == 1 + len(batches)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        assert [row["email"].split("@")[0] for row in rows] == [f"user{index:02d}" for index in range(10)]
+        assert completed == [10]
+
+    @pytest.mark.asyncio
+    async def test_gzip_output_decompresses_to_the_same_csv(self, export_db):
+        """Compressed exports are a single valid gzip stream."""
+        export, _, _ = await _export_users(export_db, 5)
+        plain = b"".join([chunk async for chunk in iter_csv_export(export)])
+        compressed = b"".join([chunk async for chunk in iter_csv_export(export, compress=True)])
+
+        assert gzip.decompress(compressed) == plain
+
+
+class TestExportHooks:
+    """Test that an export is recorded when it starts and again when it ends."""
+
+    @pytest.mark.asyncio
+    async def test_start_is_recorded_before_the_first_chunk(self, export_db):
+        export, _, completed = await _export_users(export_db, 3)
+        events = []
+
+        async def on_start(session):
+            events.append("started")
+
+        export.on_start = on_start
+        stream = iter_csv_export(export)
+        await stream.__anext__()
+        assert events == ["started"]
+        assert completed == []
+
+        [chunk async for chunk in stream]
+        assert completed == [3]
+
+    @pytest.mark.asyncio
+    async def test_failure_is_recorded_with_the_rows_sent(self, export_db):
+        """A failing export reports its row count and error to on_failure, not on_complete."""
+        export, _, completed = await _export_users(export_db, 10)
+        render_users = export.render_batch
+        rendered = 0
+        failures = []
+
+        async def render_batch(session, users):
+            nonlocal rendered
+            if rendered:
+                raise RuntimeError("renderer failed")
+            rendered += len(users)
+            return await render_users(session, users)
+
+        async def on_failure(session, row_count, error):
+            failures.append((row_count, str(error)))
+
+        export.render_batch = render_batch
+        export.on_failure = on_failure
+
+        with pytest.raises(RuntimeError):
+            [chunk async for chunk in iter_csv_export(export)]
+
+        assert failures == [(4, "renderer failed")]
+        assert completed == []
+
+
+class TestAcceptsGzip:
+    """Test content negotiation for compressed exports."""
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("gzip, deflate, br", True),
+            ("br;q=1.0, gzip;q=0.5", True),
+            ("gzip;q=0", False),
+            ("identity", False),
+            (None, False),
+        ],
+    )
+    def test_accept_encoding(self, accept_encoding, expected):
+        """gzip is used only when the client accepts it with a non-zero weight."""
+        assert accepts_gzip(_request(accept_encoding)) is expected
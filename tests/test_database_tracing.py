@@ -0,0 +1,98 @@
+"""Tests for SQL statement fingerprinting and in-memory query aggregates."""
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from aldar_middleware.monitoring.database_tracing import (
+    DatabaseTracer,
+    fingerprint_statement,
+)
+
+
+class TestFingerprintStatement:
+    """Test statement normalization."""
+
+    def test_literals_and_placeholders_are_stripped(self):
+        """Statements differing only in values share a fingerprint."""
+        first, query_type = fingerprint_statement(
+            "SELECT * FROM users WHERE email = 'a@x.com' AND age > 30 AND id = $1::UUID"
+        )
+        second, _ = fingerprint_statement(
+            "SELECT *  FROM users\n WHERE email = 'b@y.com' AND age > 41 AND id = $7::UUID"
+        )
+        assert first == second == "SELECT * FROM users WHERE email = ? AND age > ? AND id = ?"
+        assert query_type == "SELECT"
+
+    def test_in_lists_and_values_collapse(self):
+        """IN lists and multi-row VALUES do not multiply fingerprints."""
+        in_list, _ = fingerprint_statement("SELECT id FROM t WHERE id IN ($1, $2, $3)")
+        assert in_list == "SELECT id FROM t WHERE id IN (?)"
+
+        values, query_type = fingerprint_statement(
+            "INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6) ON CONFLICT (a) DO NOTHING"
+        )
+        assert values == "INSERT INTO t (a, b) VALUES (?) ON CONFLICT (a) DO NOTHING"
+        assert query_type == "INSERT"
+
+    def test_casts_and_identifiers_are_kept(self):
+        """Type casts and identifiers containing digits are not literals."""
+        fingerprint, _ = fingerprint_statement("SELECT t1.col2::text FROM t1 WHERE t1.n = 5")
+        assert fingerprint == "SELECT t1.col2::text FROM t1 WHERE t1.n = ?"
+
+
+class TestDatabaseTracer:
+    """Test aggregation through real engine events."""
+
+    @pytest.fixture
+    def tracer_engine(self):
+        tracer = DatabaseTracer()
+        tracer.enabled = True
+        tracer.caller_sample_rate = 1.0
+        engine = create_engine("sqlite://")
+        tracer.install_hooks(engine)
+        yield tracer, engine
+        engine.dispose()
+
+    def test_statements_are_aggregated_per_fingerprint(self, tracer_engine):
+        """Calls with different literals are counted under one fingerprint."""
+        tracer, engine = tracer_engine
+        with engine.connect() as conn:
+            for value in range(5):
+                conn.execute(text(f"SELECT {value} + 1"))
+            conn.execute(text("SELECT 'x'"))
+
+        report = {row["fingerprint"]: row for row in tracer.hot_statements(order_by="calls")}
+        assert report["SELECT ? + ?"]["calls"] == 5
+        assert report["SELECT ?"]["calls"] == 1
+        # Sampled at 100%; the caller is the first aldar_middleware frame (none here)
+        assert report["SELECT ? + ?"]["callers"] == [{"caller": "unknown", "count": 5}]
+        assert tracer.summary()["calls"] == 6
+
+    def test_errors_are_counted(self, tracer_engine):
+        """Failed statements are attributed to their fingerprint."""
+        tracer, engine = tracer_engine
+        with engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table WHERE id = 3"))
+
+        (row,) = tracer.hot_statements(order_by="errors", limit=1)
+        assert row["fingerprint"] == "SELECT * FROM missing_table WHERE id = ?"
+        assert row["errors"] == 1
+
+    def test_fingerprint_cap_groups_new_statements(self, tracer_engine):
+        """Unbounded distinct statements cannot grow memory without limit."""
+        tracer, engine = tracer_engine
+        tracer.max_fingerprints = 2
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 1 + 1"))
+            conn.execute(text("SELECT 1 + 1 + 1"))
+
+        fingerprints = {row["fingerprint"] for row in tracer.hot_statements()}
+        assert fingerprints == {"SELECT ?", "SELECT ? + ?", "<other>"}
+
+    def test_unknown_order_is_rejected(self, tracer_engine):
+        """Only known ranking keys are accepted."""
+        tracer, _ = tracer_engine
+        with pytest.raises(ValueError):
+            tracer.hot_statements(order_by="nope")
@@ -0,0 +1,109 @@
+"""Tests for cluster-wide database connection budgeting.
+
+The queueing tests require a reachable database (settings.db_url_property).
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import exc, text
+
+from aldar_middleware.database.pool_budget import (
+    DEFAULT_MAX_OVERFLOW,
+    DEFAULT_POOL_SIZE,
+    PoolBudget,
+    compute_pool_budget,
+    create_pooled_engine,
+)
+from aldar_middleware.monitoring.prometheus import DB_POOL_SATURATION, DB_POOL_TIMEOUTS, DB_POOL_WAIT
+from aldar_middleware.settings import settings
+
+
+class TestComputePoolBudget:
+    """Test splitting the budget across workers."""
+
+    @pytest.mark.parametrize(
+        ("budget", "workers", "replicas", "expected"),
+        [
+            (400, 4, 2, PoolBudget(pool_size=38, max_overflow=12)),  # 50 per worker
+            (200, 33, 2, PoolBudget(pool_size=3, max_overflow=0)),  # 16-core node, cpu*2+1 workers
+            (100, 2, 1, PoolBudget(pool_size=38, max_overflow=12)),
+            (90, 4, 1, PoolBudget(pool_size=17, max_overflow=5)),  # remainder is left unused
+            (3, 1, 1, PoolBudget(pool_size=3, max_overflow=0)),
+            (10, 33, 1, PoolBudget(pool_size=1, max_overflow=0)),  # budget below worker count
+        ],
+    )
+    def test_per_worker_pool(self, budget, workers, replicas, expected):
+        pool = compute_pool_budget(budget, workers, replicas)
+
+        assert pool == expected
+        if budget >= workers * replicas:
+            assert pool.capacity * workers * replicas <= budget
+
+    def test_no_budget_keeps_default_pool(self):
+        assert compute_pool_budget(None, workers=33) == PoolBudget(DEFAULT_POOL_SIZE, DEFAULT_MAX_OVERFLOW)
+
+    def test_overflow_fraction(self):
+        assert compute_pool_budget(100, workers=1, overflow_fraction=0) == PoolBudget(100, 0)
+        with pytest.raises(ValueError):
+            compute_pool_budget(100, workers=1, overflow_fraction=1)
+
+
+def _engine(pool, name, **kwargs):
+    return create_pooled_engine(str(settings.db_url_property), pool, name=name, **kwargs)
+
+
+class TestPoolQueueing:
+    """Test that requests beyond the budget wait for a connection."""
+
+    @pytest.mark.asyncio
+    async def test_excess_requests_queue_instead_of_failing(self):
+        """Eight concurrent queries on a one-connection pool all succeed."""
+        name = f"test-{uuid.uuid4().hex[:8]}"
+        engine = _engine(PoolBudget(pool_size=1, max_overflow=0), name, pool_timeout=10)
+
+        async def query(n):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT pg_sleep(0.02)"))
+                return (await conn.execute(text("SELECT CAST(:n AS integer)"), {"n": n})).scalar()
+
+        try:
+            results = await asyncio.gather(*(query(n) for n in range(8)))
+        finally:
+            await engine.dispose()
+
+        assert sorted(results) == list(range(8))
+        wait = DB_POOL_WAIT.labels(pool=name)
+        assert wait._sum.get() >= 0.1  # later checkouts waited behind earlier queries
+        assert DB_POOL_TIMEOUTS.labels(pool=name)._value.get() == 0
+        assert DB_POOL_SATURATION.labels(pool=name)._value.get() == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_is_bounded_by_pool_timeout(self):
+        """A checkout that cannot be served in time raises TimeoutError and is counted."""
+        name = f"test-{uuid.uuid4().hex[:8]}"
+        engine = _engine(PoolBudget(pool_size=1, max_overflow=0), name, pool_timeout=0.1)
+        try:
+            async with engine.connect():
+                assert DB_POOL_SATURATION.labels(pool=name)._value.get() == 1
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+        finally:
+            await engine.dispose()
+
+        assert DB_POOL_TIMEOUTS.labels(pool=name)._value.get() == 1
+
+    @pytest.mark.asyncio
+    async def test_pgbouncer_profile_runs_queries(self):
+        """The transaction-mode profile disables statement caching and still executes."""
+        engine = _engine(PoolBudget(pool_size=1, max_overflow=0), "test-pgbouncer", pgbouncer_transaction_mode=True)
+        try:
+            async with engine.connect() as conn:
+                for n in range(3):
+                    assert (await conn.execute(text("SELECT CAST(:n AS integer)"), {"n": n})).scalar() == n
+                raw = await conn.get_raw_connection()
+                assert raw.driver_connection._stmt_cache.get_max_size() == 0
+        finally:
+            await engine.dispose()
@@ -0,0 +1,65 @@
+"""Import time and memory budget of the application.
+
+Every worker imports the app before serving, so these numbers are paid per
+worker. Budgets come from ``import_time_budget_seconds`` and
+``import_rss_budget_mb`` (ALDAR_IMPORT_TIME_BUDGET_SECONDS,
+ALDAR_IMPORT_RSS_BUDGET_MB). On failure the assertion message carries the
+``-X importtime`` breakdown of the slowest imports.
+"""
+
+import pytest
+
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.import_profile import parse_importtime, profile_import
+
+# Needed only for PDF export; loaded on first use
+PDF_PACKAGES = {"reportlab", "PIL", "svglib"}
+
+
+@pytest.fixture(scope="module")
+def app_import():
+    return profile_import()
+
+
+def _breakdown() -> str:
+    return profile_import(importtime=True).format_report(20)
+
+
+class TestImportBudget:
+    """Test the cost of importing aldar_middleware.application."""
+
+    def test_import_time_within_budget(self, app_import):
+        """Importing the app stays under the time budget."""
+        budget = settings.import_time_budget_seconds
+        if app_import.seconds > budget:
+            pytest.fail(f"App import took {app_import.seconds:.2f}s (budget {budget}s)\n{_breakdown()}")
+
+    def test_rss_within_budget(self, app_import):
+        """A process that has imported the app stays under the memory budget."""
+        budget = settings.import_rss_budget_mb
+        if app_import.max_rss_mb > budget:
+            pytest.fail(f"App import peaked at {app_import.max_rss_mb:.0f} MB (budget {budget} MB)\n{_breakdown()}")
+
+    def test_pdf_libraries_are_not_imported(self, app_import):
+        """reportlab and Pillow are left to the first PDF export."""
+        assert not PDF_PACKAGES & app_import.packages
+
+
+class TestParseImporttime:
+    """Test parsing -X importtime output."""
+
+    def test_parses_nested_modules(self):
+        """-X importtime lines give each module's timings and nesting depth; other lines are skipped."""
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     encodings.aliases",
+            "import time:       300 |        420 |   encodings",
+            "some other stderr line",
+        ])
+
+        timings = parse_importtime(output)
+
+        assert [(t.module, t.self_us, t.cumulative_us, t.depth) for t in timings] == [
+            ("encodings.aliases", 120, 120, 2),
+            ("encodings", 300, 420, 1),
+        ]
@@ -0,0 +1,253 @@
+"""Tests for login enrichment off the Azure AD callback path.
+
+Graph and blob storage are replaced by stand-ins that sleep, so the tests can
+tell whether their latency is paid by the callback or by the background job.
+The tests require a migrated database and run inside a transaction that is
+rolled back at the end.
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+from starlette.requests import Request
+
+from aldar_middleware.auth.azure_ad import azure_ad_auth
+from aldar_middleware.models.rbac import RBACUserPivot
+from aldar_middleware.models.user import User
+from aldar_middleware.routes.auth import azure_ad_callback
+from aldar_middleware.services import login_enrichment
+from aldar_middleware.services.login_enrichment import (
+    PHOTO_ETAG_PREFERENCE,
+    LoginEnrichmentService,
+    LoginEnrichmentWorker,
+    membership_hash,
+)
+from aldar_middleware.settings import settings
+
+GRAPH_DELAY = 0.3
+BLOB_DELAY = 0.3
+
+
+class FakeGraph:
+    """Graph stand-in counting calls; every call takes GRAPH_DELAY."""
+
+    def __init__(self, etag='"photo-v1"', groups=("group-a", "group-b")):
+        self.etag = etag
+        self.groups = list(groups)
+        self.calls = []
+
+    async def _call(self, name, result):
+        self.calls.append(name)
+        await asyncio.sleep(GRAPH_DELAY)
+        return result
+
+    async def get_user_profile_photo_etag(self, access_token, user_id):
+        return await self._call("photo_etag", self.etag)
+
+    async def get_user_profile_photo_bytes(self, access_token, user_id):
+        return await self._call("photo_bytes", b"\xff\xd8jpeg")
+
+    async def get_user_groups(self, access_token):
+        return await self._call("groups", list(self.groups))
+
+
+class FakeBlobService:
+    """Blob storage stand-in recording uploads; every upload takes BLOB_DELAY."""
+
+    def __init__(self):
+        self.uploads = []
+
+    async def upload_profile_photo(self, file_content, user_id, overwrite=True):
+        self.uploads.append(user_id)
+        await asyncio.sleep(BLOB_DELAY)
+        blob_path = f"profile-photos/{user_id}/photo.jpg"
+        return f"https://blob/{blob_path}", blob_path, len(file_content)
+
+
+@pytest.fixture
+def no_admin_groups(monkeypatch):
+    monkeypatch.setattr(settings, "admin_group_ids", None)
+
+
+async def _create_user(db, **kwargs):
+    user = User(email=f"{uuid.uuid4().hex}@example.com", azure_ad_id=str(uuid.uuid4()), **kwargs)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+class TestLoginEnrichmentService:
+    """Test the enrichment steps and their change detection."""
+
+    @pytest.mark.asyncio
+    async def test_first_run_stores_photo_and_groups(self, db, no_admin_groups):
+        """A new user gets the photo uploaded and a pivot row created."""
+        user = await _create_user(db)
+        graph, blob = FakeGraph(), FakeBlobService()
+
+        result = await LoginEnrichmentService(db, graph, lambda: blob).enrich(str(user.id), "token")
+
+        assert result["photo"] == "uploaded"
+        assert result["groups"] == "synced"
+        assert blob.uploads == [str(user.id)]
+        assert user.preferences[PHOTO_ETAG_PREFERENCE] == '"photo-v1"'
+        groups = await db.scalar(select(RBACUserPivot.azure_ad_groups).where(RBACUserPivot.email == user.email))
+        assert sorted(groups) == ["group-a", "group-b"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_photo_and_groups_are_skipped(self, db, no_admin_groups):
+        """Same ETag and same membership (in any order) write nothing."""
+        user = await _create_user(db)
+        blob = FakeBlobService()
+        await LoginEnrichmentService(db, FakeGraph(), lambda: blob).enrich(str(user.id), "token")
+        pivot_id = await db.scalar(select(RBACUserPivot.id).where(RBACUserPivot.email == user.email))
+
+        graph = FakeGraph(groups=("group-b", "group-a"))
+        result = await LoginEnrichmentService(db, graph, lambda: blob).enrich(str(user.id), "token")
+
+        assert result["photo"] == "unchanged"
+        assert result["groups"] == "unchanged"
+        assert "photo_bytes" not in graph.calls
+        assert len(blob.uploads) == 1
+        assert await db.scalar(select(RBACUserPivot.id).where(RBACUserPivot.email == user.email)) == pivot_id
+
+    @pytest.mark.asyncio
+    async def test_changed_etag_and_membership_are_synced(self, db, no_admin_groups):
+        """A new photo ETag re-uploads; a new membership replaces the pivot row."""
+        user = await _create_user(db)
+        blob = FakeBlobService()
+        await LoginEnrichmentService(db, FakeGraph(), lambda: blob).enrich(str(user.id), "token")
+
+        graph = FakeGraph(etag='"photo-v2"', groups=("group-a", "group-c"))
+        result = await LoginEnrichmentService(db, graph, lambda: blob).enrich(str(user.id), "token")
+
+        assert result == {"photo": "uploaded", "groups": "synced"}
+        assert len(blob.uploads) == 2
+        groups = await db.scalar(select(RBACUserPivot.azure_ad_groups).where(RBACUserPivot.email == user.email))
+        assert membership_hash(groups) == membership_hash(["group-c", "group-a"])
+
+    @pytest.mark.asyncio
+    async def test_admin_follows_admin_group_membership(self, db, monkeypatch):
+        """is_admin is granted and revoked from the configured admin groups."""
+        monkeypatch.setattr(settings, "admin_group_ids", "group-admin")
+        user = await _create_user(db, is_admin=False)
+
+        granted = await LoginEnrichmentService(db, FakeGraph(groups=("group-admin",))).sync_admin(user, "token")
+        revoked = await LoginEnrichmentService(db, FakeGraph(groups=("group-a",))).sync_admin(user, "token")
+
+        assert granted is True
+        assert revoked is False
+        assert user.is_admin is False
+
+    @pytest.mark.asyncio
+    async def test_failed_group_fetch_revokes_admin(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "admin_group_ids", "group-admin")
+        user = await _create_user(db, is_admin=True)
+
+        class FailingGraph(FakeGraph):
+            async def get_user_groups(self, access_token):
+                raise ConnectionError("graph unavailable")
+
+        assert await LoginEnrichmentService(db, FailingGraph()).sync_admin(user, "token") is False
+        assert user.is_admin is False
+
+    @pytest.mark.asyncio
+    async def test_admin_check_without_admin_groups_skips_graph(self, db, no_admin_groups):
+        user = await _create_user(db, is_admin=True)
+        graph = FakeGraph()
+
+        assert await LoginEnrichmentService(db, graph).sync_admin(user, "token") is True
+        assert graph.calls == []
+
+
+class TestAzureADCallback:
+    """Test that the callback no longer waits for Graph and blob storage."""
+
+    @staticmethod
+    def _stub_login(monkeypatch, db, graph, oid, email):
+        async def get_access_token(code, redirect_uri, code_verifier=None):
+            return {"access_token": "graph-token", "id_token": "id-token", "refresh_token": "refresh"}
+
+        async def decode_id_token(id_token):
+            return {"oid": oid, "email": email, "given_name": "Test", "family_name": "User"}
+
+        async def get_user_info(access_token):
+            return {}
+
+        async def get_application_token(refresh_token):
+            return {"access_token": "api-token"}
+
+        for name, stub in [
+            ("get_access_token", get_access_token),
+            ("decode_id_token", decode_id_token),
+            ("get_user_info", get_user_info),
+            ("get_application_token", get_application_token),
+            ("get_user_profile_photo_etag", graph.get_user_profile_photo_etag),
+            ("get_user_profile_photo_bytes", graph.get_user_profile_photo_bytes),
+            ("get_user_groups", graph.get_user_groups),
+        ]:
+            monkeypatch.setattr(azure_ad_auth, name, stub)
+
+        async def get_db():
+            yield db
+
+        monkeypatch.setattr("aldar_middleware.routes.auth.get_db", get_db)
+        monkeypatch.setattr(settings, "auth_rate_limit_enabled", False)
+
+    @staticmethod
+    async def _login():
+        request = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 1234)})
+        return await azure_ad_callback(request, code="code", state="state", redirect_uri="http://test/cb")
+
+    @pytest.mark.asyncio
+    async def test_callback_returns_before_enrichment(self, db, monkeypatch, no_admin_groups):
+        """The callback's latency excludes the Graph and blob stand-in delays."""
+        oid, email = str(uuid.uuid4()), f"{uuid.uuid4().hex}@example.com"
+        graph, blob = FakeGraph(), FakeBlobService()
+        self._stub_login(monkeypatch, db, graph, oid, email)
+
+        @asynccontextmanager
+        async def session_factory():
+            yield db
+
+        worker = LoginEnrichmentWorker(concurrency=1, session_factory=session_factory)
+        monkeypatch.setattr(login_enrichment, "_default_blob_service", lambda: blob)
+        monkeypatch.setattr(login_enrichment, "_login_enrichment_worker", worker)
+        monkeypatch.setattr(settings, "login_enrichment_backend", "in_process")
+
+        try:
+            start = time.perf_counter()
+            response = await self._login()
+            callback_s = time.perf_counter() - start
+
+            assert response["access_token"] == "api-token"
+            assert response["user"]["email"] == email
+            assert callback_s < GRAPH_DELAY
+            assert graph.calls == []
+
+            await asyncio.wait_for(worker.join(), timeout=10)
+        finally:
+            await worker.stop()
+
+        assert sorted(graph.calls) == ["groups", "photo_bytes", "photo_etag"]
+        assert len(blob.uploads) == 1
+        pivot = await db.scalar(select(RBACUserPivot).where(RBACUserPivot.email == email))
+        assert pivot is not None
+
+    @pytest.mark.asyncio
+    async def test_removed_admin_is_revoked_without_background_job(self, db, monkeypatch):
+        """Revocation does not depend on the enrichment job running."""
+        user = await _create_user(db, is_admin=True)
+        self._stub_login(monkeypatch, db, FakeGraph(groups=("group-a",)), user.azure_ad_id, user.email)
+        monkeypatch.setattr(settings, "admin_group_ids", "group-admin")
+        monkeypatch.setattr(settings, "login_enrichment_backend", "disabled")
+
+        response = await self._login()
+
+        assert response["user"]["is_admin"] is False
+        await db.refresh(user)
+        assert user.is_admin is False
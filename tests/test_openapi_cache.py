@@ -0,0 +1,96 @@
+"""Tests for the precomputed, cached OpenAPI schema."""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+from starlette.testclient import TestClient
+
+from aldar_middleware.application import get_app
+from aldar_middleware.settings import settings
+from aldar_middleware.utils.openapi_cache import OpenAPISchemaCache, install_openapi_cache, route_fingerprint
+
+OPENAPI_URL = f"{settings.api_prefix}/openapi.json"
+
+
+@pytest.fixture(scope="module")
+def app():
+    return get_app()
+
+
+def _small_app(path=None):
+    app = FastAPI(openapi_url="/openapi.json")
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {}
+
+    install_openapi_cache(app, lambda: get_openapi(title=app.title, version=app.version, routes=app.routes), path)
+    return app
+
+
+class TestOpenAPICache:
+    """Test serving the application's schema from the cache."""
+
+    def test_served_schema_matches_fresh_generation(self, app):
+        """The cached document equals a fresh build of the same route table."""
+        cache: OpenAPISchemaCache = app.state.openapi_cache
+        # Without the lifespan (and its warm-up task) here, the first request builds the schema
+        client = TestClient(app)
+
+        response = client.get(OPENAPI_URL)
+
+        assert response.status_code == 200
+        assert response.json() == json.loads(json.dumps(cache._build()))
+        assert response.headers["etag"] == cache.get().etag
+        assert f"{settings.api_prefix}/chat/sessions/{{session_id}}/favourite" in response.json()["paths"]
+
+    def test_repeated_requests_do_not_rebuild(self, app):
+        """Later requests, conditional ones included, are served from memory."""
+        cache: OpenAPISchemaCache = app.state.openapi_cache
+        client = TestClient(app)
+        etag = client.get(OPENAPI_URL).headers["etag"]
+        builds = cache.builds
+
+        bodies = {client.get(OPENAPI_URL).content for _ in range(5)}
+        revalidated = client.get(OPENAPI_URL, headers={"If-None-Match": etag})
+
+        assert cache.builds == builds
+        assert len(bodies) == 1
+        assert revalidated.status_code == 304
+        assert app.openapi() is cache.get().schema
+
+
+class TestRouteFingerprint:
+    """Test regeneration when the route table changes."""
+
+    def test_new_route_regenerates_schema(self):
+        """Adding a route changes the fingerprint and the served schema."""
+        app = _small_app()
+        client = TestClient(app)
+        before = client.get("/openapi.json")
+        fingerprint = route_fingerprint(app)
+
+        @app.get("/orders")
+        async def list_orders():
+            return []
+
+        after = client.get("/openapi.json")
+
+        assert route_fingerprint(app) != fingerprint
+        assert app.state.openapi_cache.builds == 2
+        assert "/orders" in after.json()["paths"]
+        assert before.headers["etag"] != after.headers["etag"]
+
+    def test_prebuilt_file_is_used_when_fingerprint_matches(self, tmp_path):
+        """A schema file written at build time spares the worker the generation."""
+        path = str(tmp_path / "openapi.json")
+        built = _small_app(path)
+        expected = TestClient(built).get("/openapi.json").json()
+
+        worker = _small_app(path)
+        served = TestClient(worker).get("/openapi.json")
+
+        assert worker.state.openapi_cache.builds == 0
+        assert served.json() == expected
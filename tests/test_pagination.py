@@ -0,0 +1,119 @@
+"""Tests for keyset (cursor) pagination helpers."""
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+
+from aldar_middleware.services.feedback_service import FeedbackService
+from aldar_middleware.utils.pagination import (
+    InvalidCursorError,
+    KeysetColumn,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    paginate_keyset,
+    split_keyset_rows,
+)
+
+items = Table(
+    "items",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def _sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestCursorEncoding:
+    """Test cursor round trips and validation."""
+
+    def test_round_trip_preserves_types(self):
+        """Datetimes, UUIDs and nulls survive encoding."""
+        values = [datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc), uuid.uuid4(), None, 3, "x"]
+        cursor = encode_cursor(values, "items:date:DESC")
+        assert decode_cursor(cursor, "items:date:DESC") == values
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        """A cursor cannot be replayed against a different sort."""
+        cursor = encode_cursor([1], "items:date:DESC")
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, "items:date:ASC")
+
+    def test_garbage_is_rejected(self):
+        """Malformed cursors raise InvalidCursorError (a ValueError)."""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor", "items:date:DESC")
+
+
+class TestKeysetFilter:
+    """Test the WHERE clause continuing after a cursor."""
+
+    def test_uniform_non_null_keys_use_row_comparison(self):
+        """Same-direction keys compile to a single row comparison."""
+        keys = [KeysetColumn(items.c.created_at, descending=True), KeysetColumn(items.c.id, descending=True)]
+        sql = _sql(keyset_filter(keys, [datetime(2026, 3, 1), 7]))
+        assert "(items.created_at, items.id) < (" in sql
+
+    def test_nullable_key_continues_into_nulls(self):
+        """Ascending nulls-last keys include the NULL tail after the last value."""
+        keys = [KeysetColumn(items.c.name, nullable=True), KeysetColumn(items.c.id)]
+        sql = _sql(keyset_filter(keys, ["bob", 7]))
+        assert "items.name > 'bob' OR items.name IS NULL" in sql
+        assert "items.name = 'bob' AND items.id > 7" in sql
+
+    def test_null_cursor_value_only_advances_id(self):
+        """Inside the NULL group only the id tiebreaker moves forward."""
+        keys = [KeysetColumn(items.c.name, nullable=True), KeysetColumn(items.c.id)]
+        sql = _sql(keyset_filter(keys, [None, 7]))
+        assert "items.name IS NULL AND items.id > 7" in sql
+
+
+class TestPaginateKeyset:
+    """Test page query construction and splitting."""
+
+    keys = [KeysetColumn(items.c.created_at, descending=True), KeysetColumn(items.c.id, descending=True)]
+
+    def test_offset_is_used_without_cursor(self):
+        """Offset pagination keeps working for existing clients."""
+        sql = _sql(paginate_keyset(select(items.c.id), self.keys, limit=2, signature="s", offset=4))
+        assert "LIMIT 3 OFFSET 4" in sql
+
+    def test_cursor_replaces_offset(self):
+        """With a cursor the query seeks instead of skipping rows."""
+        cursor = encode_cursor([datetime(2026, 3, 1), 7], "s")
+        sql = _sql(paginate_keyset(select(items.c.id), self.keys, limit=2, signature="s", cursor=cursor, offset=4))
+        assert "OFFSET" not in sql
+        assert "(items.created_at, items.id) <" in sql
+
+    def test_split_returns_next_cursor_only_when_more_rows(self):
+        """The extra fetched row signals another page."""
+        rows = [(1, datetime(2026, 3, 3), 1), (2, datetime(2026, 3, 2), 2), (3, datetime(2026, 3, 1), 3)]
+        page, next_cursor = split_keyset_rows(rows, self.keys, limit=2, signature="s")
+        assert page == [1, 2]
+        assert decode_cursor(next_cursor, "s") == [datetime(2026, 3, 2), 2]
+
+        page, next_cursor = split_keyset_rows(rows[:2], self.keys, limit=2, signature="s")
+        assert page == [1, 2]
+        assert next_cursor is None
+
+
+class TestFeedbackCursorSignature:
+    """Feedback list cursors are signed with the ordering actually applied."""
+
+    def test_default_sort_is_signed_as_date_desc(self):
+        expected = FeedbackService._list_sort_keys("date", "DESC")[1]
+        assert expected == "feedback:date:DESC"
+        assert FeedbackService._list_sort_keys(None, None)[1] == expected
+        assert FeedbackService._list_sort_keys(None, "ASC")[1] == expected
+        assert FeedbackService._list_sort_keys("unknown", "ASC")[1] == expected
+
+    def test_sort_order_is_part_of_signature(self):
+        assert FeedbackService._list_sort_keys("comment", "ASC")[1] == "feedback:comment:ASC"
+        assert FeedbackService._list_sort_keys("comment", "bogus")[1] == "feedback:comment:DESC"
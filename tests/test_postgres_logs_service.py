@@ -0,0 +1,100 @@
+"""Tests for log counting and user matching in the PostgreSQL logs service.
+
+The tests require a migrated database and run inside a transaction that is
+rolled back at the end.
+"""
+
+import uuid
+
+import pytest
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from aldar_middleware.models.logs import UserLog
+from aldar_middleware.models.user import User
+from aldar_middleware.services.postgres_logs_service import PostgresLogsService
+from aldar_middleware.settings import settings
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="WARNING")
+    yield messages
+    logger.remove(handler_id)
+
+
+async def _matching_logs(db, count):
+    """Add ``count`` logs of a fresh action type and return a select of their ids."""
+    action_type = f"test-{uuid.uuid4().hex[:12]}"
+    db.add_all(UserLog(action_type=action_type, log_data={}) for _ in range(count))
+    await db.flush()
+    return select(UserLog.id).where(UserLog.action_type == action_type)
+
+
+class TestCountLogs:
+    """Test the exact, estimated and fallback totals."""
+
+    @pytest.mark.asyncio
+    async def test_totals_up_to_the_limit_are_exact(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "logs_exact_count_limit", 5)
+        matching = await _matching_logs(db, 5)
+
+        assert await PostgresLogsService()._count_logs(db, matching) == (5, False)
+
+    @pytest.mark.asyncio
+    async def test_totals_over_the_limit_are_estimated(self, db, monkeypatch):
+        """Beyond the limit the planner estimate is used, never below the rows already counted."""
+        monkeypatch.setattr(settings, "logs_exact_count_limit", 5)
+        matching = await _matching_logs(db, 8)
+
+        total, is_estimate = await PostgresLogsService()._count_logs(db, matching)
+
+        assert is_estimate is True
+        assert total >= 6
+
+    @pytest.mark.asyncio
+    async def test_failed_estimate_falls_back_to_exact_count(self, db, monkeypatch, warnings):
+        """A database error in EXPLAIN does not abort the transaction the exact count runs in."""
+        monkeypatch.setattr(settings, "logs_exact_count_limit", 5)
+        matching = await _matching_logs(db, 8)
+        exec_driver_sql = AsyncConnection.exec_driver_sql
+
+        async def failing_explain(self, statement, *args, **kwargs):
+            if statement.startswith("EXPLAIN"):
+                statement = "SELECT 1 / 0"
+            return await exec_driver_sql(self, statement, *args, **kwargs)
+
+        monkeypatch.setattr(AsyncConnection, "exec_driver_sql", failing_explain)
+
+        assert await PostgresLogsService()._count_logs(db, matching) == (8, False)
+        assert any("estimate failed" in message for message in warnings)
+        # The surrounding transaction is still usable
+        assert await db.scalar(select(UserLog.id).where(UserLog.id.in_(matching.scalar_subquery())).limit(1))
+
+
+class TestMatchingUserIds:
+    """Test the cap on users matched by name or email."""
+
+    @pytest.mark.asyncio
+    async def test_matches_are_capped_with_a_warning(self, db, monkeypatch, warnings):
+        monkeypatch.setattr(settings, "logs_search_max_users", 2)
+        tag = uuid.uuid4().hex
+        db.add_all(User(email=f"{tag}-{n}@example.com") for n in range(3))
+        await db.flush()
+
+        user_ids = await PostgresLogsService()._matching_user_ids(db, tag)
+
+        assert len(user_ids) == 2
+        assert any("logs_search_max_users" in message for message in warnings)
+
+    @pytest.mark.asyncio
+    async def test_matches_within_the_cap_do_not_warn(self, db, monkeypatch, warnings):
+        monkeypatch.setattr(settings, "logs_search_max_users", 2)
+        tag = uuid.uuid4().hex
+        db.add_all(User(email=f"{tag}-{n}@example.com") for n in range(2))
+        await db.flush()
+
+        assert len(await PostgresLogsService()._matching_user_ids(db, tag)) == 2
+        assert warnings == []
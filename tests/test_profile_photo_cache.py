@@ -0,0 +1,159 @@
+"""Tests for cached, conditional profile photo serving.
+
+The endpoint tests require a migrated database and run inside a transaction
+that is rolled back at the end; blob storage and Graph are local stand-ins.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from aldar_middleware.auth.azure_ad import azure_ad_auth
+from aldar_middleware.models.user import User
+from aldar_middleware.routes.auth import get_user_profile_photo
+from aldar_middleware.services import profile_photo_cache
+from aldar_middleware.services.profile_photo_cache import ProfilePhotoCache, photo_etag
+from aldar_middleware.utils.http_cache import etag_matches
+
+PHOTO = b"\xff\xd8" + b"jpeg" * 100
+
+
+class LocalBlobService:
+    """Blob storage stand-in counting downloads."""
+
+    downloads = 0
+
+    def __init__(self, container_name=None):
+        pass
+
+    async def download_blob(self, blob_name):
+        type(self).downloads += 1
+        await asyncio.sleep(0.01)
+        return PHOTO
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ProfilePhotoCache(max_bytes=1024 * 1024, max_entries=100, ttl_seconds=60, negative_ttl_seconds=60)
+    monkeypatch.setattr(profile_photo_cache, "_profile_photo_cache", cache)
+    return cache
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+class TestProfilePhotoCache:
+    """Test the byte-bounded LRU."""
+
+    def test_evicts_least_recently_used_beyond_max_bytes(self):
+        """Total cached bytes stay under the limit."""
+        now = [0.0]
+        cache = ProfilePhotoCache(max_bytes=800, max_entries=100, ttl_seconds=60, negative_ttl_seconds=10, clock=lambda: now[0])
+        for key in "abc":
+            cache.put(key, key.encode() * 100)
+        cache.get("a")
+        cache.put("d", b"d" * 100)
+        cache.put("e", b"e" * 100)
+        cache.put("f", b"f" * 100)
+        cache.put("g", b"g" * 100)
+        cache.put("h", b"h" * 100)
+        cache.put("i", b"i" * 100)
+
+        assert cache.size_bytes <= 800
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+
+    def test_negative_entries_expire(self):
+        """A "no photo" entry lives for the negative TTL only."""
+        now = [0.0]
+        cache = ProfilePhotoCache(max_bytes=800, max_entries=100, ttl_seconds=60, negative_ttl_seconds=10, clock=lambda: now[0])
+        cache.put_missing("user")
+
+        assert cache.get("user").missing
+        now[0] = 11
+        assert cache.get("user") is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self, cache):
+        """Many avatars of one user rendered at once load the photo once."""
+        loads = []
+
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            return PHOTO
+
+        entries = await asyncio.gather(*(cache.get_or_load("user", load) for _ in range(20)))
+
+        assert len(loads) == 1
+        assert {entry.etag for entry in entries} == {photo_etag(PHOTO)}
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [(None, False), ('"other"', False), ("*", True), ("ETAG", True), ('"other", W/ETAG', True)],
+    )
+    def test_etag_matches(self, header, expected):
+        """If-None-Match lists, wildcards and weak validators are understood."""
+        etag = photo_etag(PHOTO)
+        assert etag_matches(header.replace("ETAG", etag) if header else header, etag) is expected
+
+
+class TestProfilePhotoEndpoint:
+    """Test the endpoint against a local blob stand-in."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_fetches_do_not_reach_storage(self, db, cache, monkeypatch):
+        """Only the first request downloads the blob; revalidation gets a 304."""
+        monkeypatch.setattr("aldar_middleware.orchestration.blob_storage.BlobStorageService", LocalBlobService)
+        LocalBlobService.downloads = 0
+        user = User(
+            email=f"{uuid.uuid4().hex}@example.com",
+            preferences={"profile_photo_blob_path": "profile-photos/user/photo.jpg"},
+        )
+        db.add(user)
+        await db.flush()
+
+        responses = [await get_user_profile_photo(str(user.id), _request(), db) for _ in range(5)]
+        etag = responses[0].headers["etag"]
+        revalidated = await get_user_profile_photo(str(user.id), _request(etag), db)
+
+        assert LocalBlobService.downloads == 1
+        assert {response.body for response in responses} == {PHOTO}
+        assert etag == photo_etag(PHOTO)
+        assert "max-age=" in responses[0].headers["cache-control"]
+        assert revalidated.status_code == 304
+        assert revalidated.body == b""
+
+    @pytest.mark.asyncio
+    async def test_users_without_photo_are_not_probed_again(self, db, cache, monkeypatch):
+        """A Graph "no photo" answer is cached and later requests 404 directly."""
+        probes = []
+
+        async def refresh_access_token(refresh_token):
+            return {"access_token": "token"}
+
+        async def get_user_profile_photo_bytes(access_token, user_id):
+            probes.append(user_id)
+            return None
+
+        monkeypatch.setattr(azure_ad_auth, "refresh_access_token", refresh_access_token)
+        monkeypatch.setattr(azure_ad_auth, "get_user_profile_photo_bytes", get_user_profile_photo_bytes)
+        user = User(
+            email=f"{uuid.uuid4().hex}@example.com",
+            azure_ad_id=str(uuid.uuid4()),
+            azure_ad_refresh_token="refresh",
+        )
+        db.add(user)
+        await db.flush()
+
+        for _ in range(3):
+            with pytest.raises(HTTPException) as exc_info:
+                await get_user_profile_photo(str(user.id), _request(), db)
+            assert exc_info.value.status_code == 404
+
+        assert probes == [user.azure_ad_id]
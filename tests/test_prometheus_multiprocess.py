@@ -0,0 +1,77 @@
+"""Tests for Prometheus metrics shared between gunicorn workers.
+
+Workers are simulated with subprocesses, since prometheus_client picks its
+multiprocess value store when it is first imported.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+from aldar_middleware.monitoring.metrics_forwarder import PodLeaderLock
+
+
+def _run(multiproc_dir, code):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(multiproc_dir)}
+    result = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+WORKER = """
+    from aldar_middleware.monitoring.prometheus import REQUEST_COUNT, RUN_EVENT_QUEUE_DEPTH
+    REQUEST_COUNT.labels(method="GET", endpoint="/api/v1/health", status_code=200).inc({requests})
+    RUN_EVENT_QUEUE_DEPTH.set({depth})
+"""
+
+EXPOSITION = """
+    from aldar_middleware.monitoring.prometheus import get_metrics
+    print(get_metrics().body.decode())
+"""
+
+
+def _sample(exposition, prefix):
+    for line in exposition.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestMultiprocessMetrics:
+    """Test that one scrape sees every worker's metrics."""
+
+    def test_scrape_aggregates_workers(self, tmp_path):
+        """Counters add up across workers; live gauges skip exited workers."""
+        exited = WORKER.format(requests=3, depth=5) + """
+    import os
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(os.getpid())
+"""
+        _run(tmp_path, exited)
+        _run(tmp_path, WORKER.format(requests=4, depth=2))
+
+        exposition = _run(tmp_path, EXPOSITION)
+        assert _sample(exposition, 'aiq_http_requests_total{endpoint="/api/v1/health"') == 7
+        assert _sample(exposition, "aiq_run_event_queue_depth") == 2
+
+
+class TestPodLeaderLock:
+    """Test electing one forwarding worker per pod."""
+
+    def test_only_one_holder_at_a_time(self, tmp_path):
+        """A second contender is refused until the holder releases the lock."""
+        path = str(tmp_path / "azure-forwarder.lock")
+        leader, follower = PodLeaderLock(path), PodLeaderLock(path)
+
+        assert leader.acquire()
+        assert leader.acquire()
+        assert not follower.acquire()
+
+        leader.release()
+        assert follower.acquire()
+        assert follower.held and not leader.held
+        follower.release()
@@ -0,0 +1,109 @@
+"""Tests for bounded endpoint labels in PrometheusMiddleware."""
+
+import uuid
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from starlette.testclient import TestClient
+
+from aldar_middleware.monitoring.prometheus import (
+    ENDPOINT_LABEL_OVERFLOW,
+    REQUEST_COUNT,
+    UNMATCHED_ENDPOINT,
+    EndpointLabelGuard,
+    PrometheusMiddleware,
+    RouteTemplateResolver,
+)
+
+
+def _app():
+    router = APIRouter()
+
+    @router.get("/sessions/search")
+    async def search_sessions():
+        return []
+
+    @router.get("/sessions/{session_id}/messages/{message_id}")
+    async def get_message(session_id: str, message_id: str):
+        return {}
+
+    sub_app = FastAPI()
+
+    @sub_app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1/chat")
+    app.mount("/legacy", sub_app)
+    return app
+
+
+class TestRouteTemplateResolver:
+    """Test resolving paths to route templates."""
+
+    @pytest.mark.parametrize(
+        "path, template",
+        [
+            ("/api/v1/chat/sessions/search", "/api/v1/chat/sessions/search"),
+            (f"/api/v1/chat/sessions/{uuid.uuid4()}/messages/42", "/api/v1/chat/sessions/{session_id}/messages/{message_id}"),
+            ("/legacy/items/7", "/legacy/items/{item_id}"),
+            ("/legacy/unknown", "/legacy"),
+            ("/wp-admin/setup.php", UNMATCHED_ENDPOINT),
+        ],
+    )
+    def test_resolve(self, path, template):
+        """Ids collapse into their template; unknown paths into one bucket."""
+        assert RouteTemplateResolver(_app().router.routes).resolve(path) == template
+
+    def test_cache_is_bounded_and_follows_new_routes(self):
+        """Old paths are evicted, and added routes are picked up."""
+        app = _app()
+        resolver = RouteTemplateResolver(app.router.routes, cache_size=2)
+        for index in range(5):
+            resolver.resolve(f"/api/v1/chat/sessions/{index}/messages/1")
+        assert len(resolver._cache) == 2
+
+        assert resolver.resolve("/api/v1/health") == UNMATCHED_ENDPOINT
+        app.add_api_route("/api/v1/health", lambda: {})
+        assert resolver.resolve("/api/v1/health") == "/api/v1/health"
+
+
+class TestEndpointLabelGuard:
+    """Test the cap on distinct endpoint labels."""
+
+    def test_overflow_is_collapsed_and_counted(self):
+        """Pairs beyond the limit are recorded as 'other'."""
+        guard = EndpointLabelGuard(max_labels=2)
+        before = ENDPOINT_LABEL_OVERFLOW._value.get()
+
+        assert guard.admit("GET", "/a") == "/a"
+        assert guard.admit("POST", "/a") == "/a"
+        assert guard.admit("GET", "/b") == UNMATCHED_ENDPOINT
+        assert guard.admit("GET", "/a") == "/a"
+        assert ENDPOINT_LABEL_OVERFLOW._value.get() == before + 1
+
+
+class TestPrometheusMiddleware:
+    """Test the labels recorded for real requests."""
+
+    def test_requests_are_labelled_with_templates(self):
+        """Distinct ids and 404s do not create new series."""
+        app = _app()
+        app.add_middleware(PrometheusMiddleware)
+        client = TestClient(app)
+
+        for _ in range(3):
+            client.get(f"/api/v1/chat/sessions/{uuid.uuid4()}/messages/{uuid.uuid4()}")
+            client.get(f"/not-found/{uuid.uuid4()}")
+
+        template = "/api/v1/chat/sessions/{session_id}/messages/{message_id}"
+        endpoints = {
+            sample.labels["endpoint"]
+            for metric in REQUEST_COUNT.collect()
+            for sample in metric.samples
+            if sample.name == "aiq_http_requests_total"
+        }
+        assert template in endpoints
+        assert not any(endpoint.startswith("/not-found") for endpoint in endpoints)
+        assert REQUEST_COUNT.labels(method="GET", endpoint=UNMATCHED_ENDPOINT, status_code=404)._value.get() >= 3
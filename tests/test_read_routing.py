@@ -0,0 +1,187 @@
+"""Tests for read-replica routing.
+
+The "replica" is the test database behind a second engine, so the tests
+require a reachable database (settings.db_url_property). Redis is replaced
+by fakeredis.
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from aldar_middleware.database import base
+from aldar_middleware.database.pool_budget import PoolBudget, create_pooled_engine
+from aldar_middleware.database.read_routing import PRIMARY, REPLICA, ReadRouter, RouteDecision
+from aldar_middleware.settings import settings
+from aldar_middleware.settings.context import clear_user_context, set_user_context
+
+POOL = PoolBudget(pool_size=2, max_overflow=0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _sessions(url=None, name="primary-test"):
+    engine = create_pooled_engine(url or str(settings.db_url_property), POOL, name=name, pool_timeout=5)
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def databases():
+    primary_engine, primary = _sessions(name="primary-test")
+    replica_engine, replica = _sessions(name="replica-test")
+    yield primary_engine, primary, replica_engine, replica
+    await primary_engine.dispose()
+    await replica_engine.dispose()
+
+
+@pytest.fixture
+def redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeAsyncRedis()
+
+
+def _router(primary, replica, redis=None, **kwargs):
+    return ReadRouter(primary, replica, redis_getter=lambda: redis, **kwargs)
+
+
+async def _commit_write(sessions):
+    session = sessions()
+    async with session:
+        await session.execute(text("CREATE TEMP TABLE read_routing_probe (id int) ON COMMIT DROP"))
+        await session.commit()
+    return session
+
+
+class TestRouteDecisions:
+    """Test where reads are routed."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_replica_serves_reads(self, databases):
+        """A replica within the lag limit gets the read session."""
+        _, primary, replica_engine, replica = databases
+        router = _router(primary, replica)
+
+        session = await router.read_session("user-1")
+        async with session:
+            assert await session.scalar(text("SELECT 1")) == 1
+
+        assert session.info["read_route"] == RouteDecision(REPLICA, "replica")
+        assert session.bind is replica_engine
+        assert await router.replica_lag() == 0
+
+    @pytest.mark.asyncio
+    async def test_without_replica_reads_use_primary(self, databases):
+        _, primary, _, _ = databases
+
+        assert await _router(primary, None).decide("user-1") == RouteDecision(PRIMARY, "no_replica")
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self, databases, monkeypatch):
+        """Reads go to the primary while the measured lag is over the limit; lag is checked per interval."""
+        primary_engine, primary, _, replica = databases
+        clock = FakeClock()
+        router = _router(primary, replica, max_lag_seconds=5, lag_check_interval=2, clock=clock)
+        lags = iter([30.0, 1.0])
+        checks = []
+
+        async def measure():
+            checks.append(clock.now)
+            return next(lags)
+
+        monkeypatch.setattr(router, "_measure_lag", measure)
+
+        lagging = await router.read_session("user-1")
+        assert lagging.info["read_route"] == RouteDecision(PRIMARY, "replica_lag")
+        assert lagging.bind is primary_engine
+        assert (await router.decide("user-1")).reason == "replica_lag"
+
+        clock.now += 2
+        assert await router.decide("user-1") == RouteDecision(REPLICA, "replica")
+        assert len(checks) == 2
+
+    @pytest.mark.asyncio
+    async def test_unreachable_replica_falls_back_to_primary(self, databases):
+        _, primary, _, _ = databases
+        url = settings.db_url_property
+        unreachable_engine, unreachable = _sessions(str(url.with_port(1)), name="unreachable-test")
+        try:
+            decision = await _router(primary, unreachable).decide("user-1")
+        finally:
+            await unreachable_engine.dispose()
+
+        assert decision == RouteDecision(PRIMARY, "replica_unavailable")
+
+
+class TestReadYourWrites:
+    """Test that a user's reads stay on the primary after they write."""
+
+    @pytest.mark.asyncio
+    async def test_writer_is_pinned_to_primary_for_the_window(self, databases):
+        """Only the writing user is pinned, and only until the window passes."""
+        _, primary, _, replica = databases
+        clock = FakeClock()
+        router = _router(primary, replica, sticky_seconds=10, clock=clock)
+
+        session = await _commit_write(primary)
+        await router.note_session_writes(session, "writer")
+
+        assert await router.decide("writer") == RouteDecision(PRIMARY, "recent_write")
+        assert await router.decide("reader") == RouteDecision(REPLICA, "replica")
+        clock.now += 10
+        assert await router.decide("writer") == RouteDecision(REPLICA, "replica")
+
+    @pytest.mark.asyncio
+    async def test_sessions_without_committed_writes_do_not_pin(self, databases):
+        _, primary, _, replica = databases
+        router = _router(primary, replica)
+
+        session = primary()
+        async with session:
+            await session.execute(text("CREATE TEMP TABLE read_routing_probe (id int)"))
+            await session.rollback()
+        await router.note_session_writes(session, "user-1")
+
+        assert await router.decide("user-1") == RouteDecision(REPLICA, "replica")
+
+    @pytest.mark.asyncio
+    async def test_write_on_one_worker_pins_reads_on_another(self, databases, redis):
+        """The recent write is shared through Redis."""
+        _, primary, _, replica = databases
+        writer_worker = _router(primary, replica, redis)
+        reader_worker = _router(primary, replica, redis)
+
+        await writer_worker.note_write("user-1")
+
+        assert await reader_worker.decide("user-1") == RouteDecision(PRIMARY, "recent_write")
+        assert await reader_worker.decide("user-2") == RouteDecision(REPLICA, "replica")
+
+    @pytest.mark.asyncio
+    async def test_get_db_write_pins_get_read_db(self, databases, monkeypatch):
+        """A commit through get_db sends the same user's get_read_db sessions to the primary."""
+        _, primary, _, replica = databases
+        monkeypatch.setattr(base, "async_session", primary)
+        monkeypatch.setattr(base, "read_router", _router(primary, replica))
+        set_user_context(user_id="user-1", is_authenticated=True)
+        try:
+            writes = base.get_db()
+            db = await writes.__anext__()
+            await db.execute(text("CREATE TEMP TABLE read_routing_probe (id int) ON COMMIT DROP"))
+            await db.commit()
+            await writes.aclose()
+
+            reads = base.get_read_db()
+            read_db = await reads.__anext__()
+            decision = read_db.info["read_route"]
+            await reads.aclose()
+        finally:
+            clear_user_context()
+
+        assert decision == RouteDecision(PRIMARY, "recent_write")
@@ -0,0 +1,228 @@
+"""Tests for the async Service Bus facade, run against the in-memory broker."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from aldar_middleware.orchestration.azure_service_bus import AzureServiceBusService
+from aldar_middleware.orchestration.service_bus_backends import (
+    AzureServiceBusBackend,
+    InMemoryServiceBusBroker,
+    PartialSendError,
+)
+
+QUEUE = "test-queue"
+
+
+def _service(broker, **kwargs):
+    kwargs.setdefault("max_batch_delay_ms", 5)
+    return AzureServiceBusService(backend=broker, queue_name=QUEUE, **kwargs)
+
+
+def _payloads(broker):
+    return [json.loads(stored.body)["payload"]["n"] for stored in broker.queues[QUEUE]]
+
+
+async def _max_loop_lag(work, interval=0.001):
+    """Largest delay of a 1 ms ticker while ``work`` runs."""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    task = asyncio.create_task(ticker())
+    try:
+        await work
+    finally:
+        done = True
+        await task
+    return max(lags, default=0.0)
+
+
+class TestSend:
+    """Test batching on the producer side."""
+
+    @pytest.mark.asyncio
+    async def test_event_loop_lag_stays_flat_under_send_load(self):
+        """Thousands of sends over a 20 ms link neither block the loop nor go out one by one."""
+        broker = InMemoryServiceBusBroker(send_latency=0.02)
+        service = _service(broker, max_batch_messages=100)
+
+        idle_lag = await _max_loop_lag(asyncio.sleep(0.1))
+        load_lag = await _max_loop_lag(
+            asyncio.gather(*(service.send_message({"n": n}) for n in range(2000)))
+        )
+
+        assert len(broker.queues[QUEUE]) == 2000
+        assert len(broker.sent_batches) <= 25
+        assert load_lag < idle_lag + 0.05, (idle_lag, load_lag)
+
+    @pytest.mark.asyncio
+    async def test_messages_keep_send_order(self):
+        """Concurrent senders' messages reach the queue in the order they were sent."""
+        broker = InMemoryServiceBusBroker(send_latency=0.001)
+        service = _service(broker, max_batch_messages=7)
+
+        results = await asyncio.gather(*(service.send_message({"n": n}) for n in range(200)))
+
+        assert all(results)
+        assert _payloads(broker) == list(range(200))
+        assert max(broker.sent_batches) == 7
+
+    @pytest.mark.asyncio
+    async def test_batches_are_cut_by_size_and_age(self):
+        """A batch closes at max_batch_bytes; a lone message goes out after max_batch_delay_ms."""
+        broker = InMemoryServiceBusBroker()
+        service = _service(broker, max_batch_bytes=1000, max_batch_delay_ms=50)
+
+        await asyncio.gather(*(service.send_message({"n": n, "padding": "x" * 200}) for n in range(10)))
+        assert all(size <= 3 for size in broker.sent_batches)  # ~300 bytes each
+
+        start = time.perf_counter()
+        assert await service.send_message({"n": 10})
+        assert 0.04 <= time.perf_counter() - start < 0.5
+        assert broker.sent_batches[-1] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_reported_to_its_senders(self):
+        """Senders learn that their message was not sent."""
+
+        class FailingBroker(InMemoryServiceBusBroker):
+            async def send(self, queue_name, bodies):
+                raise ConnectionError("link detached")
+
+        service = _service(FailingBroker())
+
+        assert await asyncio.gather(*(service.send_message({"n": n}) for n in range(3))) == [False] * 3
+
+    @pytest.mark.asyncio
+    async def test_partially_sent_batch_is_reported_per_message(self):
+        """Messages of broker batches sent before a failure are reported as sent."""
+
+        class SplittingBroker(InMemoryServiceBusBroker):
+            async def send(self, queue_name, bodies):
+                await super().send(queue_name, bodies[:2])
+                raise PartialSendError(2, ConnectionError("link detached"))
+
+        broker = SplittingBroker()
+        service = _service(broker)
+
+        assert await asyncio.gather(*(service.send_message({"n": n}) for n in range(3))) == [True, True, False]
+        assert _payloads(broker) == [0, 1]
+
+
+class TestConsume:
+    """Test the consumer side."""
+
+    @pytest.mark.asyncio
+    async def test_failed_handlers_are_redelivered(self):
+        """Every message is handled at least once and completed; nothing is lost."""
+        broker = InMemoryServiceBusBroker()
+        service = _service(broker)
+        await asyncio.gather(*(service.send_message({"n": n}) for n in range(50)))
+        attempts = {}
+        handled = set()
+        stop = asyncio.Event()
+
+        async def handler(message):
+            n = message["payload"]["n"]
+            attempts[n] = attempts.get(n, 0) + 1
+            await asyncio.sleep(0.001)
+            if n % 5 == 0 and attempts[n] == 1:
+                raise RuntimeError("transient")
+            handled.add(n)
+            if len(handled) == 50:
+                stop.set()
+
+        await asyncio.wait_for(service.consume(handler, concurrency=8, stop=stop, max_wait_time=0.05), 5)
+
+        assert handled == set(range(50))
+        assert all(attempts[n] == 2 for n in range(0, 50, 5))
+        assert not broker.queues[QUEUE] and broker.locked_count == 0
+
+    @pytest.mark.asyncio
+    async def test_handlers_run_concurrently(self):
+        broker = InMemoryServiceBusBroker()
+        service = _service(broker)
+        await asyncio.gather(*(service.send_message({"n": n}) for n in range(16)))
+        running = 0
+        peak = 0
+        done = 0
+        stop = asyncio.Event()
+
+        async def handler(message):
+            nonlocal running, peak, done
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            done += 1
+            if done == 16:
+                stop.set()
+
+        await asyncio.wait_for(service.consume(handler, concurrency=8, stop=stop, max_wait_time=0.05), 5)
+
+        assert peak == 8
+
+    @pytest.mark.asyncio
+    async def test_receive_messages_in_order_and_dead_letters_garbage(self):
+        broker = InMemoryServiceBusBroker()
+        service = _service(broker)
+        for n in range(5):
+            await service.send_message({"n": n})
+        await broker.send(QUEUE, [b"not json"])
+
+        received = await service.receive_messages(max_messages=10)
+
+        assert [message["payload"]["n"] for message in received] == list(range(5))
+        assert broker.dead_letters[QUEUE] == [b"not json"]
+        assert broker.locked_count == 0
+
+
+class TestAzureBackend:
+    """Test the Azure backend against a stand-in receiver."""
+
+    @pytest.mark.asyncio
+    async def test_receive_and_settle_do_not_overlap(self):
+        """Calls on a queue's receiver run one at a time."""
+
+        class Receiver:
+            def __init__(self):
+                self.active = 0
+                self.peak = 0
+
+            async def _call(self):
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(0.005)
+                self.active -= 1
+
+            async def receive_messages(self, max_message_count, max_wait_time):
+                await self._call()
+                return [
+                    type("Message", (), {"body": [b"{}"], "delivery_count": 1, "message_id": str(n)})()
+                    for n in range(max_message_count)
+                ]
+
+            async def complete_message(self, message):
+                await self._call()
+
+        receiver = Receiver()
+        backend = AzureServiceBusBackend(
+            "Endpoint=sb://test.servicebus.windows.net/;SharedAccessKeyName=test;SharedAccessKey=dGVzdA=="
+        )
+        backend._client.get_queue_receiver = lambda **kwargs: receiver
+
+        received = await backend.receive(QUEUE, 4, max_wait_time=1)
+        await asyncio.gather(
+            *(backend.complete(message) for message in received),
+            backend.receive(QUEUE, 1, max_wait_time=1),
+        )
+
+        assert receiver.peak == 1
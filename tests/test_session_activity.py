@@ -0,0 +1,153 @@
+"""Tests for the denormalized session activity columns (migration 0030).
+
+The tests require a migrated database and run inside a transaction that is
+rolled back at the end.
+"""
+
+import importlib.util
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import update
+
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.messages import Message
+from aldar_middleware.models.sessions import Session
+from aldar_middleware.models.user import User
+from aldar_middleware.routes.chat import _record_session_message, get_chat_sessions
+
+MIGRATION = (
+    Path(__file__).resolve().parents[1]
+    / "aldar_middleware/migrations/versions/0030_add_session_activity_columns.py"
+)
+
+
+async def _upgrade(db):
+    spec = importlib.util.spec_from_file_location("migration_0030", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    def run(sync_conn):
+        with Operations.context(MigrationContext.configure(sync_conn)):
+            migration.upgrade()
+
+    conn = await db.connection()
+    await conn.run_sync(run)
+
+
+async def _create_session(db, **kwargs):
+    user = User(email=f"{uuid.uuid4().hex}@example.com")
+    agent = Agent(name=f"agent-{uuid.uuid4().hex}")
+    db.add_all([user, agent])
+    await db.flush()
+    session = Session(user_id=user.id, agent_id=agent.id, **kwargs)
+    db.add(session)
+    await db.flush()
+    return user, session
+
+
+def _message(session, content_type="text", content="hello", created_at=None):
+    return Message(
+        session_id=session.id,
+        user_id=session.user_id,
+        agent_id=session.agent_id,
+        role="system" if content_type == "system" else "user",
+        content=content,
+        content_type=content_type,
+        created_at=created_at or datetime.utcnow(),
+    )
+
+
+class TestRecordSessionMessage:
+    """Test the incremental updates done on every message write."""
+
+    @pytest.mark.asyncio
+    async def test_messages_increment_count_and_activity(self, db):
+        """Each non-system message adds one and moves last_activity_at."""
+        _, session = await _create_session(db)
+        start = datetime(2026, 1, 1)
+        for minutes in (1, 2):
+            message = _message(session)
+            db.add(message)
+            await _record_session_message(db, session, message, start + timedelta(minutes=minutes))
+        await db.refresh(session)
+
+        assert session.message_count == 2
+        assert session.last_activity_at == start + timedelta(minutes=2)
+
+    @pytest.mark.asyncio
+    async def test_system_messages_change_nothing(self, db):
+        _, session = await _create_session(db)
+        await db.refresh(session)
+        before = (session.message_count, session.last_activity_at)
+
+        message = _message(session, content_type="system")
+        db.add(message)
+        await _record_session_message(db, session, message, datetime.utcnow() + timedelta(days=1))
+        await db.refresh(session)
+
+        assert (session.message_count, session.last_activity_at) == before
+
+
+class TestActivityBackfill:
+    """Test that migration 0030 backfills what the incremental updates maintain."""
+
+    @pytest.mark.asyncio
+    async def test_backfill_counts_non_system_messages(self, db):
+        """Count and activity come from non-system messages, else from the session's own timestamps."""
+        last_message_at = datetime(2026, 2, 1, 12, 0)
+        _, chatted = await _create_session(db)
+        db.add_all([
+            _message(chatted, created_at=last_message_at - timedelta(hours=1)),
+            _message(chatted, created_at=last_message_at),
+            _message(chatted, content_type="system", created_at=last_message_at + timedelta(hours=1)),
+        ])
+        interacted_at = datetime(2026, 1, 15)
+        _, empty = await _create_session(db, last_message_interaction_at=interacted_at)
+        await db.flush()
+        await db.execute(
+            update(Session)
+            .where(Session.id.in_([chatted.id, empty.id]))
+            .values(message_count=0, last_activity_at=datetime(2000, 1, 1))
+        )
+
+        await _upgrade(db)
+        await db.refresh(chatted)
+        await db.refresh(empty)
+
+        assert (chatted.message_count, chatted.last_activity_at) == (2, last_message_at)
+        assert (empty.message_count, empty.last_activity_at) == (0, interacted_at)
+
+
+class TestSessionList:
+    """Test the ungrouped session list."""
+
+    @pytest.mark.asyncio
+    async def test_buckets_follow_last_activity(self, db):
+        """A session is listed in the bucket of its last_activity_at, with its last non-system message."""
+        now = datetime.utcnow()
+        user, session = await _create_session(
+            db, updated_at=now - timedelta(days=400), last_message_interaction_at=now - timedelta(days=400)
+        )
+        for minutes, (content_type, content) in enumerate((("text", "first"), ("text", "latest"), ("system", "joined"))):
+            message = _message(session, content_type, content, now + timedelta(minutes=minutes))
+            db.add(message)
+            await db.flush()
+            await _record_session_message(db, session, message, now)
+
+        async def sessions_in(group):
+            response = await get_chat_sessions(
+                group=group, limit=10, offset=0, agent_id=None, search=None,
+                date_from=None, date_to=None, current_user=user, db=db,
+            )
+            return response["sessions"]
+
+        today = await sessions_in("today")
+        assert [entry["session_id"] for entry in today] == [str(session.public_id)]
+        assert today[0]["message_count"] == 2
+        assert today[0]["last_message_preview"] == "latest"
+        assert await sessions_in("older") == []
@@ -0,0 +1,145 @@
+"""Tests for the promoted sessions.is_favorite flag (migration 0034).
+
+The tests require a migrated database. Each runs the migration's upgrade
+inside a transaction that is rolled back at the end.
+"""
+
+import importlib.util
+import uuid
+from pathlib import Path
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from aldar_middleware.models.menu import Agent
+from aldar_middleware.models.sessions import Session
+from aldar_middleware.models.user import User
+from aldar_middleware.routes.chat import (
+    FavoriteUpdateRequest,
+    _favorite_flag_clause,
+    mark_chat_session_favourite,
+)
+
+MIGRATION = (
+    Path(__file__).resolve().parents[1]
+    / "aldar_middleware/migrations/versions/0034_promote_session_favorite_flag.py"
+)
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("migration_0034", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _upgrade(db):
+    migration = _load_migration()
+
+    def run(sync_conn):
+        with Operations.context(MigrationContext.configure(sync_conn)):
+            migration.upgrade()
+
+    conn = await db.connection()
+    await conn.run_sync(run)
+
+
+async def _create_owner(db):
+    user = User(email=f"{uuid.uuid4().hex}@example.com")
+    agent = Agent(name=f"agent-{uuid.uuid4().hex}")
+    db.add_all([user, agent])
+    await db.flush()
+    return user, agent
+
+
+class TestFavoriteMigration:
+    """Test reconciling the legacy metadata keys and the favourite index."""
+
+    @pytest.mark.asyncio
+    async def test_legacy_metadata_keys_are_reconciled(self, db):
+        """Metadata keys decide the flag and are removed; sessions without keys keep theirs."""
+        user, agent = await _create_owner(db)
+        cases = {
+            "camel_case": ({"isFavorite": "true", "title": "x"}, False, True),
+            "british": ({"is_favourite": True}, False, True),
+            "unfavourited": ({"is_favorite": False}, True, False),
+            "string_false": ({"is_favorite": "false"}, True, False),
+            "no_key": ({"title": "x"}, True, True),
+            "no_metadata": (None, True, True),
+        }
+        sessions = {}
+        for name, (metadata, flag, _) in cases.items():
+            sessions[name] = Session(
+                user_id=user.id, agent_id=agent.id, session_metadata=metadata, is_favorite=flag
+            )
+        db.add_all(sessions.values())
+        await db.flush()
+
+        await _upgrade(db)
+
+        for name, (metadata, _, expected) in cases.items():
+            await db.refresh(sessions[name])
+            assert sessions[name].is_favorite is expected, name
+            remaining = sessions[name].session_metadata or {}
+            assert not {"is_favorite", "isFavorite", "is_favourite"} & set(remaining), name
+        assert sessions["camel_case"].session_metadata == {"title": "x"}
+
+    @pytest.mark.asyncio
+    async def test_favourite_listing_is_an_index_scan(self, db):
+        """The favourites filter of the session list is an index scan, not a scan of the user's sessions."""
+        user, agent = await _create_owner(db)
+        await db.execute(
+            text("""
+                INSERT INTO sessions (id, public_id, user_id, agent_id, status, session_type, is_favorite,
+                                      created_at, updated_at, last_activity_at, message_count)
+                SELECT gen_random_uuid(), gen_random_uuid(), :user_id, :agent_id, 'active', 'chat',
+                       n % 200 = 0, now(), now(), now() - n * interval '1 minute', 0
+                FROM generate_series(1, 5000) AS n
+            """),
+            {"user_id": user.id, "agent_id": agent.id},
+        )
+        await _upgrade(db)
+        await db.execute(text("ANALYZE sessions"))
+
+        listing = (
+            select(Session.id)
+            .where(Session.user_id == user.id, Session.deleted_at.is_(None), _favorite_flag_clause())
+            .order_by(Session.last_activity_at.desc())
+            .limit(20)
+        )
+        sql = listing.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        plan = "\n".join(row[0] for row in (await db.execute(text(f"EXPLAIN {sql}"))).all())
+
+        # The composite index returns the rows already in activity order
+        assert "Index Scan using idx_sessions_user_favorite_activity on sessions" in plan, plan
+        assert "Seq Scan" not in plan, plan
+        assert "Sort" not in plan, plan
+        redundant = await db.scalar(
+            text("""
+                SELECT count(*) FROM pg_indexes
+                WHERE indexname IN ('idx_sessions_user_favorites_activity', 'ix_sessions_is_favorite')
+            """)
+        )
+        assert redundant == 0
+
+
+class TestFavouriteToggle:
+    """Test that the toggle endpoint writes the column only."""
+
+    @pytest.mark.asyncio
+    async def test_toggle_writes_column_and_clears_metadata_keys(self, db):
+        """The flag lands in is_favorite and no copy is left in metadata."""
+        user, agent = await _create_owner(db)
+        session = Session(user_id=user.id, agent_id=agent.id, session_metadata={"isFavorite": "false", "title": "x"})
+        db.add(session)
+        await db.flush()
+
+        response = await mark_chat_session_favourite(session.id, FavoriteUpdateRequest(is_favorite=True), user, db)
+
+        assert response["is_favorite"] is True
+        await db.refresh(session)
+        assert session.is_favorite is True
+        assert session.session_metadata == {"title": "x"}
@@ -0,0 +1,131 @@
+"""Tests for the sliding-window rate limiter backends."""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from aldar_middleware.services.sliding_window_limiter import (
+    InMemorySlidingWindowLimiter,
+    RedisSlidingWindowLimiter,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest_asyncio.fixture
+async def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    # Lua scripting in fakeredis needs the lupa package (fakeredis[lua])
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeAsyncRedis(server=server)
+    yield server, client
+    await client.aclose()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter_factory(request):
+    """Build limiters of either backend sharing one clock (and one Redis)."""
+    clock = FakeClock()
+    if request.param == "memory":
+        limiter = InMemorySlidingWindowLimiter(shards=4, clock=clock)
+        return clock, lambda: limiter
+    _, client = request.getfixturevalue("fake_redis")
+    return clock, lambda: RedisSlidingWindowLimiter(client, prefix="test", clock=clock)
+
+
+class TestSlidingWindow:
+    """Behaviour shared by both backends."""
+
+    @pytest.mark.asyncio
+    async def test_limit_is_enforced_and_slides(self, limiter_factory):
+        """Hits beyond the limit are rejected until the oldest ones age out."""
+        clock, make = limiter_factory
+        limiter = make()
+        for offset in range(3):
+            clock.now += 10
+            assert (await limiter.hit("user", [(3, 60)])).allowed
+
+        clock.now += 10
+        rejected = await limiter.hit("user", [(3, 60)])
+        assert not rejected.allowed
+        assert (rejected.count, rejected.limit) == (3, 3)
+        assert rejected.retry_after == 30
+
+        clock.now += 30
+        assert (await limiter.hit("user", [(3, 60)])).allowed
+        assert (await limiter.hit("other-user", [(3, 60)])).allowed
+
+    @pytest.mark.asyncio
+    async def test_every_window_must_have_room(self, limiter_factory):
+        """The hour limit applies even when the minute window is empty."""
+        clock, make = limiter_factory
+        limiter = make()
+        windows = [(2, 60), (3, 3600)]
+        for _ in range(3):
+            assert (await limiter.hit("ip", windows)).allowed
+            clock.now += 61
+
+        decision = await limiter.hit("ip", windows)
+        assert not decision.allowed
+        assert decision.window == 3600
+
+    @pytest.mark.asyncio
+    async def test_concurrent_hits_admit_exactly_the_limit(self, limiter_factory):
+        """Concurrent coroutines never over-admit."""
+        _, make = limiter_factory
+        limiter = make()
+        decisions = await asyncio.gather(*(limiter.hit("burst", [(10, 60)]) for _ in range(50)))
+        assert sum(decision.allowed for decision in decisions) == 10
+
+
+class TestRedisSlidingWindow:
+    """Redis-specific behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_limit_is_shared_between_workers(self, fake_redis):
+        """Two limiter instances (workers) count against one limit."""
+        _, client = fake_redis
+        clock = FakeClock()
+        workers = [RedisSlidingWindowLimiter(client, prefix="test", clock=clock) for _ in range(2)]
+
+        decisions = [await workers[index % 2].hit("user", [(4, 60)]) for index in range(6)]
+        assert [decision.allowed for decision in decisions] == [True] * 4 + [False] * 2
+        assert 0 < await client.pttl("test:user") <= 60_000
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_process_limits_when_redis_fails(self, fake_redis):
+        """A Redis outage degrades to per-process limits."""
+        server, client = fake_redis
+        fallback = InMemorySlidingWindowLimiter(clock=FakeClock())
+        limiter = RedisSlidingWindowLimiter(client, prefix="test", fallback=fallback)
+        server.connected = False
+
+        assert (await limiter.hit("user", [(1, 60)])).allowed
+        assert not (await limiter.hit("user", [(1, 60)])).allowed
+        assert len(fallback) == 1
+
+
+class TestInMemorySlidingWindow:
+    """In-process specific behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_expired_buckets_are_swept(self):
+        """Keys whose hits have all expired do not accumulate."""
+        clock = FakeClock()
+        limiter = InMemorySlidingWindowLimiter(shards=1, clock=clock)
+        limiter.SWEEP_EVERY = 10
+        for index in range(9):
+            await limiter.hit(f"user-{index}", [(5, 60)])
+        assert len(limiter) == 9
+
+        clock.now += 61
+        await limiter.hit("late-user", [(5, 60)])
+        assert len(limiter) == 1
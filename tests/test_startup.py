@@ -0,0 +1,94 @@
+"""Tests for the concurrent startup graph."""
+
+import asyncio
+import time
+
+import pytest
+
+from aldar_middleware.utils.startup import StartupGraph, StartupTask
+
+
+def _sleep(seconds, order=None, name=None, result=None):
+    async def run():
+        await asyncio.sleep(seconds)
+        if order is not None:
+            order.append(name)
+        return result
+
+    return run
+
+
+class TestStartupGraph:
+    """Test running startup tasks by dependency."""
+
+    @pytest.mark.asyncio
+    async def test_independent_tasks_overlap(self):
+        """Boot time is the longest chain, not the sum of all tasks."""
+        order = []
+        graph = StartupGraph([
+            StartupTask("secrets", _sleep(0.1, order, "secrets")),
+            StartupTask("database", _sleep(0.2, order, "database"), ("secrets",)),
+            StartupTask("redis", _sleep(0.2, order, "redis", result="client"), ("secrets",)),
+            StartupTask("caches", _sleep(0.0, order, "caches"), ("redis",)),
+        ])
+
+        start = time.perf_counter()
+        await graph.start()
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.45
+        assert order[0] == "secrets" and order.index("caches") > order.index("redis")
+        assert graph.results["redis"] == "client"
+        assert graph.ready
+
+    @pytest.mark.asyncio
+    async def test_failures_and_timeouts_are_contained(self):
+        """A failing or slow task is recorded; the others still run."""
+        async def fail():
+            raise ConnectionError("refused")
+
+        graph = StartupGraph([
+            StartupTask("redis", fail),
+            StartupTask("cosmos", _sleep(5), timeout=0.05),
+            StartupTask("caches", _sleep(0), ("redis",)),
+        ])
+        await graph.start()
+
+        snapshot = graph.snapshot()
+        assert snapshot["redis"]["status"] == "failed"
+        assert "refused" in snapshot["redis"]["error"]
+        assert snapshot["cosmos"]["status"] == "timeout"
+        assert snapshot["caches"]["status"] == "ok"
+
+    @pytest.mark.asyncio
+    async def test_background_tasks_gate_readiness(self):
+        """Startup returns before background tasks; readiness waits for them."""
+        graph = StartupGraph([
+            StartupTask("database", _sleep(0)),
+            StartupTask("openai", _sleep(0.1), background=True),
+        ])
+        await graph.start()
+        assert not graph.ready
+
+        await graph.wait_ready()
+        assert graph.ready
+        await graph.stop()
+
+    @pytest.mark.asyncio
+    async def test_warm_ups_do_not_gate_readiness(self):
+        """A task declared with gates_readiness=False is reported but not waited for."""
+        graph = StartupGraph([
+            StartupTask("database", _sleep(0)),
+            StartupTask("openapi_schema", _sleep(10), background=True, gates_readiness=False),
+        ])
+        await graph.start()
+        await asyncio.sleep(0)
+
+        assert graph.ready
+        assert graph.snapshot()["openapi_schema"]["status"] == "pending"
+        await graph.stop()
+
+    def test_cycles_are_rejected(self):
+        """Dependencies that can never be satisfied fail at construction."""
+        with pytest.raises(ValueError, match="cycle"):
+            StartupGraph([StartupTask("a", _sleep(0), ("b",)), StartupTask("b", _sleep(0), ("a",))])
@@ -0,0 +1,106 @@
+"""Tests for buffered trace export and tail-based trace retention."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from aldar_middleware.models import TraceStatusType
+from aldar_middleware.monitoring.distributed_tracing import (
+    DistributedTracingService,
+    get_current_trace,
+)
+from aldar_middleware.monitoring.trace_exporter import TraceExporter, TraceRecord
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = TraceExporter()
+    exporter.flush_interval = 0.01
+    exporter.otlp_enabled = False
+    batches = []
+
+    async def fake_write_batch(batch):
+        batches.append([record.request_path for record in batch])
+        return len(batch)
+
+    monkeypatch.setattr(exporter, "_write_batch", fake_write_batch)
+    monkeypatch.setattr(
+        "aldar_middleware.monitoring.distributed_tracing.get_trace_exporter", lambda: exporter
+    )
+    exporter.batches = batches
+    return exporter
+
+
+@pytest.fixture
+def tracing_service():
+    service = DistributedTracingService()
+    service.enabled = True
+    service.sampling_config.should_sample = 0.0
+    service.slow_threshold_ms = 1000
+    return service
+
+
+async def _trace_request(service, path, **end_kwargs):
+    trace = await service.start_trace("GET", path)
+    assert get_current_trace() is trace
+    finished = await service.end_trace(**end_kwargs)
+    assert get_current_trace() is None
+    return finished
+
+
+class TestTailRetention:
+    """Test which unsampled traces are kept."""
+
+    @pytest.mark.asyncio
+    async def test_errors_and_slow_traces_are_kept(self, exporter, tracing_service):
+        """Head sampling drops ordinary traces; failures and slow ones are still exported."""
+        await exporter.start()
+        try:
+            ok = await _trace_request(tracing_service, "/ok", http_status_code=200)
+            failed = await _trace_request(
+                tracing_service, "/failed", status=TraceStatusType.ERROR, http_status_code=500
+            )
+            tracing_service.slow_threshold_ms = 0
+            slow = await _trace_request(tracing_service, "/slow", http_status_code=200)
+        finally:
+            await exporter.stop()
+
+        assert (ok.retention, failed.retention, slow.retention) == (None, "error", "slow")
+        assert exporter.batches == [["/failed", "/slow"]]
+
+    @pytest.mark.asyncio
+    async def test_head_sampled_traces_are_kept(self, exporter, tracing_service):
+        """Traces selected by head sampling are exported regardless of outcome."""
+        tracing_service.sampling_config.should_sample = 1.0
+        await exporter.start()
+        try:
+            trace = await _trace_request(tracing_service, "/ok", http_status_code=200)
+        finally:
+            await exporter.stop()
+
+        assert trace.retention == "sampled"
+        assert exporter.batches == [["/ok"]]
+
+
+class TestTraceExporter:
+    """Test the export buffer."""
+
+    @pytest.mark.asyncio
+    async def test_traces_are_dropped_when_not_running(self, exporter, tracing_service):
+        """Without a running exporter, traces are dropped instead of written inline."""
+        trace = await tracing_service.start_trace("GET", "/ok")
+        await tracing_service.end_trace(status=TraceStatusType.ERROR)
+
+        assert exporter.submit(trace) is False
+        assert exporter.batches == []
+
+    def test_trace_row_records_retention(self, tracing_service):
+        """Exported rows carry the retention reason in their metadata."""
+        record = TraceRecord(
+            correlation_id="c", trace_id="t", span_id="s", request_method="GET",
+            request_path="/x", start_time=datetime.now(timezone.utc), sampled=False,
+            sample_type=tracing_service.sampling_config.sample_type, retention="slow",
+        )
+        row = record.to_row()
+        assert row["trace_metadata"] == {"retention": "slow"}
+        assert row["sampled"] is True
@@ -0,0 +1,140 @@
+"""Tests for batched Web PubSub run event ingestion."""
+
+import asyncio
+import uuid
+
+import pytest
+
+from aldar_middleware.services import webpubsub_listener
+from aldar_middleware.services.webpubsub_listener import (
+    WebPubSubEventListener,
+    _PendingRunEvent,
+    _fold_run_events,
+)
+
+
+def _event(run_id: str, **data) -> _PendingRunEvent:
+    return _PendingRunEvent(
+        event="Run", run_id=run_id, session_id="s", run_data={"run_id": run_id, **data}
+    )
+
+
+class TestFoldRunEvents:
+    """Test collapsing a batch into one upsert per run."""
+
+    def test_events_apply_in_arrival_order(self):
+        """The last status wins and empty content does not erase earlier content."""
+        runs = _fold_run_events([
+            _event("a", status="RUNNING"),
+            _event("b", status="RUNNING", content="b1"),
+            _event("a", content="partial"),
+            _event("a", status="COMPLETED", content="final"),
+            _event("b", status="FAILED", content="", error_message="boom"),
+        ])
+
+        assert list(runs) == ["a", "b"]
+        assert (runs["a"].status, runs["a"].content) == ("completed", "final")
+        assert (runs["b"].status, runs["b"].content, runs["b"].error_message) == ("failed", "b1", "boom")
+
+    def test_insert_fields_come_from_first_event(self):
+        """Agent and user of a new run are taken from the event that created it."""
+        first = _event("a", agent_name="Router")
+        runs = _fold_run_events([first, _event("a", agent_name="Other")])
+        assert runs["a"].first is first
+
+
+class TestBatching:
+    """Test that concurrent events share a batch."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_events_are_written_together(self, monkeypatch):
+        """Events arriving within the flush interval form one batch."""
+        listener = WebPubSubEventListener()
+        listener.flush_interval = 0.05
+        batches = []
+
+        async def fake_process_batch(batch):
+            batches.append([pending.run_id for pending in batch])
+            results = [True] * len(batch)
+            listener._resolve_futures(batch, results)
+            return results
+
+        monkeypatch.setattr(listener, "_process_batch", fake_process_batch)
+        await listener.start_listening()
+        try:
+            events = [
+                {"event": "RunCompleted", "data": {"session_id": "s", "run_id": f"r{i}"}}
+                for i in range(5)
+            ]
+            results = await asyncio.gather(*(listener.process_run_event(e) for e in events))
+        finally:
+            await listener.stop_listening()
+
+        assert results == [True] * 5
+        assert batches == [["r0", "r1", "r2", "r3", "r4"]]
+
+    @pytest.mark.asyncio
+    async def test_non_run_events_are_ignored(self):
+        """Only Run* events are saved."""
+        listener = WebPubSubEventListener()
+        assert await listener.process_run_event({"event": "Heartbeat"}) is False
+
+
+class FakeSavepointSession:
+    """Session stand-in counting savepoints and commits."""
+
+    def __init__(self):
+        self.savepoints = 0
+        self.commits = 0
+
+    def begin_nested(self):
+        session = self
+
+        class Savepoint:
+            async def __aenter__(self):
+                session.savepoints += 1
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+        return Savepoint()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class TestFailureIsolation:
+    """Test that one unwritable run does not fail the rest of its batch."""
+
+    @pytest.mark.asyncio
+    async def test_bad_run_is_bisected_out_of_the_batch(self, monkeypatch):
+        """Only events of the run whose upsert fails are reported as failed."""
+        listener = WebPubSubEventListener()
+        db = FakeSavepointSession()
+        written = []
+
+        async def get_db():
+            yield db
+
+        async def resolve_sessions(db, session_ids):
+            return {"s": (uuid.uuid4(), 1, uuid.uuid4())}
+
+        async def upsert_runs(db, runs, sessions):
+            if "bad" in runs:
+                raise RuntimeError("violates foreign key constraint")
+            written.extend(runs)
+
+        monkeypatch.setattr(webpubsub_listener, "get_db", get_db)
+        monkeypatch.setattr(listener, "_resolve_sessions", resolve_sessions)
+        monkeypatch.setattr(listener, "_upsert_runs", upsert_runs)
+
+        batch = [_event(run_id) for run_id in ["a", "b", "bad", "c", "a", "d", "e", "f"]]
+        results = await listener._process_batch(batch)
+
+        assert results == [True, True, False, True, True, True, True, True]
+        assert sorted(written) == ["a", "b", "c", "d", "e", "f"]
+        assert db.commits == 1
+        assert db.savepoints <= 1 + 2 * 3  # The whole batch, then two halves per level
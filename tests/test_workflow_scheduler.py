@@ -0,0 +1,194 @@
+"""Tests for the workflow DAG scheduler."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from aldar_middleware.services.workflow_scheduler import (
+    StepStatusBatcher,
+    WorkflowCycleError,
+    WorkflowDagScheduler,
+    WorkflowDependencyError,
+    WorkflowStepTimeoutError,
+)
+
+
+def _sleep_step(durations, started, finished):
+    """Build a run_step coroutine that sleeps for the step's duration."""
+
+    async def run_step(step_def):
+        started.append(step_def["id"])
+        await asyncio.sleep(durations[step_def["id"]])
+        finished.append(step_def["id"])
+        return {"id": step_def["id"]}
+
+    return run_step
+
+
+class TestWorkflowDagScheduler:
+    """Unit tests for WorkflowDagScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_independent_branches_run_concurrently(self):
+        """Wall-clock time approaches the critical path, not the sum of steps."""
+        steps = [
+            {"id": "a"},
+            {"id": "b", "depends_on": ["a"]},
+            {"id": "c", "depends_on": ["a"]},
+            {"id": "d", "depends_on": ["b", "c"]},
+        ]
+        durations = {"a": 0.05, "b": 0.2, "c": 0.2, "d": 0.05}
+        started, finished, completed = [], [], []
+
+        async def on_complete(step_id, result, error):
+            assert error is None
+            completed.append(step_id)
+
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=4)
+        start = time.perf_counter()
+        await scheduler.run(_sleep_step(durations, started, finished), on_complete)
+        elapsed = time.perf_counter() - start
+
+        # Critical path a -> b -> d is 0.3s; sequential would be 0.5s
+        assert elapsed < 0.45
+        assert completed[0] == "a"
+        assert completed[-1] == "d"
+        assert set(completed) == {"a", "b", "c", "d"}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_is_respected(self):
+        """No more than max_concurrency steps run at once."""
+        steps = [{"id": f"s{i}"} for i in range(6)]
+        running = 0
+        peak = 0
+
+        async def run_step(step_def):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=2)
+        await scheduler.run(run_step, AsyncMock())
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_critical_path_started_first_when_capped(self):
+        """With one slot, the step heading the longest chain is started first."""
+        steps = [
+            {"id": "leaf"},
+            {"id": "root"},
+            {"id": "mid", "depends_on": ["root"]},
+            {"id": "tail", "depends_on": ["mid"]},
+        ]
+        started = []
+
+        async def run_step(step_def):
+            started.append(step_def["id"])
+
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=1)
+        await scheduler.run(run_step, AsyncMock())
+
+        assert started[0] == "root"
+
+    @pytest.mark.asyncio
+    async def test_step_timeout_is_reported_as_error(self):
+        """Steps exceeding timeout_seconds complete with a timeout error."""
+        steps = [{"id": "slow", "timeout_seconds": 0.01}]
+        errors = {}
+
+        async def run_step(step_def):
+            await asyncio.sleep(1)
+
+        async def on_complete(step_id, result, error):
+            errors[step_id] = error
+
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=1)
+        await scheduler.run(run_step, on_complete)
+
+        assert isinstance(errors["slow"], WorkflowStepTimeoutError)
+
+    @pytest.mark.asyncio
+    async def test_failing_callback_cancels_running_steps(self):
+        """An exception from on_complete stops the run and cancels in-flight steps."""
+        steps = [{"id": "fast"}, {"id": "slow"}]
+        cancelled = []
+
+        async def run_step(step_def):
+            if step_def["id"] == "fast":
+                raise RuntimeError("boom")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(step_def["id"])
+                raise
+
+        async def on_complete(step_id, result, error):
+            if error is not None:
+                raise error
+
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=2)
+        with pytest.raises(RuntimeError, match="boom"):
+            await scheduler.run(run_step, on_complete)
+
+        assert cancelled == ["slow"]
+
+    @pytest.mark.asyncio
+    async def test_cycle_is_detected(self):
+        """Steps that can never become ready raise WorkflowCycleError."""
+        steps = [
+            {"id": "a"},
+            {"id": "b", "depends_on": ["c"]},
+            {"id": "c", "depends_on": ["b"]},
+        ]
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=2)
+
+        with pytest.raises(WorkflowCycleError):
+            await scheduler.run(AsyncMock(), AsyncMock())
+
+
+    @pytest.mark.asyncio
+    async def test_dependency_on_parallel_child_waits_for_its_owner(self):
+        """A step depending on a child of a parallel step starts after the parallel step."""
+        steps = [
+            {"id": "fan_out", "type": "parallel", "parallel_steps": ["child"]},
+            {"id": "b", "depends_on": ["child"]},
+        ]
+        started, finished = [], []
+        scheduler = WorkflowDagScheduler(steps, max_concurrency=4, owners={"child": "fan_out"})
+
+        await scheduler.run(_sleep_step({"fan_out": 0.05, "b": 0}, started, finished), AsyncMock())
+
+        assert finished.index("fan_out") < started.index("b")
+
+    def test_unknown_dependency_is_rejected(self):
+        with pytest.raises(WorkflowDependencyError, match="missing"):
+            WorkflowDagScheduler([{"id": "a", "depends_on": ["missing"]}], max_concurrency=1)
+
+
+class TestStepStatusBatcher:
+    """Unit tests for StepStatusBatcher."""
+
+    @pytest.mark.asyncio
+    async def test_flushes_once_per_batch(self):
+        """Records are flushed together once the batch size is reached."""
+        db = MagicMock()
+        db.flush = AsyncMock()
+        batcher = StepStatusBatcher(db, batch_size=3)
+
+        for i in range(2):
+            batcher.add(f"record-{i}")
+            await batcher.maybe_flush()
+        db.flush.assert_not_awaited()
+
+        batcher.add("record-2")
+        await batcher.maybe_flush()
+        db.flush.assert_awaited_once()
+        db.add_all.assert_called_once_with(["record-0", "record-1", "record-2"])
+
+        await batcher.flush()
+        db.flush.assert_awaited_once()